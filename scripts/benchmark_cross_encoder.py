@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Cross-Encoder Scoring Benchmark
+Plain CrossEncoder.predict (input order) vs CrossEncoderScorer (length-sorted
+dynamic batches, optional int8 quantization) at batch sizes 1-64, plus the
+warm-cache case of a repeated classroom question.
+
+Usage:
+    python scripts/benchmark_cross_encoder.py [--model cross-encoder/ms-marco-MiniLM-L-6-v2]
+        [--pairs 128] [--batch-sizes 1,2,4,8,16,32,64] [--repeat 3] [--quantize]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.rag.cross_encoder_scoring import CrossEncoderScorer, quantize_for_cpu
+
+SENTENCES = [
+    "Hücre zarı seçici geçirgen bir yapıya sahiptir.",
+    "Mitoz bölünme sonucunda kalıtsal olarak aynı iki hücre oluşur.",
+    "Fotosentez kloroplastlarda gerçekleşir ve ışık enerjisini kimyasal enerjiye dönüştürür.",
+    "Enzimler tepkimelerin aktivasyon enerjisini düşürür.",
+    "DNA'nın yapısında deoksiriboz şekeri, fosfat ve organik bazlar bulunur.",
+    "Osmoz suyun yarı geçirgen zardan az yoğun ortamdan çok yoğun ortama geçişidir.",
+]
+
+
+def build_workload(pairs: int, seed: int = 42):
+    """Chunks of 1-40 sentences: the length spread of real PDF chunks"""
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(SENTENCES) for _ in range(rng.choice([1, 2, 4, 8, 16, 40])))
+        for _ in range(pairs)
+    ]
+
+
+def time_runs(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def run_benchmark(model_name: str, pairs: int, batch_sizes, repeat: int, quantize: bool):
+    from sentence_transformers import CrossEncoder
+
+    model = CrossEncoder(model_name, max_length=512)
+    quantized = quantize_for_cpu(model) if quantize else False
+    query = "Hücre zarının görevi nedir?"
+    texts = build_workload(pairs)
+    query_pairs = [(query, text) for text in texts]
+
+    rows = []
+    for batch_size in batch_sizes:
+        scorer = CrossEncoderScorer(model, model_name, batch_size=batch_size, cache_size=0)
+        baseline = time_runs(
+            lambda: model.predict(query_pairs, batch_size=batch_size, show_progress_bar=False), repeat
+        )
+        dynamic = time_runs(lambda: scorer.predict_pairs(query_pairs), repeat)
+        batches = len(scorer.plan_batches(query_pairs))
+        rows.append({
+            "batch_size": batch_size,
+            "baseline_pairs_per_s": pairs / baseline,
+            "dynamic_pairs_per_s": pairs / dynamic,
+            "dynamic_batch_latency_ms": dynamic / batches * 1000,
+            "speedup": baseline / dynamic,
+        })
+
+    cached = CrossEncoderScorer(model, model_name)
+    cold = time_runs(lambda: (cached.clear_cache(), cached.score(query, texts)), 1)
+    warm = time_runs(lambda: cached.score(query.upper(), texts), repeat)
+
+    return {"model": model_name, "pairs": pairs, "quantized": quantized, "rows": rows,
+            "cold_ms": cold * 1000, "warm_ms": warm * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-encoder batching/caching benchmark")
+    parser.add_argument("--model", default="cross-encoder/ms-marco-MiniLM-L-6-v2")
+    parser.add_argument("--pairs", type=int, default=128)
+    parser.add_argument("--batch-sizes", default="1,2,4,8,16,32,64")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quantize", action="store_true", help="int8 dynamic quantization (CPU)")
+    args = parser.parse_args()
+
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+    result = run_benchmark(args.model, args.pairs, batch_sizes, args.repeat, args.quantize)
+
+    print("=" * 72)
+    print(f"  Cross-Encoder Benchmark: {result['model']} ({result['pairs']} pairs)")
+    print("=" * 72)
+    print(f"  int8 quantized: {result['quantized']}")
+    print(f"  {'batch':>5}  {'baseline pairs/s':>16}  {'dynamic pairs/s':>15}  {'batch ms':>9}  {'speedup':>7}")
+    for row in result["rows"]:
+        print(f"  {row['batch_size']:>5}  {row['baseline_pairs_per_s']:>16.1f}  {row['dynamic_pairs_per_s']:>15.1f}"
+              f"  {row['dynamic_batch_latency_ms']:>9.1f}  {row['speedup']:>6.2f}x")
+    print(f"  repeated question: cold {result['cold_ms']:.1f} ms, warm cache {result['warm_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,27 +20,27 @@ import requests
 # Import all Eğitsel-KBRAG components
 try:
     from database.database import DatabaseManager
+    from database.student_context import load_student_context, invalidate_student_context
     from config.feature_flags import FeatureFlags
-    from business_logic.cacs import get_cacs_scorer
+    from business_logic.cacs import get_cacs_scorer, fetch_global_scores
     from business_logic.pedagogical import (
         get_zpd_calculator,
         get_bloom_detector,
         get_cognitive_load_manager
     )
-    from api.personalization import PersonalizeRequest, personalize_response
 except ImportError:
     import sys
     import os
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
     from database.database import DatabaseManager
+    from database.student_context import load_student_context, invalidate_student_context
     from config.feature_flags import FeatureFlags
-    from business_logic.cacs import get_cacs_scorer
+    from business_logic.cacs import get_cacs_scorer, fetch_global_scores
     from business_logic.pedagogical import (
         get_zpd_calculator,
         get_bloom_detector,
         get_cognitive_load_manager
     )
-    from api.personalization import PersonalizeRequest, personalize_response
 
 # DB manager will be injected via dependency
 db_manager = None
@@ -171,24 +171,17 @@ async def adaptive_query(
     try:
         logger.info(f"🚀 Adaptive query for user {request.user_id}: {request.query[:60]}...")
         
+        # Profile, recent interactions, EBARS state and session settings in one round trip
+        # (the same briefly cached context is reused by personalization below)
+        context = load_student_context(db, request.user_id, request.session_id)
+        
         # Track which components are active (use session-specific settings)
-        # First check session-specific settings from database
-        session_settings_dict = {}
-        try:
-            session_settings_result = db.execute_query(
-                "SELECT * FROM session_settings WHERE session_id = ?",
-                (request.session_id,)
-            )
-            if session_settings_result and len(session_settings_result) > 0:
-                # Convert SQLite Row to dict
-                row = session_settings_result[0]
-                session_settings_dict = dict(row) if hasattr(row, 'keys') else row
-                logger.info(f"📋 Loaded session settings for {request.session_id}")
-                logger.info(f"   Session settings keys: {list(session_settings_dict.keys())}")
-            else:
-                logger.warning(f"⚠️ No session settings found for session {request.session_id}")
-        except Exception as e:
-            logger.warning(f"⚠️ Could not load session settings: {e}", exc_info=True)
+        session_settings_dict = context.session_settings
+        if session_settings_dict:
+            logger.info(f"📋 Loaded session settings for {request.session_id}")
+            logger.info(f"   Session settings keys: {list(session_settings_dict.keys())}")
+        else:
+            logger.warning(f"⚠️ No session settings found for session {request.session_id}")
         
         # First check if Eğitsel-KBRAG is enabled (required for all features)
         egitsel_kbrag_enabled = FeatureFlags.is_egitsel_kbrag_enabled()
@@ -258,47 +251,10 @@ async def adaptive_query(
         # === 1. STUDENT PROFILE & HISTORY ===
         logger.info("1️⃣ Loading student profile and history...")
         
-        profile = db.execute_query(
-            "SELECT * FROM student_profiles WHERE user_id = ? AND session_id = ?",
-            (request.user_id, request.session_id)
-        )
-        student_profile = profile[0] if profile else {}
-        
-        if not student_profile:
-            logger.info("  → New student, creating default profile")
-            # Create default profile for new student
-            try:
-                db.execute_insert(
-                    """
-                    INSERT INTO student_profiles
-                    (user_id, session_id, average_understanding, average_satisfaction,
-                     total_interactions, total_feedback_count, last_updated)
-                    VALUES (?, ?, 3.0, 3.0, 0, 0, CURRENT_TIMESTAMP)
-                    """,
-                    (request.user_id, request.session_id)
-                )
-                logger.info(f"  → Created default profile for user {request.user_id}")
-                student_profile = {
-                    "user_id": request.user_id,
-                    "session_id": request.session_id,
-                    "average_understanding": 3.0,
-                    "average_satisfaction": 3.0,
-                    "total_interactions": 0,
-                    "total_feedback_count": 0
-                }
-            except Exception as e:
-                logger.warning(f"  → Failed to create default profile: {e}")
-                student_profile = {}
-        
-        recent_interactions = db.execute_query(
-            """
-            SELECT * FROM student_interactions 
-            WHERE user_id = ? AND session_id = ?
-            ORDER BY timestamp DESC
-            LIMIT 20
-            """,
-            (request.user_id, request.session_id)
-        )
+        student_profile = context.profile
+        if "profile_id" not in student_profile:
+            logger.info("  → New student, default profile created")
+        recent_interactions = context.recent_interactions
         
         logger.info(f"  → Profile loaded, {len(recent_interactions)} past interactions")
         
@@ -312,32 +268,25 @@ async def adaptive_query(
             cacs_scorer = get_cacs_scorer()
             
             if cacs_scorer:
-                # Fetch global scores (table may not exist yet, handle gracefully)
+                # Fetch global scores in one query (table may not exist yet, handle gracefully)
                 global_scores = {}
                 try:
-                    for doc in request.rag_documents:
-                        score_data = db.execute_query(
-                            "SELECT * FROM document_global_scores WHERE doc_id = ?",
-                            (doc.doc_id,)
-                        )
-                        if score_data:
-                            global_scores[doc.doc_id] = score_data[0]
+                    global_scores = fetch_global_scores(db, [doc.doc_id for doc in request.rag_documents])
                 except Exception as e:
                     logger.warning(f"Could not fetch global scores (table may not exist): {e}")
                     global_scores = {}  # Continue with empty global_scores
                 
-                # Score each document
+                # Score all documents at once (history indexed once per request)
+                cacs_results = cacs_scorer.calculate_scores_bulk(
+                    documents=[(doc.doc_id, doc.score) for doc in request.rag_documents],
+                    student_profile=student_profile,
+                    conversation_history=recent_interactions,
+                    global_scores=global_scores,
+                    current_query=request.query
+                )
+                
                 scored_docs = []
-                for doc in request.rag_documents:
-                    cacs_result = cacs_scorer.calculate_score(
-                        doc_id=doc.doc_id,
-                        base_score=doc.score,
-                        student_profile=student_profile,
-                        conversation_history=recent_interactions,
-                        global_scores=global_scores,
-                        current_query=request.query
-                    )
-                    
+                for doc, cacs_result in zip(request.rag_documents, cacs_results):
                     scored_docs.append(DocumentScore(
                         doc_id=doc.doc_id,
                         final_score=cacs_result['final_score'],
@@ -560,6 +509,7 @@ async def adaptive_query(
             "UPDATE student_interactions SET processing_time_ms = ? WHERE interaction_id = ?",
             (processing_time_ms, interaction_id)
         )
+        invalidate_student_context(request.user_id, request.session_id)
         
         logger.info(f"✅ Adaptive query completed: interaction_id={interaction_id}, "
                    f"time={processing_time_ms:.0f}ms")
@@ -747,6 +697,9 @@ async def _generate_personalized_response(
     try:
         logger.info(f"🧠 Generating personalized response using LLM service...")
         
+        # Imported here: api.personalization imports main, which imports this module
+        from api.personalization import PersonalizeRequest, personalize_response
+        
         # Create personalization request
         personalize_req = PersonalizeRequest(
             user_id=user_id,
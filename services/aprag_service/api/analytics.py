@@ -8,7 +8,7 @@ from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
 import logging
 import json
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +17,7 @@ router = APIRouter()
 # Import database manager
 try:
     from database.database import DatabaseManager
+    from database import topic_rollups
     from main import db_manager
     from api.profiles import get_profile
 except ImportError:
@@ -25,6 +26,7 @@ except ImportError:
     import os
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
     from database.database import DatabaseManager
+    from database import topic_rollups
     from api.profiles import get_profile
     db_manager = None
 
@@ -40,6 +42,8 @@ class AnalyticsResponse(BaseModel):
     topic_performance: Dict[str, Any]
     engagement_metrics: Dict[str, Any]
     time_analysis: Dict[str, Any]
+    since: Optional[str] = None  # Inclusive lower bound applied (normalized), if any
+    as_of: Optional[str] = None  # Exclusive upper bound; pass it as the next ``since``
 
 
 def get_db() -> DatabaseManager:
@@ -52,38 +56,172 @@ def get_db() -> DatabaseManager:
     return db_manager
 
 
-def _calculate_improvement_trend(
-    interactions: List[Dict[str, Any]],
-    feedback: List[Dict[str, Any]]
-) -> str:
+# Keyword topics counted in interaction texts (simple keyword-based, can be enhanced with NLP)
+COMMON_TOPICS = ["kimya", "fizik", "matematik", "biyoloji", "tarih", "edebiyat"]
+
+# strftime('%w') -> day name (same names as datetime.strftime("%A"))
+WEEKDAY_NAMES = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+
+def _parse_since(since: Optional[str]) -> Optional[str]:
     """
-    Calculate improvement trend based on recent interactions and feedback
-    Returns: 'improving', 'stable', 'declining', or 'insufficient_data'
+    Normalize the ``since`` query parameter to the stored timestamp format
+    (SQLite CURRENT_TIMESTAMP, UTC 'YYYY-MM-DD HH:MM:SS') so it can be used
+    as an index range bound.
     """
-    if len(feedback) < 3:
-        return "insufficient_data"
+    if not since:
+        return None
+    try:
+        parsed = datetime.fromisoformat(since.replace('Z', '+00:00'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid 'since' timestamp: {since}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _load_user_analytics_aggregates(
+    db: DatabaseManager,
+    user_id: str,
+    session_id: Optional[str] = None,
+    since: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Compute all per-user analytics aggregates in SQL
     
-    # Sort feedback by timestamp
-    sorted_feedback = sorted(
-        feedback,
-        key=lambda x: x.get("timestamp", "") or "",
-        reverse=False
+    Only projected columns are read; the daily/hourly/weekday groupings are
+    answered from idx_interactions_user_session_time and the feedback window
+    from idx_feedback_user_session_time (both covering). Only the keyword
+    topic counts need the interaction texts, and those never leave SQLite.
+    
+    Counts cover the half-open window [since, as_of). ``as_of`` is the
+    current second, read once before the queries: rows of the running second
+    are left to the next refresh, so consecutive windows (since = previous
+    as_of) neither overlap nor skip rows.
+    
+    The improvement trend and the recent satisfaction are not additive over
+    windows (they compare halves / take the last rows of the whole series),
+    so they are always computed over the full history up to ``as_of``.
+    """
+    with db.get_connection() as conn:
+        as_of = conn.execute("SELECT strftime('%Y-%m-%d %H:%M:%S', 'now')").fetchone()[0]
+        aggregates = _query_aggregates(conn, user_id, session_id, since, as_of)
+    aggregates["as_of"] = as_of
+    return aggregates
+
+
+def _query_aggregates(
+    conn,
+    user_id: str,
+    session_id: Optional[str],
+    since: Optional[str],
+    as_of: str
+) -> Dict[str, Any]:
+    """Aggregate queries of ``_load_user_analytics_aggregates`` on one connection"""
+    history_where = "user_id = ?"
+    history_params: List[Any] = [user_id]
+    if session_id:
+        history_where += " AND session_id = ?"
+        history_params.append(session_id)
+    history_where += " AND timestamp < ?"
+    history_params.append(as_of)
+    
+    where = history_where
+    params = list(history_params)
+    if since:
+        where += " AND timestamp >= ?"
+        params.append(since)
+    params_t = tuple(params)
+    
+    topic_columns = ",\n".join(
+        f"SUM(CASE WHEN instr(lower(query), '{topic}') > 0 "
+        f"OR instr(lower(original_response), '{topic}') > 0 THEN 1 ELSE 0 END) AS topic_{topic}"
+        for topic in COMMON_TOPICS
     )
     
-    # Calculate average understanding for first half and second half
-    mid_point = len(sorted_feedback) // 2
-    first_half = sorted_feedback[:mid_point]
-    second_half = sorted_feedback[mid_point:]
+    totals = conn.execute(f"""
+        SELECT COUNT(*) AS total, {topic_columns}
+        FROM student_interactions
+        WHERE {where}
+    """, params_t).fetchone()
     
-    first_avg = sum(
-        float(f.get("understanding_level", 0) or 0)
-        for f in first_half
-    ) / len(first_half) if first_half else 0
+    # Groups are ordered so that ties resolve to the most recent group
+    daily = conn.execute(f"""
+        SELECT date(timestamp) AS day, COUNT(*) AS n
+        FROM student_interactions
+        WHERE {where} AND date(timestamp) IS NOT NULL
+        GROUP BY day
+        ORDER BY n DESC, day DESC
+    """, params_t).fetchall()
     
-    second_avg = sum(
-        float(f.get("understanding_level", 0) or 0)
-        for f in second_half
-    ) / len(second_half) if second_half else 0
+    hourly = conn.execute(f"""
+        SELECT CAST(strftime('%H', timestamp) AS INTEGER) AS hour, COUNT(*) AS n,
+               MAX(timestamp) AS last_seen
+        FROM student_interactions
+        WHERE {where} AND strftime('%H', timestamp) IS NOT NULL
+        GROUP BY hour
+        ORDER BY last_seen DESC
+    """, params_t).fetchall()
+    
+    weekdays = conn.execute(f"""
+        SELECT CAST(strftime('%w', timestamp) AS INTEGER) AS weekday, COUNT(*) AS n,
+               MAX(timestamp) AS last_seen
+        FROM student_interactions
+        WHERE {where} AND strftime('%w', timestamp) IS NOT NULL
+        GROUP BY weekday
+        ORDER BY last_seen DESC
+    """, params_t).fetchall()
+    
+    # Full feedback history in chronological order: halves for the trend,
+    # last 3 for satisfaction; totals/averages only over the window
+    feedback = conn.execute(f"""
+        WITH ordered AS (
+            SELECT
+                COALESCE(understanding_level, 0) AS understanding,
+                COALESCE(satisfaction_level, 0) AS satisfaction,
+                timestamp >= ? AS in_window,
+                ROW_NUMBER() OVER (ORDER BY timestamp, feedback_id) AS rn,
+                COUNT(*) OVER () AS n
+            FROM student_feedback sf
+            WHERE {history_where}
+              AND EXISTS (
+                  SELECT 1 FROM student_interactions si
+                  WHERE si.interaction_id = sf.interaction_id
+              )
+        )
+        SELECT
+            COALESCE(SUM(in_window), 0) AS total,
+            AVG(CASE WHEN in_window THEN understanding END) AS avg_understanding,
+            COUNT(*) AS history_total,
+            AVG(CASE WHEN rn <= n / 2 THEN understanding END) AS first_half_avg,
+            AVG(CASE WHEN rn > n / 2 THEN understanding END) AS second_half_avg,
+            MIN(CASE WHEN rn > n - 3 THEN satisfaction END) AS recent_min_satisfaction
+        FROM ordered
+    """, (since or "",) + tuple(history_params)).fetchone()
+    
+    return {
+        "total_interactions": totals["total"] or 0,
+        "topic_counts": {
+            topic: totals[f"topic_{topic}"] for topic in COMMON_TOPICS if totals[f"topic_{topic}"]
+        },
+        "daily_counts": [(row["day"], row["n"]) for row in daily],
+        "hour_counts": [(row["hour"], row["n"]) for row in hourly],
+        "weekday_counts": [(WEEKDAY_NAMES[row["weekday"]], row["n"]) for row in weekdays],
+        "feedback": dict(feedback)
+    }
+
+
+def _calculate_improvement_trend(feedback: Dict[str, Any]) -> str:
+    """
+    Calculate improvement trend from the chronological feedback halves
+    (full history, independent of ``since``)
+    Returns: 'improving', 'stable', 'declining', or 'insufficient_data'
+    """
+    if (feedback.get("history_total") or 0) < 3:
+        return "insufficient_data"
+    
+    first_avg = feedback.get("first_half_avg") or 0
+    second_avg = feedback.get("second_half_avg") or 0
     
     if second_avg > first_avg + 0.3:
         return "improving"
@@ -94,19 +232,20 @@ def _calculate_improvement_trend(
 
 
 def _detect_learning_patterns(
-    interactions: List[Dict[str, Any]],
-    feedback: List[Dict[str, Any]],
+    aggregates: Dict[str, Any],
     profile: Dict[str, Any]
 ) -> List[Dict[str, Any]]:
     """
-    Detect learning patterns from interactions and feedback
+    Detect learning patterns from interaction and feedback aggregates
     """
     patterns = []
+    total_interactions = aggregates["total_interactions"]
+    feedback = aggregates["feedback"]
+    total_feedback = feedback.get("total") or 0
     
     # Pattern 1: Active questioning
-    if len(interactions) >= 5:
-        recent_interactions = interactions[-10:]
-        questions_per_day = len(recent_interactions) / 7  # Approximate
+    if total_interactions >= 5:
+        questions_per_day = min(total_interactions, 10) / 7  # Approximate (last 10 over a week)
         if questions_per_day >= 2:
             patterns.append({
                 "pattern_type": "active_questioning",
@@ -116,11 +255,8 @@ def _detect_learning_patterns(
             })
     
     # Pattern 2: Consistent feedback
-    if len(feedback) >= 3:
-        avg_understanding = sum(
-            float(f.get("understanding_level", 0) or 0)
-            for f in feedback
-        ) / len(feedback)
+    if total_feedback >= 3:
+        avg_understanding = feedback.get("avg_understanding") or 0
         if avg_understanding >= 4.0:
             patterns.append({
                 "pattern_type": "high_understanding",
@@ -167,13 +303,9 @@ def _detect_learning_patterns(
                 "recommendation": "Bu konularda ileri seviye çalışmalar yapabilirsiniz"
             })
     
-    # Pattern 4: Feedback consistency
-    if len(feedback) >= 5:
-        satisfaction_scores = [
-            float(f.get("satisfaction_level", 0) or 0)
-            for f in feedback
-        ]
-        if all(s >= 4.0 for s in satisfaction_scores[-3:]):
+    # Pattern 4: Feedback consistency (last 3 feedback entries of the full history)
+    if (feedback.get("history_total") or 0) >= 5:
+        if (feedback.get("recent_min_satisfaction") or 0) >= 4.0:
             patterns.append({
                 "pattern_type": "high_satisfaction",
                 "description": "Son geri bildirimlerde yüksek memnuniyet",
@@ -185,27 +317,16 @@ def _detect_learning_patterns(
 
 
 def _analyze_topic_performance(
-    interactions: List[Dict[str, Any]],
-    feedback: List[Dict[str, Any]],
+    aggregates: Dict[str, Any],
     profile: Dict[str, Any]
 ) -> Dict[str, Any]:
     """
     Analyze performance by topic
     """
-    topic_stats = {}
-    
-    # Extract topics from interactions (simple keyword-based)
-    for interaction in interactions:
-        query = interaction.get("query", "").lower()
-        response = interaction.get("original_response", "").lower()
-        
-        # Simple topic extraction (can be enhanced with NLP)
-        common_topics = ["kimya", "fizik", "matematik", "biyoloji", "tarih", "edebiyat"]
-        for topic in common_topics:
-            if topic in query or topic in response:
-                if topic not in topic_stats:
-                    topic_stats[topic] = {"count": 0, "avg_understanding": 0.0}
-                topic_stats[topic]["count"] += 1
+    topic_stats = {
+        topic: {"count": count, "avg_understanding": 0.0}
+        for topic, count in aggregates["topic_counts"].items()
+    }
     
     # Add profile-based topic info
     weak_topics = profile.get("weak_topics")
@@ -219,13 +340,12 @@ def _analyze_topic_performance(
     }
 
 
-def _calculate_engagement_metrics(
-    interactions: List[Dict[str, Any]]
-) -> Dict[str, Any]:
+def _calculate_engagement_metrics(aggregates: Dict[str, Any]) -> Dict[str, Any]:
     """
     Calculate engagement metrics
     """
-    if not interactions:
+    total = aggregates["total_interactions"]
+    if not total:
         return {
             "total_interactions": 0,
             "avg_per_day": 0,
@@ -233,22 +353,12 @@ def _calculate_engagement_metrics(
             "engagement_level": "low"
         }
     
-    # Group by date
-    daily_counts = {}
-    for interaction in interactions:
-        timestamp = interaction.get("timestamp")
-        if timestamp:
-            try:
-                date = datetime.fromisoformat(timestamp.replace('Z', '+00:00')).date()
-                daily_counts[date] = daily_counts.get(date, 0) + 1
-            except:
-                pass
-    
-    total = len(interactions)
+    daily_counts = aggregates["daily_counts"]
     days_active = len(daily_counts)
     avg_per_day = total / days_active if days_active > 0 else 0
     
-    most_active_day = max(daily_counts.items(), key=lambda x: x[1])[0] if daily_counts else None
+    # daily_counts is ordered by count (ties: most recent day first)
+    most_active_day = daily_counts[0][0] if daily_counts else None
     
     # Determine engagement level
     if avg_per_day >= 3:
@@ -267,35 +377,21 @@ def _calculate_engagement_metrics(
     }
 
 
-def _analyze_time_patterns(
-    interactions: List[Dict[str, Any]]
-) -> Dict[str, Any]:
+def _analyze_time_patterns(aggregates: Dict[str, Any]) -> Dict[str, Any]:
     """
     Analyze time-based patterns
     """
-    if not interactions:
+    if not aggregates["total_interactions"]:
         return {
             "peak_hour": None,
             "peak_day": None,
             "time_distribution": {}
         }
     
-    hour_counts = {}
-    day_counts = {}
-    
-    for interaction in interactions:
-        timestamp = interaction.get("timestamp")
-        if timestamp:
-            try:
-                dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                hour = dt.hour
-                day = dt.strftime("%A")
-                
-                hour_counts[hour] = hour_counts.get(hour, 0) + 1
-                day_counts[day] = day_counts.get(day, 0) + 1
-            except:
-                pass
+    hour_counts = dict(aggregates["hour_counts"])
+    day_counts = dict(aggregates["weekday_counts"])
     
+    # Groups are ordered most recent first, so ties resolve to the latest one
     peak_hour = max(hour_counts.items(), key=lambda x: x[1])[0] if hour_counts else None
     peak_day = max(day_counts.items(), key=lambda x: x[1])[0] if day_counts else None
     
@@ -311,6 +407,7 @@ def _analyze_time_patterns(
 async def get_analytics(
     user_id: str,
     session_id: Optional[str] = None,
+    since: Optional[str] = None,
     db: DatabaseManager = Depends(get_db)
 ) -> AnalyticsResponse:
     """
@@ -319,47 +416,14 @@ async def get_analytics(
     Args:
         user_id: User ID
         session_id: Optional session ID filter
+        since: Optional ISO timestamp; only interactions/feedback at or after it
+            and before ``as_of`` are counted (incremental refresh, pass the
+            previous ``as_of``). The improvement trend always covers the full
+            history.
     """
     try:
-        # Get interactions
-        if session_id:
-            interactions_query = """
-                SELECT * FROM student_interactions
-                WHERE user_id = ? AND session_id = ?
-                ORDER BY timestamp DESC
-            """
-            interactions_params = (user_id, session_id)
-        else:
-            interactions_query = """
-                SELECT * FROM student_interactions
-                WHERE user_id = ?
-                ORDER BY timestamp DESC
-            """
-            interactions_params = (user_id,)
-        
-        interactions = db.execute_query(interactions_query, interactions_params)
-        
-        # Get feedback
-        if session_id:
-            feedback_query = """
-                SELECT sf.*, si.query, si.original_response
-                FROM student_feedback sf
-                JOIN student_interactions si ON sf.interaction_id = si.interaction_id
-                WHERE sf.user_id = ? AND sf.session_id = ?
-                ORDER BY sf.timestamp DESC
-            """
-            feedback_params = (user_id, session_id)
-        else:
-            feedback_query = """
-                SELECT sf.*, si.query, si.original_response
-                FROM student_feedback sf
-                JOIN student_interactions si ON sf.interaction_id = si.interaction_id
-                WHERE sf.user_id = ?
-                ORDER BY sf.timestamp DESC
-            """
-            feedback_params = (user_id,)
-        
-        feedback = db.execute_query(feedback_query, feedback_params)
+        since_ts = _parse_since(since)
+        aggregates = _load_user_analytics_aggregates(db, user_id, session_id, since_ts)
         
         # Get profile
         try:
@@ -368,40 +432,25 @@ async def get_analytics(
         except:
             profile_dict = {}
         
-        # Calculate metrics
-        total_interactions = len(interactions)
-        total_feedback = len(feedback)
-        
         avg_understanding = profile_dict.get("average_understanding")
         avg_satisfaction = profile_dict.get("average_satisfaction")
         
-        # Calculate improvement trend
-        improvement_trend = _calculate_improvement_trend(interactions, feedback)
-        
-        # Detect learning patterns
-        learning_patterns = _detect_learning_patterns(interactions, feedback, profile_dict)
-        
-        # Analyze topic performance
-        topic_performance = _analyze_topic_performance(interactions, feedback, profile_dict)
-        
-        # Calculate engagement metrics
-        engagement_metrics = _calculate_engagement_metrics(interactions)
-        
-        # Analyze time patterns
-        time_analysis = _analyze_time_patterns(interactions)
-        
         return AnalyticsResponse(
-            total_interactions=total_interactions,
-            total_feedback=total_feedback,
+            total_interactions=aggregates["total_interactions"],
+            total_feedback=aggregates["feedback"].get("total") or 0,
             average_understanding=float(avg_understanding) if avg_understanding else None,
             average_satisfaction=float(avg_satisfaction) if avg_satisfaction else None,
-            improvement_trend=improvement_trend,
-            learning_patterns=learning_patterns,
-            topic_performance=topic_performance,
-            engagement_metrics=engagement_metrics,
-            time_analysis=time_analysis
+            improvement_trend=_calculate_improvement_trend(aggregates["feedback"]),
+            learning_patterns=_detect_learning_patterns(aggregates, profile_dict),
+            topic_performance=_analyze_topic_performance(aggregates, profile_dict),
+            engagement_metrics=_calculate_engagement_metrics(aggregates),
+            time_analysis=_analyze_time_patterns(aggregates),
+            since=since_ts,
+            as_of=aggregates["as_of"]
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get analytics: {e}")
         raise HTTPException(
@@ -414,21 +463,25 @@ async def get_analytics(
 async def get_analytics_summary(
     user_id: str,
     session_id: Optional[str] = None,
+    since: Optional[str] = None,
     db: DatabaseManager = Depends(get_db)
 ):
     """
     Get a summary of analytics (lightweight version)
     """
     try:
-        analytics = await get_analytics(user_id, session_id, db)
+        analytics = await get_analytics(user_id, session_id, since, db)
         
         return {
             "total_interactions": analytics.total_interactions,
             "average_understanding": analytics.average_understanding,
             "improvement_trend": analytics.improvement_trend,
             "engagement_level": analytics.engagement_metrics.get("engagement_level"),
-            "key_patterns": analytics.learning_patterns[:3]  # Top 3 patterns
+            "key_patterns": analytics.learning_patterns[:3],  # Top 3 patterns
+            "as_of": analytics.as_of
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get analytics summary: {e}")
         raise HTTPException(
@@ -450,6 +503,51 @@ class TopicAnalyticsResponse(BaseModel):
     recommendations: List[Dict[str, Any]]
 
 
+def _load_topic_rollups(db: DatabaseManager, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Active topics joined with their (session, topic) rollup row
+
+    Each topic is a primary-key lookup into topic_session_rollup; knowledge
+    base and QA pair counts are indexed lookups by topic_id.
+    """
+    rollup_columns = ", ".join(f"r.{f}" for f in ("students_attempted",) + topic_rollups.STAT_FIELDS)
+    query = f"""
+        SELECT
+            ct.topic_id, ct.session_id, ct.topic_title, ct.estimated_difficulty,
+            {rollup_columns},
+            (SELECT tkb.knowledge_id FROM topic_knowledge_base tkb
+             WHERE tkb.topic_id = ct.topic_id LIMIT 1) AS knowledge_id,
+            (SELECT tkb.content_quality_score FROM topic_knowledge_base tkb
+             WHERE tkb.topic_id = ct.topic_id LIMIT 1) AS content_quality_score,
+            (SELECT COUNT(*) FROM topic_qa_pairs tqa
+             WHERE tqa.topic_id = ct.topic_id AND tqa.is_active = TRUE) AS qa_pairs_count
+        FROM course_topics ct
+        LEFT JOIN topic_session_rollup r
+            ON r.session_id = ct.session_id AND r.topic_id = ct.topic_id
+        WHERE ct.is_active = TRUE
+    """
+    params: List[Any] = []
+    if session_id:
+        query += " AND ct.session_id = ?"
+        params.append(session_id)
+    query += " ORDER BY ct.topic_id"
+
+    topics = []
+    for row in db.execute_query(query, tuple(params)):
+        metrics = topic_rollups.derive_topic_metrics(row)
+        topics.append({
+            'topic_id': row['topic_id'],
+            'session_id': row['session_id'],
+            'topic_title': row['topic_title'],
+            'estimated_difficulty': row['estimated_difficulty'],
+            'knowledge_id': row['knowledge_id'],
+            'content_quality_score': row['content_quality_score'],
+            'qa_pairs_count': row['qa_pairs_count'] or 0,
+            **metrics
+        })
+    return topics
+
+
 @router.get("/topics/mastery-overview/{session_id}")
 async def get_topic_mastery_overview(
     session_id: str,
@@ -461,21 +559,28 @@ async def get_topic_mastery_overview(
     Returns heatmap data showing student performance across topics
     """
     try:
-        # Get topic mastery analytics from view
-        query = """
-            SELECT
-                topic_id, topic_title, estimated_difficulty,
-                students_attempted, total_interactions,
-                avg_mastery_level, avg_understanding, avg_satisfaction,
-                performance_level, difficulty_appropriateness,
-                has_knowledge_base, qa_pairs_count,
-                first_interaction, last_interaction
-            FROM topic_mastery_analytics
-            WHERE session_id = ?
-            ORDER BY topic_id
-        """
-        
-        mastery_data = db.execute_query(query, (session_id,))
+        # Topic mastery from the materialized rollups (one PK lookup per topic)
+        mastery_data = []
+        for topic in _load_topic_rollups(db, session_id):
+            avg_u = topic['avg_understanding']
+            mastery_data.append({
+                'topic_id': topic['topic_id'],
+                'topic_title': topic['topic_title'],
+                'estimated_difficulty': topic['estimated_difficulty'],
+                'students_attempted': topic['students_attempted'],
+                'total_interactions': topic['total_interactions'],
+                'avg_mastery_level': avg_u * 0.2 if avg_u is not None else 0.0,
+                'avg_understanding': avg_u if avg_u is not None else 0.0,
+                'avg_satisfaction': topic['avg_satisfaction'] if topic['avg_satisfaction'] is not None else 0.0,
+                'performance_level': topic_rollups.performance_level(avg_u),
+                'difficulty_appropriateness': topic_rollups.difficulty_appropriateness(
+                    topic['estimated_difficulty'], avg_u
+                ),
+                'has_knowledge_base': 1 if topic['knowledge_id'] is not None else 0,
+                'qa_pairs_count': topic['qa_pairs_count'],
+                'first_interaction': topic['first_interaction'],
+                'last_interaction': topic['last_interaction']
+            })
         
         # Calculate summary statistics
         total_topics = len(mastery_data)
@@ -531,6 +636,48 @@ async def get_topic_mastery_overview(
         )
 
 
+def _student_topic_progress_row(user_id: str, row: Dict[str, Any]) -> Dict[str, Any]:
+    """Build one student_topic_progress_analytics-shaped row from rollup + topic_progress"""
+    metrics = topic_rollups.derive_topic_metrics(row)
+    avg_u = metrics['avg_understanding']
+    total_interactions = metrics['total_interactions']
+    time_spent = row['time_spent_minutes'] or 0.0
+    
+    mastery = row['mastery_score'] if row['mastery_score'] is not None else (avg_u * 0.2 if avg_u is not None else None)
+    if total_interactions == 0:
+        trend = 'new'
+    elif mastery is not None and mastery >= 0.8:
+        trend = 'improving'
+    elif mastery is not None and mastery < 0.6:
+        trend = 'declining'
+    else:
+        trend = 'stable'
+    
+    def first_of(*values):
+        return next((v for v in values if v is not None), None)
+    
+    return {
+        'user_id': user_id,
+        'topic_id': row['topic_id'],
+        'session_id': row['session_id'],
+        'topic_title': row['topic_title'],
+        'estimated_difficulty': row['estimated_difficulty'],
+        'mastery_level': mastery if mastery is not None else 0.0,
+        'completion_percentage': row['completion_percentage'] or 0.0,
+        'time_spent_minutes': time_spent,
+        'learning_velocity': total_interactions / (time_spent / 1440.0) if time_spent > 0 else 0.0,
+        'total_interactions': total_interactions,
+        'feedback_count': metrics['total_feedback_count'],
+        'avg_understanding': first_of(row['average_understanding'], avg_u, 0.0),
+        'avg_satisfaction': first_of(row['average_satisfaction'], metrics['avg_satisfaction'], 0.0),
+        'progress_trend': trend,
+        'last_interaction_date': first_of(
+            row['last_interaction_date'], row['last_question_timestamp'], metrics['last_interaction']
+        ),
+        'prerequisite_status': 'no_prerequisites'
+    }
+
+
 @router.get("/topics/student-progress/{user_id}")
 async def get_student_topic_progress(
     user_id: str,
@@ -541,26 +688,38 @@ async def get_student_topic_progress(
     Get individual student progress across topics
     """
     try:
-        # Build query with optional session filter
-        base_query = """
+        # Topics of the sessions the student interacted in, joined with the
+        # (user, topic) rollup row (PK lookup) and topic_progress
+        rollup_columns = ", ".join(f"r.{f}" for f in topic_rollups.STAT_FIELDS)
+        base_query = f"""
             SELECT
-                user_id, topic_id, session_id, topic_title, estimated_difficulty,
-                mastery_level, completion_percentage, time_spent_minutes,
-                learning_velocity, total_interactions, feedback_count,
-                avg_understanding, avg_satisfaction, progress_trend,
-                last_interaction_date, prerequisite_status
-            FROM student_topic_progress_analytics
-            WHERE user_id = ?
+                ct.topic_id, ct.session_id, ct.topic_title, ct.estimated_difficulty,
+                ct.created_at AS topic_created_at, ct.updated_at AS topic_updated_at,
+                {rollup_columns},
+                tp.mastery_score, tp.completion_percentage, tp.time_spent_minutes,
+                tp.last_interaction_date, tp.last_question_timestamp,
+                tp.average_understanding, tp.average_satisfaction,
+                tp.created_at AS progress_created_at, tp.updated_at AS progress_updated_at
+            FROM course_topics ct
+            LEFT JOIN topic_user_rollup r ON r.user_id = ? AND r.topic_id = ct.topic_id
+            LEFT JOIN topic_progress tp ON tp.user_id = ? AND tp.topic_id = ct.topic_id
+            WHERE ct.is_active = TRUE
+              AND ct.session_id IN (
+                  SELECT DISTINCT session_id FROM student_interactions WHERE user_id = ?
+              )
         """
         
-        params = [user_id]
+        params = [user_id, user_id, user_id]
         if session_id:
-            base_query += " AND session_id = ?"
+            base_query += " AND ct.session_id = ?"
             params.append(session_id)
             
-        base_query += " ORDER BY topic_id"
+        base_query += " ORDER BY ct.topic_id"
         
-        progress_data = db.execute_query(base_query, tuple(params))
+        progress_data = [
+            _student_topic_progress_row(user_id, row)
+            for row in db.execute_query(base_query, tuple(params))
+        ]
         
         # Calculate learning trends
         trends = {
@@ -623,25 +782,28 @@ async def get_topic_difficulty_analysis(
     Analyze topic difficulty vs student performance correlation
     """
     try:
-        # Build query with optional session filter
-        base_query = """
-            SELECT
-                topic_id, session_id, topic_title, estimated_difficulty,
-                total_questions, avg_question_complexity, students_attempted,
-                avg_understanding_score, avg_satisfaction_score, success_rate,
-                avg_time_spent, kb_quality_score, available_qa_pairs,
-                difficulty_recommendation
-            FROM topic_difficulty_analysis
-        """
-        
-        params = []
-        if session_id:
-            base_query += " WHERE session_id = ?"
-            params.append(session_id)
-            
-        base_query += " ORDER BY estimated_difficulty, avg_understanding_score"
-        
-        difficulty_data = db.execute_query(base_query, tuple(params))
+        difficulty_data = []
+        for topic in _load_topic_rollups(db, session_id):
+            avg_u = topic['avg_understanding']
+            difficulty_data.append({
+                'topic_id': topic['topic_id'],
+                'session_id': topic['session_id'],
+                'topic_title': topic['topic_title'],
+                'estimated_difficulty': topic['estimated_difficulty'],
+                'total_questions': topic['total_interactions'],
+                'avg_question_complexity': topic['avg_question_complexity'] or 0.0,
+                'students_attempted': topic['students_attempted'],
+                'avg_understanding_score': avg_u if avg_u is not None else 0.0,
+                'avg_satisfaction_score': topic['avg_satisfaction'] if topic['avg_satisfaction'] is not None else 0.0,
+                'success_rate': topic['success_rate'],
+                'avg_time_spent': 0.0,
+                'kb_quality_score': topic['content_quality_score'] or 0.0,
+                'available_qa_pairs': topic['qa_pairs_count'],
+                'difficulty_recommendation': topic_rollups.difficulty_recommendation(
+                    topic['estimated_difficulty'], avg_u, topic['total_feedback_count']
+                )
+            })
+        difficulty_data.sort(key=lambda t: (t['estimated_difficulty'] or '', t['avg_understanding_score']))
         
         # Analyze difficulty appropriateness
         difficulty_analysis = {
@@ -710,26 +872,32 @@ async def get_topic_recommendation_insights(
     Get AI-powered topic recommendations and intervention strategies
     """
     try:
-        # Get recommendation insights from view
-        query = """
-            SELECT
-                topic_id, topic_title, estimated_difficulty,
-                topic_strength_level, engagement_level,
-                recommended_intervention, learning_path_suggestion,
-                student_count, avg_understanding, avg_satisfaction,
-                qa_pairs_count, kb_quality
-            FROM topic_recommendation_insights
-            WHERE session_id = ?
-            ORDER BY
-                CASE topic_strength_level
-                    WHEN 'critical_weakness' THEN 1
-                    WHEN 'moderate_weakness' THEN 2
-                    ELSE 3
-                END,
-                avg_understanding ASC
-        """
-        
-        insights = db.execute_query(query, (session_id,))
+        insights = []
+        for topic in _load_topic_rollups(db, session_id):
+            avg_u = topic['avg_understanding']
+            avg_s = topic['avg_satisfaction']
+            students = topic['students_attempted']
+            insights.append({
+                'topic_id': topic['topic_id'],
+                'topic_title': topic['topic_title'],
+                'estimated_difficulty': topic['estimated_difficulty'],
+                'topic_strength_level': topic_rollups.topic_strength_level(avg_u),
+                'engagement_level': topic_rollups.engagement_level(students),
+                'recommended_intervention': topic_rollups.recommended_intervention(
+                    topic['estimated_difficulty'], avg_u, avg_s, students,
+                    topic['qa_pairs_count'], topic['content_quality_score']
+                ),
+                'learning_path_suggestion': topic_rollups.learning_path_suggestion(
+                    topic['estimated_difficulty'], avg_u
+                ),
+                'student_count': students,
+                'avg_understanding': avg_u if avg_u is not None else 0.0,
+                'avg_satisfaction': avg_s if avg_s is not None else 0.0,
+                'qa_pairs_count': topic['qa_pairs_count'],
+                'kb_quality': topic['content_quality_score'] or 0.0
+            })
+        strength_order = {'critical_weakness': 1, 'moderate_weakness': 2}
+        insights.sort(key=lambda i: (strength_order.get(i['topic_strength_level'], 3), i['avg_understanding']))
         
         # Categorize recommendations
         critical_topics = [i for i in insights if i['topic_strength_level'] == 'critical_weakness']
@@ -16,12 +16,18 @@ from datetime import datetime
 # Import database and dependencies
 try:
     from database.database import DatabaseManager
+    from database import feedback_aggregates
+    from database.progressive_assessment_state import record_trigger_decision
+    from database.student_context import invalidate_student_context
     from config.feature_flags import FeatureFlags
 except ImportError:
     import sys
     import os
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
     from database.database import DatabaseManager
+    from database import feedback_aggregates
+    from database.progressive_assessment_state import record_trigger_decision
+    from database.student_context import invalidate_student_context
     from config.feature_flags import FeatureFlags
 
 # DB manager will be injected via dependency
@@ -298,9 +304,10 @@ async def create_emoji_feedback(
         
         logger.info(f"Updated interaction {feedback.interaction_id} with emoji {feedback.emoji}")
         
-        # Update global document scores (if sources available)
+        # Source documents of the answer (for global document scores)
         interaction_data = interaction[0]
         sources_json = interaction_data.get('sources')
+        doc_ids = []
         
         if sources_json:
             try:
@@ -312,11 +319,9 @@ async def create_emoji_feedback(
                 for source in sources:
                     doc_id = source.get('doc_id') or source.get('document_id')
                     if doc_id:
-                        _update_global_score(db, doc_id, emoji_score, feedback.emoji)
-                
-                logger.debug(f"Updated global scores for {len(sources)} documents")
+                        doc_ids.append(doc_id)
             except Exception as e:
-                logger.warning(f"Failed to update global scores: {e}")
+                logger.warning(f"Failed to read interaction sources: {e}")
         
         # Update student profile (real-time)
         profile_updated = _update_profile_from_emoji(
@@ -327,8 +332,12 @@ async def create_emoji_feedback(
             feedback.emoji
         )
         
-        # Update emoji summary table
-        _update_emoji_summary(db, feedback.user_id, feedback.session_id, feedback.emoji, emoji_score)
+        # Progressive assessment: decide the follow-up trigger once, polls only read it
+        _record_progressive_trigger(db, feedback.interaction_id, feedback.emoji, emoji_score)
+        
+        # Global document scores + emoji summary: append events, folded in the background
+        _record_aggregate_events(db, feedback.user_id, feedback.session_id, feedback.emoji, emoji_score, doc_ids)
+        invalidate_student_context(feedback.user_id, feedback.session_id)
         
         logger.info(f"Emoji feedback {feedback.emoji} successfully recorded")
         
@@ -370,15 +379,9 @@ async def get_emoji_stats(
         )
     
     try:
-        # Get emoji summary
-        summary = db.execute_query(
-            """
-            SELECT emoji, emoji_count, avg_score
-            FROM emoji_feedback_summary
-            WHERE user_id = ? AND session_id = ?
-            """,
-            (user_id, session_id)
-        )
+        # Get emoji summary (including feedback not folded into the table yet)
+        with db.get_connection() as conn:
+            summary = feedback_aggregates.load_emoji_summary(conn, user_id, session_id)
         
         if not summary:
             # No feedback yet
@@ -756,66 +759,41 @@ def _update_profile_from_multi_feedback(
         return False
 
 
-def _update_global_score(db: DatabaseManager, doc_id: str, emoji_score: float, emoji: str):
-    """Update global document score with emoji feedback"""
+def _record_aggregate_events(
+    db: DatabaseManager,
+    user_id: str,
+    session_id: str,
+    emoji: str,
+    emoji_score: float,
+    doc_ids: List[str]
+):
+    """
+    Append global score / emoji summary events (write-behind)
+    
+    document_global_scores and emoji_feedback_summary are updated by the
+    background FeedbackAggregator in batches; reads merge pending events.
+    """
     try:
-        # Check if document exists in global scores
-        existing = db.execute_query(
-            "SELECT * FROM document_global_scores WHERE doc_id = ?",
-            (doc_id,)
-        )
-        
-        if existing:
-            # Update existing
-            row = existing[0]
-            total = row['total_feedback_count'] + 1
-            
-            # Update positive/negative counts
-            if emoji_score >= 0.7:
-                positive = row['positive_feedback_count'] + 1
-                negative = row['negative_feedback_count']
-            elif emoji_score <= 0.2:
-                positive = row['positive_feedback_count']
-                negative = row['negative_feedback_count'] + 1
-            else:
-                positive = row['positive_feedback_count']
-                negative = row['negative_feedback_count']
-            
-            # Update avg emoji score
-            current_avg = row.get('avg_emoji_score', 0.5)
-            new_avg = (current_avg * (total - 1) + emoji_score) / total
-            
-            db.execute_update(
-                """
-                UPDATE document_global_scores
-                SET total_feedback_count = ?,
-                    positive_feedback_count = ?,
-                    negative_feedback_count = ?,
-                    avg_emoji_score = ?,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE doc_id = ?
-                """,
-                (total, positive, negative, new_avg, doc_id)
-            )
-        else:
-            # Insert new
-            positive = 1 if emoji_score >= 0.7 else 0
-            negative = 1 if emoji_score <= 0.2 else 0
-            
-            db.execute_insert(
-                """
-                INSERT INTO document_global_scores
-                (doc_id, total_feedback_count, positive_feedback_count, 
-                 negative_feedback_count, avg_emoji_score, updated_at)
-                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                """,
-                (doc_id, 1, positive, negative, emoji_score)
+        with db.get_connection() as conn:
+            count = feedback_aggregates.append_emoji_feedback(
+                conn, user_id, session_id, emoji, emoji_score, doc_ids
             )
-        
-        logger.debug(f"Updated global score for doc {doc_id}")
-        
+            conn.commit()
+        feedback_aggregates.get_feedback_aggregator(db)
+        logger.debug(f"Recorded {count} aggregate events for {user_id}: {emoji}")
+    except Exception as e:
+        logger.warning(f"Failed to record aggregate feedback events: {e}")
+
+
+def _record_progressive_trigger(db: DatabaseManager, interaction_id: int, emoji: str, emoji_score: float):
+    """Store the follow-up trigger decision read by GET /progressive-assessment/check-trigger"""
+    try:
+        with db.get_connection() as conn:
+            reason = record_trigger_decision(conn, interaction_id, emoji, emoji_score)
+            conn.commit()
+        logger.debug(f"Progressive trigger for interaction {interaction_id}: {reason}")
     except Exception as e:
-        logger.warning(f"Failed to update global score for doc {doc_id}: {e}")
+        logger.warning(f"Failed to record progressive assessment trigger (non-critical): {e}")
 
 
 def _update_profile_from_emoji(
@@ -890,56 +868,3 @@ def _update_profile_from_emoji(
     except Exception as e:
         logger.warning(f"Failed to update profile from emoji: {e}")
         return False
-
-
-def _update_emoji_summary(
-    db: DatabaseManager,
-    user_id: str,
-    session_id: str,
-    emoji: str,
-    emoji_score: float
-):
-    """Update emoji summary table for analytics"""
-    try:
-        # Check if entry exists
-        existing = db.execute_query(
-            """
-            SELECT * FROM emoji_feedback_summary
-            WHERE user_id = ? AND session_id = ? AND emoji = ?
-            """,
-            (user_id, session_id, emoji)
-        )
-        
-        if existing:
-            # Update existing
-            row = existing[0]
-            new_count = row['emoji_count'] + 1
-            current_avg = row['avg_score']
-            new_avg = (current_avg * (new_count - 1) + emoji_score) / new_count
-            
-            db.execute_update(
-                """
-                UPDATE emoji_feedback_summary
-                SET emoji_count = ?,
-                    avg_score = ?,
-                    last_updated = CURRENT_TIMESTAMP
-                WHERE user_id = ? AND session_id = ? AND emoji = ?
-                """,
-                (new_count, new_avg, user_id, session_id, emoji)
-            )
-        else:
-            # Insert new
-            db.execute_insert(
-                """
-                INSERT INTO emoji_feedback_summary
-                (user_id, session_id, emoji, emoji_count, avg_score, last_updated)
-                VALUES (?, ?, ?, 1, ?, CURRENT_TIMESTAMP)
-                """,
-                (user_id, session_id, emoji, emoji_score)
-            )
-        
-        logger.debug(f"Updated emoji summary for {user_id}: {emoji}")
-        
-    except Exception as e:
-        logger.warning(f"Failed to update emoji summary: {e}")
-
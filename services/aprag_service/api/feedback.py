@@ -15,6 +15,9 @@ router = APIRouter()
 # Import database manager
 try:
     from database.database import DatabaseManager
+    from database.student_context import invalidate_student_context
+    from database.topic_rollups import record_feedback
+    from services.recommendation_refresh import notify_activity
     from main import db_manager
 except ImportError:
     # Fallback import
@@ -22,6 +25,9 @@ except ImportError:
     import os
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
     from database.database import DatabaseManager
+    from database.student_context import invalidate_student_context
+    from database.topic_rollups import record_feedback
+    from services.recommendation_refresh import notify_activity
     db_manager = None
 
 
@@ -105,22 +111,27 @@ async def create_feedback(feedback: FeedbackCreate, db: DatabaseManager = Depend
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """
         
-        feedback_id = db.execute_insert(
-            query,
-            (
-                feedback.interaction_id,
-                feedback.user_id,
-                feedback.session_id,
-                feedback.understanding_level,
-                feedback.answer_adequacy,
-                feedback.satisfaction_level,
-                feedback.difficulty_level,
-                feedback.topic_understood,
-                feedback.answer_helpful,
-                feedback.needs_more_explanation,
-                feedback.comment
+        with db.get_connection() as conn:
+            cursor = conn.execute(
+                query,
+                (
+                    feedback.interaction_id,
+                    feedback.user_id,
+                    feedback.session_id,
+                    feedback.understanding_level,
+                    feedback.answer_adequacy,
+                    feedback.satisfaction_level,
+                    feedback.difficulty_level,
+                    feedback.topic_understood,
+                    feedback.answer_helpful,
+                    feedback.needs_more_explanation,
+                    feedback.comment
+                )
             )
-        )
+            feedback_id = cursor.lastrowid
+            # Topic analytics rollups, same transaction as the feedback row
+            record_feedback(conn, feedback_id)
+            conn.commit()
         
         logger.info(f"Successfully collected feedback {feedback_id} for interaction {feedback.interaction_id}")
         
@@ -130,6 +141,10 @@ async def create_feedback(feedback: FeedbackCreate, db: DatabaseManager = Depend
         except Exception as e:
             logger.warning(f"Failed to update profile from feedback (non-critical): {e}")
         
+        invalidate_student_context(feedback.user_id, feedback.session_id)
+        # Count towards a background recommendation refresh (debounced)
+        notify_activity(db, feedback.user_id, feedback.session_id)
+        
         return {
             "feedback_id": feedback_id,
             "message": "Feedback collected successfully"
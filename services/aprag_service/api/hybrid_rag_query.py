@@ -23,6 +23,14 @@ from database.database import DatabaseManager
 import sys
 sys.path.append(os.path.dirname(__file__))
 from services.hybrid_knowledge_retriever import HybridKnowledgeRetriever
+from services.qa_fast_path import (
+    QA_FAST_PATH_ENABLED,
+    get_ebars_difficulty,
+    personalize_answer,
+    resolve_threshold,
+)
+from database.qa_fast_path_stats import load_fast_path_report, record_fast_path_outcome
+from utils.request_context import begin_request, end_request, memoized_db, memoized_http
 
 # Environment variables
 MODEL_INFERENCER_URL = os.getenv("MODEL_INFERENCER_URL", "http://model-inference-service:8002")
@@ -54,6 +62,7 @@ class HybridRAGQueryRequest(BaseModel):
     top_k: int = 10
     use_kb: bool = True  # Use knowledge base
     use_qa_pairs: bool = True  # Check QA pairs for direct answers
+    qa_fast_path_threshold: Optional[float] = None  # Direct answer cut-off (default: session/env, 0.90; clamped to [0.80, 1.0])
     use_crag: bool = True  # Use CRAG evaluation
     
     # Generation options
@@ -103,6 +112,43 @@ def get_db() -> DatabaseManager:
     return DatabaseManager(db_path)
 
 
+def _get_gateway_session(session_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Session metadata from the API Gateway, fetched once per request
+
+    Used for the RAG settings at the start and for ``min_score_threshold``
+    before the score check; a failed fetch is also kept (None), so the second
+    use falls back to defaults instead of waiting for another timeout.
+    """
+    def load():
+        try:
+            # Use internal Docker network URL to avoid SSL errors
+            api_gateway_url = get_internal_api_gateway_url(API_GATEWAY_URL)
+            session_response = requests.get(
+                f"{api_gateway_url}/sessions/{session_id}",
+                timeout=5
+            )
+            if session_response.status_code == 200:
+                return session_response.json()
+            logger.warning(f"⚠️ Could not load session settings: {session_response.status_code}")
+        except Exception as e:
+            logger.warning(f"⚠️ Error loading session from API Gateway: {e}")
+        return None
+
+    return memoized_http("gateway_sessions", session_id, load)
+
+
+def _record_qa_outcome(db: DatabaseManager, session_id: str, hit: bool, start_time: datetime):
+    """Add one QA fast-path hit/miss with its latency to the session counters"""
+    latency_ms = int((datetime.now() - start_time).total_seconds() * 1000)
+    try:
+        with db.get_connection() as conn:
+            record_fast_path_outcome(conn, session_id, hit, latency_ms)
+            conn.commit()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not record QA fast path outcome (non-critical): {e}")
+
+
 async def _generate_followup_suggestions(
     question: str, 
     answer: str, 
@@ -457,9 +503,10 @@ async def hybrid_rag_query(request: HybridRAGQueryRequest):
     
     Workflow:
     1. Classify query to topic(s)
-    2. Check QA pairs for direct match (similarity > 0.90)
-    3. If direct match: Use QA + KB summary
-    4. Else: Retrieve chunks + KB + QA
+    2. Check QA pairs for direct match (similarity > threshold, default 0.90)
+    3. If direct match: return the stored answer (EBARS template + KB summary),
+       no chunk retrieval, rerank or LLM
+    4. Else: Retrieve chunks + KB + QA (classification and QA matches reused)
     5. CRAG evaluation on chunks
     6. Merge results with weighted scoring
     7. Generate answer with LLM
@@ -467,28 +514,23 @@ async def hybrid_rag_query(request: HybridRAGQueryRequest):
     
     start_time = datetime.now()
     db = get_db()
+    qa_outcome = None  # "hit" / "miss" once the QA fast path was checked
+    # Session / profile / settings lookups are memoized until the response is built
+    request_ctx, request_scope_token = begin_request()
     
     try:
         # Get session RAG settings and metadata from API Gateway to use correct model
         session_rag_settings = {}
         session_name = None
         try:
-            # Use internal Docker network URL to avoid SSL errors
-            api_gateway_url = get_internal_api_gateway_url(API_GATEWAY_URL)
-            session_response = requests.get(
-                f"{api_gateway_url}/sessions/{request.session_id}",
-                timeout=5
-            )
-            if session_response.status_code == 200:
-                session_data = session_response.json()
+            session_data = _get_gateway_session(request.session_id)
+            if session_data:
                 session_rag_settings = session_data.get("rag_settings", {}) or {}
                 # Get session name for course scope validation
                 session_name = session_data.get("name") or session_data.get("session_name")
                 logger.info(f"✅ Loaded session RAG settings: model={session_rag_settings.get('model')}, embedding_model={session_rag_settings.get('embedding_model')}")
                 if session_name:
                     logger.info(f"📚 Session name retrieved for course scope validation: '{session_name}'")
-            else:
-                logger.warning(f"⚠️ Could not load session settings: {session_response.status_code}")
         except Exception as settings_err:
             logger.warning(f"⚠️ Error loading session RAG settings: {settings_err}")
         
@@ -503,6 +545,100 @@ async def hybrid_rag_query(request: HybridRAGQueryRequest):
         # Initialize hybrid retriever
         retriever = HybridKnowledgeRetriever(db)
         
+        # QA FAST PATH: curated QA bank before any chunk retrieval
+        fast_path = None
+        if request.use_qa_pairs and QA_FAST_PATH_ENABLED:
+            qa_threshold = resolve_threshold(request.qa_fast_path_threshold, session_rag_settings)
+            fast_path = await retriever.find_direct_answer(
+                query=request.query,
+                session_id=request.session_id,
+                embedding_model=effective_embedding_model,
+                threshold=qa_threshold
+            )
+            direct_qa = fast_path["direct_answer"]
+            qa_outcome = "hit" if direct_qa else "miss"
+            
+            if direct_qa:
+                logger.info(
+                    f"⚡ QA fast path hit (similarity: {direct_qa['similarity_score']:.3f} > {qa_threshold:.2f}, "
+                    f"lookup: {fast_path['lookup_time_ms']}ms)"
+                )
+                topic_classification = fast_path["topic_classification"]
+                matched_topics = topic_classification.get("matched_topics", [])
+                classification_confidence = topic_classification.get("confidence", 0.0)
+                
+                kb_summary = None
+                if request.use_kb and matched_topics and classification_confidence > retriever.kb_usage_threshold:
+                    kb_results = await retriever._retrieve_knowledge_base(matched_topics)
+                    if kb_results:
+                        kb_summary = kb_results[0]["content"]["topic_summary"]
+                
+                difficulty_level = get_ebars_difficulty(db, request.user_id, request.session_id)
+                answer = personalize_answer(direct_qa, difficulty_level, kb_summary)
+                processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
+                
+                # Interaction log: one student_qa_interactions row (response_source 'direct_qa')
+                await retriever.track_qa_usage(
+                    qa_id=direct_qa["qa_id"],
+                    user_id=request.user_id,
+                    session_id=request.session_id,
+                    original_question=request.query,
+                    similarity_score=direct_qa["similarity_score"],
+                    response_time_ms=processing_time
+                )
+                
+                return HybridRAGQueryResponse(
+                    answer=answer,
+                    confidence="high",
+                    retrieval_strategy="direct_qa_match",
+                    sources_used={"qa_pairs": 1, "kb": 1 if kb_summary else 0, "chunks": 0},
+                    direct_qa_match=True,
+                    matched_topics=matched_topics,
+                    classification_confidence=classification_confidence,
+                    processing_time_ms=processing_time,
+                    sources=[{
+                        "type": "qa_pair",
+                        "content": direct_qa["answer"],
+                        "score": direct_qa["similarity_score"],
+                        "question": direct_qa["question"],
+                        "answer": direct_qa["answer"],
+                        "similarity": direct_qa["similarity_score"],
+                        "metadata": {
+                            "qa_id": direct_qa["qa_id"],
+                            "question": direct_qa["question"],
+                            "source_type": "qa_pair",
+                            "source": "qa_pair",
+                            "filename": "qa_pairs",
+                            "qa_fast_path": True
+                        }
+                    }],
+                    debug_info={
+                        "qa_fast_path": {
+                            "hit": True,
+                            "qa_id": direct_qa["qa_id"],
+                            "similarity": direct_qa["similarity_score"],
+                            "threshold": qa_threshold,
+                            "difficulty_level": difficulty_level,
+                            "lookup_time_ms": fast_path["lookup_time_ms"]
+                        },
+                        "interaction_metadata": {
+                            "user_id": request.user_id,
+                            "session_id": request.session_id,
+                            "chain_type": "qa_fast_path",
+                            "model_used": None
+                        },
+                        "timing": {
+                            "total_processing_ms": processing_time,
+                            "request_context": request_ctx.stats()
+                        }
+                    }
+                )
+            
+            logger.info(
+                f"❓ QA fast path miss ({len(fast_path['qa_matches'])} QA matches, "
+                f"lookup: {fast_path['lookup_time_ms']}ms), continuing with hybrid retrieval"
+            )
+        
         # HYBRID RETRIEVAL
         # If reranking is enabled, retrieve more chunks (top_k * 2) for better reranking
         # Then rerank and take top_k
@@ -516,7 +652,10 @@ async def hybrid_rag_query(request: HybridRAGQueryRequest):
             top_k=retrieval_top_k,  # Get more chunks if reranking
             use_kb=request.use_kb,
             use_qa_pairs=request.use_qa_pairs,
-            embedding_model=effective_embedding_model
+            embedding_model=effective_embedding_model,
+            # Reuse the fast-path lookup instead of classifying / matching again
+            topic_classification=fast_path["topic_classification"] if fast_path else None,
+            qa_matches=fast_path["qa_matches"] if fast_path else None
         )
         
         # Extract components
@@ -532,11 +671,11 @@ async def hybrid_rag_query(request: HybridRAGQueryRequest):
         if kb_results:
             logger.info(f"📚 KB items: {[kb.get('topic_title', 'N/A') for kb in kb_results[:3]]}")
         
-        # CHECK FOR DIRECT QA MATCH
-        direct_qa = retriever.get_direct_answer_if_available(retrieval_result)
+        # CHECK FOR DIRECT QA MATCH (only when the QA fast path did not run)
+        direct_qa = retriever.get_direct_answer_if_available(retrieval_result) if fast_path is None else None
         
         if direct_qa:
-            # FAST PATH: Direct answer from QA pair
+            # LATE PATH: Direct answer from QA pair after full retrieval
             logger.info(f"🎯 Using direct QA answer (similarity: {direct_qa['similarity_score']:.3f})")
             
             answer = direct_qa["answer"]
@@ -706,15 +845,10 @@ async def hybrid_rag_query(request: HybridRAGQueryRequest):
             # Get min_score_threshold from session RAG settings
             min_score_threshold = 0.4  # Default
             try:
-                # Use internal Docker network URL to avoid SSL errors
-                api_gateway_url = get_internal_api_gateway_url(API_GATEWAY_URL)
-                session_response = requests.get(
-                    f"{api_gateway_url}/sessions/{request.session_id}",
-                    timeout=5
-                )
-                if session_response.status_code == 200:
-                    session_data = session_response.json()
-                    rag_settings = session_data.get('rag_settings', {})
+                # Same gateway response as at the start of the request (memoized)
+                session_data = _get_gateway_session(request.session_id)
+                if session_data:
+                    rag_settings = session_data.get('rag_settings', {}) or {}
                     if rag_settings.get('min_score_threshold') is not None:
                         min_score_threshold = float(rag_settings.get('min_score_threshold', 0.4))
                         logger.info(f"📊 Using min_score_threshold from RAG settings: {min_score_threshold:.4f}")
@@ -880,7 +1014,8 @@ async def hybrid_rag_query(request: HybridRAGQueryRequest):
                 "timing": {
                     "total_time_ms": processing_time,
                     "retrieval_time_ms": processing_time,
-                    "llm_time_ms": 0
+                    "llm_time_ms": 0,
+                    "request_context": request_ctx.stats()
                 },
                 "sources_summary": {
                     "total_sources": 0,
@@ -1041,16 +1176,12 @@ async def hybrid_rag_query(request: HybridRAGQueryRequest):
         recent_interactions_info = None
         
         try:
-            from config.feature_flags import FeatureFlags
+            from config.feature_flags import FeatureFlags, get_session_settings_row
             
-            # Get session settings
-            session_settings_result = db.execute_query(
-                "SELECT * FROM session_settings WHERE session_id = ?",
-                (request.session_id,)
-            )
-            if session_settings_result and len(session_settings_result) > 0:
-                row = session_settings_result[0]
-                session_settings_info = dict(row) if hasattr(row, 'keys') else row
+            # Get session settings (same row the feature flags read)
+            row = get_session_settings_row(db, request.session_id)
+            if row:
+                session_settings_info = dict(row)
             
             # Get user profile if user_id is available
             if request.user_id and request.user_id != "student":
@@ -1072,15 +1203,19 @@ async def hybrid_rag_query(request: HybridRAGQueryRequest):
             # Get recent interactions
             if request.user_id and request.user_id != "student":
                 try:
-                    recent_interactions = db.execute_query(
-                        """
-                        SELECT query, timestamp, emoji_feedback, feedback_score
-                        FROM student_interactions
-                        WHERE user_id = ? AND session_id = ?
-                        ORDER BY timestamp DESC
-                        LIMIT 5
-                        """,
-                        (request.user_id, request.session_id)
+                    recent_interactions = memoized_db(
+                        "student_interactions",
+                        ("recent_5", request.user_id, request.session_id),
+                        lambda: db.execute_query(
+                            """
+                            SELECT query, timestamp, emoji_feedback, feedback_score
+                            FROM student_interactions
+                            WHERE user_id = ? AND session_id = ?
+                            ORDER BY timestamp DESC
+                            LIMIT 5
+                            """,
+                            (request.user_id, request.session_id)
+                        )
                     )
                     if recent_interactions:
                         recent_interactions_info = {
@@ -1209,7 +1344,9 @@ async def hybrid_rag_query(request: HybridRAGQueryRequest):
             # Timing
             "timing": {
                 "total_processing_ms": processing_time,
-                "retrieval_time_ms": retrieval_result.get("metadata", {}).get("retrieval_time_seconds", 0) * 1000 if retrieval_result.get("metadata") else 0
+                "retrieval_time_ms": retrieval_result.get("metadata", {}).get("retrieval_time_seconds", 0) * 1000 if retrieval_result.get("metadata") else 0,
+                # Distinct DB / HTTP metadata lookups of this request (rest served from the request memo)
+                "request_context": request_ctx.stats()
             },
             # Sources summary
             "sources_summary": sources_used,
@@ -1319,7 +1456,8 @@ async def hybrid_rag_query(request: HybridRAGQueryRequest):
                         "retrieval": retrieval_result.get("metadata", {}).get("retrieval_time_seconds", 0) * 1000 if retrieval_result.get("metadata") else 0,
                         "reranking": 0,  # Could be tracked if needed
                         "llm_generation": llm_debug.get("llm_duration_ms", 0) if llm_debug else 0
-                    }
+                    },
+                    "request_context": request_ctx.stats()
                 },
                 
                 # Interaction metadata
@@ -1367,6 +1505,11 @@ async def hybrid_rag_query(request: HybridRAGQueryRequest):
         import traceback
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Hybrid RAG query failed: {str(e)}")
+    finally:
+        # Misses are counted with the latency of the full hybrid path
+        if qa_outcome:
+            _record_qa_outcome(db, request.session_id, qa_outcome == "hit", start_time)
+        end_request(request_scope_token)
 
 
 @router.post("/query-feedback")
@@ -1436,7 +1579,7 @@ async def get_qa_analytics(session_id: str):
     db = get_db()
     
     try:
-        with self.db.get_connection() as conn:
+        with db.get_connection() as conn:
             # Get most used QA pairs
             cursor = conn.execute("""
                 SELECT 
@@ -1482,3 +1625,28 @@ async def get_qa_analytics(session_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to fetch analytics: {str(e)}")
 
 
+@router.get("/qa-fast-path/{session_id}")
+async def get_qa_fast_path_report(session_id: str, days: int = 30):
+    """
+    QA fast-path report for a session: hit rate and latency of direct
+    answers vs. the full hybrid path, per day, plus the most served QA pairs
+    """
+    
+    if days < 1 or days > 365:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 365")
+    
+    db = get_db()
+    
+    try:
+        with db.get_connection() as conn:
+            report = load_fast_path_report(conn, session_id, days)
+        
+        return {
+            "success": True,
+            "fast_path_enabled": QA_FAST_PATH_ENABLED,
+            **report
+        }
+        
+    except Exception as e:
+        logger.error(f"Error fetching QA fast path report: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch QA fast path report: {str(e)}")
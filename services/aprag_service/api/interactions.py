@@ -8,6 +8,7 @@ from pydantic import BaseModel, ConfigDict
 from typing import Optional, List, Dict, Any
 import logging
 import json
+import sqlite3
 import httpx
 import os
 from datetime import datetime
@@ -19,6 +20,8 @@ router = APIRouter()
 # Import database manager
 try:
     from database.database import DatabaseManager
+    from database.student_context import invalidate_student_context
+    from services.recommendation_refresh import notify_activity
     from main import db_manager
 except ImportError:
     # Fallback import
@@ -26,6 +29,8 @@ except ImportError:
     import os
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
     from database.database import DatabaseManager
+    from database.student_context import invalidate_student_context
+    from services.recommendation_refresh import notify_activity
     db_manager = None
 
 
@@ -231,6 +236,10 @@ async def create_interaction(interaction: InteractionCreate, db: DatabaseManager
         
         logger.info(f"Successfully logged interaction {interaction_id} for user {interaction.user_id}")
         
+        invalidate_student_context(interaction.user_id, interaction.session_id)
+        # Count towards a background recommendation refresh (debounced)
+        notify_activity(db, interaction.user_id, interaction.session_id)
+        
         return {
             "interaction_id": interaction_id,
             "message": "Interaction logged successfully"
@@ -244,6 +253,97 @@ async def create_interaction(interaction: InteractionCreate, db: DatabaseManager
         )
 
 
+class InteractionBatchCreate(BaseModel):
+    """Request model for logging several interactions at once"""
+    interactions: List[InteractionCreate]
+
+
+@router.post("/batch", status_code=201)
+async def create_interactions_batch(batch: InteractionBatchCreate, db: DatabaseManager = Depends(get_db)):
+    """
+    Create several interaction records in one transaction
+    
+    Used by the API gateway's telemetry outbox, which queues interactions
+    locally and delivers them in batches. Returns the IDs in request order.
+    Each row is inserted under its own savepoint: a row that cannot be stored
+    gets ``None`` and an entry in ``errors`` (``{"index", "error"}``) while
+    the others are committed, so the outbox retries only that row.
+    """
+    try:
+        interaction_ids = []
+        errors = []
+        with db.get_connection() as conn:
+            # Same defaults as POST /interactions for students without a profile
+            for user_id, session_id in {(i.user_id, i.session_id) for i in batch.interactions}:
+                conn.execute(
+                    """
+                    INSERT INTO student_profiles
+                    (user_id, session_id, average_understanding, average_satisfaction,
+                     total_interactions, total_feedback_count, last_updated, created_at)
+                    SELECT ?, ?, 3.0, 3.0, 0, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM student_profiles WHERE user_id = ? AND session_id = ?
+                    )
+                    """,
+                    (user_id, session_id, user_id, session_id)
+                )
+            for index, interaction in enumerate(batch.interactions):
+                conn.execute("SAVEPOINT batch_row")
+                try:
+                    cursor = conn.execute(
+                        """
+                        INSERT INTO student_interactions 
+                        (user_id, session_id, query, original_response, personalized_response,
+                         processing_time_ms, model_used, chain_type, sources, metadata)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        (
+                            interaction.user_id,
+                            interaction.session_id,
+                            interaction.query,
+                            interaction.response,
+                            interaction.personalized_response,
+                            interaction.processing_time_ms,
+                            interaction.model_used,
+                            interaction.chain_type,
+                            json.dumps(interaction.sources) if interaction.sources else None,
+                            json.dumps(interaction.metadata) if interaction.metadata else None
+                        )
+                    )
+                except sqlite3.Error as row_error:
+                    conn.execute("ROLLBACK TO SAVEPOINT batch_row")
+                    conn.execute("RELEASE SAVEPOINT batch_row")
+                    logger.warning(f"Interaction {index} of batch not logged: {row_error}")
+                    interaction_ids.append(None)
+                    errors.append({"index": index, "error": str(row_error)})
+                    continue
+                conn.execute("RELEASE SAVEPOINT batch_row")
+                interaction_ids.append(cursor.lastrowid)
+            conn.commit()
+        
+        stored = [i for i, interaction_id in zip(batch.interactions, interaction_ids) if interaction_id is not None]
+        logger.info(f"Successfully logged {len(stored)} interactions in one batch ({len(errors)} failed)")
+        
+        for user_id, session_id in {(i.user_id, i.session_id) for i in stored}:
+            invalidate_student_context(user_id, session_id)
+        # One activity event per interaction, as with single POSTs
+        for interaction in stored:
+            notify_activity(db, interaction.user_id, interaction.session_id)
+        
+        return {
+            "interaction_ids": interaction_ids,
+            "errors": errors,
+            "message": f"{len(stored)} interactions logged successfully"
+        }
+        
+    except Exception as e:
+        logger.error(f"Failed to log interaction batch: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to log interactions: {str(e)}"
+        )
+
+
 @router.get("/{user_id}")
 async def get_user_interactions(
     user_id: str,
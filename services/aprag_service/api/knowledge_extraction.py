@@ -5,7 +5,7 @@ Extracts structured knowledge from document chunks for KB-Enhanced RAG
 
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 import logging
 import json
 import re
@@ -469,16 +469,28 @@ async def get_session_model(session_id: str) -> str:
         return os.getenv("DEFAULT_MODEL", "llama-3.1-8b-instant")
 
 
-async def fetch_chunks_for_session(session_id: str) -> List[Dict[str, Any]]:
-    """Fetch all chunks for a session from document processing service"""
+async def fetch_chunks_for_session(session_id: str, chunk_ids: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Fetch chunks for a session from document processing service.
+
+    Only ids and text are requested (no metadata/embeddings). When
+    ``chunk_ids`` is given the filtering happens server-side.
+    """
+    params = {"fields": "ids,text"}
+    if chunk_ids:
+        params["chunk_ids"] = ",".join(str(cid) for cid in chunk_ids)
     try:
         async with httpx.AsyncClient(timeout=30.0) as client:
             response = await client.get(
-                f"{DOCUMENT_PROCESSING_URL}/sessions/{session_id}/chunks"
+                f"{DOCUMENT_PROCESSING_URL}/sessions/{session_id}/chunks",
+                params=params
             )
             
-            if response.status_code == 200:
-                chunks = response.json().get("chunks", [])
+            if response.status_code != 200:
+                logger.warning(f"Could not fetch chunks: {response.status_code}")
+                return []
+            
+            chunks = response.json().get("chunks", [])
             
             # Normalize chunk IDs - ensure every chunk has a valid ID
             for i, chunk in enumerate(chunks):
@@ -502,18 +514,37 @@ async def fetch_chunks_for_session(session_id: str) -> List[Dict[str, Any]]:
                 
                 # Ensure chunk_id is set in the main dict (keep original type - string UUID or int)
                 chunk["chunk_id"] = chunk_id
-                
-                logger.info(f"✅ [FETCH CHUNKS] Fetched {len(chunks)} chunks, sample IDs (first 5): {[c.get('chunk_id') for c in chunks[:5]]}")
-                return chunks
-            else:
-                logger.warning(f"Could not fetch chunks: {response.status_code}")
-                return []
+            
+            logger.info(f"✅ [FETCH CHUNKS] Fetched {len(chunks)} chunks, sample IDs (first 5): {[c.get('chunk_id') for c in chunks[:5]]}")
+            return chunks
             
     except Exception as e:
         logger.error(f"Error fetching chunks for session {session_id}: {e}")
         return []
 
 
+async def fetch_topic_chunks(topic: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Fetch the chunks relevant to a topic.
+
+    Explicitly related chunks are requested by ID first; the whole session is
+    only pulled when the topic has no (resolvable) chunk links and keyword
+    matching is needed.
+
+    Returns:
+        (fetched_chunks, relevant_chunks)
+    """
+    related_chunk_ids = topic.get("related_chunk_ids") or []
+    if related_chunk_ids:
+        linked_chunks = await fetch_chunks_for_session(topic["session_id"], chunk_ids=related_chunk_ids)
+        relevant_chunks = filter_chunks_by_topic(linked_chunks, topic["keywords"], related_chunk_ids)
+        if relevant_chunks:
+            return linked_chunks, relevant_chunks
+    
+    all_chunks = await fetch_chunks_for_session(topic["session_id"])
+    return all_chunks, filter_chunks_by_topic(all_chunks, topic["keywords"], related_chunk_ids)
+
+
 def get_topic_info(topic_id: int, db: DatabaseManager) -> Optional[Dict]:
     """Get topic information from database"""
     try:
@@ -1640,19 +1671,12 @@ async def extract_knowledge_for_topic(topic_id: int, request: Optional[Knowledge
         
         # Fetch chunks
         logger.info(f"📦 [KB DEBUG] Fetching chunks for session {topic['session_id']}")
-        all_chunks = await fetch_chunks_for_session(topic["session_id"])
+        all_chunks, relevant_chunks = await fetch_topic_chunks(topic)
         if not all_chunks:
             logger.error(f"❌ [KB DEBUG] No chunks found for session {topic['session_id']}")
             raise HTTPException(status_code=404, detail="No chunks found for session")
         
-        logger.info(f"📦 [KB DEBUG] Found {len(all_chunks)} chunks for session")
-        
-        # Filter relevant chunks
-        relevant_chunks = filter_chunks_by_topic(
-            all_chunks,
-            topic["keywords"],
-            topic["related_chunk_ids"]
-        )
+        logger.info(f"📦 [KB DEBUG] Fetched {len(all_chunks)} chunks for session")
         
         if not relevant_chunks:
             logger.error(f"❌ [KB DEBUG] CRITICAL: No relevant chunks for topic {topic_id}!")
@@ -2219,8 +2243,7 @@ async def generate_qa_pairs_endpoint(topic_id: int, request: QAGenerationRequest
         if not topic:
             raise HTTPException(status_code=404, detail="Topic not found")
         
-        all_chunks = await fetch_chunks_for_session(topic["session_id"])
-        relevant_chunks = filter_chunks_by_topic(all_chunks, topic["keywords"], topic["related_chunk_ids"])
+        all_chunks, relevant_chunks = await fetch_topic_chunks(topic)
         
         chunks_text = "\n\n---\n\n".join([
             chunk.get("chunk_text", chunk.get("content", ""))
@@ -2379,10 +2402,7 @@ async def refresh_topic_summary_only(topic_id: int, request: SelectiveRefreshReq
             kb_dict = dict(existing_kb)
 
         # Fetch relevant chunks
-        all_chunks = await fetch_chunks_for_session(topic["session_id"])
-        relevant_chunks = filter_chunks_by_topic(
-            all_chunks, topic["keywords"], topic["related_chunk_ids"]
-        )
+        all_chunks, relevant_chunks = await fetch_topic_chunks(topic)
         
         if not relevant_chunks:
             raise HTTPException(
@@ -2505,10 +2525,7 @@ async def refresh_topic_concepts_only(topic_id: int, request: SelectiveRefreshRe
             current_concepts = json.loads(dict(existing_kb)["key_concepts"]) if dict(existing_kb)["key_concepts"] else []
 
         # Fetch relevant chunks
-        all_chunks = await fetch_chunks_for_session(topic["session_id"])
-        relevant_chunks = filter_chunks_by_topic(
-            all_chunks, topic["keywords"], topic["related_chunk_ids"]
-        )
+        all_chunks, relevant_chunks = await fetch_topic_chunks(topic)
         
         chunks_text = "\n\n---\n\n".join([
             chunk.get("chunk_text", chunk.get("content", ""))
@@ -2647,10 +2664,7 @@ async def refresh_learning_objectives_only(topic_id: int, request: SelectiveRefr
             current_objectives = json.loads(dict(existing_kb)["learning_objectives"]) if dict(existing_kb)["learning_objectives"] else []
 
         # Fetch relevant chunks
-        all_chunks = await fetch_chunks_for_session(topic["session_id"])
-        relevant_chunks = filter_chunks_by_topic(
-            all_chunks, topic["keywords"], topic["related_chunk_ids"]
-        )
+        all_chunks, relevant_chunks = await fetch_topic_chunks(topic)
         
         chunks_text = "\n\n---\n\n".join([
             chunk.get("chunk_text", chunk.get("content", ""))
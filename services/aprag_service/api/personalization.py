@@ -7,7 +7,7 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 import logging
-import requests
+import httpx
 import os
 import json
 
@@ -18,8 +18,8 @@ router = APIRouter()
 # Import database manager and profiles
 try:
     from database.database import DatabaseManager
+    from database.student_context import StudentContext, load_student_context
     from main import db_manager
-    from api.profiles import get_profile
     from config.feature_flags import FeatureFlags
     from business_logic.pedagogical import (
         get_zpd_calculator,
@@ -32,7 +32,7 @@ except ImportError:
     import os
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
     from database.database import DatabaseManager
-    from api.profiles import get_profile
+    from database.student_context import StudentContext, load_student_context
     from config.feature_flags import FeatureFlags
     from business_logic.pedagogical import (
         get_zpd_calculator,
@@ -88,6 +88,19 @@ def get_db() -> DatabaseManager:
     return db_manager
 
 
+def _is_ebars_enabled(session_id: str, context: Optional[StudentContext]) -> bool:
+    """
+    EBARS check answered from the already loaded session settings when possible
+    (same precedence as FeatureFlags.is_ebars_enabled, without another query)
+    """
+    if context is not None and "enable_ebars" in context.session_settings:
+        if not FeatureFlags.is_egitsel_kbrag_enabled():
+            return False
+        return bool(context.session_settings["enable_ebars"])
+    from ebars.router import check_ebars_enabled
+    return check_ebars_enabled(session_id)
+
+
 def _map_ebars_to_legacy_difficulty(ebars_level: str) -> str:
     """
     Map EBARS difficulty levels to legacy difficulty levels.
@@ -321,28 +334,11 @@ async def personalize_response(
     try:
         logger.info(f"Personalizing response for user {request.user_id}, session {request.session_id}")
         
-        # Get student profile
+        # Profile, recent interactions, EBARS state and session settings in one round trip
+        context = None
         try:
-            profile_result = await get_profile(request.user_id, request.session_id, db)
-            # Pydantic v2: use model_dump() instead of dict()
-            if hasattr(profile_result, 'model_dump'):
-                profile_dict = profile_result.model_dump()
-            elif hasattr(profile_result, 'dict'):
-                profile_dict = profile_result.dict()
-            elif isinstance(profile_result, dict):
-                profile_dict = profile_result
-            else:
-                # Fallback: convert to dict manually
-                profile_dict = {
-                    "user_id": getattr(profile_result, 'user_id', request.user_id),
-                    "session_id": getattr(profile_result, 'session_id', request.session_id),
-                    "average_understanding": getattr(profile_result, 'average_understanding', None),
-                    "average_satisfaction": getattr(profile_result, 'average_satisfaction', None),
-                    "total_interactions": getattr(profile_result, 'total_interactions', 0),
-                    "total_feedback_count": getattr(profile_result, 'total_feedback_count', 0),
-                    "preferred_explanation_style": getattr(profile_result, 'preferred_explanation_style', None),
-                    "preferred_difficulty_level": getattr(profile_result, 'preferred_difficulty_level', None),
-                }
+            context = load_student_context(db, request.user_id, request.session_id)
+            profile_dict = context.profile_dict()
             logger.info(f"Profile loaded: interactions={profile_dict.get('total_interactions', 0)}, "
                        f"feedback={profile_dict.get('total_feedback_count', 0)}")
         except Exception as e:
@@ -371,19 +367,8 @@ async def personalize_response(
             try:
                 zpd_calc = get_zpd_calculator()
                 if zpd_calc:
-                    # Get recent interactions for ZPD calculation
-                    recent_interactions = db.execute_query(
-                        """
-                        SELECT * FROM student_interactions
-                        WHERE user_id = ? AND session_id = ?
-                        ORDER BY timestamp DESC
-                        LIMIT 20
-                        """,
-                        (request.user_id, request.session_id)
-                    )
-                    
                     zpd_info = zpd_calc.calculate_zpd_level(
-                        recent_interactions=recent_interactions,
+                        recent_interactions=context.recent_interactions if context else [],
                         student_profile=profile_dict
                     )
                     
@@ -466,8 +451,7 @@ async def personalize_response(
         # Check if EBARS is enabled - if so, use EBARS prompt adapter instead
         ebars_enabled = False
         try:
-            from ebars.router import check_ebars_enabled
-            ebars_enabled = check_ebars_enabled(request.session_id)
+            ebars_enabled = _is_ebars_enabled(request.session_id, context)
             logger.info(f"🔍 EBARS enabled check: {ebars_enabled}")
         except ImportError:
             # EBARS module not available
@@ -540,16 +524,17 @@ async def personalize_response(
             
             logger.info(f"Personalization LLM call: original={len(request.original_response)} chars (~{original_tokens_estimate} tokens), max_tokens={max_tokens}")
             
-            model_response = requests.post(
-                f"{MODEL_INFERENCE_URL}/models/generate",
-                json={
-                    "prompt": personalization_prompt,
-                    "model": "llama-3.1-8b-instant",  # Fast model for personalization
-                    "max_tokens": max_tokens,
-                    "temperature": 0.5,  # Slightly higher temperature for more creative personalization
-                },
-                timeout=20  # Increased timeout for longer responses
-            )
+            # Non-blocking: the event loop keeps serving other requests while the LLM runs
+            async with httpx.AsyncClient(timeout=20.0) as client:  # Increased timeout for longer responses
+                model_response = await client.post(
+                    f"{MODEL_INFERENCE_URL}/models/generate",
+                    json={
+                        "prompt": personalization_prompt,
+                        "model": "llama-3.1-8b-instant",  # Fast model for personalization
+                        "max_tokens": max_tokens,
+                        "temperature": 0.5,  # Slightly higher temperature for more creative personalization
+                    }
+                )
             
             if model_response.status_code == 200:
                 result = model_response.json()
@@ -635,7 +620,7 @@ async def personalize_response(
                     pedagogical_instructions=pedagogical_instructions if pedagogical_instructions else None
                 )
                 
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.warning(f"Model inference service unavailable: {e}")
             # Fallback to original response
             return PersonalizeResponse(
@@ -693,24 +678,15 @@ async def personalize_response_endpoint(
     try:
         logger.info(f"Personalization request for user {request.user_id}, session {request.session_id}")
         
-        # Get student profile
+        # Get student profile and recent interactions (shared, briefly cached context)
         try:
-            profile_result = await get_profile(request.user_id, request.session_id, db)
-            profile_dict = profile_result.dict() if hasattr(profile_result, 'dict') else profile_result
+            context = load_student_context(db, request.user_id, request.session_id)
+            profile_dict = context.profile_dict()
+            recent_interactions = context.recent_interactions
         except Exception as e:
             logger.warning(f"Could not get profile: {e}")
             profile_dict = {}
-        
-        # Get recent interactions for context
-        recent_interactions = db.execute_query(
-            """
-            SELECT * FROM student_interactions
-            WHERE user_id = ? AND session_id = ?
-            ORDER BY timestamp DESC
-            LIMIT 20
-            """,
-            (request.user_id, request.session_id)
-        )
+            recent_interactions = []
         
         # Analyze student profile
         factors = _analyze_student_profile(profile_dict)
@@ -16,6 +16,9 @@ router = APIRouter()
 # Import database manager
 try:
     from database.database import DatabaseManager
+    from database.student_context import invalidate_student_context
+    from database.topic_rollups import refresh_session_rollups
+    from utils.request_context import DB, invalidate, memoized_db
     from main import db_manager
 except ImportError:
     # Fallback import
@@ -23,6 +26,9 @@ except ImportError:
     import os
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
     from database.database import DatabaseManager
+    from database.student_context import invalidate_student_context
+    from database.topic_rollups import refresh_session_rollups
+    from utils.request_context import DB, invalidate, memoized_db
     db_manager = None
 
 
@@ -85,7 +91,8 @@ async def get_profile(
             """
             params = (user_id,)
         
-        results = db.execute_query(query, params)
+        # Read once per request when called from a request scope (e.g. hybrid RAG debug)
+        results = memoized_db("student_profiles", params, lambda: db.execute_query(query, params))
         
         if not results:
             # Auto-create profile if it doesn't exist
@@ -100,6 +107,7 @@ async def get_profile(
                     """,
                     (user_id, session_id or "")
                 )
+                invalidate(DB, "student_profiles", params)
                 logger.info(f"✅ Created default profile for user {user_id}, session {session_id}")
                 # Return the newly created profile
                 return ProfileResponse(
@@ -207,33 +215,38 @@ async def reset_profile(
         user_id = str(user_id)
         session_id = str(session_id)
         
-        # Reset profile to defaults
-        db.execute_update(
-            """
-            UPDATE student_profiles
-            SET average_understanding = 3.0,
-                average_satisfaction = 3.0,
-                total_interactions = 0,
-                total_feedback_count = 0,
-                strong_topics = NULL,
-                weak_topics = NULL,
-                preferred_explanation_style = NULL,
-                preferred_difficulty_level = NULL,
-                last_updated = CURRENT_TIMESTAMP
-            WHERE user_id = ? AND session_id = ?
-            """,
-            (user_id, session_id)
-        )
-        
-        # Delete all interactions for this user and session
-        db.execute_update(
-            """
-            DELETE FROM student_interactions
-            WHERE user_id = ? AND session_id = ?
-            """,
-            (user_id, session_id)
-        )
+        with db.get_connection() as conn:
+            # Reset profile to defaults
+            conn.execute(
+                """
+                UPDATE student_profiles
+                SET average_understanding = 3.0,
+                    average_satisfaction = 3.0,
+                    total_interactions = 0,
+                    total_feedback_count = 0,
+                    strong_topics = NULL,
+                    weak_topics = NULL,
+                    preferred_explanation_style = NULL,
+                    preferred_difficulty_level = NULL,
+                    last_updated = CURRENT_TIMESTAMP
+                WHERE user_id = ? AND session_id = ?
+                """,
+                (user_id, session_id)
+            )
+            
+            # Delete all interactions for this user and session
+            conn.execute(
+                """
+                DELETE FROM student_interactions
+                WHERE user_id = ? AND session_id = ?
+                """,
+                (user_id, session_id)
+            )
+            # The student's interactions no longer count towards the topic rollups
+            refresh_session_rollups(conn, session_id)
+            conn.commit()
         
+        invalidate_student_context(user_id, session_id)
         logger.info(f"Reset profile for user {user_id}, session {session_id}")
         
         return {
@@ -472,6 +485,7 @@ async def update_profile(
                     json.dumps(profile_data.get("weak_topics")) if profile_data.get("weak_topics") else None,
                 )
             )
+        invalidate_student_context(user_id, session_id)
         
         return {"message": "Profile updated successfully"}
         
@@ -21,12 +21,14 @@ from enum import Enum
 # Import database and dependencies
 try:
     from database.database import DatabaseManager
+    from database.progressive_assessment_state import get_trigger_state, load_insight_counters
     from config.feature_flags import FeatureFlags
 except ImportError:
     import sys
     import os
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
     from database.database import DatabaseManager
+    from database.progressive_assessment_state import get_trigger_state, load_insight_counters
     from config.feature_flags import FeatureFlags
 
 db_manager = None
@@ -383,7 +385,7 @@ async def get_assessment_insights(
     """
     Get comprehensive assessment insights for a user
     
-    Provides deep learning analytics based on progressive assessment data:
+    Provides deep learning analytics based on progressive assessment counters:
     - Confidence trends
     - Application readiness
     - Concept mastery levels
@@ -391,28 +393,11 @@ async def get_assessment_insights(
     """
     
     try:
-        # Base query conditions
-        where_conditions = ["user_id = ?"]
-        params = [user_id]
-        
-        if session_id:
-            where_conditions.append("session_id = ?")
-            params.append(session_id)
-        
-        where_conditions.append("timestamp >= datetime('now', '-{} days')".format(days))
-        where_clause = " AND ".join(where_conditions)
-        
-        # Get progressive assessment data
-        assessments = db.execute_query(
-            f"""
-            SELECT * FROM progressive_assessments
-            WHERE {where_clause}
-            ORDER BY timestamp DESC
-            """,
-            tuple(params)
-        )
+        # Incremental per-day counters (maintained by a trigger on progressive_assessments)
+        with db.get_connection() as conn:
+            counters = load_insight_counters(conn, user_id, session_id, days)
         
-        if not assessments:
+        if not counters["total"]:
             return AssessmentInsights(
                 user_id=user_id,
                 session_id=session_id or "all",
@@ -422,8 +407,8 @@ async def get_assessment_insights(
                 average_confidence=2.5
             )
         
-        # Analyze assessment data
-        insights = _analyze_progressive_assessments(assessments, user_id, session_id or "all")
+        # Analyze assessment counters
+        insights = _analyze_progressive_assessments(counters, user_id, session_id or "all")
         
         logger.info(f"Generated insights for user {user_id}: {insights.total_assessments} assessments analyzed")
         
@@ -445,39 +430,24 @@ async def check_progressive_trigger(
     """
     Check if progressive assessment should be triggered for an interaction
     
-    Returns trigger conditions based on:
-    - Initial emoji feedback score
-    - Time since interaction
-    - User's assessment history
+    The decision is made when emoji feedback is recorded and stored on the
+    interaction (follow-up due time); this is a single-row lookup:
+    - Low emoji feedback (😐, ❌ or score <= 0.5) → due immediately
+    - Otherwise due 30 seconds after the interaction
+    - Already assessed interactions never trigger again
     """
     
     try:
-        # Get interaction with emoji feedback
-        interaction = db.execute_query(
-            """
-            SELECT interaction_id, user_id, session_id, emoji_feedback, 
-                   feedback_score, emoji_feedback_timestamp, timestamp
-            FROM student_interactions
-            WHERE interaction_id = ?
-            """,
-            (interaction_id,)
-        )
+        with db.get_connection() as conn:
+            interaction_data = get_trigger_state(conn, interaction_id)
         
-        if not interaction:
+        if not interaction_data:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Interaction {interaction_id} not found"
             )
         
-        interaction_data = interaction[0]
-        
-        # Check if follow-up assessment already exists
-        existing_assessment = db.execute_query(
-            "SELECT * FROM progressive_assessments WHERE interaction_id = ?",
-            (interaction_id,)
-        )
-        
-        if existing_assessment:
+        if interaction_data['progressive_assessment_stage']:
             return {
                 "trigger_follow_up": False,
                 "trigger_deep_analysis": False,
@@ -485,34 +455,13 @@ async def check_progressive_trigger(
                 "next_stage": None
             }
         
-        # Determine trigger conditions
-        emoji_score = interaction_data.get('feedback_score', 0.5)
-        emoji_feedback = interaction_data.get('emoji_feedback')
-        
-        # Trigger follow-up if:
-        # 1. Low emoji scores (😐, ❌)
-        # 2. 30+ seconds have passed since interaction
-        # 3. No existing progressive assessment
-        
-        should_trigger_follow_up = False
-        should_trigger_deep = False
-        
-        if emoji_feedback in ['😐', '❌'] or emoji_score <= 0.5:
-            should_trigger_follow_up = True
-            
-        # Check time delay (30 seconds for follow-up)
-        if interaction_data.get('timestamp'):
-            interaction_time = datetime.fromisoformat(interaction_data['timestamp'].replace('Z', '+00:00'))
-            time_diff = datetime.now() - interaction_time
-            
-            if time_diff.total_seconds() >= 30:
-                should_trigger_follow_up = True
-        
         return {
-            "trigger_follow_up": should_trigger_follow_up,
-            "trigger_deep_analysis": should_trigger_deep,
-            "emoji_feedback": emoji_feedback,
-            "emoji_score": emoji_score,
+            "trigger_follow_up": bool(interaction_data['follow_up_due']),
+            "trigger_deep_analysis": False,
+            "emoji_feedback": interaction_data['emoji_feedback'],
+            "emoji_score": interaction_data['feedback_score'],
+            "trigger_reason": interaction_data['progressive_trigger_reason'],
+            "follow_up_due_at": interaction_data['follow_up_due_at'],
             "interaction_id": interaction_id,
             "user_id": interaction_data['user_id'],
             "session_id": interaction_data['session_id']
@@ -677,42 +626,34 @@ def _update_concept_confusion_analytics(db: DatabaseManager, user_id: str, sessi
         logger.warning(f"Failed to update concept confusion analytics: {e}")
 
 
-def _analyze_progressive_assessments(assessments: List[Dict], user_id: str, session_id: str) -> AssessmentInsights:
-    """Analyze progressive assessments and generate insights"""
+def _analyze_progressive_assessments(counters: Dict[str, Any], user_id: str, session_id: str) -> AssessmentInsights:
+    """Generate insights from summed progressive assessment counters"""
     
-    total_assessments = len(assessments)
-    follow_up_count = len([a for a in assessments if a['stage'] == 'follow_up'])
-    deep_analysis_count = len([a for a in assessments if a['stage'] == 'deep_analysis'])
+    total_assessments = counters["total"]
+    follow_up_count = counters["follow_up"]
+    deep_analysis_count = counters["deep_analysis"]
     
     # Calculate rates
     follow_up_rate = follow_up_count / total_assessments if total_assessments > 0 else 0
     deep_analysis_rate = deep_analysis_count / total_assessments if total_assessments > 0 else 0
     
     # Analyze confidence trends
-    confidence_values = [a['confidence_level'] for a in assessments if a.get('confidence_level')]
-    avg_confidence = sum(confidence_values) / len(confidence_values) if confidence_values else 2.5
+    confidence_count = counters["confidence_count"]
+    avg_confidence = counters["confidence_sum"] / confidence_count if confidence_count else 2.5
     
+    # Newest vs oldest day with confidence values in the window
     confidence_trend = "stable"
-    if len(confidence_values) >= 3:
-        recent_avg = sum(confidence_values[:3]) / 3
-        older_avg = sum(confidence_values[-3:]) / 3
+    daily = counters["daily_confidence"]
+    if confidence_count >= 3 and len(daily) >= 2:
+        recent_avg = daily[0][0] / daily[0][1]
+        older_avg = daily[-1][0] / daily[-1][1]
         if recent_avg > older_avg + 0.5:
             confidence_trend = "improving"
         elif recent_avg < older_avg - 0.5:
             confidence_trend = "declining"
     
-    # Extract confusion areas and patterns
-    confusion_areas = []
-    for a in assessments:
-        if a.get('confusion_areas'):
-            try:
-                areas = json.loads(a['confusion_areas'])
-                confusion_areas.extend(areas)
-            except:
-                pass
-    
-    # Generate recommendations
-    weak_areas = list(set(confusion_areas))[:5]  # Top 5 most common
+    # Most frequent confusion areas
+    weak_areas = counters["weak_areas"]
     
     # Determine if intervention needed
     needs_intervention = False
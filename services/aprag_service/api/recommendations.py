@@ -10,6 +10,7 @@ import logging
 import json
 import requests
 import os
+import asyncio
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -21,6 +22,7 @@ try:
     from database.database import DatabaseManager
     from main import db_manager
     from api.profiles import get_profile
+    from services import recommendation_refresh
 except ImportError:
     # Fallback import
     import sys
@@ -28,6 +30,7 @@ except ImportError:
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
     from database.database import DatabaseManager
     from api.profiles import get_profile
+    from services import recommendation_refresh
     db_manager = None
 
 # Model Inference Service URL - Google Cloud Run compatible
@@ -61,6 +64,8 @@ class RecommendationResponse(BaseModel):
     """Response model for recommendations"""
     recommendations: List[Recommendation]
     total: int
+    generated_at: Optional[str] = None  # Freshness stamp of the stored recommendations
+    stale: bool = False  # True if a background refresh was requested
 
 
 def get_db() -> DatabaseManager:
@@ -293,6 +298,35 @@ def _generate_topic_recommendations(
     return recommendations
 
 
+def _build_recommendations(
+    db: DatabaseManager,
+    user_id: str,
+    session_id: str
+) -> List[Dict[str, Any]]:
+    """
+    Generate recommendations for a (user, session)
+    
+    Runs on the refresh worker thread (may call model inference), never inside a request.
+    """
+    try:
+        profile_result = asyncio.run(get_profile(user_id, session_id, db))
+        profile_dict = profile_result.dict() if hasattr(profile_result, 'dict') else profile_result
+    except Exception as e:
+        logger.warning(f"Could not get profile: {e}")
+        profile_dict = {}
+    
+    recommendations = []
+    recommendations.extend(_generate_question_recommendations(user_id, session_id, profile_dict, db))
+    recommendations.extend(_generate_topic_recommendations(user_id, session_id, profile_dict, db))
+    
+    recommendations.sort(key=lambda x: (x["priority"], x["relevance_score"]), reverse=True)
+    return recommendations
+
+
+refresh_worker = recommendation_refresh.RecommendationRefreshWorker(_build_recommendations)
+recommendation_refresh.set_default_worker(refresh_worker)
+
+
 @router.get("/{user_id}")
 async def get_recommendations(
     user_id: str,
@@ -303,36 +337,32 @@ async def get_recommendations(
     """
     Get personalized recommendations for a user
     
+    Only reads stored recommendations. If they are missing or stale, a
+    background refresh is requested and the next read returns fresh ones.
+    
     Args:
         user_id: User ID
         session_id: Optional session ID filter
         limit: Maximum number of recommendations
     """
     try:
-        # Get student profile
-        try:
-            profile_result = await get_profile(user_id, session_id, db)
-            profile_dict = profile_result.dict() if hasattr(profile_result, 'dict') else profile_result
-        except Exception as e:
-            logger.warning(f"Could not get profile: {e}")
-            profile_dict = {}
-        
-        # Generate recommendations
-        all_recommendations = []
+        generated_at = None
+        stale = False
         
         if session_id:
-            # Question recommendations
-            question_recs = _generate_question_recommendations(user_id, session_id, profile_dict, db)
-            all_recommendations.extend(question_recs)
-            
-            # Topic recommendations
-            topic_recs = _generate_topic_recommendations(user_id, session_id, profile_dict, db)
-            all_recommendations.extend(topic_recs)
+            state = recommendation_refresh.get_refresh_state(db, user_id, session_id)
+            generated_at = state.get("generated_at") if state else None
+            stale = recommendation_refresh.is_stale(state)
+            if recommendation_refresh.refresh_due(state):
+                # Never generated: run as soon as possible; otherwise debounce
+                refresh_worker.schedule(db, user_id, session_id, delay=0 if not generated_at else None)
         
-        # Get existing recommendations from database
+        # Get stored recommendations from database
         if session_id:
             existing_query = """
-                SELECT * FROM recommendations
+                SELECT recommendation_id, recommendation_type, title, description,
+                       content, priority, relevance_score, status
+                FROM recommendations
                 WHERE user_id = ? AND session_id = ? AND status = 'pending'
                 ORDER BY priority DESC, relevance_score DESC
                 LIMIT ?
@@ -340,7 +370,9 @@ async def get_recommendations(
             existing_params = (user_id, session_id, limit)
         else:
             existing_query = """
-                SELECT * FROM recommendations
+                SELECT recommendation_id, recommendation_type, title, description,
+                       content, priority, relevance_score, status
+                FROM recommendations
                 WHERE user_id = ? AND status = 'pending'
                 ORDER BY priority DESC, relevance_score DESC
                 LIMIT ?
@@ -349,7 +381,8 @@ async def get_recommendations(
         
         existing_recs = db.execute_query(existing_query, existing_params)
         
-        # Convert existing recommendations to dict format
+        # Convert stored recommendations to dict format
+        all_recommendations = []
         for rec in existing_recs:
             content = {}
             if rec.get("content"):
@@ -369,41 +402,11 @@ async def get_recommendations(
                 "status": rec.get("status", "pending")
             })
         
-        # Sort by priority and relevance score
-        all_recommendations.sort(key=lambda x: (x["priority"], x["relevance_score"]), reverse=True)
-        
-        # Limit results
-        all_recommendations = all_recommendations[:limit]
-        
-        # Save new recommendations to database (if not already saved)
-        for rec in all_recommendations:
-            if not rec.get("recommendation_id") and session_id:
-                try:
-                    rec_id = db.execute_insert(
-                        """
-                        INSERT INTO recommendations
-                        (user_id, session_id, recommendation_type, title, description, content, priority, relevance_score, status)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """,
-                        (
-                            user_id,
-                            session_id,
-                            rec["recommendation_type"],
-                            rec["title"],
-                            rec["description"],
-                            json.dumps(rec["content"]),
-                            rec["priority"],
-                            rec["relevance_score"],
-                            rec.get("status", "pending")
-                        )
-                    )
-                    rec["recommendation_id"] = rec_id
-                except Exception as e:
-                    logger.debug(f"Could not save recommendation: {e}")
-        
         return RecommendationResponse(
             recommendations=all_recommendations,
-            total=len(all_recommendations)
+            total=len(all_recommendations),
+            generated_at=generated_at,
+            stale=stale
         )
         
     except Exception as e:
@@ -13,14 +13,14 @@ import json
 
 # Import business logic and database
 try:
-    from business_logic.cacs import get_cacs_scorer, CACSScorer
+    from business_logic.cacs import get_cacs_scorer, CACSScorer, fetch_global_scores
     from database.database import DatabaseManager
     from config.feature_flags import FeatureFlags
 except ImportError:
     import sys
     import os
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-    from business_logic.cacs import get_cacs_scorer, CACSScorer
+    from business_logic.cacs import get_cacs_scorer, CACSScorer, fetch_global_scores
     from database.database import DatabaseManager
     from config.feature_flags import FeatureFlags
 
@@ -169,64 +169,32 @@ async def score_documents(
         
         logger.debug(f"Found {len(history)} past interactions for user {request.user_id}")
         
-        # Fetch global scores for all documents
-        global_scores = {}
-        for doc in request.documents:
-            doc_id = doc.doc_id
-            score_data = db.execute_query(
-                "SELECT * FROM document_global_scores WHERE doc_id = ?",
-                (doc_id,)
-            )
-            if score_data:
-                global_scores[doc_id] = score_data[0]
+        # Fetch global scores for all documents (single IN query)
+        global_scores = fetch_global_scores(db, [doc.doc_id for doc in request.documents])
         
         logger.debug(f"Found global scores for {len(global_scores)} documents")
         
-        # Score each document
+        # Score all documents at once
+        score_results = scorer.calculate_scores_bulk(
+            documents=[(doc.doc_id, doc.base_score) for doc in request.documents],
+            student_profile=student_profile,
+            conversation_history=history,
+            global_scores=global_scores,
+            current_query=request.query
+        )
+        
         scored_documents = []
-        for doc in request.documents:
-            try:
-                score_result = scorer.calculate_score(
-                    doc_id=doc.doc_id,
-                    base_score=doc.base_score,
-                    student_profile=student_profile,
-                    conversation_history=history,
-                    global_scores=global_scores,
-                    current_query=request.query
-                )
-                
-                # Create response object
-                scored_doc = DocumentScoreResponse(
-                    doc_id=doc.doc_id,
-                    final_score=score_result['final_score'],
-                    base_score=score_result['base_score'],
-                    personal_score=score_result['personal_score'],
-                    global_score=score_result['global_score'],
-                    context_score=score_result['context_score'],
-                    breakdown=score_result['breakdown'],
-                    cacs_enabled=score_result.get('cacs_enabled', True)
-                )
-                
-                scored_documents.append(scored_doc)
-                
-            except Exception as e:
-                logger.error(f"Error scoring document {doc.doc_id}: {e}")
-                # Fallback: use base score only
-                scored_documents.append(DocumentScoreResponse(
-                    doc_id=doc.doc_id,
-                    final_score=doc.base_score,
-                    base_score=doc.base_score,
-                    personal_score=0.5,
-                    global_score=0.5,
-                    context_score=0.5,
-                    breakdown={
-                        'base_weight': 1.0,
-                        'personal_weight': 0.0,
-                        'global_weight': 0.0,
-                        'context_weight': 0.0
-                    },
-                    cacs_enabled=False
-                ))
+        for doc, score_result in zip(request.documents, score_results):
+            scored_documents.append(DocumentScoreResponse(
+                doc_id=doc.doc_id,
+                final_score=score_result['final_score'],
+                base_score=score_result['base_score'],
+                personal_score=score_result['personal_score'],
+                global_score=score_result['global_score'],
+                context_score=score_result['context_score'],
+                breakdown=score_result['breakdown'],
+                cacs_enabled=score_result.get('cacs_enabled', True)
+            ))
         
         # Sort by final_score (highest first)
         scored_documents.sort(key=lambda x: x.final_score, reverse=True)
@@ -14,11 +14,13 @@ from datetime import datetime
 # Import database and dependencies
 try:
     from database.database import DatabaseManager
+    from database.student_context import invalidate_student_context
 except ImportError:
     import sys
     import os
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
     from database.database import DatabaseManager
+    from database.student_context import invalidate_student_context
 
 db_manager = None
 logger = logging.getLogger(__name__)
@@ -404,6 +406,7 @@ async def update_session_settings(
                 logger.error(f"Traceback: {traceback.format_exc()}")
                 raise HTTPException(status_code=500, detail=error_msg)
         
+        invalidate_student_context(session_id=session_id)
         # Return updated settings
         return await get_session_settings(session_id, db)
         
@@ -462,6 +465,7 @@ async def reset_session_settings(
             (session_id, user_id, False, False, False, True, True, True, True, True, True, False)
         )
         
+        invalidate_student_context(session_id=session_id)
         # Return new default settings
         return await get_session_settings(session_id, db)
         
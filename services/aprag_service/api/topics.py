@@ -19,6 +19,7 @@ router = APIRouter()
 
 # Import database manager
 from database.database import DatabaseManager
+from database.topic_rollups import record_topic_mapping, refresh_session_rollups
 
 # Import feature flags
 try:
@@ -215,12 +216,14 @@ def get_db() -> DatabaseManager:
     return DatabaseManager(db_path)
 
 
-def fetch_chunks_for_session(session_id: str) -> List[Dict[str, Any]]:
+def fetch_chunks_for_session(session_id: str, fields: str = "ids,metadata,text") -> List[Dict[str, Any]]:
     """
     Fetch all chunks for a session from ChromaDB
     
     Args:
         session_id: Session ID
+        fields: Projection passed to the chunks endpoint (embeddings are
+            never needed here)
         
     Returns:
         List of chunk dictionaries with content and metadata
@@ -230,6 +233,7 @@ def fetch_chunks_for_session(session_id: str) -> List[Dict[str, Any]]:
         # If that doesn't work, we'll need to query ChromaDB directly
         response = requests.get(
             f"{DOCUMENT_PROCESSING_URL}/sessions/{session_id}/chunks",
+            params={"fields": fields},
             timeout=30
         )
         
@@ -1591,6 +1595,8 @@ async def delete_topic(topic_id: int):
                 raw_conn.close()
                 raise HTTPException(status_code=404, detail="Topic not found")
             
+            # Its mappings are gone; drop the topic's rollup rows
+            refresh_session_rollups(raw_conn, session_id, [topic_id])
             raw_conn.commit()
             logger.info(f"Topic {topic_id} ('{topic_title}') deleted successfully")
             
@@ -1738,6 +1744,8 @@ async def classify_question(request: QuestionClassificationRequest):
                         ))
                         
                         mapping_id = cursor.lastrowid
+                        # Topic analytics rollups, same transaction as the mapping
+                        record_topic_mapping(conn, mapping_id)
                         conn.commit()
                         
                         logger.info(f"Successfully saved question-topic mapping with ID {mapping_id}")
@@ -2152,6 +2160,7 @@ def run_extraction_in_background(job_id: str, session_id: str, method: str, syst
                     
                     # Now delete existing topics (only inactive ones or if explicitly allowed)
                     deleted_count = conn.execute("DELETE FROM course_topics WHERE session_id = ?", (session_id,)).rowcount
+                    refresh_session_rollups(conn, session_id)
                     conn.commit()
                     logger.info(f"🗑️ [TOPIC EXTRACTION] Deleted {deleted_count} existing topics for session {session_id}")
                     extraction_jobs[job_id]["message"] = f"Eski konular yedeklendi ve silindi ({deleted_count} konu), extraction başlıyor..."
@@ -2420,6 +2429,7 @@ async def re_extract_topics_sync(
                 conn.execute("""
                     DELETE FROM course_topics WHERE session_id = ?
                 """, (session_id,))
+                refresh_session_rollups(conn, session_id)
                 conn.commit()
             
             logger.info(f"Deleted old topics for session {session_id}")
@@ -3028,6 +3038,8 @@ async def restore_topics_from_backup(session_id: str):
                     logger.warning(f"Failed to restore topic {topic_dict.get('topic_title')}: {e}")
                     continue
             
+            # Restored topics get new IDs; mappings to the replaced ones no longer count
+            refresh_session_rollups(conn, session_id)
             conn.commit()
             
             logger.info(f"✅ Restored {restored_count} topics from backup for session {session_id}")
@@ -1,34 +1,33 @@
 #!/usr/bin/env python3
 """
-Apply Migration 017: Update Initial Test for Two-Stage System
-Adds test_attempt and answer_preferences columns to initial_cognitive_tests table
+Apply the two-stage initial test (017_update_initial_test_for_two_stage.sql)
+
+Kept for existing deploy notes: the change is a step of
+database/schema_migrations.py, so this runs every pending step.
+Same as ``python -m database.schema_migrations migrate``.
 """
 
 import os
 import sys
-import sqlite3
 
-# Add parent directory to path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Add service root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from database.database import DatabaseManager
+from database.schema_migrations import LATEST_VERSION, get_schema_version, migrate
+
 
 def main():
-    # Get database path from environment or use default
     db_path = os.getenv("APRAG_DB_PATH", os.getenv("DATABASE_PATH", "data/rag_assistant.db"))
-    
-    print(f"📦 Applying Migration 017: Two-Stage Test System")
+    print(f"📦 Applying pending schema migrations")
     print(f"   Database: {db_path}")
-    
+
+    # DatabaseManager() runs pending steps; migrate() raises if one fails
     db = DatabaseManager(db_path)
-    
+    migrate(db)
     with db.get_connection() as conn:
-        # Apply migration
-        db.apply_initial_test_two_stage_migration(conn)
-        conn.commit()
-    
-    print("✅ Migration 017 applied successfully!")
+        print(f"✅ Schema version {get_schema_version(conn)}/{LATEST_VERSION}")
+
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+CACS Scoring Benchmark
+Per-document scoring vs bulk scoring (50 documents × 1,000 history rows by default)
+
+Usage:
+    python benchmark_cacs.py [--documents 50] [--history 1000] [--repeat 20]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+os.environ.setdefault("APRAG_ENABLED", "true")
+os.environ.setdefault("ENABLE_EGITSEL_KBRAG", "true")
+os.environ.setdefault("ENABLE_CACS", "true")
+
+from business_logic import cacs
+from business_logic.cacs import CACSScorer
+
+
+def build_workload(documents: int, history_rows: int, seed: int = 42):
+    """Synthetic candidates, history and global scores shaped like production rows"""
+    rng = random.Random(seed)
+    doc_ids = [f"chunk_{i:04d}_{rng.randint(1000, 9999)}" for i in range(documents * 4)]
+    candidates = [(doc_id, rng.random()) for doc_id in rng.sample(doc_ids, documents)]
+
+    history = []
+    for i in range(history_rows):
+        sources = [
+            {"doc_id": doc_id, "score": round(rng.random(), 3), "metadata": {"source_file": "ders.pdf"}}
+            for doc_id in rng.sample(doc_ids, 3)
+        ]
+        history.append({
+            "interaction_id": i,
+            "query": " ".join(rng.sample(["hücre", "zarı", "mitoz", "enerji", "protein", "nedir", "yapısı"], 3)),
+            "sources": json.dumps(sources),
+            "feedback_score": rng.choice([None, None, 1, 2, 3, 4, 5, "😊", "👍"]),
+        })
+
+    global_scores = {
+        doc_id: {
+            "doc_id": doc_id,
+            "total_feedback_count": rng.randint(0, 40),
+            "positive_feedback_count": rng.randint(0, 20),
+            "negative_feedback_count": rng.randint(0, 20),
+            "avg_emoji_score": round(rng.random(), 2),
+        }
+        for doc_id, _ in candidates[::2]
+    }
+    profile = {"preferred_difficulty_level": "intermediate", "success_rate": 0.8}
+    return candidates, history, global_scores, profile
+
+
+def run_benchmark(documents: int = 50, history_rows: int = 1000, repeat: int = 20):
+    """Time both paths on the same workload and check that results agree"""
+    scorer = CACSScorer()
+    candidates, history, global_scores, profile = build_workload(documents, history_rows)
+    query = "hücre zarı yapısı"
+
+    def single():
+        return [
+            scorer.calculate_score(doc_id, base, profile, history, global_scores, query)
+            for doc_id, base in candidates
+        ]
+
+    def bulk():
+        return scorer.calculate_scores_bulk(candidates, profile, history, global_scores, query)
+
+    assert single() == bulk(), "bulk scoring diverged from per-document scoring"
+
+    timings = {}
+    for name, fn in (("per_document", single), ("bulk", bulk)):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        timings[name] = {"median_ms": samples[len(samples) // 2], "min_ms": samples[0]}
+
+    return {
+        "documents": documents,
+        "history_rows": history_rows,
+        "numpy": cacs.np is not None,
+        "timings": timings,
+        "speedup": timings["per_document"]["median_ms"] / max(timings["bulk"]["median_ms"], 1e-9),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CACS per-document vs bulk scoring benchmark")
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--history", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    result = run_benchmark(args.documents, args.history, args.repeat)
+
+    print("=" * 60)
+    print(f"  CACS Benchmark: {result['documents']} documents × {result['history_rows']} history rows")
+    print("=" * 60)
+    print(f"  numpy available: {result['numpy']}")
+    for name, timing in result["timings"].items():
+        print(f"  {name:<14} median {timing['median_ms']:8.2f} ms   min {timing['min_ms']:8.2f} ms")
+    print(f"  speedup: {result['speedup']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
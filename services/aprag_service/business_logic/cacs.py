@@ -5,10 +5,16 @@ Eğitsel-KBRAG paper implementation
 This module requires APRAG to be enabled.
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+from bisect import bisect_right
 import logging
 import json
 
+try:
+    import numpy as np
+except ImportError:  # Bulk scoring falls back to pure Python
+    np = None
+
 # Import feature flags
 try:
     from config.feature_flags import FeatureFlags
@@ -192,6 +198,195 @@ class CACSScorer:
                 'error': str(e)
             }
     
+    def calculate_scores_bulk(
+        self,
+        documents: List[Tuple[str, float]],
+        student_profile: Dict,
+        conversation_history: List[Dict],
+        global_scores: Dict,
+        current_query: str,
+        doc_index: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> List[Dict]:
+        """
+        Tüm aday dokümanları tek seferde skorla (calculate_score ile aynı sonuçlar)
+        
+        Konuşma geçmişi bir kez taranır (build_doc_interaction_index), context
+        skoru dokümandan bağımsız olduğu için bir kez hesaplanır ve bileşen
+        hesapları numpy ile tüm dokümanlar üzerinde vektörize edilir.
+        
+        Args:
+            documents: (doc_id, base_score) listesi
+            student_profile: Öğrenci profil verisi
+            conversation_history: Son N etkileşim listesi
+            global_scores: Global skor tablosu (doc_id -> scores dict)
+            current_query: Mevcut sorgu metni
+            doc_index: Önceden oluşturulmuş doc_id -> geçmiş istatistikleri (opsiyonel)
+            
+        Returns:
+            documents ile aynı sırada calculate_score sonuç sözlükleri
+        """
+        if not documents:
+            return []
+        
+        if not FeatureFlags.is_cacs_enabled():
+            return [
+                self.calculate_score(doc_id, base_score, student_profile, conversation_history,
+                                     global_scores, current_query)
+                for doc_id, base_score in documents
+            ]
+        
+        try:
+            doc_ids = [doc_id for doc_id, _ in documents]
+            bases = [float(base_score) for _, base_score in documents]
+            
+            if conversation_history and doc_index is None:
+                doc_index = build_doc_interaction_index(conversation_history, doc_ids)
+            
+            personal = self._personal_scores_bulk(doc_ids, student_profile, conversation_history, doc_index)
+            global_values = self._global_scores_bulk(doc_ids, global_scores)
+            # Context skoru dokümana bağlı değil
+            context = self._calculate_context_score(None, conversation_history, current_query)
+            
+            if np is not None:
+                final = np.clip(
+                    self.w_base * np.array(bases, dtype=np.float64) +
+                    self.w_personal * personal +
+                    self.w_global * global_values +
+                    self.w_context * context,
+                    0.0, 1.0
+                ).tolist()
+                personal = personal.tolist()
+                global_values = global_values.tolist()
+            else:
+                final = [
+                    max(0.0, min(1.0,
+                        self.w_base * b + self.w_personal * p + self.w_global * g + self.w_context * context
+                    ))
+                    for b, p, g in zip(bases, personal, global_values)
+                ]
+            
+            breakdown = {
+                'base_weight': self.w_base,
+                'personal_weight': self.w_personal,
+                'global_weight': self.w_global,
+                'context_weight': self.w_context
+            }
+            results = [
+                {
+                    'final_score': final[i],
+                    'base_score': bases[i],
+                    'personal_score': personal[i],
+                    'global_score': global_values[i],
+                    'context_score': context,
+                    'breakdown': dict(breakdown),
+                    'cacs_enabled': True
+                }
+                for i in range(len(documents))
+            ]
+            
+            logger.debug(f"CACS bulk scored {len(results)} documents against "
+                        f"{len(conversation_history or [])} history rows")
+            return results
+            
+        except Exception as e:
+            logger.warning(f"Bulk CACS scoring failed, scoring documents one by one: {e}")
+            return [
+                self.calculate_score(doc_id, base_score, student_profile, conversation_history,
+                                     global_scores, current_query)
+                for doc_id, base_score in documents
+            ]
+    
+    def _personal_scores_bulk(
+        self,
+        doc_ids: List[str],
+        student_profile: Dict,
+        conversation_history: List[Dict],
+        doc_index: Optional[Dict[str, Dict[str, Any]]]
+    ):
+        """_calculate_personal_score for all documents using the history index"""
+        if not conversation_history:
+            return np.full(len(doc_ids), 0.5) if np is not None else [0.5] * len(doc_ids)
+        
+        try:
+            stats = [doc_index.get(doc_id) or {} for doc_id in doc_ids]
+            boost_preferred = bool(student_profile.get('preferred_difficulty_level'))
+            success_rate = student_profile.get('success_rate')
+            boost_success = success_rate is not None and success_rate > 0.7
+            
+            if np is not None:
+                feedback_sum = np.array([s.get('feedback_sum', 0.0) for s in stats], dtype=np.float64)
+                feedback_count = np.array([s.get('feedback_count', 0) for s in stats], dtype=np.float64)
+                scores = np.where(
+                    feedback_count > 0,
+                    feedback_sum / np.maximum(feedback_count, 1.0),
+                    0.5
+                )
+                if boost_preferred:
+                    scores = np.minimum(scores * 1.1, 1.0)
+                if boost_success:
+                    scores = np.minimum(scores * 1.05, 1.0)
+                return scores
+            
+            scores = []
+            for s in stats:
+                score = s['feedback_sum'] / s['feedback_count'] if s.get('feedback_count') else 0.5
+                if boost_preferred:
+                    score = min(score * 1.1, 1.0)
+                if boost_success:
+                    score = min(score * 1.05, 1.0)
+                scores.append(score)
+            return scores
+            
+        except Exception as e:
+            logger.warning(f"Error calculating personal score: {e}")
+            return np.full(len(doc_ids), 0.5) if np is not None else [0.5] * len(doc_ids)
+    
+    def _global_scores_bulk(self, doc_ids: List[str], global_scores: Dict):
+        """_calculate_global_score for all documents"""
+        if np is None:
+            return [self._calculate_global_score(doc_id, global_scores) for doc_id in doc_ids]
+        
+        n = len(doc_ids)
+        total = np.zeros(n)
+        positive = np.zeros(n)
+        negative = np.zeros(n)
+        avg_emoji = np.full(n, np.nan)
+        vectorized = np.zeros(n, dtype=bool)
+        scalar = {}
+        
+        for i, doc_id in enumerate(doc_ids):
+            doc_global = global_scores.get(doc_id) if global_scores else None
+            if not doc_global:
+                continue
+            counts = (
+                doc_global.get('total_feedback_count', 0),
+                doc_global.get('positive_feedback_count', 0),
+                doc_global.get('negative_feedback_count', 0)
+            )
+            if all(isinstance(c, (int, float)) for c in counts):
+                total[i], positive[i], negative[i] = counts
+                avg = doc_global.get('avg_emoji_score')
+                if avg is not None:
+                    avg_emoji[i] = float(avg)
+                vectorized[i] = True
+            else:
+                # Eksik/NULL sayaçlar: tekil hesapla aynı davranış
+                scalar[i] = self._calculate_global_score(doc_id, global_scores)
+        
+        rated = positive + negative
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(rated > 0, positive / np.where(rated > 0, rated, 1.0), 0.5)
+        confidence = np.minimum(total / 10.0, 1.0)
+        scores = np.where(
+            rated > 0,
+            0.5 + (ratio - 0.5) * confidence,
+            np.where(np.isnan(avg_emoji), 0.5, avg_emoji)
+        )
+        scores = np.where(vectorized & (total != 0), scores, 0.5)
+        for i, value in scalar.items():
+            scores[i] = value
+        return scores
+    
     def _calculate_personal_score(
         self,
         doc_id: str,
@@ -367,7 +562,8 @@ class CACSScorer:
         
         return score
     
-    def _normalize_feedback(self, feedback_value: Any) -> float:
+    @staticmethod
+    def _normalize_feedback(feedback_value: Any) -> float:
         """
         Farklı geri bildirim formatlarını 0-1 arasına normalize et
         
@@ -406,7 +602,7 @@ class CACSScorer:
             # Try to parse as number
             try:
                 num_val = float(feedback_value)
-                return self._normalize_feedback(num_val)
+                return CACSScorer._normalize_feedback(num_val)
             except:
                 pass
         
@@ -414,6 +610,88 @@ class CACSScorer:
         return 0.5
 
 
+def fetch_global_scores(db, doc_ids: Iterable[str]) -> Dict[str, Dict]:
+    """
+    document_global_scores satırlarını tek IN (...) sorgusuyla getir
+    
+    Henüz tabloya işlenmemiş emoji geri bildirimleri de dahil edilir
+    (database.feedback_aggregates), sonuçlar kesin kalır.
+    
+    Returns:
+        {doc_id: row dict}
+    """
+    from database.feedback_aggregates import load_document_global_scores
+    
+    with db.get_connection() as conn:
+        return load_document_global_scores(conn, doc_ids)
+
+
+def build_doc_interaction_index(
+    conversation_history: List[Dict],
+    doc_ids: Iterable[str]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    doc_id -> geçmiş istatistikleri, tüm konuşma geçmişi üzerinden tek geçişte
+    
+    Eşleşme kuralı _calculate_personal_score ile aynıdır: satırın doc_id alanı
+    eşit ya da doc_id, str(sources) içinde geçiyor. Her satırın sources metni
+    bir kez üretilir ve tek bir metinde birleştirilir; her doküman için bu metin
+    üzerinde str.find ile arama yapılır (doküman × satır döngüsü yok).
+    
+    Returns:
+        {doc_id: {'interactions': int, 'feedback_sum': float, 'feedback_count': int}}
+        (feedback_sum, normalize edilmiş feedback'lerin geçmiş sırasıyla toplamı)
+    """
+    doc_ids = list(dict.fromkeys(doc_ids))
+    rows_by_doc_id: Dict[Any, List[int]] = {}
+    feedback_values: List[Optional[float]] = []
+    parts: List[str] = []
+    starts: List[int] = []
+    offset = 0
+    
+    for i, h in enumerate(conversation_history or []):
+        rows_by_doc_id.setdefault(h.get('doc_id'), []).append(i)
+        feedback = h.get('feedback_score')
+        feedback_values.append(CACSScorer._normalize_feedback(feedback) if feedback is not None else None)
+        text = str(h.get('sources', ''))
+        starts.append(offset)
+        parts.append(text)
+        offset += len(text) + 1
+    
+    # \x00 ayırıcı: doc_id içinde bulunmaz, satır sınırını aşan eşleşme olmaz
+    joined = "\x00".join(parts)
+    
+    index = {}
+    for doc_id in doc_ids:
+        rows = set(rows_by_doc_id.get(doc_id, ()))
+        if doc_id:
+            position = joined.find(doc_id)
+            while position != -1:
+                row = bisect_right(starts, position) - 1
+                rows.add(row)
+                # Aynı satırdaki diğer eşleşmeleri atla
+                next_start = starts[row + 1] if row + 1 < len(starts) else len(joined)
+                position = joined.find(doc_id, next_start)
+        elif doc_id == "" and conversation_history:
+            # "" her metinde geçer (``"" in s`` her zaman True)
+            rows.update(range(len(conversation_history)))
+        
+        feedback_sum = 0.0
+        feedback_count = 0
+        for row in sorted(rows):
+            value = feedback_values[row]
+            if value is not None:
+                feedback_sum += value
+                feedback_count += 1
+        index[doc_id] = {
+            'interactions': len(rows),
+            'feedback_sum': feedback_sum,
+            'feedback_count': feedback_count
+        }
+    
+    return index
+
+
 # Singleton instance
 _cacs_scorer = None
 
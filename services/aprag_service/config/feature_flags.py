@@ -5,11 +5,35 @@ All Eğitsel-KBRAG features are dependent on APRAG being enabled
 
 import os
 import logging
-from typing import Optional
+import sqlite3
+from typing import Any, Dict, Optional
+
+from utils.request_context import memoized_db
 
 logger = logging.getLogger(__name__)
 
 
+def get_session_settings_row(db_manager, session_id: str) -> Optional[Dict[str, Any]]:
+    """
+    ``session_settings`` row of a session, None when there is none
+
+    Read once per request (utils/request_context.py); every session-specific
+    flag below takes its column from this row instead of its own query.
+    """
+    def load():
+        try:
+            result = db_manager.execute_query(
+                "SELECT * FROM session_settings WHERE session_id = ?",
+                (session_id,)
+            )
+        except sqlite3.OperationalError as e:
+            logger.debug(f"session_settings not readable: {e}")
+            return None
+        return result[0] if result else None
+
+    return memoized_db("session_settings", session_id, load)
+
+
 class FeatureFlags:
     """
     Feature Flags Manager
@@ -75,9 +99,13 @@ class FeatureFlags:
                         logger.info("✅ Created feature_flags table in feature_flags.py")
                 
                 # Session-specific feature flag kontrolü
-                result = FeatureFlags._db_manager.execute_query(
-                    "SELECT feature_enabled FROM feature_flags WHERE feature_name = ? AND session_id = ?",
-                    ("aprag", session_id)
+                result = memoized_db(
+                    "feature_flags",
+                    ("aprag", session_id),
+                    lambda: FeatureFlags._db_manager.execute_query(
+                        "SELECT feature_enabled FROM feature_flags WHERE feature_name = ? AND session_id = ?",
+                        ("aprag", session_id)
+                    )
                 )
                 if result:
                     return bool(result[0].get("feature_enabled", True))
@@ -206,31 +234,15 @@ class FeatureFlags:
         # Check session-specific settings from session_settings table first
         if session_id and FeatureFlags._db_manager:
             try:
-                # Check if session_settings table exists and has enable_ebars column
-                with FeatureFlags._db_manager.get_connection() as conn:
-                    # Check if table exists
-                    cursor = conn.execute("""
-                        SELECT name FROM sqlite_master
-                        WHERE type='table' AND name='session_settings'
-                    """)
-                    if cursor.fetchone():
-                        # Check if enable_ebars column exists
-                        cursor = conn.execute("PRAGMA table_info(session_settings)")
-                        columns = [row[1] for row in cursor.fetchall()]
-                        if 'enable_ebars' in columns:
-                            # Get EBARS setting from session_settings
-                            result = FeatureFlags._db_manager.execute_query(
-                                "SELECT enable_ebars FROM session_settings WHERE session_id = ?",
-                                (session_id,)
-                            )
-                            if result:
-                                session_setting = bool(result[0].get("enable_ebars", False))
-                                logger.debug(f"Session {session_id} EBARS setting from session_settings: {session_setting}")
-                                return session_setting
-                        else:
-                            logger.debug(f"enable_ebars column not found in session_settings table")
-                    else:
-                        logger.debug(f"session_settings table not found")
+                row = get_session_settings_row(FeatureFlags._db_manager, session_id)
+                if row is None:
+                    logger.debug(f"No session_settings row for session {session_id}")
+                elif 'enable_ebars' in row:
+                    session_setting = bool(row.get("enable_ebars", False))
+                    logger.debug(f"Session {session_id} EBARS setting from session_settings: {session_setting}")
+                    return session_setting
+                else:
+                    logger.debug(f"enable_ebars column not found in session_settings table")
             except Exception as e:
                 logger.warning(f"Failed to check session EBARS setting from session_settings: {e}")
         
@@ -257,12 +269,9 @@ class FeatureFlags:
         # Check session-specific settings first
         if session_id and FeatureFlags._db_manager:
             try:
-                result = FeatureFlags._db_manager.execute_query(
-                    "SELECT enable_progressive_assessment FROM session_settings WHERE session_id = ?",
-                    (session_id,)
-                )
-                if result:
-                    session_setting = bool(result[0].get("enable_progressive_assessment", False))
+                row = get_session_settings_row(FeatureFlags._db_manager, session_id)
+                if row is not None and "enable_progressive_assessment" in row:
+                    session_setting = bool(row.get("enable_progressive_assessment", False))
                     logger.debug(f"Session {session_id} progressive assessment setting: {session_setting}")
                     return session_setting
             except Exception as e:
@@ -291,12 +300,9 @@ class FeatureFlags:
         # Check session-specific settings first
         if session_id and FeatureFlags._db_manager:
             try:
-                result = FeatureFlags._db_manager.execute_query(
-                    "SELECT enable_personalized_responses FROM session_settings WHERE session_id = ?",
-                    (session_id,)
-                )
-                if result:
-                    session_setting = bool(result[0].get("enable_personalized_responses", False))
+                row = get_session_settings_row(FeatureFlags._db_manager, session_id)
+                if row is not None and "enable_personalized_responses" in row:
+                    session_setting = bool(row.get("enable_personalized_responses", False))
                     logger.debug(f"Session {session_id} personalized responses setting: {session_setting}")
                     return session_setting
             except Exception as e:
@@ -325,12 +331,9 @@ class FeatureFlags:
         # Check session-specific settings first
         if session_id and FeatureFlags._db_manager:
             try:
-                result = FeatureFlags._db_manager.execute_query(
-                    "SELECT enable_multi_dimensional_feedback FROM session_settings WHERE session_id = ?",
-                    (session_id,)
-                )
-                if result:
-                    session_setting = bool(result[0].get("enable_multi_dimensional_feedback", False))
+                row = get_session_settings_row(FeatureFlags._db_manager, session_id)
+                if row is not None and "enable_multi_dimensional_feedback" in row:
+                    session_setting = bool(row.get("enable_multi_dimensional_feedback", False))
                     logger.debug(f"Session {session_id} multi-dimensional feedback setting: {session_setting}")
                     return session_setting
             except Exception as e:
@@ -364,12 +367,9 @@ class FeatureFlags:
         # Check session-specific settings first
         if session_id and FeatureFlags._db_manager:
             try:
-                result = FeatureFlags._db_manager.execute_query(
-                    "SELECT enable_module_extraction FROM session_settings WHERE session_id = ?",
-                    (session_id,)
-                )
-                if result:
-                    session_setting = bool(result[0].get("enable_module_extraction", True))
+                row = get_session_settings_row(FeatureFlags._db_manager, session_id)
+                if row is not None and "enable_module_extraction" in row:
+                    session_setting = bool(row.get("enable_module_extraction", True))
                     logger.debug(f"Session {session_id} module extraction setting: {session_setting}")
                     return session_setting
             except Exception as e:
@@ -398,12 +398,9 @@ class FeatureFlags:
         # Check session-specific settings first
         if session_id and FeatureFlags._db_manager:
             try:
-                result = FeatureFlags._db_manager.execute_query(
-                    "SELECT enable_module_quality_validation FROM session_settings WHERE session_id = ?",
-                    (session_id,)
-                )
-                if result:
-                    session_setting = bool(result[0].get("enable_module_quality_validation", True))
+                row = get_session_settings_row(FeatureFlags._db_manager, session_id)
+                if row is not None and "enable_module_quality_validation" in row:
+                    session_setting = bool(row.get("enable_module_quality_validation", True))
                     logger.debug(f"Session {session_id} module quality validation setting: {session_setting}")
                     return session_setting
             except Exception as e:
@@ -432,12 +429,9 @@ class FeatureFlags:
         # Check session-specific settings first
         if session_id and FeatureFlags._db_manager:
             try:
-                result = FeatureFlags._db_manager.execute_query(
-                    "SELECT enable_module_curriculum_alignment FROM session_settings WHERE session_id = ?",
-                    (session_id,)
-                )
-                if result:
-                    session_setting = bool(result[0].get("enable_module_curriculum_alignment", True))
+                row = get_session_settings_row(FeatureFlags._db_manager, session_id)
+                if row is not None and "enable_module_curriculum_alignment" in row:
+                    session_setting = bool(row.get("enable_module_curriculum_alignment", True))
                     logger.debug(f"Session {session_id} module curriculum alignment setting: {session_setting}")
                     return session_setting
             except Exception as e:
@@ -13,6 +13,19 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def _migration_statements(migration_sql: str) -> List[str]:
+    """
+    Statements of a migration file, comment lines removed
+
+    Statements often start with a ``--`` comment line; dropping every piece
+    that started with ``--`` skipped e.g. the CREATE TABLE of migration 016.
+    Trailing status SELECTs are left out.
+    """
+    lines = [line for line in migration_sql.splitlines() if not line.strip().startswith('--')]
+    statements = [s.strip() for s in "\n".join(lines).split(';')]
+    return [s for s in statements if s and not s.upper().startswith('SELECT')]
+
+
 class DatabaseManager:
     """
     Database manager for APRAG Service
@@ -62,75 +75,21 @@ class DatabaseManager:
             conn.close()
     
     def init_database(self, force: bool = False):
-        """Initialize database and apply APRAG migrations"""
-        # Use a simple flag file to track if migrations were already applied in this process
-        import os
-        import threading
-        
-        # Thread-safe migration flag
-        if not hasattr(self, '_migrations_applied'):
-            self._migrations_applied = threading.Event()
+        """
+        Initialize database and apply APRAG migrations
         
-        # If migrations were already applied and not forcing, skip
-        if not force and self._migrations_applied.is_set():
-            return
+        Versioned: runs each pending migration once per database (see
+        database/schema_migrations.py). On a current schema this is a single
+        schema_version lookup per process.
+        """
+        from database import schema_migrations
         
         try:
-            with self.get_connection() as conn:
-                # Check if APRAG tables exist
-                cursor = conn.execute("""
-                    SELECT name FROM sqlite_master
-                    WHERE type='table' AND name='student_interactions'
-                """)
-                
-                if not cursor.fetchone():
-                    logger.info("APRAG tables not found. Applying migrations...")
-                    self.apply_aprag_migrations(conn)
-                    self.apply_topic_migrations(conn)
-                    self.apply_knowledge_base_tables_migration(conn)
-                    self.apply_session_settings_migration(conn)
-                    self.apply_session_settings_fk_removal_migration(conn)
-                    self.apply_document_global_scores_migration(conn)
-                    self.ensure_feature_flags_table(conn)
-                    conn.commit()  # Ensure commit after migration
-                    logger.info("APRAG migrations applied successfully")
-                else:
-                    logger.info("APRAG tables already exist")
-                    # Always try to apply migrations to ensure schema is up to date
-                    # (migration file uses IF NOT EXISTS, so it's safe)
-                    self.apply_aprag_migrations(conn)
-                    self.apply_topic_migrations(conn)
-                    self.apply_foreign_key_fix_migration(conn)
-                    self.apply_topic_progress_fk_removal_migration(conn)
-                    self.apply_qa_embeddings_migration(conn)
-                    self.apply_satisfaction_fix_migration(conn)
-                    self.apply_detailed_feedback_migration(conn)
-                    self.apply_session_settings_migration(conn)
-                    self.apply_session_settings_fk_removal_migration(conn)
-                    self.apply_document_global_scores_migration(conn)
-                    self.apply_avg_emoji_score_migration(conn)
-                    self.apply_analytics_views(conn)
-                    self.apply_knowledge_base_tables_migration(conn)
-                    self.apply_ebars_migration(conn)
-                    self.apply_initial_test_tracking_migration(conn)
-                    self.apply_initial_test_two_stage_migration(conn)
-                    self.apply_completion_percentage_migration(conn)
-                    self.apply_question_pool_migration(conn)
-                    self.ensure_feature_flags_table(conn)
-                    conn.commit()
-                    
-                    # Mark migrations as applied
-                    self._migrations_applied.set()
-                    
+            schema_migrations.migrate(self, force=force)
         except Exception as e:
             # Don't fail completely on migration errors - log and continue
-            # Migration errors are often non-critical (e.g., already applied, syntax issues)
+            # (the next start resumes from the last recorded version)
             logger.warning(f"Migration warning (non-critical, continuing): {e}")
-            # Still mark as applied to avoid repeated attempts in this process
-            if not hasattr(self, '_migrations_applied'):
-                import threading
-                self._migrations_applied = threading.Event()
-            self._migrations_applied.set()
     
     def apply_aprag_migrations(self, conn: sqlite3.Connection):
         """Apply APRAG database migrations"""
@@ -2166,6 +2125,101 @@ class DatabaseManager:
             logger.warning(f"Failed to apply Question Pool migration (non-critical): {e}")
             # Don't raise - let the system continue
     
+    def apply_topic_rollups_migration(self, conn: sqlite3.Connection):
+        """Create topic analytics rollup tables and backfill them once from existing data"""
+        try:
+            from database.topic_rollups import ensure_rollup_tables, rebuild_topic_rollups
+            
+            ensure_rollup_tables(conn)
+            
+            has_rollups = conn.execute("SELECT 1 FROM topic_session_rollup LIMIT 1").fetchone()
+            mapping_table = conn.execute("""
+                SELECT name FROM sqlite_master
+                WHERE type='table' AND name='question_topic_mapping'
+            """).fetchone()
+            if not has_rollups and mapping_table:
+                has_mappings = conn.execute("SELECT 1 FROM question_topic_mapping LIMIT 1").fetchone()
+                if has_mappings:
+                    logger.info("Backfilling topic analytics rollups...")
+                    conn.commit()
+                    rebuild_topic_rollups(conn)
+                    
+        except Exception as e:
+            logger.warning(f"Failed to apply topic rollups migration (non-critical): {e}")
+    
+    def apply_user_analytics_indexes_migration(self, conn: sqlite3.Connection):
+        """Covering indexes for per-user analytics (GET /analytics/{user_id})"""
+        try:
+            # Interactions: user/session filter + time range, grouped by date/hour/weekday
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_interactions_user_session_time
+                ON student_interactions(user_id, session_id, timestamp)
+            """)
+            # Feedback: everything the feedback window reads lives in the index
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_feedback_user_session_time
+                ON student_feedback(user_id, session_id, timestamp,
+                                    understanding_level, satisfaction_level, interaction_id)
+            """)
+            conn.commit()
+        except Exception as e:
+            logger.warning(f"Failed to apply user analytics indexes migration (non-critical): {e}")
+    
+    def apply_recommendation_refresh_migration(self, conn: sqlite3.Connection):
+        """Freshness state for background-generated recommendations"""
+        try:
+            from services.recommendation_refresh import ensure_refresh_state_table
+            
+            ensure_refresh_state_table(conn)
+            conn.commit()
+        except Exception as e:
+            logger.warning(f"Failed to apply recommendation refresh migration (non-critical): {e}")
+    
+    def apply_recommendation_refresh_backoff_migration(self, conn: sqlite3.Connection):
+        """Failure counters of recommendation_refresh_state (backoff after failed generations)"""
+        try:
+            from services.recommendation_refresh import ensure_refresh_state_table
+            
+            ensure_refresh_state_table(conn)
+            conn.commit()
+        except Exception as e:
+            logger.warning(f"Failed to apply recommendation refresh backoff migration (non-critical): {e}")
+    
+    def apply_feedback_events_migration(self, conn: sqlite3.Connection):
+        """Append-only event table for write-behind feedback aggregation"""
+        try:
+            from database.feedback_aggregates import ensure_event_table
+            
+            ensure_event_table(conn)
+            conn.commit()
+        except Exception as e:
+            logger.warning(f"Failed to apply feedback events migration (non-critical): {e}")
+    
+    def apply_progressive_assessment_migration(self, conn: sqlite3.Connection):
+        """Progressive assessment tables, stored trigger decisions and insight counters"""
+        try:
+            from database.progressive_assessment_state import ensure_progressive_tables, rebuild_counters
+            
+            ensure_progressive_tables(conn)
+            has_counters = conn.execute("SELECT 1 FROM progressive_assessment_counters LIMIT 1").fetchone()
+            has_assessments = conn.execute("SELECT 1 FROM progressive_assessments LIMIT 1").fetchone()
+            if has_assessments and not has_counters:
+                logger.info("Backfilling progressive assessment counters...")
+                rebuild_counters(conn)
+            conn.commit()
+        except Exception as e:
+            logger.warning(f"Failed to apply progressive assessment migration (non-critical): {e}")
+    
+    def apply_qa_fast_path_migration(self, conn: sqlite3.Connection):
+        """QA fast-path counters and the QA cache/interaction tables it writes"""
+        try:
+            from database.qa_fast_path_stats import ensure_qa_fast_path_tables
+            
+            ensure_qa_fast_path_tables(conn)
+            conn.commit()
+        except Exception as e:
+            logger.warning(f"Failed to apply QA fast path migration (non-critical): {e}")
+    
     def _apply_question_pool_migration_directly(self, conn: sqlite3.Connection):
         """Apply Question Pool migration directly (fallback if file not found)"""
         try:
@@ -2484,7 +2538,11 @@ class DatabaseManager:
             cursor = conn.execute("PRAGMA table_info(student_comprehension_scores)")
             columns = [row[1] for row in cursor.fetchall()]
             
-            if 'has_completed_initial_test' in columns:
+            cursor = conn.execute("""
+                SELECT name FROM sqlite_master
+                WHERE type='table' AND name='initial_cognitive_tests'
+            """)
+            if 'has_completed_initial_test' in columns and cursor.fetchone():
                 logger.info("Initial test tracking columns already exist")
                 return
             
@@ -2512,22 +2570,14 @@ class DatabaseManager:
                 
                 # Execute migration with error handling for ALTER TABLE
                 try:
-                    # Split migration into parts
-                    parts = migration_sql.split('-- ===========================================')
-                    
-                    for part in parts:
-                        if part.strip() and not part.strip().startswith('SELECT'):
-                            # Skip comments and SELECT statements
-                            statements = [s.strip() for s in part.split(';') if s.strip() and not s.strip().startswith('--')]
-                            for statement in statements:
-                                if statement:
-                                    try:
-                                        conn.execute(statement)
-                                    except sqlite3.OperationalError as e:
-                                        if "duplicate column name" in str(e).lower() or "already exists" in str(e).lower():
-                                            logger.info(f"Column/table already exists, skipping: {statement[:50]}...")
-                                        else:
-                                            raise
+                    for statement in _migration_statements(migration_sql):
+                        try:
+                            conn.execute(statement)
+                        except sqlite3.OperationalError as e:
+                            if "duplicate column name" in str(e).lower() or "already exists" in str(e).lower():
+                                logger.info(f"Column/table already exists, skipping: {statement[:50]}...")
+                            else:
+                                raise
                     
                     conn.commit()
                     logger.info("✅ Initial Test Tracking migration (016) applied successfully")
@@ -2535,6 +2585,8 @@ class DatabaseManager:
                     logger.warning(f"Error applying migration 016: {e}")
                     # Try to apply columns manually
                     try:
+                        # Some ALTERs may have run before the error
+                        columns = [row[1] for row in conn.execute("PRAGMA table_info(student_comprehension_scores)")]
                         if 'has_completed_initial_test' not in columns:
                             conn.execute("ALTER TABLE student_comprehension_scores ADD COLUMN has_completed_initial_test BOOLEAN DEFAULT 0")
                         if 'initial_test_score' not in columns:
@@ -2610,6 +2662,17 @@ class DatabaseManager:
         except Exception as e:
             logger.warning(f"Failed to apply Initial Test Tracking migration (non-critical): {e}")
     
+    def apply_initial_test_repair_migration(self, conn: sqlite3.Connection):
+        """
+        Re-run the initial test migrations (016, 017)
+
+        016 used to drop its CREATE TABLE initial_cognitive_tests (see
+        _migration_statements) while the version was still recorded; both
+        methods are idempotent and complete such databases.
+        """
+        self.apply_initial_test_tracking_migration(conn)
+        self.apply_initial_test_two_stage_migration(conn)
+
     def apply_initial_test_two_stage_migration(self, conn: sqlite3.Connection):
         """Apply Initial Test Two-Stage migration (017_update_initial_test_for_two_stage.sql)"""
         try:
@@ -2655,22 +2718,14 @@ class DatabaseManager:
                 
                 # Execute migration with error handling
                 try:
-                    # Split migration into parts
-                    parts = migration_sql.split('-- ===========================================')
-                    
-                    for part in parts:
-                        if part.strip() and not part.strip().startswith('SELECT'):
-                            # Skip comments and SELECT statements
-                            statements = [s.strip() for s in part.split(';') if s.strip() and not s.strip().startswith('--')]
-                            for statement in statements:
-                                if statement:
-                                    try:
-                                        conn.execute(statement)
-                                    except sqlite3.OperationalError as e:
-                                        if "duplicate column name" in str(e).lower() or "already exists" in str(e).lower():
-                                            logger.info(f"Column already exists, skipping: {statement[:50]}...")
-                                        else:
-                                            raise
+                    for statement in _migration_statements(migration_sql):
+                        try:
+                            conn.execute(statement)
+                        except sqlite3.OperationalError as e:
+                            if "duplicate column name" in str(e).lower() or "already exists" in str(e).lower():
+                                logger.info(f"Column already exists, skipping: {statement[:50]}...")
+                            else:
+                                raise
                     
                     conn.commit()
                     logger.info("✅ Initial Test Two-Stage migration (017) applied successfully")
@@ -2678,6 +2733,7 @@ class DatabaseManager:
                     logger.warning(f"Error applying migration 017: {e}")
                     # Try to apply columns manually
                     try:
+                        columns = [row[1] for row in conn.execute("PRAGMA table_info(initial_cognitive_tests)")]
                         if 'test_attempt' not in columns:
                             conn.execute("ALTER TABLE initial_cognitive_tests ADD COLUMN test_attempt INTEGER DEFAULT 1")
                         if 'answer_preferences' not in columns:
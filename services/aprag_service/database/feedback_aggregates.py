@@ -0,0 +1,401 @@
+"""
+Write-behind aggregation for emoji feedback
+
+Emoji feedback used to run a read-modify-write on ``document_global_scores``
+(one row per source document) and ``emoji_feedback_summary`` inside the
+request, so the most used documents became write-lock hotspots when a whole
+class reacted at once. Requests now only append rows to
+``feedback_aggregate_events``; FeedbackAggregator folds them into the
+aggregate tables in batched transactions with atomic upserts.
+
+Reads stay exact: load_document_global_scores() and load_emoji_summary()
+merge the not yet folded events into the stored rows using the same
+formula as the fold. A fold and the deletion of its events are one
+transaction, so a reader sees every event exactly once.
+
+Usage:
+    python -m database.feedback_aggregates flush [--db-path PATH]
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# How often pending events are folded (seconds)
+AGGREGATION_INTERVAL_SECONDS = float(os.getenv("FEEDBACK_AGGREGATION_INTERVAL_SECONDS", "2.0"))
+# Maximum events folded per transaction
+AGGREGATION_BATCH_SIZE = int(os.getenv("FEEDBACK_AGGREGATION_BATCH_SIZE", "1000"))
+
+# Same thresholds as the former synchronous update
+POSITIVE_THRESHOLD = 0.7
+NEGATIVE_THRESHOLD = 0.2
+
+EVENT_GLOBAL_SCORE = "global_score"
+EVENT_EMOJI_SUMMARY = "emoji_summary"
+
+
+def ensure_event_table(conn: sqlite3.Connection):
+    """Create the event table (and the emoji summary table it folds into)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS feedback_aggregate_events (
+            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_type TEXT NOT NULL,      -- global_score | emoji_summary
+            doc_id TEXT,                   -- global_score
+            user_id TEXT,                  -- emoji_summary
+            session_id TEXT,               -- emoji_summary
+            emoji TEXT,
+            score REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_feedback_events_doc
+        ON feedback_aggregate_events(doc_id) WHERE doc_id IS NOT NULL
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_feedback_events_user_session
+        ON feedback_aggregate_events(user_id, session_id) WHERE user_id IS NOT NULL
+    """)
+    # Same definition as migration 006 (fold target must exist)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS emoji_feedback_summary (
+            summary_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            session_id TEXT NOT NULL,
+            emoji TEXT NOT NULL,
+            emoji_count INTEGER DEFAULT 1,
+            avg_score REAL DEFAULT 0.5,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, session_id, emoji)
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_emoji_summary_user_session
+        ON emoji_feedback_summary(user_id, session_id)
+    """)
+
+
+def append_emoji_feedback(
+    conn: sqlite3.Connection,
+    user_id: str,
+    session_id: str,
+    emoji: str,
+    score: float,
+    doc_ids: Iterable[str] = ()
+) -> int:
+    """
+    Append the aggregate events of one emoji feedback (caller commits)
+
+    Returns:
+        Number of events appended
+    """
+    rows = [
+        (EVENT_GLOBAL_SCORE, doc_id, None, None, emoji, score)
+        for doc_id in dict.fromkeys(doc_ids) if doc_id
+    ]
+    rows.append((EVENT_EMOJI_SUMMARY, None, user_id, session_id, emoji, score))
+    conn.executemany("""
+        INSERT INTO feedback_aggregate_events (event_type, doc_id, user_id, session_id, emoji, score)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows)
+    return len(rows)
+
+
+# ============================================================================
+# FOLD
+# ============================================================================
+
+def _fold_global_scores(conn: sqlite3.Connection, high_event_id: int):
+    conn.execute(f"""
+        INSERT INTO document_global_scores
+        (doc_id, total_feedback_count, positive_feedback_count,
+         negative_feedback_count, avg_emoji_score, updated_at)
+        SELECT doc_id,
+               COUNT(*),
+               SUM(score >= {POSITIVE_THRESHOLD}),
+               SUM(score <= {NEGATIVE_THRESHOLD}),
+               AVG(score),
+               CURRENT_TIMESTAMP
+        FROM feedback_aggregate_events
+        WHERE event_type = '{EVENT_GLOBAL_SCORE}' AND event_id <= ?
+        GROUP BY doc_id
+        ON CONFLICT(doc_id) DO UPDATE SET
+            avg_emoji_score = (COALESCE(avg_emoji_score, 0.5) * COALESCE(total_feedback_count, 0)
+                               + excluded.avg_emoji_score * excluded.total_feedback_count)
+                              / (COALESCE(total_feedback_count, 0) + excluded.total_feedback_count),
+            total_feedback_count = COALESCE(total_feedback_count, 0) + excluded.total_feedback_count,
+            positive_feedback_count = COALESCE(positive_feedback_count, 0) + excluded.positive_feedback_count,
+            negative_feedback_count = COALESCE(negative_feedback_count, 0) + excluded.negative_feedback_count,
+            updated_at = CURRENT_TIMESTAMP
+    """, (high_event_id,))
+
+
+def _fold_emoji_summary(conn: sqlite3.Connection, high_event_id: int):
+    conn.execute(f"""
+        INSERT INTO emoji_feedback_summary
+        (user_id, session_id, emoji, emoji_count, avg_score, last_updated)
+        SELECT user_id, session_id, emoji, COUNT(*), AVG(score), CURRENT_TIMESTAMP
+        FROM feedback_aggregate_events
+        WHERE event_type = '{EVENT_EMOJI_SUMMARY}' AND event_id <= ?
+        GROUP BY user_id, session_id, emoji
+        ON CONFLICT(user_id, session_id, emoji) DO UPDATE SET
+            avg_score = (COALESCE(avg_score, 0.5) * COALESCE(emoji_count, 0)
+                         + excluded.avg_score * excluded.emoji_count)
+                        / (COALESCE(emoji_count, 0) + excluded.emoji_count),
+            emoji_count = COALESCE(emoji_count, 0) + excluded.emoji_count,
+            last_updated = CURRENT_TIMESTAMP
+    """, (high_event_id,))
+
+
+_FOLDS = (
+    (EVENT_GLOBAL_SCORE, _fold_global_scores),
+    (EVENT_EMOJI_SUMMARY, _fold_emoji_summary),
+)
+
+
+def flush_feedback_events(conn: sqlite3.Connection, batch_size: int = AGGREGATION_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Fold up to ``batch_size`` pending events into the aggregate tables
+
+    Each event type is folded in its own savepoint. If a fold fails (e.g. an
+    old schema without avg_emoji_score) its events are kept, so reads stay
+    exact and the next flush retries; the other type is still folded.
+
+    Returns:
+        {event_type: events folded}
+    """
+    folded = {event_type: 0 for event_type, _ in _FOLDS}
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        high = conn.execute("""
+            SELECT MAX(event_id) FROM (
+                SELECT event_id FROM feedback_aggregate_events
+                ORDER BY event_id LIMIT ?
+            )
+        """, (batch_size,)).fetchone()[0]
+
+        if high is not None:
+            for event_type, fold in _FOLDS:
+                conn.execute("SAVEPOINT feedback_fold")
+                try:
+                    fold(conn, high)
+                    cursor = conn.execute(
+                        "DELETE FROM feedback_aggregate_events WHERE event_type = ? AND event_id <= ?",
+                        (event_type, high)
+                    )
+                    conn.execute("RELEASE SAVEPOINT feedback_fold")
+                    folded[event_type] = cursor.rowcount
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO SAVEPOINT feedback_fold")
+                    conn.execute("RELEASE SAVEPOINT feedback_fold")
+                    logger.warning(f"Failed to fold {event_type} feedback events (kept for retry): {e}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return folded
+
+
+# ============================================================================
+# READS (stored rows + unflushed delta)
+# ============================================================================
+
+def _merge_average(stored_avg, stored_count, pending_avg, pending_count):
+    """Same arithmetic as the fold upserts"""
+    stored_count = stored_count or 0
+    stored_avg = 0.5 if stored_avg is None else stored_avg
+    return (stored_avg * stored_count + pending_avg * pending_count) / (stored_count + pending_count)
+
+
+def load_document_global_scores(
+    conn: sqlite3.Connection,
+    doc_ids: Iterable[str],
+    chunk_size: int = 500
+) -> Dict[str, Dict[str, Any]]:
+    """
+    document_global_scores rows for ``doc_ids`` including unflushed events
+
+    Returns:
+        {doc_id: row dict}; documents with only pending events get a
+        synthesized row with the fold columns
+    """
+    doc_ids = list(dict.fromkeys(doc_ids))
+    result: Dict[str, Dict[str, Any]] = {}
+    # One read transaction: stored rows and pending events from the same snapshot
+    conn.execute("BEGIN")
+    try:
+        for start in range(0, len(doc_ids), chunk_size):
+            chunk = doc_ids[start:start + chunk_size]
+            placeholders = ",".join("?" for _ in chunk)
+            for row in conn.execute(
+                f"SELECT * FROM document_global_scores WHERE doc_id IN ({placeholders})",
+                tuple(chunk)
+            ):
+                result.setdefault(row["doc_id"], dict(row))
+
+            pending = conn.execute(f"""
+                SELECT doc_id, COUNT(*) AS n,
+                       SUM(score >= {POSITIVE_THRESHOLD}) AS positive,
+                       SUM(score <= {NEGATIVE_THRESHOLD}) AS negative,
+                       AVG(score) AS avg_score
+                FROM feedback_aggregate_events
+                WHERE event_type = '{EVENT_GLOBAL_SCORE}' AND doc_id IN ({placeholders})
+                GROUP BY doc_id
+            """, tuple(chunk)).fetchall()
+
+            for delta in pending:
+                row = result.get(delta["doc_id"])
+                if row is None:
+                    result[delta["doc_id"]] = {
+                        "doc_id": delta["doc_id"],
+                        "total_feedback_count": delta["n"],
+                        "positive_feedback_count": delta["positive"],
+                        "negative_feedback_count": delta["negative"],
+                        "avg_emoji_score": delta["avg_score"],
+                    }
+                    continue
+                row["avg_emoji_score"] = _merge_average(
+                    row.get("avg_emoji_score"), row.get("total_feedback_count"), delta["avg_score"], delta["n"]
+                )
+                row["total_feedback_count"] = (row.get("total_feedback_count") or 0) + delta["n"]
+                row["positive_feedback_count"] = (row.get("positive_feedback_count") or 0) + delta["positive"]
+                row["negative_feedback_count"] = (row.get("negative_feedback_count") or 0) + delta["negative"]
+    finally:
+        conn.commit()
+    return result
+
+
+def load_emoji_summary(conn: sqlite3.Connection, user_id: str, session_id: str) -> List[Dict[str, Any]]:
+    """emoji_feedback_summary rows (emoji, emoji_count, avg_score) including unflushed events"""
+    conn.execute("BEGIN")
+    try:
+        rows = {
+            row["emoji"]: dict(row)
+            for row in conn.execute("""
+                SELECT emoji, emoji_count, avg_score
+                FROM emoji_feedback_summary
+                WHERE user_id = ? AND session_id = ?
+            """, (user_id, session_id))
+        }
+        pending = conn.execute(f"""
+            SELECT emoji, COUNT(*) AS n, AVG(score) AS avg_score
+            FROM feedback_aggregate_events
+            WHERE event_type = '{EVENT_EMOJI_SUMMARY}' AND user_id = ? AND session_id = ?
+            GROUP BY emoji
+        """, (user_id, session_id)).fetchall()
+    finally:
+        conn.commit()
+
+    for delta in pending:
+        row = rows.get(delta["emoji"])
+        if row is None:
+            rows[delta["emoji"]] = {"emoji": delta["emoji"], "emoji_count": delta["n"], "avg_score": delta["avg_score"]}
+            continue
+        row["avg_score"] = _merge_average(row["avg_score"], row["emoji_count"], delta["avg_score"], delta["n"])
+        row["emoji_count"] = (row["emoji_count"] or 0) + delta["n"]
+    return list(rows.values())
+
+
+# ============================================================================
+# BACKGROUND AGGREGATOR
+# ============================================================================
+
+class FeedbackAggregator:
+    """Daemon thread that folds pending feedback events every ``interval`` seconds"""
+
+    def __init__(self, db, interval: float = AGGREGATION_INTERVAL_SECONDS, batch_size: int = AGGREGATION_BATCH_SIZE):
+        self.db = db
+        self.interval = interval
+        self.batch_size = batch_size
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name="feedback-aggregator", daemon=True)
+                self._thread.start()
+
+    def flush(self) -> Dict[str, int]:
+        """Fold all pending events now (batch by batch)"""
+        totals = {event_type: 0 for event_type, _ in _FOLDS}
+        while True:
+            with self.db.get_connection() as conn:
+                folded = flush_feedback_events(conn, self.batch_size)
+            for event_type, count in folded.items():
+                totals[event_type] += count
+            # Last batch smaller than batch_size (failed folds count as 0 -> stop)
+            if sum(folded.values()) < self.batch_size:
+                return totals
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the thread after a final flush"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning(f"Final feedback aggregation flush failed (events kept): {e}")
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                return
+            try:
+                totals = self.flush()
+                if any(totals.values()):
+                    logger.debug(f"Folded feedback events: {totals}")
+            except Exception as e:
+                logger.warning(f"Feedback aggregation failed (will retry): {e}")
+
+
+_aggregators: Dict[str, FeedbackAggregator] = {}
+_aggregators_lock = threading.Lock()
+
+
+def get_feedback_aggregator(db) -> FeedbackAggregator:
+    """Started aggregator for this database (one per database file)"""
+    with _aggregators_lock:
+        aggregator = _aggregators.get(db.db_path)
+        if aggregator is None:
+            aggregator = _aggregators[db.db_path] = FeedbackAggregator(db)
+    aggregator.start()
+    return aggregator
+
+
+def stop_feedback_aggregators():
+    """Stop all aggregators with a final flush (service shutdown)"""
+    with _aggregators_lock:
+        aggregators = list(_aggregators.values())
+        _aggregators.clear()
+    for aggregator in aggregators:
+        aggregator.stop()
+
+
+def main():
+    import argparse
+    from database.database import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="Feedback aggregate maintenance")
+    parser.add_argument("command", choices=["flush"])
+    parser.add_argument("--db-path", default=os.getenv("APRAG_DB_PATH", "data/rag_assistant.db"))
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.db_path)
+    totals = FeedbackAggregator(db).flush()
+    print(f"✅ Folded feedback events: {totals}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Progressive assessment trigger decisions and insight counters
+
+The frontend polls ``GET /progressive-assessment/check-trigger/{id}`` after
+every answer. The check used to re-read the interaction plus its
+``progressive_assessments`` rows and evaluate the trigger rules in Python on
+each poll; ``/insights/{user_id}`` loaded every assessment of the user with
+``SELECT *`` to count stages and average confidence levels.
+
+Now:
+
+- the trigger is decided once, when emoji feedback is recorded
+  (``record_trigger_decision``), and stored on the interaction row as the
+  time the follow-up becomes due; the check is one primary-key lookup
+  (``get_trigger_state``) with the due time compared in SQL
+- stage counts and confidence sums are kept per (user, session, day) in
+  ``progressive_assessment_counters`` by an AFTER INSERT trigger, so insights
+  sum at most ``days`` rows per session instead of scanning assessments
+
+Interactions without a stored decision (no emoji yet, or recorded before
+this module) fall back to the 30 second delay rule in the same query.
+"""
+
+import logging
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Follow-up is offered this long after an answer, immediately for low feedback
+FOLLOW_UP_DELAY_SECONDS = 30
+LOW_FEEDBACK_EMOJIS = ('😐', '❌')
+LOW_FEEDBACK_SCORE = 0.5
+
+TRIGGER_LOW_FEEDBACK = "low_feedback"
+TRIGGER_DELAY = "follow_up_delay"
+
+# Columns the progressive assessment endpoints read/write on existing tables
+# (emoji columns are otherwise only added lazily by POST /emoji-feedback)
+INTERACTION_COLUMNS = (
+    ("emoji_feedback", "TEXT DEFAULT NULL"),
+    ("emoji_feedback_timestamp", "TIMESTAMP DEFAULT NULL"),
+    ("emoji_comment", "TEXT DEFAULT NULL"),
+    ("feedback_score", "REAL DEFAULT NULL"),
+    ("progressive_assessment_data", "TEXT DEFAULT NULL"),
+    ("progressive_assessment_stage", "TEXT DEFAULT NULL"),
+    ("progressive_follow_up_due_at", "TIMESTAMP DEFAULT NULL"),
+    ("progressive_trigger_reason", "TEXT DEFAULT NULL"),
+)
+PROFILE_COLUMNS = (
+    ("average_confidence", "REAL DEFAULT 2.5"),
+    ("application_readiness", "REAL DEFAULT 0.5"),
+    ("progressive_assessment_count", "INTEGER DEFAULT 0"),
+    ("has_active_questions", "BOOLEAN DEFAULT FALSE"),
+)
+
+
+def _add_missing_columns(conn: sqlite3.Connection, table: str, columns):
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if not existing:
+        return
+    for name, definition in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+
+def ensure_progressive_tables(conn: sqlite3.Connection):
+    """
+    Progressive assessment schema (migration 007 tables) plus the counters
+
+    007 was only applied by the one-off ``apply_progressive_assessment_migration.py``
+    script; the tables are created here with the same definitions.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS progressive_assessments (
+            assessment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            interaction_id INTEGER NOT NULL,
+            user_id TEXT NOT NULL,
+            session_id TEXT NOT NULL,
+            stage TEXT NOT NULL CHECK(stage IN ('initial', 'follow_up', 'deep_analysis')),
+            confidence_level INTEGER CHECK(confidence_level >= 1 AND confidence_level <= 5),
+            has_questions BOOLEAN,
+            application_understanding TEXT,
+            confusion_areas TEXT,
+            requested_topics TEXT,
+            alternative_explanation_request TEXT,
+            comment TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (interaction_id) REFERENCES student_interactions(interaction_id)
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_progressive_assessments_interaction
+        ON progressive_assessments(interaction_id)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_progressive_assessments_user_session
+        ON progressive_assessments(user_id, session_id)
+    """)
+    for table, column in (("concept_confusion_log", "confusion_area"),
+                          ("requested_topics_log", "requested_topic")):
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                {column} TEXT NOT NULL,
+                frequency INTEGER DEFAULT 1,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_concept_confusion_user_session
+        ON concept_confusion_log(user_id, session_id)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_requested_topics_user_session
+        ON requested_topics_log(user_id, session_id)
+    """)
+
+    _add_missing_columns(conn, "student_interactions", INTERACTION_COLUMNS)
+    _add_missing_columns(conn, "student_profiles", PROFILE_COLUMNS)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS progressive_assessment_counters (
+            user_id TEXT NOT NULL,
+            session_id TEXT NOT NULL,
+            day DATE NOT NULL,
+            total_count INTEGER NOT NULL DEFAULT 0,
+            follow_up_count INTEGER NOT NULL DEFAULT 0,
+            deep_analysis_count INTEGER NOT NULL DEFAULT 0,
+            confidence_sum INTEGER NOT NULL DEFAULT 0,
+            confidence_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, session_id, day)
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS progressive_assessment_counters_after_insert
+        AFTER INSERT ON progressive_assessments
+        BEGIN
+            INSERT INTO progressive_assessment_counters
+                (user_id, session_id, day, total_count, follow_up_count, deep_analysis_count,
+                 confidence_sum, confidence_count)
+            VALUES (
+                NEW.user_id, NEW.session_id, date(COALESCE(NEW.timestamp, CURRENT_TIMESTAMP)), 1,
+                NEW.stage = 'follow_up', NEW.stage = 'deep_analysis',
+                COALESCE(NEW.confidence_level, 0), NEW.confidence_level IS NOT NULL
+            )
+            ON CONFLICT(user_id, session_id, day) DO UPDATE SET
+                total_count = total_count + 1,
+                follow_up_count = follow_up_count + excluded.follow_up_count,
+                deep_analysis_count = deep_analysis_count + excluded.deep_analysis_count,
+                confidence_sum = confidence_sum + excluded.confidence_sum,
+                confidence_count = confidence_count + excluded.confidence_count;
+        END
+    """)
+
+
+def rebuild_counters(conn: sqlite3.Connection) -> int:
+    """Recompute the counters from progressive_assessments; returns the bucket count"""
+    conn.execute("DELETE FROM progressive_assessment_counters")
+    conn.execute("""
+        INSERT INTO progressive_assessment_counters
+            (user_id, session_id, day, total_count, follow_up_count, deep_analysis_count,
+             confidence_sum, confidence_count)
+        SELECT user_id, session_id, date(COALESCE(timestamp, created_at)), COUNT(*),
+               SUM(stage = 'follow_up'), SUM(stage = 'deep_analysis'),
+               COALESCE(SUM(confidence_level), 0), COUNT(confidence_level)
+        FROM progressive_assessments
+        GROUP BY user_id, session_id, date(COALESCE(timestamp, created_at))
+    """)
+    # Assessments written without marking the interaction (check-trigger reads the stage)
+    conn.execute("""
+        UPDATE student_interactions
+        SET progressive_assessment_stage = (
+            SELECT stage FROM progressive_assessments pa
+            WHERE pa.interaction_id = student_interactions.interaction_id
+            ORDER BY assessment_id DESC LIMIT 1
+        )
+        WHERE progressive_assessment_stage IS NULL
+          AND interaction_id IN (SELECT interaction_id FROM progressive_assessments)
+    """)
+    return conn.execute("SELECT COUNT(*) FROM progressive_assessment_counters").fetchone()[0]
+
+
+def is_low_feedback(emoji: Optional[str], score: Optional[float]) -> bool:
+    """Confused / not understood answers get the follow-up right away"""
+    return emoji in LOW_FEEDBACK_EMOJIS or (score is not None and score <= LOW_FEEDBACK_SCORE)
+
+
+def record_trigger_decision(
+    conn: sqlite3.Connection,
+    interaction_id: int,
+    emoji: Optional[str],
+    score: Optional[float]
+) -> str:
+    """Store when the follow-up becomes due for an interaction; returns the reason"""
+    if is_low_feedback(emoji, score):
+        reason = TRIGGER_LOW_FEEDBACK
+        due_at = "CURRENT_TIMESTAMP"
+    else:
+        reason = TRIGGER_DELAY
+        due_at = f"datetime(timestamp, '+{FOLLOW_UP_DELAY_SECONDS} seconds')"
+    conn.execute(f"""
+        UPDATE student_interactions
+        SET progressive_follow_up_due_at = {due_at},
+            progressive_trigger_reason = ?
+        WHERE interaction_id = ?
+    """, (reason, interaction_id))
+    return reason
+
+
+def get_trigger_state(conn: sqlite3.Connection, interaction_id: int) -> Optional[Dict[str, Any]]:
+    """Stored trigger decision of one interaction (single primary-key lookup)"""
+    row = conn.execute(f"""
+        SELECT interaction_id, user_id, session_id, emoji_feedback, feedback_score,
+               progressive_assessment_stage, progressive_trigger_reason,
+               COALESCE(progressive_follow_up_due_at,
+                        datetime(timestamp, '+{FOLLOW_UP_DELAY_SECONDS} seconds')) AS follow_up_due_at,
+               COALESCE(progressive_follow_up_due_at,
+                        datetime(timestamp, '+{FOLLOW_UP_DELAY_SECONDS} seconds')) <= datetime('now')
+                   AS follow_up_due
+        FROM student_interactions
+        WHERE interaction_id = ?
+    """, (interaction_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def load_insight_counters(
+    conn: sqlite3.Connection,
+    user_id: str,
+    session_id: Optional[str],
+    days: int,
+    weak_area_limit: int = 5
+) -> Dict[str, Any]:
+    """
+    Summed counters of the last ``days`` days
+
+    ``daily_confidence`` lists (sum, count) per day, newest first, for the
+    confidence trend; ``weak_areas`` are the most frequent confusion areas.
+    """
+    where = "user_id = ? AND day >= date('now', ?)"
+    params: List[Any] = [user_id, f"-{int(days)} days"]
+    if session_id:
+        where += " AND session_id = ?"
+        params.append(session_id)
+
+    rows = conn.execute(f"""
+        SELECT day, SUM(total_count) AS total, SUM(follow_up_count) AS follow_up,
+               SUM(deep_analysis_count) AS deep_analysis,
+               SUM(confidence_sum) AS confidence_sum, SUM(confidence_count) AS confidence_count
+        FROM progressive_assessment_counters
+        WHERE {where}
+        GROUP BY day
+        ORDER BY day DESC
+    """, tuple(params)).fetchall()
+
+    area_where = where.replace("day >= date('now', ?)", "timestamp >= datetime('now', ?)")
+    weak_areas = [r[0] for r in conn.execute(f"""
+        SELECT confusion_area FROM concept_confusion_log
+        WHERE {area_where}
+        GROUP BY confusion_area
+        ORDER BY COUNT(*) DESC, MAX(timestamp) DESC
+        LIMIT ?
+    """, (*params, weak_area_limit))]
+
+    return {
+        "total": sum(r["total"] for r in rows),
+        "follow_up": sum(r["follow_up"] for r in rows),
+        "deep_analysis": sum(r["deep_analysis"] for r in rows),
+        "confidence_sum": sum(r["confidence_sum"] for r in rows),
+        "confidence_count": sum(r["confidence_count"] for r in rows),
+        "daily_confidence": [(r["confidence_sum"], r["confidence_count"]) for r in rows if r["confidence_count"]],
+        "weak_areas": weak_areas,
+    }
@@ -0,0 +1,175 @@
+"""
+QA fast-path hit/miss counters per session
+
+``POST /hybrid-rag/query`` answers a question straight from a teacher-approved
+``topic_qa_pairs`` row when the best QA match is similar enough, before any
+chunk retrieval, reranking or LLM call (services/qa_fast_path.py). To see how
+often that happens and what it saves, every query that checked the QA bank
+adds to a per (session, day) row in ``qa_fast_path_counters``: hit/miss
+counts plus latency sums and maxima. The report reads at most ``days`` rows
+per session instead of scanning interaction logs.
+
+Individual hits are still logged one row each in ``student_qa_interactions``
+(``response_source = 'direct_qa'``) by ``HybridKnowledgeRetriever.track_qa_usage``;
+the report uses them for the most served QA pairs.
+"""
+
+import logging
+import sqlite3
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_qa_fast_path_tables(conn: sqlite3.Connection):
+    """
+    Counter table, plus the QA cache/interaction tables the fast path writes
+
+    ``qa_similarity_cache`` and ``student_qa_interactions`` come from
+    auth_service migration 005 and only existed when that migration ran on the
+    same database file; they are created here with the same columns. The
+    ``users`` foreign key is left out (users belong to auth_service, see
+    005_fix_aprag_foreign_keys).
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS qa_fast_path_counters (
+            session_id TEXT NOT NULL,
+            day DATE NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            misses INTEGER NOT NULL DEFAULT 0,
+            hit_latency_ms_sum INTEGER NOT NULL DEFAULT 0,
+            hit_latency_ms_max INTEGER NOT NULL DEFAULT 0,
+            miss_latency_ms_sum INTEGER NOT NULL DEFAULT 0,
+            miss_latency_ms_max INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (session_id, day)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS qa_similarity_cache (
+            cache_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question_text TEXT NOT NULL,
+            question_text_hash VARCHAR(64) NOT NULL,
+            matched_qa_ids TEXT NOT NULL,
+            embedding_model VARCHAR(100),
+            cache_hits INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP,
+            UNIQUE(question_text_hash)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS student_qa_interactions (
+            interaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            qa_id INTEGER NOT NULL,
+            user_id VARCHAR(255) NOT NULL,
+            session_id VARCHAR(255) NOT NULL,
+            original_question TEXT NOT NULL,
+            similarity_score DECIMAL(3,2),
+            was_helpful BOOLEAN,
+            student_rating INTEGER,
+            had_followup BOOLEAN DEFAULT FALSE,
+            followup_question TEXT,
+            response_time_ms INTEGER,
+            response_source VARCHAR(50),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (qa_id) REFERENCES topic_qa_pairs(qa_id) ON DELETE CASCADE
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_qa_cache_expires ON qa_similarity_cache(expires_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_student_qa_qa_id ON student_qa_interactions(qa_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_student_qa_session ON student_qa_interactions(session_id)")
+
+
+def record_fast_path_outcome(conn: sqlite3.Connection, session_id: str, hit: bool, latency_ms: int):
+    """Count one query that checked the QA bank (caller commits)"""
+    latency_ms = max(0, int(latency_ms))
+    if hit:
+        conn.execute("""
+            INSERT INTO qa_fast_path_counters (session_id, day, hits, hit_latency_ms_sum, hit_latency_ms_max)
+            VALUES (?, date('now'), 1, ?, ?)
+            ON CONFLICT(session_id, day) DO UPDATE SET
+                hits = hits + 1,
+                hit_latency_ms_sum = hit_latency_ms_sum + excluded.hit_latency_ms_sum,
+                hit_latency_ms_max = MAX(hit_latency_ms_max, excluded.hit_latency_ms_max)
+        """, (session_id, latency_ms, latency_ms))
+    else:
+        conn.execute("""
+            INSERT INTO qa_fast_path_counters (session_id, day, misses, miss_latency_ms_sum, miss_latency_ms_max)
+            VALUES (?, date('now'), 1, ?, ?)
+            ON CONFLICT(session_id, day) DO UPDATE SET
+                misses = misses + 1,
+                miss_latency_ms_sum = miss_latency_ms_sum + excluded.miss_latency_ms_sum,
+                miss_latency_ms_max = MAX(miss_latency_ms_max, excluded.miss_latency_ms_max)
+        """, (session_id, latency_ms, latency_ms))
+
+
+def _latency_summary(count: int, total: int, maximum: int) -> Dict[str, Any]:
+    return {
+        "avg_ms": round(total / count, 1) if count else None,
+        "max_ms": maximum if count else None,
+    }
+
+
+def load_fast_path_report(conn: sqlite3.Connection, session_id: str, days: int = 30) -> Dict[str, Any]:
+    """
+    Hit rate and latency of the QA fast path for the last ``days`` days (today included)
+
+    ``estimated_time_saved_ms`` assumes a hit would otherwise have taken the
+    average miss latency of the same window.
+    """
+    window = f"-{max(1, int(days)) - 1} days"
+    rows = [dict(row) for row in conn.execute("""
+        SELECT day, hits, misses, hit_latency_ms_sum, hit_latency_ms_max,
+               miss_latency_ms_sum, miss_latency_ms_max
+        FROM qa_fast_path_counters
+        WHERE session_id = ? AND day >= date('now', ?)
+        ORDER BY day DESC
+    """, (session_id, window))]
+
+    hits = sum(r["hits"] for r in rows)
+    misses = sum(r["misses"] for r in rows)
+    hit_sum = sum(r["hit_latency_ms_sum"] for r in rows)
+    miss_sum = sum(r["miss_latency_ms_sum"] for r in rows)
+    hit_latency = _latency_summary(hits, hit_sum, max((r["hit_latency_ms_max"] for r in rows), default=0))
+    miss_latency = _latency_summary(misses, miss_sum, max((r["miss_latency_ms_max"] for r in rows), default=0))
+
+    time_saved = None
+    if hits and misses:
+        time_saved = round(hits * (miss_latency["avg_ms"] - hit_latency["avg_ms"]))
+
+    top_qa_pairs = [dict(row) for row in conn.execute("""
+        SELECT sqa.qa_id, qa.question, COUNT(*) AS times_served,
+               AVG(sqa.similarity_score) AS avg_similarity,
+               AVG(sqa.response_time_ms) AS avg_response_time_ms
+        FROM student_qa_interactions sqa
+        LEFT JOIN topic_qa_pairs qa ON qa.qa_id = sqa.qa_id
+        WHERE sqa.session_id = ? AND sqa.response_source = 'direct_qa'
+          AND sqa.created_at >= date('now', ?)
+        GROUP BY sqa.qa_id
+        ORDER BY times_served DESC
+        LIMIT 10
+    """, (session_id, window))]
+
+    return {
+        "session_id": session_id,
+        "days": max(1, int(days)),
+        "queries": hits + misses,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        "hit_latency": hit_latency,
+        "miss_latency": miss_latency,
+        "estimated_time_saved_ms": time_saved,
+        "daily": [
+            {
+                "day": r["day"],
+                "hits": r["hits"],
+                "misses": r["misses"],
+                "hit_rate": round(r["hits"] / (r["hits"] + r["misses"]), 4) if r["hits"] + r["misses"] else 0.0,
+                "avg_hit_latency_ms": round(r["hit_latency_ms_sum"] / r["hits"], 1) if r["hits"] else None,
+                "avg_miss_latency_ms": round(r["miss_latency_ms_sum"] / r["misses"], 1) if r["misses"] else None,
+            }
+            for r in rows
+        ],
+        "top_qa_pairs": top_qa_pairs,
+    }
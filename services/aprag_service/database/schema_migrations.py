@@ -0,0 +1,281 @@
+"""
+Versioned schema migrations for the APRAG database
+
+``DatabaseManager.init_database`` used to probe ``sqlite_master`` and
+``PRAGMA table_info`` for every migration, in every worker and on every
+``DatabaseManager`` instantiation. Migrations are now numbered steps and the
+highest applied number is stored in ``schema_version``:
+
+- startup: one ``SELECT MAX(version)`` per database and process; nothing else
+  runs when the schema is current
+- otherwise the pending steps run once, under an exclusive file lock
+  (``<db_path>.migrate.lock``), so concurrent workers wait for the first one
+  and then see the new version instead of migrating again
+
+Each step is one of the existing idempotent ``DatabaseManager.apply_*``
+methods. Databases created before this table existed start at version 0 and
+run every step once (all of them are no-ops on an up-to-date schema).
+
+Most ``apply_*`` methods log their errors instead of raising, so a step
+returning is not proof that it worked. A step is only recorded once its
+``POSTCONDITIONS`` (tables, views, indexes, ``table.column``) exist; otherwise
+``MigrationError`` is raised, the version stays below it and the step runs
+again on the next startup. Data-only steps (FK / satisfaction repairs) have no
+schema postcondition and are recorded when they return.
+
+Version numbers are independent of the SQL file names in ``migrations/``
+(which contain duplicates such as two 005s, 007s and 016s); new schema
+changes append a step to ``MIGRATIONS`` and never renumber existing ones.
+The one-off ``apply_*_migration.py`` scripts in the service root only call
+``migrate`` now (``apply_migration_008.py`` applies an unrelated schema and is
+not a step).
+
+Usage:
+    python -m database.schema_migrations status [--db-path PATH]
+    python -m database.schema_migrations migrate [--db-path PATH]
+    python -m database.schema_migrations rerun [--db-path PATH]   # re-apply every step
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# (version, DatabaseManager method) in application order
+MIGRATIONS: Tuple[Tuple[int, str], ...] = (
+    (1, "apply_aprag_migrations"),
+    (2, "apply_topic_migrations"),
+    (3, "apply_foreign_key_fix_migration"),
+    (4, "apply_topic_progress_fk_removal_migration"),
+    (5, "apply_knowledge_base_tables_migration"),
+    (6, "apply_qa_embeddings_migration"),  # adds columns to topic_qa_pairs
+    (7, "apply_detailed_feedback_migration"),
+    (8, "apply_satisfaction_fix_migration"),  # reads detailed_feedback_entries
+    (9, "apply_session_settings_migration"),
+    (10, "apply_session_settings_fk_removal_migration"),
+    (11, "apply_document_global_scores_migration"),
+    (12, "apply_avg_emoji_score_migration"),
+    (13, "apply_analytics_views"),
+    (14, "apply_ebars_migration"),
+    (15, "apply_initial_test_tracking_migration"),
+    (16, "apply_initial_test_two_stage_migration"),
+    (17, "apply_completion_percentage_migration"),
+    (18, "apply_question_pool_migration"),
+    (19, "apply_topic_rollups_migration"),
+    (20, "apply_user_analytics_indexes_migration"),
+    (21, "apply_recommendation_refresh_migration"),
+    (22, "apply_feedback_events_migration"),
+    (23, "ensure_feature_flags_table"),
+    (24, "apply_progressive_assessment_migration"),
+    (25, "apply_qa_fast_path_migration"),
+    (26, "apply_initial_test_repair_migration"),  # 15/16 again for databases stamped without them
+    (27, "apply_recommendation_refresh_backoff_migration"),
+)
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Schema objects each step must leave behind: "name" is a table, view or
+# index, "table.column" a column. Steps without an entry are data-only.
+POSTCONDITIONS: Dict[int, Tuple[str, ...]] = {
+    1: ("student_interactions", "student_profiles", "student_feedback", "personalized_responses",
+        "recommendations", "learning_patterns", "aprag_feature_flags"),
+    2: ("course_topics", "question_topic_mapping", "topic_progress"),
+    4: ("topic_progress",),
+    5: ("topic_knowledge_base", "topic_qa_pairs"),
+    6: ("topic_qa_pairs.question_embedding", "topic_qa_pairs.embedding_model",
+        "topic_qa_pairs.embedding_dim", "topic_qa_pairs.embedding_updated_at"),
+    7: ("detailed_feedback_entries", "multi_feedback_summary"),
+    9: ("session_settings",),
+    10: ("session_settings.user_id",),
+    11: ("document_global_scores",),
+    12: ("document_global_scores.avg_emoji_score",),
+    13: ("topic_mastery_analytics", "student_topic_progress_analytics",
+         "topic_difficulty_analysis", "topic_recommendation_insights"),
+    14: ("student_comprehension_scores", "ebars_feedback_history", "ebars_prompt_cache"),
+    15: ("student_comprehension_scores.has_completed_initial_test",
+         "student_comprehension_scores.initial_test_score",
+         "student_comprehension_scores.initial_test_completed_at",
+         "initial_cognitive_tests"),
+    16: ("initial_cognitive_tests.test_attempt", "initial_cognitive_tests.answer_preferences"),
+    17: ("topic_progress.completion_percentage", "topic_progress.last_interaction_date"),
+    18: ("question_pool", "question_pool_batch_jobs", "question_embeddings"),
+    19: ("topic_session_rollup", "topic_user_rollup"),
+    20: ("idx_interactions_user_session_time", "idx_feedback_user_session_time"),
+    21: ("recommendation_refresh_state",),
+    22: ("feedback_aggregate_events", "emoji_feedback_summary"),
+    23: ("feature_flags",),
+    24: ("progressive_assessments", "progressive_assessment_counters", "concept_confusion_log",
+         "requested_topics_log", "student_interactions.progressive_assessment_stage",
+         "student_profiles.progressive_assessment_count"),
+    25: ("qa_fast_path_counters", "qa_similarity_cache", "student_qa_interactions"),
+    26: ("initial_cognitive_tests.test_attempt", "initial_cognitive_tests.answer_preferences"),
+    27: ("recommendation_refresh_state.failed_refreshes", "recommendation_refresh_state.last_error_at"),
+}
+
+# Databases known to be current in this process (db_path -> version)
+_current: Dict[str, int] = {}
+_current_lock = threading.Lock()
+
+
+class MigrationError(RuntimeError):
+    """A step returned without producing its schema postconditions"""
+
+
+def ensure_version_table(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Highest applied migration, 0 for a database without ``schema_version``"""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] or 0
+
+
+@contextmanager
+def migration_lock(db_path: str):
+    """Exclusive inter-process lock next to the database file"""
+    with open(f"{db_path}.migrate.lock", "a+") as handle:
+        if fcntl:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def missing_objects(conn: sqlite3.Connection, version: int) -> List[str]:
+    """Postconditions of ``version`` that are not in the database"""
+    objects = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+    missing = []
+    for required in POSTCONDITIONS.get(version, ()):
+        table, _, column = required.partition(".")
+        if table not in objects:
+            missing.append(required)
+        elif column and column not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+            missing.append(required)
+    return missing
+
+
+def _run_pending(db, conn: sqlite3.Connection, from_version: int) -> int:
+    applied = 0
+    for version, name in MIGRATIONS:
+        if version <= from_version:
+            continue
+        logger.info(f"🔧 Applying schema migration {version}: {name}")
+        getattr(db, name)(conn)
+        missing = missing_objects(conn, version)
+        if missing:
+            # Not recorded: the next migrate() starts again at this step
+            conn.rollback()
+            raise MigrationError(f"Schema migration {version} ({name}) did not create: {', '.join(missing)}")
+        conn.execute(
+            "INSERT OR REPLACE INTO schema_version (version, name, applied_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+            (version, name)
+        )
+        conn.commit()
+        applied += 1
+    return applied
+
+
+def migrate(db, force: bool = False) -> int:
+    """
+    Bring ``db`` to LATEST_VERSION; returns the number of steps applied
+
+    ``force`` re-applies every step (repair after a manual schema change).
+    A step that raises or leaves its ``POSTCONDITIONS`` unmet raises here;
+    the steps before it stay recorded, the database is not marked current
+    and the next call resumes at the failed step.
+    """
+    db_path = db.db_path
+    if not force:
+        with _current_lock:
+            if _current.get(db_path) == LATEST_VERSION:
+                return 0
+        with db.get_connection() as conn:
+            version = get_schema_version(conn)
+        if version >= LATEST_VERSION:
+            with _current_lock:
+                _current[db_path] = version
+            return 0
+
+    with migration_lock(db_path):
+        with db.get_connection() as conn:
+            # Another worker may have finished while we waited for the lock
+            version = 0 if force else get_schema_version(conn)
+            applied = 0
+            if version < LATEST_VERSION:
+                ensure_version_table(conn)
+                conn.commit()
+                applied = _run_pending(db, conn, version)
+                logger.info(f"✅ Schema migrated from version {version} to {LATEST_VERSION} ({applied} steps)")
+    with _current_lock:
+        _current[db_path] = LATEST_VERSION
+    return applied
+
+
+def forget(db_path: Optional[str] = None):
+    """Drop the in-process "schema is current" marker (tests, replaced database files)"""
+    with _current_lock:
+        if db_path is None:
+            _current.clear()
+        else:
+            _current.pop(db_path, None)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="APRAG schema migrations")
+    parser.add_argument("command", choices=["status", "migrate", "rerun"])
+    parser.add_argument("--db-path", default=os.getenv("APRAG_DB_PATH", "data/rag_assistant.db"))
+    args = parser.parse_args()
+
+    if args.command == "status":
+        conn = sqlite3.connect(args.db_path)
+        try:
+            version = get_schema_version(conn)
+        finally:
+            conn.close()
+        state = "current" if version >= LATEST_VERSION else f"{LATEST_VERSION - version} pending"
+        print(f"Schema version {version}/{LATEST_VERSION} ({state})")
+        return
+
+    from database.database import DatabaseManager
+
+    # DatabaseManager() already runs pending migrations on construction
+    db = DatabaseManager(args.db_path)
+    if args.command == "rerun":
+        applied = migrate(db, force=True)
+        print(f"✅ Re-applied {applied} migration steps")
+    else:
+        with db.get_connection() as conn:
+            print(f"✅ Schema version {get_schema_version(conn)}/{LATEST_VERSION}")
+
+
+if __name__ == "__main__":
+    main()
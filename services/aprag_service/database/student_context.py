@@ -0,0 +1,256 @@
+"""
+Student Context Loader
+Profile, recent interactions, EBARS state and session settings in one round trip
+
+Personalization and adaptive query both need the same per (user, session)
+inputs. ``load_student_context`` reads them on a single connection inside
+one read transaction (consistent snapshot) and keeps the result for a few
+seconds, so one request flow (adaptive query → personalize) hits SQLite
+once. Writers that change these rows call ``invalidate_student_context``;
+other processes see their writes after at most the TTL.
+
+Invalidation bumps a generation counter for the (user, session) scope it
+covers. A load remembers the counters before reading and only stores its
+result if none of them changed meanwhile, so a load that read the old rows
+cannot put them back into the cache after a concurrent write invalidated it.
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from database.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+STUDENT_CONTEXT_TTL_SECONDS = float(os.getenv("STUDENT_CONTEXT_TTL", "5.0"))
+RECENT_INTERACTION_LIMIT = 20
+
+# Columns read by ZPD/CACS from recent interactions (large response texts are skipped).
+# Older databases lack some of them; only the existing ones are selected.
+INTERACTION_COLUMNS = (
+    "interaction_id", "query", "sources", "feedback_score", "emoji_feedback",
+    "understanding_level", "difficulty_level", "timestamp",
+)
+
+PROFILE_DEFAULTS = {
+    "average_understanding": 3.0,
+    "average_satisfaction": None,
+    "total_interactions": 0,
+    "total_feedback_count": 0,
+    "strong_topics": None,
+    "weak_topics": None,
+    "preferred_explanation_style": None,
+    "preferred_difficulty_level": None,
+}
+
+
+@dataclass
+class StudentContext:
+    """Snapshot of everything personalization needs for one (user, session)"""
+    user_id: str
+    session_id: str
+    profile: Dict[str, Any]
+    recent_interactions: List[Dict[str, Any]] = field(default_factory=list)
+    ebars_state: Optional[Dict[str, Any]] = None
+    session_settings: Dict[str, Any] = field(default_factory=dict)
+    loaded_at: float = 0.0
+
+    def profile_dict(self) -> Dict[str, Any]:
+        """Profile in the shape returned by GET /profiles/{user_id}"""
+        profile = self.profile
+        return {
+            "user_id": str(profile.get("user_id") or self.user_id),
+            "session_id": str(profile.get("session_id") or self.session_id),
+            "average_understanding": _as_float(profile.get("average_understanding")),
+            "average_satisfaction": _as_float(profile.get("average_satisfaction")),
+            "total_interactions": int(profile.get("total_interactions") or 0),
+            "total_feedback_count": int(profile.get("total_feedback_count") or 0),
+            "strong_topics": _parse_json(profile.get("strong_topics")),
+            "weak_topics": _parse_json(profile.get("weak_topics")),
+            "preferred_explanation_style": profile.get("preferred_explanation_style"),
+            "preferred_difficulty_level": profile.get("preferred_difficulty_level"),
+        }
+
+
+def _as_float(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _parse_json(value):
+    if not value or not isinstance(value, str):
+        return value or None
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# (db_path, user_id, session_id) -> (expires_at, interaction limit, context)
+_context_cache: Dict[Tuple[str, str, str], Tuple[float, int, StudentContext]] = {}
+_context_cache_lock = threading.Lock()
+# (user_id, session_id) -> invalidation count; None in either position is a
+# wildcard invalidation (all users of a session, a user everywhere, everything)
+_generations: Dict[Tuple[Optional[str], Optional[str]], int] = {}
+# db_path -> selectable student_interactions columns
+_interaction_columns: Dict[str, Tuple[str, ...]] = {}
+
+
+def invalidate_student_context(user_id: Optional[str] = None, session_id: Optional[str] = None):
+    """
+    Drop cached contexts after a write
+
+    Either argument may be omitted: session settings changes invalidate every
+    student of the session, ``invalidate_student_context()`` clears everything.
+    """
+    user_id = str(user_id) if user_id is not None else None
+    session_id = str(session_id) if session_id is not None else None
+    with _context_cache_lock:
+        scope = (user_id, session_id)
+        _generations[scope] = _generations.get(scope, 0) + 1
+        for key in list(_context_cache):
+            if (user_id is None or key[1] == user_id) and (session_id is None or key[2] == session_id):
+                del _context_cache[key]
+
+
+def _generation(user_id: str, session_id: str) -> Tuple[int, ...]:
+    """Invalidation counters of every scope covering (user, session); lock held"""
+    return tuple(
+        _generations.get(scope, 0)
+        for scope in ((user_id, session_id), (None, session_id), (user_id, None), (None, None))
+    )
+
+
+def _table_exists(conn, name: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)
+    ).fetchone() is not None
+
+
+def _select_interaction_columns(conn, db_path: str) -> Tuple[str, ...]:
+    columns = _interaction_columns.get(db_path)
+    if columns is None:
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(student_interactions)")}
+        columns = tuple(c for c in INTERACTION_COLUMNS if c in existing)
+        if columns:
+            _interaction_columns[db_path] = columns
+    return columns
+
+
+def _load(conn, db_path: str, user_id: str, session_id: str, limit: int, create_profile: bool) -> StudentContext:
+    # Explicit read transaction: all four reads see the same snapshot
+    conn.execute("BEGIN")
+    try:
+        row = conn.execute(
+            "SELECT * FROM student_profiles WHERE user_id = ? AND session_id = ?",
+            (user_id, session_id)
+        ).fetchone()
+        profile = dict(row) if row else None
+
+        recent_interactions = []
+        columns = _select_interaction_columns(conn, db_path)
+        if columns:
+            order_by = "timestamp" if "timestamp" in columns else "interaction_id"
+            recent_interactions = [dict(r) for r in conn.execute(f"""
+                SELECT {', '.join(columns)} FROM student_interactions
+                WHERE user_id = ? AND session_id = ?
+                ORDER BY {order_by} DESC
+                LIMIT ?
+            """, (user_id, session_id, limit))]
+
+        ebars_row = None
+        if _table_exists(conn, "student_comprehension_scores"):
+            ebars_row = conn.execute("""
+                SELECT comprehension_score, current_difficulty_level,
+                       consecutive_positive_count, consecutive_negative_count,
+                       total_feedback_count, positive_feedback_count, negative_feedback_count,
+                       last_feedback_at
+                FROM student_comprehension_scores
+                WHERE user_id = ? AND session_id = ?
+            """, (user_id, session_id)).fetchone()
+
+        settings_row = None
+        if _table_exists(conn, "session_settings"):
+            settings_row = conn.execute(
+                "SELECT * FROM session_settings WHERE session_id = ?", (session_id,)
+            ).fetchone()
+    finally:
+        conn.rollback()
+
+    if profile is None:
+        profile = {"user_id": user_id, "session_id": session_id, **PROFILE_DEFAULTS}
+        if create_profile:
+            try:
+                conn.execute("""
+                    INSERT INTO student_profiles
+                    (user_id, session_id, average_understanding, average_satisfaction,
+                     total_interactions, total_feedback_count, last_updated, created_at)
+                    VALUES (?, ?, 3.0, NULL, 0, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                """, (user_id, session_id))
+                conn.commit()
+                logger.info(f"✅ Created default profile for user {user_id}, session {session_id}")
+            except Exception as e:
+                conn.rollback()
+                logger.warning(f"Failed to auto-create profile (non-critical): {e}")
+
+    ebars_state = None
+    if ebars_row is not None:
+        from ebars.score_calculator import ComprehensionScoreCalculator
+        ebars_state = ComprehensionScoreCalculator._row_to_state(ebars_row)
+
+    return StudentContext(
+        user_id=user_id,
+        session_id=session_id,
+        profile=profile,
+        recent_interactions=recent_interactions,
+        ebars_state=ebars_state,
+        session_settings=dict(settings_row) if settings_row else {},
+        loaded_at=time.time(),
+    )
+
+
+def load_student_context(
+    db: DatabaseManager,
+    user_id: str,
+    session_id: str,
+    limit: int = RECENT_INTERACTION_LIMIT,
+    create_profile: bool = True,
+    use_cache: bool = True
+) -> StudentContext:
+    """
+    Student context for (user, session), served from the TTL cache when fresh
+
+    A missing profile row is created with the defaults used by GET /profiles
+    (``create_profile``). Callers get a private copy and may mutate it.
+    """
+    user_id, session_id = str(user_id), str(session_id)
+    key = (getattr(db, "db_path", ""), user_id, session_id)
+    with _context_cache_lock:
+        cached = _context_cache.get(key) if use_cache else None
+        generation = _generation(user_id, session_id)
+    if STUDENT_CONTEXT_TTL_SECONDS > 0 and cached and cached[0] > time.monotonic() and cached[1] >= limit:
+        context = copy.deepcopy(cached[2])
+        context.recent_interactions = context.recent_interactions[:limit]
+        return context
+
+    with db.get_connection() as conn:
+        context = _load(conn, key[0], user_id, session_id, limit, create_profile)
+
+    if context.ebars_state is not None:
+        # Prime the EBARS state cache: prompt generation reads it right after
+        from ebars.score_calculator import prime_cached_state
+        prime_cached_state(db, user_id, session_id, context.ebars_state)
+
+    if STUDENT_CONTEXT_TTL_SECONDS > 0:
+        with _context_cache_lock:
+            # Invalidated while loading: the snapshot may predate the write
+            if _generation(user_id, session_id) == generation:
+                _context_cache[key] = (
+                    time.monotonic() + STUDENT_CONTEXT_TTL_SECONDS, limit, copy.deepcopy(context)
+                )
+    return context
@@ -0,0 +1,666 @@
+"""
+Materialized topic analytics rollups
+
+The topic analytics views (topic_analytics_views.sql) aggregate every
+interaction, mapping and feedback row of a session on each dashboard request.
+This module keeps the same sums/counts in two rollup tables instead:
+
+    topic_session_rollup  PRIMARY KEY (session_id, topic_id)
+    topic_user_rollup     PRIMARY KEY (user_id, topic_id)
+
+A question counts towards a topic once it is mapped to it
+(question_topic_mapping); feedback counts once per mapping of its
+interaction, i.e. the same attribution the views use. Rollups are updated
+incrementally inside the write transaction of the mapping / feedback row, can
+be rebuilt from the base tables at any time and checked against them.
+
+Incremental updates only add. Writes that remove base rows (topic delete,
+topic re-extraction / restore, profile reset) call ``refresh_session_rollups``
+in their transaction, which recomputes the affected session's rows.
+
+Usage (rebuild / consistency check):
+    python -m database.topic_rollups rebuild [--session-id ID]
+    python -m database.topic_rollups check [--session-id ID]
+"""
+
+import logging
+import sqlite3
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Additive statistics, stored identically in both rollup tables
+SUM_FIELDS = (
+    "interaction_count",
+    "confidence_sum",
+    "complexity_sum",
+    "response_time_sum",
+    "response_time_count",
+    "feedback_count",
+    "understanding_sum",
+    "understanding_count",
+    "satisfaction_sum",
+    "satisfaction_count",
+    "success_count",
+)
+MAX_FIELDS = ("understanding_max", "last_interaction")
+MIN_FIELDS = ("first_interaction",)
+STAT_FIELDS = SUM_FIELDS + MAX_FIELDS + MIN_FIELDS
+
+# Fields contributed by the mapping row itself (zeroed for feedback deltas)
+_MAPPING_FIELDS = (
+    "interaction_count",
+    "confidence_sum",
+    "complexity_sum",
+    "response_time_sum",
+    "response_time_count",
+    "first_interaction",
+    "last_interaction",
+)
+
+# question_complexity is stored as text (basic / intermediate / advanced)
+_COMPLEXITY_SQL = """
+    CASE lower(qtm.question_complexity)
+        WHEN 'basic' THEN 1.0
+        WHEN 'intermediate' THEN 2.0
+        WHEN 'advanced' THEN 3.0
+        ELSE COALESCE(CAST(qtm.question_complexity AS REAL), 0.0)
+    END
+"""
+
+SUCCESS_UNDERSTANDING_LEVEL = 4.0
+
+_STAT_COLUMNS_DDL = """
+    interaction_count INTEGER NOT NULL DEFAULT 0,
+    confidence_sum REAL NOT NULL DEFAULT 0,
+    complexity_sum REAL NOT NULL DEFAULT 0,
+    response_time_sum REAL NOT NULL DEFAULT 0,
+    response_time_count INTEGER NOT NULL DEFAULT 0,
+    feedback_count INTEGER NOT NULL DEFAULT 0,
+    understanding_sum REAL NOT NULL DEFAULT 0,
+    understanding_count INTEGER NOT NULL DEFAULT 0,
+    satisfaction_sum REAL NOT NULL DEFAULT 0,
+    satisfaction_count INTEGER NOT NULL DEFAULT 0,
+    success_count INTEGER NOT NULL DEFAULT 0,
+    understanding_max REAL,
+    last_interaction TIMESTAMP,
+    first_interaction TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+"""
+
+ROLLUP_TABLES_SQL = f"""
+CREATE TABLE IF NOT EXISTS topic_session_rollup (
+    session_id TEXT NOT NULL,
+    topic_id INTEGER NOT NULL,
+    students_attempted INTEGER NOT NULL DEFAULT 0,
+    {_STAT_COLUMNS_DDL},
+    PRIMARY KEY (session_id, topic_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS topic_user_rollup (
+    user_id TEXT NOT NULL,
+    topic_id INTEGER NOT NULL,
+    session_id TEXT NOT NULL,
+    {_STAT_COLUMNS_DDL},
+    PRIMARY KEY (user_id, topic_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_topic_user_rollup_session
+    ON topic_user_rollup(session_id, topic_id);
+"""
+
+
+def ensure_rollup_tables(conn: sqlite3.Connection):
+    """Create the rollup tables if missing (idempotent)"""
+    conn.executescript(ROLLUP_TABLES_SQL)
+
+
+def _user_stats_select(mapping_where: str, feedback_where: str = "") -> str:
+    """
+    Aggregate mapped interactions (+ their feedback) per (user, topic)
+
+    Feedback is pre-aggregated per interaction so that rows never fan out.
+    Parameters: feedback_where params first, then mapping_where params.
+    """
+    return f"""
+        SELECT
+            si.user_id AS user_id,
+            qtm.topic_id AS topic_id,
+            si.session_id AS session_id,
+            COUNT(*) AS interaction_count,
+            COALESCE(SUM(qtm.confidence_score), 0.0) AS confidence_sum,
+            COALESCE(SUM({_COMPLEXITY_SQL}), 0.0) AS complexity_sum,
+            COALESCE(SUM(si.processing_time_ms), 0.0) AS response_time_sum,
+            COUNT(si.processing_time_ms) AS response_time_count,
+            COALESCE(SUM(f.feedback_count), 0) AS feedback_count,
+            COALESCE(SUM(f.understanding_sum), 0.0) AS understanding_sum,
+            COALESCE(SUM(f.understanding_count), 0) AS understanding_count,
+            COALESCE(SUM(f.satisfaction_sum), 0.0) AS satisfaction_sum,
+            COALESCE(SUM(f.satisfaction_count), 0) AS satisfaction_count,
+            COALESCE(SUM(f.success_count), 0) AS success_count,
+            MAX(f.understanding_max) AS understanding_max,
+            MAX(si.timestamp) AS last_interaction,
+            MIN(si.timestamp) AS first_interaction
+        FROM question_topic_mapping qtm
+        JOIN student_interactions si ON si.interaction_id = qtm.interaction_id
+        JOIN course_topics ct ON ct.topic_id = qtm.topic_id AND ct.session_id = si.session_id
+        LEFT JOIN (
+            SELECT
+                interaction_id,
+                COUNT(*) AS feedback_count,
+                SUM(understanding_level) AS understanding_sum,
+                COUNT(understanding_level) AS understanding_count,
+                SUM(satisfaction_level) AS satisfaction_sum,
+                COUNT(satisfaction_level) AS satisfaction_count,
+                SUM(CASE WHEN understanding_level >= {SUCCESS_UNDERSTANDING_LEVEL} THEN 1 ELSE 0 END) AS success_count,
+                MAX(understanding_level) AS understanding_max
+            FROM student_feedback
+            {feedback_where}
+            GROUP BY interaction_id
+        ) f ON f.interaction_id = qtm.interaction_id
+        WHERE {mapping_where}
+        GROUP BY si.user_id, qtm.topic_id, si.session_id
+    """
+
+
+def _upsert_sql(table: str, keys: Tuple[str, ...], fields: Tuple[str, ...], conflict: Tuple[str, ...]) -> str:
+    updates = []
+    for field in fields:
+        if field in MAX_FIELDS:
+            updates.append(f"{field} = COALESCE(MAX({field}, excluded.{field}), {field}, excluded.{field})")
+        elif field in MIN_FIELDS:
+            updates.append(f"{field} = COALESCE(MIN({field}, excluded.{field}), {field}, excluded.{field})")
+        else:
+            updates.append(f"{field} = {field} + excluded.{field}")
+    columns = keys + fields
+    return f"""
+        INSERT INTO {table} ({', '.join(columns)}, updated_at)
+        VALUES ({', '.join('?' for _ in columns)}, CURRENT_TIMESTAMP)
+        ON CONFLICT({', '.join(conflict)}) DO UPDATE SET
+            {', '.join(updates)},
+            updated_at = CURRENT_TIMESTAMP
+    """
+
+
+_USER_UPSERT_SQL = _upsert_sql(
+    "topic_user_rollup", ("user_id", "topic_id", "session_id"), STAT_FIELDS, ("user_id", "topic_id")
+)
+_SESSION_UPSERT_SQL = _upsert_sql(
+    "topic_session_rollup", ("session_id", "topic_id"), ("students_attempted",) + STAT_FIELDS,
+    ("session_id", "topic_id")
+)
+
+
+def _apply_delta(conn: sqlite3.Connection, delta: Mapping[str, Any]):
+    """Add one (user, topic) delta to both rollup tables"""
+    user_id, topic_id, session_id = delta["user_id"], delta["topic_id"], delta["session_id"]
+    cursor = conn.execute(
+        """
+        INSERT INTO topic_user_rollup (user_id, topic_id, session_id)
+        VALUES (?, ?, ?)
+        ON CONFLICT(user_id, topic_id) DO NOTHING
+        """,
+        (user_id, topic_id, session_id),
+    )
+    new_student = 1 if cursor.rowcount == 1 else 0
+    values = tuple(delta[field] for field in STAT_FIELDS)
+    conn.execute(_USER_UPSERT_SQL, (user_id, topic_id, session_id) + values)
+    conn.execute(_SESSION_UPSERT_SQL, (session_id, topic_id, new_student) + values)
+
+
+def _apply_deltas_safely(conn: sqlite3.Connection, deltas: List[Dict[str, Any]], source: str):
+    """
+    Apply deltas inside a savepoint of the caller's transaction
+
+    A rollup failure must never fail (or half-apply to) the interaction write;
+    drift from a skipped update is repaired by a rebuild.
+    """
+    try:
+        conn.execute("SAVEPOINT topic_rollup")
+    except sqlite3.Error as e:
+        logger.warning(f"⚠️ Topic rollup update skipped ({source}): {e}")
+        return
+    try:
+        for delta in deltas:
+            _apply_delta(conn, delta)
+        conn.execute("RELEASE SAVEPOINT topic_rollup")
+    except sqlite3.Error as e:
+        conn.execute("ROLLBACK TO SAVEPOINT topic_rollup")
+        conn.execute("RELEASE SAVEPOINT topic_rollup")
+        logger.warning(f"⚠️ Topic rollup update skipped ({source}): {e}")
+
+
+def record_topic_mapping(conn: sqlite3.Connection, mapping_rowid: int):
+    """
+    Roll a newly inserted question_topic_mapping row into the rollups
+
+    Feedback already given for the interaction is included. Call on the same
+    connection before committing the mapping insert.
+    """
+    try:
+        rows = conn.execute(
+            _user_stats_select("qtm.rowid = ?", "WHERE interaction_id = (SELECT interaction_id FROM question_topic_mapping WHERE rowid = ?)"),
+            (mapping_rowid, mapping_rowid),
+        ).fetchall()
+    except sqlite3.Error as e:
+        logger.warning(f"⚠️ Topic rollup update skipped (mapping {mapping_rowid}): {e}")
+        return
+    _apply_deltas_safely(conn, [dict(_row_items(row)) for row in rows], f"mapping {mapping_rowid}")
+
+
+def record_feedback(conn: sqlite3.Connection, feedback_id: int):
+    """
+    Roll a newly inserted student_feedback row into the rollups
+
+    The feedback counts once per topic mapping of its interaction. Call on the
+    same connection before committing the feedback insert.
+    """
+    try:
+        rows = conn.execute(
+            _user_stats_select(
+                "qtm.interaction_id = (SELECT interaction_id FROM student_feedback WHERE feedback_id = ?)",
+                "WHERE feedback_id = ?",
+            ),
+            (feedback_id, feedback_id),
+        ).fetchall()
+    except sqlite3.Error as e:
+        logger.warning(f"⚠️ Topic rollup update skipped (feedback {feedback_id}): {e}")
+        return
+
+    deltas = []
+    for row in rows:
+        delta = dict(_row_items(row))
+        for field in _MAPPING_FIELDS:
+            delta[field] = None if field in MAX_FIELDS + MIN_FIELDS else 0
+        deltas.append(delta)
+    _apply_deltas_safely(conn, deltas, f"feedback {feedback_id}")
+
+
+def _row_items(row) -> List[Tuple[str, Any]]:
+    if isinstance(row, sqlite3.Row):
+        return [(key, row[key]) for key in row.keys()]
+    return list(row.items())
+
+
+def _session_filter(session_id: Optional[str], column: str = "session_id") -> Tuple[str, tuple]:
+    if session_id:
+        return f"{column} = ?", (session_id,)
+    return "1 = 1", ()
+
+
+def _replace_rollups(conn: sqlite3.Connection, session_id: Optional[str], topic_ids: Optional[List[int]] = None) -> Tuple[int, int]:
+    """Delete and recompute the rollup rows in scope; no transaction handling"""
+    where, params = _session_filter(session_id)
+    si_where, si_params = _session_filter(session_id, "si.session_id")
+    feedback_where = f"WHERE {where}" if session_id else ""
+    if topic_ids:
+        placeholders = ", ".join("?" for _ in topic_ids)
+        where += f" AND topic_id IN ({placeholders})"
+        params += tuple(topic_ids)
+        si_where += f" AND qtm.topic_id IN ({placeholders})"
+        si_params += tuple(topic_ids)
+
+    conn.execute(f"DELETE FROM topic_user_rollup WHERE {where}", params)
+    conn.execute(f"DELETE FROM topic_session_rollup WHERE {where}", params)
+    user_columns = ("user_id", "topic_id", "session_id") + STAT_FIELDS
+    cursor = conn.execute(
+        f"""
+        INSERT INTO topic_user_rollup ({', '.join(user_columns)})
+        SELECT {', '.join(user_columns)} FROM ({_user_stats_select(si_where, feedback_where)})
+        """,
+        (params[:1] if session_id else ()) + si_params,
+    )
+    user_rows = cursor.rowcount
+    aggregates = [f"SUM({f})" for f in SUM_FIELDS] + [f"MAX({f})" for f in MAX_FIELDS] + [f"MIN({f})" for f in MIN_FIELDS]
+    cursor = conn.execute(
+        f"""
+        INSERT INTO topic_session_rollup (session_id, topic_id, students_attempted, {', '.join(STAT_FIELDS)})
+        SELECT session_id, topic_id, COUNT(*), {', '.join(aggregates)}
+        FROM topic_user_rollup
+        WHERE {where}
+        GROUP BY session_id, topic_id
+        """,
+        params,
+    )
+    return user_rows, cursor.rowcount
+
+
+def rebuild_topic_rollups(conn: sqlite3.Connection, session_id: Optional[str] = None) -> Dict[str, int]:
+    """
+    Recompute rollups from the base tables (one session or everything)
+
+    Runs under BEGIN IMMEDIATE so concurrent incremental updates cannot
+    interleave with the delete + re-insert.
+
+    Returns:
+        Number of (user, topic) and (session, topic) rows written
+    """
+    ensure_rollup_tables(conn)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        user_rows, session_rows = _replace_rollups(conn, session_id)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    logger.info(
+        f"✅ Topic rollups rebuilt ({session_id or 'all sessions'}): "
+        f"{user_rows} user rows, {session_rows} session rows"
+    )
+    return {"user_rows": user_rows, "session_rows": session_rows}
+
+
+def refresh_session_rollups(conn: sqlite3.Connection, session_id: str, topic_ids: Optional[List[int]] = None):
+    """
+    Recompute one session's rollups (optionally only ``topic_ids``) after a delete
+
+    Call on the same connection after deleting topics, mappings or
+    interactions and before committing. Like the incremental updates it runs
+    in a savepoint and never fails the caller's write; on error the rows are
+    left for ``rebuild``.
+    """
+    try:
+        conn.execute("SAVEPOINT topic_rollup")
+    except sqlite3.Error as e:
+        logger.warning(f"⚠️ Topic rollup refresh skipped (session {session_id}): {e}")
+        return
+    try:
+        _replace_rollups(conn, session_id, topic_ids)
+        conn.execute("RELEASE SAVEPOINT topic_rollup")
+    except sqlite3.Error as e:
+        conn.execute("ROLLBACK TO SAVEPOINT topic_rollup")
+        conn.execute("RELEASE SAVEPOINT topic_rollup")
+        logger.warning(f"⚠️ Topic rollup refresh skipped (session {session_id}): {e}")
+
+
+# ============================================================================
+# Derived metrics (same formulas as topic_analytics_views.sql)
+# ============================================================================
+
+def _avg(total, count) -> Optional[float]:
+    return float(total) / count if count else None
+
+
+def derive_topic_metrics(row: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    """
+    Turn a rollup row (or None when nothing was rolled up yet) into averages
+
+    Averages are None when there is no data, like AVG() over no rows.
+    """
+    row = row or {}
+
+    def value(field, default=0):
+        result = row.get(field) if hasattr(row, "get") else row[field]
+        return default if result is None else result
+
+    interactions = value("interaction_count")
+    feedback_count = value("feedback_count")
+    return {
+        "students_attempted": value("students_attempted"),
+        "total_interactions": interactions,
+        "total_feedback_count": feedback_count,
+        "avg_understanding": _avg(value("understanding_sum"), value("understanding_count")),
+        "avg_satisfaction": _avg(value("satisfaction_sum"), value("satisfaction_count")),
+        "max_understanding": value("understanding_max", None),
+        "success_rate": float(value("success_count")) / feedback_count if feedback_count else 0.0,
+        "avg_topic_confidence": _avg(value("confidence_sum"), interactions),
+        "avg_question_complexity": _avg(value("complexity_sum"), interactions),
+        "avg_response_time": _avg(value("response_time_sum"), value("response_time_count")),
+        "first_interaction": value("first_interaction", None),
+        "last_interaction": value("last_interaction", None),
+    }
+
+
+def performance_level(avg_understanding: Optional[float]) -> str:
+    if avg_understanding is None:
+        return "very_low"
+    if avg_understanding >= 4.0:
+        return "high"
+    if avg_understanding >= 3.0:
+        return "medium"
+    if avg_understanding >= 2.0:
+        return "low"
+    return "very_low"
+
+
+def difficulty_appropriateness(difficulty: Optional[str], avg_understanding: Optional[float]) -> str:
+    if avg_understanding is None:
+        return "needs_review"
+    if difficulty == "beginner" and avg_understanding >= 4.0:
+        return "appropriate"
+    if difficulty == "intermediate" and avg_understanding >= 3.5:
+        return "appropriate"
+    if difficulty == "advanced" and avg_understanding >= 3.0:
+        return "appropriate"
+    if avg_understanding < 2.0:
+        return "too_difficult"
+    if avg_understanding >= 4.5:
+        return "too_easy"
+    return "needs_review"
+
+
+def difficulty_recommendation(difficulty: Optional[str], avg_understanding: Optional[float], feedback_count: int) -> str:
+    if avg_understanding is not None:
+        if avg_understanding < 2.5 and difficulty == "beginner":
+            return "needs_simplification"
+        if avg_understanding > 4.5 and difficulty == "advanced":
+            return "can_increase_difficulty"
+        if avg_understanding < 3.0:
+            return "needs_support_materials"
+    if feedback_count < 5:
+        return "insufficient_data"
+    return "appropriate_level"
+
+
+def topic_strength_level(avg_understanding: Optional[float]) -> str:
+    if avg_understanding is not None and avg_understanding < 2.5:
+        return "critical_weakness"
+    if avg_understanding is not None and avg_understanding < 3.5:
+        return "moderate_weakness"
+    return "strength"
+
+
+def engagement_level(student_count: int) -> str:
+    if student_count == 0:
+        return "no_engagement"
+    if student_count <= 2:
+        return "low_engagement"
+    if student_count <= 5:
+        return "medium_engagement"
+    return "high_engagement"
+
+
+def recommended_intervention(
+    difficulty: Optional[str],
+    avg_understanding: Optional[float],
+    avg_satisfaction: Optional[float],
+    student_count: int,
+    qa_pairs_count: int,
+    kb_quality: Optional[float],
+) -> str:
+    u = avg_understanding
+    if u is not None and u < 2.5 and qa_pairs_count < 5:
+        return "add_more_practice_questions"
+    if u is not None and u < 3.0 and kb_quality is not None and kb_quality < 0.7:
+        return "improve_knowledge_base"
+    if student_count <= 2 and difficulty == "beginner":
+        return "make_more_accessible"
+    if avg_satisfaction is not None and avg_satisfaction < 3.0:
+        return "review_teaching_approach"
+    if u is not None and u >= 4.5:
+        return "add_advanced_content"
+    return "maintain_current_approach"
+
+
+def learning_path_suggestion(difficulty: Optional[str], avg_understanding: Optional[float]) -> str:
+    u = avg_understanding
+    if u is not None and difficulty == "beginner" and u >= 4.0:
+        return "ready_for_intermediate"
+    if u is not None and difficulty == "intermediate" and u >= 4.0:
+        return "ready_for_advanced"
+    if u is not None and u < 3.0:
+        return "needs_prerequisite_review"
+    return "continue_current_level"
+
+
+# ============================================================================
+# Consistency check
+# ============================================================================
+
+def _diff_rows(
+    kind: str,
+    key_fields: Tuple[str, ...],
+    fields: Tuple[str, ...],
+    expected: List[Mapping[str, Any]],
+    stored: List[Mapping[str, Any]],
+    tolerance: float,
+) -> List[Dict[str, Any]]:
+    expected_by_key = {tuple(r[k] for k in key_fields): r for r in expected}
+    stored_by_key = {tuple(r[k] for k in key_fields): r for r in stored}
+    mismatches = []
+    for key in sorted(set(expected_by_key) | set(stored_by_key), key=str):
+        exp, got = expected_by_key.get(key), stored_by_key.get(key)
+        if exp is None or got is None:
+            mismatches.append({"table": kind, "key": list(key), "problem": "missing_rollup" if got is None else "stale_rollup"})
+            continue
+        for field in fields:
+            a, b = exp[field], got[field]
+            if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+                equal = abs(a - b) <= tolerance
+            else:
+                equal = a == b
+            if not equal:
+                mismatches.append({"table": kind, "key": list(key), "field": field, "expected": a, "stored": b})
+    return mismatches
+
+
+def check_rollup_consistency(
+    conn: sqlite3.Connection,
+    session_id: Optional[str] = None,
+    tolerance: float = 1e-6,
+) -> Dict[str, Any]:
+    """
+    Compare stored rollups with the live data
+
+    1. Every rollup row is recomputed from the base tables and compared field
+       by field.
+    2. Session rollups of active topics are compared with the
+       topic_difficulty_analysis view on the columns that do not depend on its
+       join fan-out (students, average understanding/satisfaction, success rate).
+
+    Returns:
+        Dict with ``consistent`` flag, row counts and the list of mismatches
+    """
+    where, params = _session_filter(session_id)
+    si_where, si_params = _session_filter(session_id, "si.session_id")
+    feedback_where = f"WHERE {where}" if session_id else ""
+
+    expected_users = [dict(_row_items(r)) for r in conn.execute(
+        _user_stats_select(si_where, feedback_where), params + si_params
+    ).fetchall()]
+    stored_users = [dict(_row_items(r)) for r in conn.execute(
+        f"SELECT * FROM topic_user_rollup WHERE {where}", params
+    ).fetchall()]
+    mismatches = _diff_rows(
+        "topic_user_rollup", ("user_id", "topic_id"), ("session_id",) + STAT_FIELDS,
+        expected_users, stored_users, tolerance,
+    )
+
+    # Expected session rows, aggregated from the recomputed user rows
+    expected_sessions: Dict[Tuple[str, int], Dict[str, Any]] = {}
+    for row in expected_users:
+        key = (row["session_id"], row["topic_id"])
+        agg = expected_sessions.setdefault(
+            key, {"session_id": key[0], "topic_id": key[1], "students_attempted": 0,
+                  **{f: 0 for f in SUM_FIELDS}, **{f: None for f in MAX_FIELDS + MIN_FIELDS}}
+        )
+        agg["students_attempted"] += 1
+        for f in SUM_FIELDS:
+            agg[f] += row[f] or 0
+        for f in MAX_FIELDS:
+            if row[f] is not None and (agg[f] is None or row[f] > agg[f]):
+                agg[f] = row[f]
+        for f in MIN_FIELDS:
+            if row[f] is not None and (agg[f] is None or row[f] < agg[f]):
+                agg[f] = row[f]
+    stored_sessions = [dict(_row_items(r)) for r in conn.execute(
+        f"SELECT * FROM topic_session_rollup WHERE {where}", params
+    ).fetchall()]
+    mismatches += _diff_rows(
+        "topic_session_rollup", ("session_id", "topic_id"), ("students_attempted",) + STAT_FIELDS,
+        list(expected_sessions.values()), stored_sessions, tolerance,
+    )
+
+    # Cross-check against the live analytics view
+    view_checked = 0
+    view_error = None
+    stored_by_key = {(r["session_id"], r["topic_id"]): r for r in stored_sessions}
+    try:
+        view_rows = conn.execute(
+            f"""
+            SELECT session_id, topic_id, students_attempted, avg_understanding_score,
+                   avg_satisfaction_score, success_rate
+            FROM topic_difficulty_analysis
+            WHERE {where}
+            """,
+            params,
+        ).fetchall()
+    except sqlite3.Error as e:
+        view_rows = []
+        view_error = str(e)
+    for view_row in view_rows:
+        view_row = dict(_row_items(view_row))
+        metrics = derive_topic_metrics(stored_by_key.get((view_row["session_id"], view_row["topic_id"])))
+        derived = {
+            "students_attempted": metrics["students_attempted"],
+            "avg_understanding_score": metrics["avg_understanding"] or 0.0,
+            "avg_satisfaction_score": metrics["avg_satisfaction"] or 0.0,
+            "success_rate": metrics["success_rate"],
+        }
+        for field, value in derived.items():
+            if abs((view_row[field] or 0) - value) > tolerance:
+                mismatches.append({
+                    "table": "topic_difficulty_analysis",
+                    "key": [view_row["session_id"], view_row["topic_id"]],
+                    "field": field,
+                    "expected": view_row[field],
+                    "stored": value,
+                })
+        view_checked += 1
+
+    return {
+        "consistent": not mismatches,
+        "session_id": session_id,
+        "user_rows_checked": len(expected_users),
+        "session_rows_checked": len(expected_sessions),
+        "view_rows_checked": view_checked,
+        "view_error": view_error,
+        "mismatches": mismatches,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import os
+    import sys
+
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+    from database.database import DatabaseManager
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Rebuild or check topic analytics rollups")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--session-id", default=None, help="Limit to one session")
+    parser.add_argument("--db-path", default=os.getenv("APRAG_DB_PATH", "data/rag_assistant.db"))
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.db_path)
+    with db.get_connection() as connection:
+        if args.command == "rebuild":
+            print(json.dumps(rebuild_topic_rollups(connection, args.session_id), indent=2))
+        else:
+            report = check_rollup_consistency(connection, args.session_id)
+            print(json.dumps(report, indent=2, ensure_ascii=False, default=str))
+            sys.exit(0 if report["consistent"] else 1)
@@ -4,7 +4,7 @@ Handles emoji feedback and triggers adaptive response updates
 """
 
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from database.database import DatabaseManager
 from .score_calculator import ComprehensionScoreCalculator
 from .prompt_adapter import PromptAdapter
@@ -111,6 +111,57 @@ class FeedbackHandler:
                 'error': str(e)
             }
     
+    def process_feedback_batch(self, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Apply a list of emoji feedback events in order, in one transaction.
+        
+        Each event has user_id, session_id, emoji and optional interaction_id.
+        Events are validated up front; if any is invalid nothing is applied.
+        
+        Returns:
+            Dict with 'success', 'applied' and per-event 'results'
+        """
+        valid_emojis = ['👍', '😊', '😐', '❌']
+        for index, event in enumerate(events):
+            if event.get('emoji') not in valid_emojis:
+                return {
+                    'success': False,
+                    'error': f'Invalid emoji in event {index}. Must be one of: {valid_emojis}'
+                }
+        
+        try:
+            def update_interaction(conn, event, score_update):
+                if event.get('interaction_id'):
+                    self._write_interaction_ebars_data(
+                        conn, event['interaction_id'], event['emoji'], score_update
+                    )
+            
+            results = self.score_calculator.apply_feedback_batch(events, after_update=update_interaction)
+            return {
+                'success': True,
+                'applied': len(results),
+                'results': results
+            }
+        except Exception as e:
+            logger.error(f"Error processing feedback batch: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    @staticmethod
+    def _write_interaction_ebars_data(conn, interaction_id: int, emoji: str, score_update: Dict[str, Any]):
+        conn.execute("""
+            UPDATE student_interactions
+            SET emoji_feedback = ?,
+                feedback_score = ?
+            WHERE interaction_id = ?
+        """, (
+            emoji,
+            score_update['new_score'] / 100.0,  # Normalize to 0-1
+            interaction_id
+        ))
+    
     def _update_interaction_ebars_data(
         self,
         interaction_id: int,
@@ -120,18 +171,7 @@ class FeedbackHandler:
         """Update interaction record with EBARS data"""
         try:
             with self.db.get_connection() as conn:
-                # Check if emoji_feedback column exists and update it
-                # Also update any EBARS-related metadata
-                conn.execute("""
-                    UPDATE student_interactions
-                    SET emoji_feedback = ?,
-                        feedback_score = ?
-                    WHERE interaction_id = ?
-                """, (
-                    emoji,
-                    score_update['new_score'] / 100.0,  # Normalize to 0-1
-                    interaction_id
-                ))
+                self._write_interaction_ebars_data(conn, interaction_id, emoji, score_update)
                 conn.commit()
         except Exception as e:
             logger.warning(f"Could not update interaction EBARS data: {e}")
@@ -155,8 +195,9 @@ class FeedbackHandler:
             }
         """
         try:
-            # Get current score
-            score = self.score_calculator.get_score(user_id, session_id)
+            # One (cached) state read serves score, difficulty and statistics
+            state = self.score_calculator.get_state(user_id, session_id)
+            score = state['comprehension_score']
             difficulty = self.score_calculator.get_difficulty_level(user_id, session_id)
             
             # Get prompt parameters
@@ -166,36 +207,14 @@ class FeedbackHandler:
                 difficulty_level=difficulty
             )
             
-            # Get statistics
-            with self.db.get_connection() as conn:
-                cursor = conn.execute("""
-                    SELECT total_feedback_count, positive_feedback_count,
-                           negative_feedback_count, consecutive_positive_count,
-                           consecutive_negative_count, last_feedback_at
-                    FROM student_comprehension_scores
-                    WHERE user_id = ? AND session_id = ?
-                """, (user_id, session_id))
-                
-                row = cursor.fetchone()
-                
-                if row:
-                    stats = {
-                        'total_feedback_count': row['total_feedback_count'] or 0,
-                        'positive_feedback_count': row['positive_feedback_count'] or 0,
-                        'negative_feedback_count': row['negative_feedback_count'] or 0,
-                        'consecutive_positive': row['consecutive_positive_count'] or 0,
-                        'consecutive_negative': row['consecutive_negative_count'] or 0,
-                        'last_feedback_at': row['last_feedback_at'],
-                    }
-                else:
-                    stats = {
-                        'total_feedback_count': 0,
-                        'positive_feedback_count': 0,
-                        'negative_feedback_count': 0,
-                        'consecutive_positive': 0,
-                        'consecutive_negative': 0,
-                        'last_feedback_at': None,
-                    }
+            stats = {
+                'total_feedback_count': state['total_feedback_count'],
+                'positive_feedback_count': state['positive_feedback_count'],
+                'negative_feedback_count': state['negative_feedback_count'],
+                'consecutive_positive': state['consecutive_positive'],
+                'consecutive_negative': state['consecutive_negative'],
+                'last_feedback_at': state['last_feedback_at'],
+            }
             
             # Generate sample prompt for display
             sample_prompt = self.generate_adaptive_prompt(
@@ -21,7 +21,7 @@ def get_db() -> DatabaseManager:
     return DatabaseManager(db_path)
 from config.feature_flags import is_feature_enabled
 from .feedback_handler import FeedbackHandler
-from .score_calculator import ComprehensionScoreCalculator
+from .score_calculator import ComprehensionScoreCalculator, invalidate_cached_state
 from .prompt_adapter import PromptAdapter
 from .simulation_manager import SimulationRunner
 from .simulation_models import SimulationDatabaseManager, SimulationStatus
@@ -53,6 +53,11 @@ class FeedbackRequest(BaseModel):
     query_text: Optional[str] = None
 
 
+class BulkFeedbackRequest(BaseModel):
+    """Request model for applying several emoji feedback events at once"""
+    events: List[FeedbackRequest]
+
+
 class AdaptivePromptRequest(BaseModel):
     """Request model for adaptive prompt generation"""
     user_id: str
@@ -200,6 +205,46 @@ async def process_emoji_feedback(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/feedback/bulk")
+async def process_emoji_feedback_bulk(
+    request: BulkFeedbackRequest,
+    db: DatabaseManager = Depends(get_db)
+):
+    """
+    Apply a list of emoji feedback events in order, in a single transaction.
+    
+    Either every event is applied or none is. Returns one score update per
+    event, in request order.
+    """
+    try:
+        if not request.events:
+            return {"success": True, "applied": 0, "results": []}
+        
+        for session_id in {event.session_id for event in request.events}:
+            if not check_ebars_enabled(session_id):
+                raise HTTPException(
+                    status_code=403,
+                    detail=f"EBARS feature is disabled for session {session_id}"
+                )
+        
+        handler = FeedbackHandler(db)
+        result = handler.process_feedback_batch([event.dict() for event in request.events])
+        
+        if not result.get('success'):
+            raise HTTPException(
+                status_code=400,
+                detail=result.get('error', 'Failed to process feedback')
+            )
+        
+        return result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing bulk feedback: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 class EBARSStateRequest(BaseModel):
     """Request model for EBARS state with query and context (POST)"""
     query: Optional[str] = None
@@ -633,6 +678,7 @@ async def reset_comprehension_score(
                 WHERE user_id = ? AND session_id = ?
             """, (user_id, session_id))
             conn.commit()
+        invalidate_cached_state(user_id, session_id)
         
         return {
             "success": True,
@@ -690,6 +736,8 @@ async def reset_initial_test(
             
             conn.commit()
         
+        invalidate_cached_state(user_id, session_id)
+        
         logger.info(f"✅ Initial test reset for user {user_id}, session {session_id}")
         
         return {
@@ -864,6 +912,7 @@ async def generate_initial_test(
             logger.info(f"📦 Fetching chunks from: {DOCUMENT_PROCESSING_URL}/sessions/{session_id}/chunks")
             chunks_response = requests.get(
                 f"{DOCUMENT_PROCESSING_URL}/sessions/{session_id}/chunks",
+                params={"fields": "ids,metadata,text"},  # no embeddings; questions cite document_name/chunk_index
                 timeout=30
             )
             
@@ -1284,6 +1333,7 @@ async def generate_leveled_answers(
             try:
                 chunks_response = requests.get(
                     f"{DOCUMENT_PROCESSING_URL}/sessions/{request.session_id}/chunks",
+                    params={"fields": "ids,metadata,text"},
                     timeout=30
                 )
                 if chunks_response.status_code == 200:
@@ -1495,6 +1545,7 @@ async def submit_answer_preference(
                 WHERE user_id = ? AND session_id = ?
             """, (request.user_id, request.session_id))
             conn.commit()
+        invalidate_cached_state(request.user_id, request.session_id)
         
         logger.info(
             f"✅ Answer preference submitted: {request.user_id}/{request.session_id} "
@@ -1555,6 +1606,8 @@ async def reset_initial_test(
             
             conn.commit()
         
+        invalidate_cached_state(user_id, session_id)
+        
         logger.info(f"✅ Initial test reset for {user_id}/{session_id}")
         
         return {
@@ -2158,10 +2211,16 @@ async def start_simulation(
     Start a new EBARS simulation.
     
     This endpoint:
-    1. Creates a new simulation with 3 agents (struggling, fast learner, variable)
+    1. Creates a new simulation with `num_agents` agents cycling through the
+       struggling, fast learner and variable profiles
     2. Starts the simulation in background
     3. Returns simulation ID for tracking
     
+    Optional `config` keys:
+    - mode: "in_process" (default), "dry" (deterministic stub, no LLM) or "http"
+    - max_concurrency: agents running a turn at the same time
+    - seed: makes emoji feedback reproducible
+    
     The simulation runs asynchronously and can be monitored via status endpoint.
     """
     try:
@@ -2240,6 +2299,8 @@ async def start_simulation(
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error starting simulation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
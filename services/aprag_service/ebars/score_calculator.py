@@ -4,12 +4,45 @@ Calculates and updates comprehension scores (0-100) based on emoji feedback
 """
 
 import logging
-from typing import Optional, Dict, Any
+import os
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple, Callable
 from datetime import datetime
 from database.database import DatabaseManager
+from database.student_context import invalidate_student_context
 
 logger = logging.getLogger(__name__)
 
+# Short-lived state cache shared by all calculator instances of this process.
+# One query reads the EBARS state several times (score, difficulty, prompt
+# parameters); writes made here refresh the entry, other workers see them
+# after at most the TTL.
+STATE_CACHE_TTL_SECONDS = float(os.getenv("EBARS_STATE_CACHE_TTL", "2.0"))
+_state_cache: Dict[Tuple[str, str, str], Tuple[float, Dict[str, Any]]] = {}
+_state_cache_lock = threading.Lock()
+
+
+def invalidate_cached_state(user_id: str, session_id: str):
+    """Drop cached state after a direct write to student_comprehension_scores"""
+    with _state_cache_lock:
+        for key in [k for k in _state_cache if k[1] == user_id and k[2] == session_id]:
+            del _state_cache[key]
+    invalidate_student_context(user_id, session_id)
+
+
+def prime_cached_state(db: DatabaseManager, user_id: str, session_id: str, state: Dict[str, Any]):
+    """Seed the cache from a row read elsewhere; never replaces a live entry"""
+    if STATE_CACHE_TTL_SECONDS <= 0:
+        return
+    key = (getattr(db, "db_path", ""), user_id, session_id)
+    now = time.monotonic()
+    with _state_cache_lock:
+        cached = _state_cache.get(key)
+        if not cached or cached[0] <= now:
+            _state_cache[key] = (now + STATE_CACHE_TTL_SECONDS, dict(state))
+
+
 # Base emoji to delta mapping (will be adjusted dynamically)
 EMOJI_BASE_DELTA = {
     '👍': +5,   # Mükemmel - Öğrenci tam anladı
@@ -76,6 +109,73 @@ class ComprehensionScoreCalculator:
     def __init__(self, db: DatabaseManager):
         self.db = db
     
+    def _cache_key(self, user_id: str, session_id: str) -> Tuple[str, str, str]:
+        return (getattr(self.db, "db_path", ""), user_id, session_id)
+    
+    def _cache_state(self, user_id: str, session_id: str, state: Dict[str, Any]):
+        if STATE_CACHE_TTL_SECONDS <= 0:
+            return
+        with _state_cache_lock:
+            _state_cache[self._cache_key(user_id, session_id)] = (
+                time.monotonic() + STATE_CACHE_TTL_SECONDS, dict(state)
+            )
+    
+    @staticmethod
+    def _row_to_state(row) -> Dict[str, Any]:
+        return {
+            'comprehension_score': float(row["comprehension_score"]),
+            'difficulty_level': row["current_difficulty_level"],
+            'total_feedback_count': row["total_feedback_count"] or 0,
+            'positive_feedback_count': row["positive_feedback_count"] or 0,
+            'negative_feedback_count': row["negative_feedback_count"] or 0,
+            'consecutive_positive': row["consecutive_positive_count"] or 0,
+            'consecutive_negative': row["consecutive_negative_count"] or 0,
+            'last_feedback_at': row["last_feedback_at"],
+        }
+    
+    def _select_state(self, conn, user_id: str, session_id: str):
+        return conn.execute("""
+            SELECT comprehension_score, current_difficulty_level,
+                   consecutive_positive_count, consecutive_negative_count,
+                   total_feedback_count, positive_feedback_count, negative_feedback_count,
+                   last_feedback_at
+            FROM student_comprehension_scores
+            WHERE user_id = ? AND session_id = ?
+        """, (user_id, session_id)).fetchone()
+    
+    def get_state(self, user_id: str, session_id: str) -> Dict[str, Any]:
+        """
+        Get the full score row for a student-session pair (cached briefly).
+        Creates the default row (50.0 / normal) if it doesn't exist.
+        """
+        key = self._cache_key(user_id, session_id)
+        with _state_cache_lock:
+            cached = _state_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return dict(cached[1])
+        
+        with self.db.get_connection() as conn:
+            row = self._select_state(conn, user_id, session_id)
+            if not row:
+                self._create_default_score(conn, user_id, session_id)
+                row = self._select_state(conn, user_id, session_id)
+        
+        if row:
+            state = self._row_to_state(row)
+        else:
+            state = {
+                'comprehension_score': 50.0,
+                'difficulty_level': 'normal',
+                'total_feedback_count': 0,
+                'positive_feedback_count': 0,
+                'negative_feedback_count': 0,
+                'consecutive_positive': 0,
+                'consecutive_negative': 0,
+                'last_feedback_at': None,
+            }
+        self._cache_state(user_id, session_id, state)
+        return state
+    
     def get_score(self, user_id: str, session_id: str) -> float:
         """
         Get current comprehension score for a student-session pair.
@@ -89,35 +189,23 @@ class ComprehensionScoreCalculator:
             Current comprehension score (0-100)
         """
         try:
-            with self.db.get_connection() as conn:
-                cursor = conn.execute("""
-                    SELECT comprehension_score
-                    FROM student_comprehension_scores
-                    WHERE user_id = ? AND session_id = ?
-                """, (user_id, session_id))
-                
-                row = cursor.fetchone()
-                
-                if row:
-                    return float(row["comprehension_score"])
-                else:
-                    # Create default score
-                    return self._create_default_score(conn, user_id, session_id)
-                    
+            return self.get_state(user_id, session_id)['comprehension_score']
         except Exception as e:
             logger.error(f"Error getting comprehension score: {e}")
             return 50.0  # Default fallback
     
-    def _create_default_score(self, conn, user_id: str, session_id: str) -> float:
-        """Create default comprehension score entry"""
+    def _create_default_score(self, conn, user_id: str, session_id: str, commit: bool = True) -> float:
+        """Create default comprehension score entry (no-op if another request created it first)"""
         try:
             conn.execute("""
                 INSERT INTO student_comprehension_scores (
                     user_id, session_id, comprehension_score,
                     current_difficulty_level, created_at, last_updated
                 ) VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                ON CONFLICT(user_id, session_id) DO NOTHING
             """, (user_id, session_id, 50.0, 'normal'))
-            conn.commit()
+            if commit:
+                conn.commit()
             return 50.0
         except Exception as e:
             logger.error(f"Error creating default score: {e}")
@@ -152,138 +240,195 @@ class ComprehensionScoreCalculator:
             }
         """
         try:
-            # Get base delta for emoji
-            base_delta = EMOJI_BASE_DELTA.get(emoji, 0)
-            
-            if base_delta == 0:
+            if EMOJI_BASE_DELTA.get(emoji, 0) == 0:
                 logger.warning(f"Unknown emoji: {emoji}")
                 return self._get_current_state(user_id, session_id)
             
-            with self.db.get_connection() as conn:
-                # Get current score
-                cursor = conn.execute("""
-                    SELECT comprehension_score, current_difficulty_level,
-                           consecutive_positive_count, consecutive_negative_count,
-                           total_feedback_count, positive_feedback_count, negative_feedback_count
-                    FROM student_comprehension_scores
-                    WHERE user_id = ? AND session_id = ?
-                """, (user_id, session_id))
-                
-                row = cursor.fetchone()
-                
-                if not row:
-                    # Create default entry
-                    self._create_default_score(conn, user_id, session_id)
-                    previous_score = 50.0
-                    previous_difficulty = 'normal'
-                    consecutive_positive = 0
-                    consecutive_negative = 0
-                    total_feedback = 0
-                    positive_feedback = 0
-                    negative_feedback = 0
-                else:
-                    previous_score = float(row["comprehension_score"])
-                    previous_difficulty = row["current_difficulty_level"]
-                    consecutive_positive = row["consecutive_positive_count"] or 0
-                    consecutive_negative = row["consecutive_negative_count"] or 0
-                    total_feedback = row["total_feedback_count"] or 0
-                    positive_feedback = row["positive_feedback_count"] or 0
-                    negative_feedback = row["negative_feedback_count"] or 0
-                
-                # Calculate adaptive delta based on current score
-                delta = calculate_adaptive_delta(base_delta, previous_score)
-                
-                # Calculate new score
-                new_score = previous_score + delta
-                new_score = max(0.0, min(100.0, new_score))  # Clamp to 0-100
-                
-                # Determine new difficulty level with hysteresis
-                new_difficulty = self._score_to_difficulty_with_hysteresis(
-                    new_score, previous_difficulty
-                )
-                difficulty_changed = (previous_difficulty != new_difficulty)
-                
-                # Update consecutive counts
-                is_positive = emoji in ['👍', '😊']
-                is_negative = emoji in ['😐', '❌']
-                
-                if is_positive:
-                    consecutive_positive += 1
-                    consecutive_negative = 0
-                    positive_feedback += 1
-                elif is_negative:
-                    consecutive_negative += 1
-                    consecutive_positive = 0
-                    negative_feedback += 1
-                
-                total_feedback += 1
-                
-                # Determine adjustment type
-                adjustment_type = self._determine_adjustment_type(
-                    previous_score, new_score, emoji,
-                    consecutive_positive, consecutive_negative
-                )
-                
-                # Update database
-                conn.execute("""
-                    UPDATE student_comprehension_scores
-                    SET comprehension_score = ?,
-                        current_difficulty_level = ?,
-                        consecutive_positive_count = ?,
-                        consecutive_negative_count = ?,
-                        total_feedback_count = ?,
-                        positive_feedback_count = ?,
-                        negative_feedback_count = ?,
-                        last_updated = CURRENT_TIMESTAMP,
-                        last_feedback_at = CURRENT_TIMESTAMP
-                    WHERE user_id = ? AND session_id = ?
-                """, (
-                    new_score, new_difficulty,
-                    consecutive_positive, consecutive_negative,
-                    total_feedback, positive_feedback, negative_feedback,
-                    user_id, session_id
-                ))
-                
-                # Record in history
-                if interaction_id:
-                    conn.execute("""
-                        INSERT INTO ebars_feedback_history (
-                            user_id, session_id, interaction_id,
-                            emoji_feedback, previous_score, score_delta, new_score,
-                            previous_difficulty_level, new_difficulty_level, difficulty_changed,
-                            adjustment_type, timestamp
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                    """, (
-                        user_id, session_id, interaction_id,
-                        emoji, previous_score, delta, new_score,
-                        previous_difficulty, new_difficulty, difficulty_changed,
-                        adjustment_type
-                    ))
-                
-                conn.commit()
-                
-                logger.info(
-                    f"✅ Updated comprehension score: {user_id}/{session_id} "
-                    f"{previous_score:.1f} → {new_score:.1f} ({delta:+.1f}) "
-                    f"[{previous_difficulty} → {new_difficulty}]"
-                )
-                
-                return {
-                    'previous_score': previous_score,
-                    'new_score': new_score,
-                    'score_delta': delta,
-                    'previous_difficulty': previous_difficulty,
-                    'new_difficulty': new_difficulty,
-                    'difficulty_changed': difficulty_changed,
-                    'adjustment_type': adjustment_type,
-                    'consecutive_positive': consecutive_positive,
-                    'consecutive_negative': consecutive_negative,
-                }
+            return self.apply_feedback_batch([{
+                'user_id': user_id,
+                'session_id': session_id,
+                'emoji': emoji,
+                'interaction_id': interaction_id
+            }])[0]
                 
         except Exception as e:
             logger.error(f"Error updating comprehension score: {e}")
             return self._get_current_state(user_id, session_id)
     
+    def apply_feedback_batch(
+        self,
+        events: List[Dict[str, Any]],
+        after_update: Optional[Callable[[Any, Dict[str, Any], Dict[str, Any]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Apply feedback events in order inside one write transaction.
+        
+        The transaction starts with BEGIN IMMEDIATE, so the read-modify-write of
+        each score row is serialized against every other writer, including
+        other uvicorn workers. Either all events are applied or none.
+        
+        Args:
+            events: Dicts with user_id, session_id, emoji and optional interaction_id
+            after_update: Optional hook called as (conn, event, result) inside
+                the same transaction (e.g. to update the interaction row)
+            
+        Returns:
+            One score update dict per event (same shape as update_score)
+        """
+        results = []
+        final_states: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        
+        with self.db.get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for event in events:
+                    result, state = self._apply_feedback(
+                        conn,
+                        event['user_id'],
+                        event['session_id'],
+                        event['emoji'],
+                        event.get('interaction_id')
+                    )
+                    if after_update:
+                        after_update(conn, event, result)
+                    results.append(result)
+                    final_states[(event['user_id'], event['session_id'])] = state
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        
+        for (user_id, session_id), state in final_states.items():
+            self._cache_state(user_id, session_id, state)
+            invalidate_student_context(user_id, session_id)
+        return results
+    
+    def _apply_feedback(
+        self,
+        conn,
+        user_id: str,
+        session_id: str,
+        emoji: str,
+        interaction_id: Optional[int]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Score transition for one event; must run inside a write transaction."""
+        base_delta = EMOJI_BASE_DELTA.get(emoji, 0)
+        if base_delta == 0:
+            raise ValueError(f"Unknown emoji: {emoji}")
+        
+        row = self._select_state(conn, user_id, session_id)
+        if not row:
+            self._create_default_score(conn, user_id, session_id, commit=False)
+            row = self._select_state(conn, user_id, session_id)
+        
+        state = self._row_to_state(row)
+        previous_score = state['comprehension_score']
+        previous_difficulty = state['difficulty_level']
+        consecutive_positive = state['consecutive_positive']
+        consecutive_negative = state['consecutive_negative']
+        total_feedback = state['total_feedback_count']
+        positive_feedback = state['positive_feedback_count']
+        negative_feedback = state['negative_feedback_count']
+        
+        # Calculate adaptive delta based on current score
+        delta = calculate_adaptive_delta(base_delta, previous_score)
+        
+        # Calculate new score
+        new_score = previous_score + delta
+        new_score = max(0.0, min(100.0, new_score))  # Clamp to 0-100
+        
+        # Determine new difficulty level with hysteresis
+        new_difficulty = self._score_to_difficulty_with_hysteresis(
+            new_score, previous_difficulty
+        )
+        difficulty_changed = (previous_difficulty != new_difficulty)
+        
+        # Update consecutive counts
+        is_positive = emoji in ['👍', '😊']
+        is_negative = emoji in ['😐', '❌']
+        
+        if is_positive:
+            consecutive_positive += 1
+            consecutive_negative = 0
+            positive_feedback += 1
+        elif is_negative:
+            consecutive_negative += 1
+            consecutive_positive = 0
+            negative_feedback += 1
+        
+        total_feedback += 1
+        
+        # Determine adjustment type
+        adjustment_type = self._determine_adjustment_type(
+            previous_score, new_score, emoji,
+            consecutive_positive, consecutive_negative
+        )
+        
+        # Update database
+        conn.execute("""
+            UPDATE student_comprehension_scores
+            SET comprehension_score = ?,
+                current_difficulty_level = ?,
+                consecutive_positive_count = ?,
+                consecutive_negative_count = ?,
+                total_feedback_count = ?,
+                positive_feedback_count = ?,
+                negative_feedback_count = ?,
+                last_updated = CURRENT_TIMESTAMP,
+                last_feedback_at = CURRENT_TIMESTAMP
+            WHERE user_id = ? AND session_id = ?
+        """, (
+            new_score, new_difficulty,
+            consecutive_positive, consecutive_negative,
+            total_feedback, positive_feedback, negative_feedback,
+            user_id, session_id
+        ))
+        
+        # Record in history
+        if interaction_id:
+            conn.execute("""
+                INSERT INTO ebars_feedback_history (
+                    user_id, session_id, interaction_id,
+                    emoji_feedback, previous_score, score_delta, new_score,
+                    previous_difficulty_level, new_difficulty_level, difficulty_changed,
+                    adjustment_type, timestamp
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """, (
+                user_id, session_id, interaction_id,
+                emoji, previous_score, delta, new_score,
+                previous_difficulty, new_difficulty, difficulty_changed,
+                adjustment_type
+            ))
+        
+        logger.info(
+            f"✅ Updated comprehension score: {user_id}/{session_id} "
+            f"{previous_score:.1f} → {new_score:.1f} ({delta:+.1f}) "
+            f"[{previous_difficulty} → {new_difficulty}]"
+        )
+        
+        state.update({
+            'comprehension_score': new_score,
+            'difficulty_level': new_difficulty,
+            'total_feedback_count': total_feedback,
+            'positive_feedback_count': positive_feedback,
+            'negative_feedback_count': negative_feedback,
+            'consecutive_positive': consecutive_positive,
+            'consecutive_negative': consecutive_negative,
+            'last_feedback_at': datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+        })
+        result = {
+            'previous_score': previous_score,
+            'new_score': new_score,
+            'score_delta': delta,
+            'previous_difficulty': previous_difficulty,
+            'new_difficulty': new_difficulty,
+            'difficulty_changed': difficulty_changed,
+            'adjustment_type': adjustment_type,
+            'consecutive_positive': consecutive_positive,
+            'consecutive_negative': consecutive_negative,
+        }
+        return result, state
+    
     def _score_to_difficulty(self, score: float) -> str:
         """Convert score to difficulty level (fallback method)"""
         for level, (min_score, max_score) in DIFFICULTY_THRESHOLDS.items():
@@ -367,42 +512,23 @@ class ComprehensionScoreCalculator:
     def _get_current_state(self, user_id: str, session_id: str) -> Dict[str, Any]:
         """Get current state without updating"""
         try:
-            with self.db.get_connection() as conn:
-                cursor = conn.execute("""
-                    SELECT comprehension_score, current_difficulty_level
-                    FROM student_comprehension_scores
-                    WHERE user_id = ? AND session_id = ?
-                """, (user_id, session_id))
-                
-                row = cursor.fetchone()
-                
-                if row:
-                    score = float(row["comprehension_score"])
-                    difficulty = row["current_difficulty_level"]
-                else:
-                    score = 50.0
-                    difficulty = 'normal'
-                
-                return {
-                    'previous_score': score,
-                    'new_score': score,
-                    'score_delta': 0.0,
-                    'previous_difficulty': difficulty,
-                    'new_difficulty': difficulty,
-                    'difficulty_changed': False,
-                    'adjustment_type': 'no_change',
-                }
+            state = self.get_state(user_id, session_id)
+            score = state['comprehension_score']
+            difficulty = state['difficulty_level']
         except Exception as e:
             logger.error(f"Error getting current state: {e}")
-            return {
-                'previous_score': 50.0,
-                'new_score': 50.0,
-                'score_delta': 0.0,
-                'previous_difficulty': 'normal',
-                'new_difficulty': 'normal',
-                'difficulty_changed': False,
-                'adjustment_type': 'no_change',
-            }
+            score = 50.0
+            difficulty = 'normal'
+        
+        return {
+            'previous_score': score,
+            'new_score': score,
+            'score_delta': 0.0,
+            'previous_difficulty': difficulty,
+            'new_difficulty': difficulty,
+            'difficulty_changed': False,
+            'adjustment_type': 'no_change',
+        }
     
     def get_difficulty_level(self, user_id: str, session_id: str) -> str:
         """Get current difficulty level for student"""
@@ -1,10 +1,29 @@
 """
 EBARS Simulation Manager
 Manages simulation execution and agent interactions
+
+Simulation modes (``config['mode']``):
+- ``in_process`` (default): agents call the hybrid RAG pipeline directly and
+  take the interaction ID from the logged interaction, no HTTP or polling
+- ``dry``: the RAG pipeline/LLM is replaced with a deterministic local stub so
+  large agent populations can be run for EBARS parameter studies
+- ``http``: legacy behaviour, queries go through the API gateway with pacing
+  delays and interaction ID polling
+
+Agents of a turn run concurrently, bounded by ``config['max_concurrency']``.
+
+In-process mode runs the pipeline coroutines on one long-lived event loop in
+a dedicated thread (``run_on_pipeline_loop``). The pipeline makes blocking
+HTTP calls, so it must not run on the API's own loop. A fresh
+``asyncio.run`` loop per query would instead break anything the pipeline
+binds to its loop (async clients, locks, caches) on the next query. Pipeline
+calls therefore overlap only where they await; feedback, state reads and
+logging of the agents still run concurrently.
 """
 
 import asyncio
 import logging
+import threading
 import uuid
 import time
 import random
@@ -17,12 +36,44 @@ from .simulation_models import SimulationDatabaseManager, SimulationStatus, Agen
 from .feedback_handler import FeedbackHandler
 from .score_calculator import ComprehensionScoreCalculator
 import os
+import hashlib
+import json
 
 # Import get_db function from router
 from .router import get_db
 
 logger = logging.getLogger(__name__)
 
+SIMULATION_MODES = ("in_process", "dry", "http")
+DEFAULT_SIMULATION_MODE = os.getenv("EBARS_SIM_MODE", "in_process")
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("EBARS_SIM_MAX_CONCURRENCY", "5"))
+
+LEVELS = ['very_struggling', 'struggling', 'normal', 'good', 'excellent']
+
+# Event loop (and its thread) shared by all in-process pipeline calls
+_pipeline_loop: Optional[asyncio.AbstractEventLoop] = None
+_pipeline_loop_lock = threading.Lock()
+
+
+def _get_pipeline_loop() -> asyncio.AbstractEventLoop:
+    global _pipeline_loop
+    with _pipeline_loop_lock:
+        if _pipeline_loop is None or _pipeline_loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="ebars-sim-pipeline", daemon=True).start()
+            _pipeline_loop = loop
+        return _pipeline_loop
+
+
+async def run_on_pipeline_loop(coro):
+    """Await ``coro`` on the shared pipeline loop (cancelling the caller cancels it there)"""
+    future = asyncio.run_coroutine_threadsafe(coro, _get_pipeline_loop())
+    return await asyncio.wrap_future(future)
+
+
+# Dry mode answer length per difficulty level (sentences)
+_DRY_SENTENCES = {'very_struggling': 8, 'struggling': 6, 'normal': 4, 'good': 3, 'excellent': 2}
+
 @dataclass
 class TurnData:
     """Data structure for a single turn"""
@@ -41,6 +92,22 @@ class TurnData:
     interaction_id: Optional[int] = None
     feedback_sent: bool = False
 
+def dry_run_answer(question: str, difficulty_level: str) -> str:
+    """
+    Deterministic stand-in for the LLM answer used in dry simulations.
+    
+    Same question and level always give the same text; lower comprehension
+    levels get longer, more step-by-step answers, mirroring EBARS prompts.
+    """
+    digest = hashlib.sha256(f"{difficulty_level}|{question}".encode("utf-8")).hexdigest()
+    sentences = _DRY_SENTENCES.get(difficulty_level, 4)
+    body = " ".join(
+        f"Adım {i + 1}: {question.rstrip('?')} ile ilgili açıklama ({digest[i * 4:(i + 1) * 4]})."
+        for i in range(sentences)
+    )
+    return f"[dry-run:{difficulty_level}] {body}"
+
+
 class SimulationAgent:
     """Base simulation agent class"""
     
@@ -54,7 +121,9 @@ class SimulationAgent:
         feedback_strategy: str,
         emoji_distribution: Dict[str, float],
         db_manager: SimulationDatabaseManager,
-        feedback_handler: FeedbackHandler
+        feedback_handler: FeedbackHandler,
+        mode: str = DEFAULT_SIMULATION_MODE,
+        seed: Optional[int] = None
     ):
         self.agent_id = agent_id
         self.agent_name = agent_name
@@ -65,6 +134,9 @@ class SimulationAgent:
         self.emoji_distribution = emoji_distribution
         self.db_manager = db_manager
         self.feedback_handler = feedback_handler
+        self.mode = mode
+        # Per-agent RNG so seeded runs are reproducible even when agents interleave
+        self.rng = random.Random(seed)
         
         self.turn_data = []
         self.previous_score = None
@@ -76,14 +148,14 @@ class SimulationAgent:
         if self.feedback_strategy == 'variable':
             # Dalgalı agent: First 10 turns negative, then positive
             if turn_number <= 10:
-                return random.choices(['❌', '😐'], weights=[0.8, 0.2])[0]
+                return self.rng.choices(['❌', '😐'], weights=[0.8, 0.2])[0]
             else:
-                return random.choices(['👍', '😊'], weights=[0.8, 0.2])[0]
+                return self.rng.choices(['👍', '😊'], weights=[0.8, 0.2])[0]
         
         # Use emoji distribution
         emojis = list(self.emoji_distribution.keys())
         weights = list(self.emoji_distribution.values())
-        return random.choices(emojis, weights=weights)[0]
+        return self.rng.choices(emojis, weights=weights)[0]
     
     async def ask_question_internal(self, question: str) -> Dict[str, Any]:
         """Ask question using internal API calls instead of HTTP"""
@@ -95,8 +167,9 @@ class SimulationAgent:
             api_base_url = os.getenv("API_GATEWAY_URL", "http://localhost:8000")
             
             import requests
-            response = requests.post(
-                f"{api_base_url}/aprag/hybrid-rag/query",
+            response = await asyncio.to_thread(
+                requests.post,
+                f"{api_base_url}/api/aprag/hybrid-rag/query",
                 json={
                     "user_id": self.user_id,
                     "session_id": self.session_id,
@@ -123,6 +196,82 @@ class SimulationAgent:
                 "processing_time_ms": processing_time
             }
     
+    async def ask_question_in_process(self, question: str) -> Dict[str, Any]:
+        """Run the hybrid RAG pipeline in-process and log the interaction"""
+        from api.hybrid_rag_query import hybrid_rag_query, HybridRAGQueryRequest
+        
+        start_time = time.time()
+        request = HybridRAGQueryRequest(
+            user_id=self.user_id,
+            session_id=self.session_id,
+            query=question
+        )
+        # Off the API loop (blocking HTTP inside), always on the same loop
+        response = await run_on_pipeline_loop(hybrid_rag_query(request))
+        processing_time = (time.time() - start_time) * 1000
+        
+        response_data = response.model_dump() if hasattr(response, "model_dump") else response.dict()
+        interaction_id = await asyncio.to_thread(
+            self._log_interaction, question, response_data.get("answer", ""),
+            processing_time, (response_data.get("debug_info") or {}).get("interaction_metadata", {}).get("model_used")
+        )
+        return {
+            "response_data": response_data,
+            "processing_time_ms": processing_time,
+            "interaction_id": interaction_id
+        }
+    
+    async def ask_question_dry(self, question: str) -> Dict[str, Any]:
+        """Answer with a deterministic local stub (no retrieval, no LLM)"""
+        start_time = time.time()
+        level = self.previous_level or "normal"
+        answer = dry_run_answer(question, level)
+        processing_time = (time.time() - start_time) * 1000
+        interaction_id = await asyncio.to_thread(
+            self._log_interaction, question, answer, processing_time, "dry-run-stub"
+        )
+        return {
+            "response_data": {"answer": answer},
+            "processing_time_ms": processing_time,
+            "interaction_id": interaction_id
+        }
+    
+    def _log_interaction(
+        self,
+        question: str,
+        answer: str,
+        processing_time_ms: float,
+        model_used: Optional[str]
+    ) -> Optional[int]:
+        """Insert the student interaction directly and return its ID"""
+        try:
+            return self.db_manager.db.execute_insert("""
+                INSERT INTO student_interactions
+                (user_id, session_id, query, original_response,
+                 processing_time_ms, model_used, chain_type, metadata)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                self.user_id,
+                self.session_id,
+                question,
+                answer,
+                int(processing_time_ms),
+                model_used,
+                "ebars_simulation",
+                json.dumps({"simulation_agent_id": self.agent_id, "mode": self.mode})
+            ))
+        except Exception as e:
+            logger.warning(f"Could not log simulated interaction: {e}")
+            return None
+    
+    async def ask_question(self, question: str) -> Dict[str, Any]:
+        """Dispatch the question according to the simulation mode"""
+        if self.mode == "dry":
+            return await self.ask_question_dry(question)
+        if self.mode == "in_process":
+            return await self.ask_question_in_process(question)
+        return await self.ask_question_internal(question)
+    
     async def get_latest_interaction_id(self) -> Optional[int]:
         """Get latest interaction ID from database"""
         try:
@@ -181,32 +330,35 @@ class SimulationAgent:
         answer = ""
         processing_time = 0
         
+        interaction_id = None
         try:
-            # Ask question using internal API
-            result = await self.ask_question_internal(question)
+            result = await self.ask_question(question)
             answer = result["response_data"].get("answer", "")
             processing_time = result["processing_time_ms"]
+            interaction_id = result.get("interaction_id")
         except Exception as e:
             logger.error(f"   ❌ Query failed: {e}")
             error_message = str(e)
             answer, processing_time = "", 0
         
-        # Get interaction ID
-        interaction_id = await self.get_latest_interaction_id()
+        # Over HTTP the interaction is logged elsewhere, so it has to be polled
+        if self.mode == "http":
+            interaction_id = await self.get_latest_interaction_id()
         
         # Generate and send feedback
         emoji = self.get_emoji_feedback(self.turn_count)
         feedback_sent = False
         
         if interaction_id:
-            feedback_sent = self.send_feedback_internal(interaction_id, emoji)
+            feedback_sent = await asyncio.to_thread(self.send_feedback_internal, interaction_id, emoji)
             logger.info(f"   {'✅' if feedback_sent else '⚠️'} Feedback: {emoji} (interaction_id: {interaction_id})")
         else:
             logger.warning(f"   ⚠️ No interaction_id found for turn {self.turn_count}")
         
         # Get updated state
-        await asyncio.sleep(1)  # Give time for feedback processing
-        state = self.get_current_state()
+        if self.mode == "http":
+            await asyncio.sleep(1)  # Give time for feedback processing
+        state = await asyncio.to_thread(self.get_current_state)
         current_score = state.get("comprehension_score", self.previous_score or 50.0)
         current_level = state.get("difficulty_level", self.previous_level or "normal")
         score_delta = (current_score - self.previous_score) if self.previous_score else 0.0
@@ -214,7 +366,7 @@ class SimulationAgent:
         # Calculate level transition
         level_transition = "same"
         if self.previous_level and self.previous_level != current_level:
-            levels = ['very_struggling', 'struggling', 'normal', 'good', 'excellent']
+            levels = LEVELS
             try:
                 if levels.index(current_level) > levels.index(self.previous_level):
                     level_transition = "up"
@@ -242,7 +394,8 @@ class SimulationAgent:
         )
         
         # Record turn in database
-        self.db_manager.record_turn(
+        await asyncio.to_thread(
+            self.db_manager.record_turn,
             simulation_id=simulation_id,
             agent_id=self.agent_id,
             turn_number=self.turn_count,
@@ -279,6 +432,9 @@ class EBARSSimulation:
         self.agents: List[SimulationAgent] = []
         self.questions: List[str] = []
         self.simulation_id = None
+        self.mode = DEFAULT_SIMULATION_MODE
+        self.max_concurrency = DEFAULT_MAX_CONCURRENCY
+        self.seed: Optional[int] = None
     
     def initialize_tables(self):
         """Initialize simulation database tables"""
@@ -289,6 +445,13 @@ class EBARSSimulation:
         self.simulation_id = str(uuid.uuid4())
         self.questions = questions
         
+        mode = config.get('mode', DEFAULT_SIMULATION_MODE)
+        if mode not in SIMULATION_MODES:
+            raise ValueError(f"Unknown simulation mode '{mode}'. Use one of: {list(SIMULATION_MODES)}")
+        self.mode = mode
+        self.max_concurrency = max(1, int(config.get('max_concurrency', DEFAULT_MAX_CONCURRENCY)))
+        self.seed = config.get('seed')
+        
         result = self.db_manager.create_simulation(
             simulation_id=self.simulation_id,
             session_id=self.session_id,
@@ -338,7 +501,9 @@ class EBARSSimulation:
             feedback_strategy=feedback_strategy,
             emoji_distribution=emoji_distribution,
             db_manager=self.db_manager,
-            feedback_handler=self.feedback_handler
+            feedback_handler=self.feedback_handler,
+            mode=self.mode,
+            seed=None if self.seed is None else f"{self.seed}:{agent_id}"
         )
         
         self.agents.append(agent)
@@ -354,7 +519,23 @@ class EBARSSimulation:
         if len(self.questions) < num_turns:
             raise Exception(f"Not enough questions: {len(self.questions)} < {num_turns}")
         
-        logger.info(f"🚀 Starting simulation {self.simulation_id}: {num_turns} turns, {len(self.agents)} agents")
+        logger.info(
+            f"🚀 Starting simulation {self.simulation_id}: {num_turns} turns, {len(self.agents)} agents "
+            f"(mode={self.mode}, concurrency={self.max_concurrency})"
+        )
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def run_agent_turn(agent: SimulationAgent, turn: int, question: str) -> bool:
+            async with semaphore:
+                try:
+                    await agent.run_turn(self.simulation_id, question)
+                    if self.mode == "http":
+                        await asyncio.sleep(1)  # Small delay between agents
+                    return True
+                except Exception as e:
+                    logger.error(f"❌ Agent {agent.agent_id} failed on turn {turn}: {e}")
+                    # Continue with other agents
+                    return False
         
         # Update status to running
         self.db_manager.update_simulation_status(self.simulation_id, SimulationStatus.RUNNING)
@@ -373,16 +554,11 @@ class EBARSSimulation:
                     status_message=f"Running turn {turn}/{num_turns}"
                 )
                 
-                # Run turn for each agent
-                agents_completed = 0
-                for agent in self.agents:
-                    try:
-                        await agent.run_turn(self.simulation_id, question)
-                        agents_completed += 1
-                        await asyncio.sleep(1)  # Small delay between agents
-                    except Exception as e:
-                        logger.error(f"❌ Agent {agent.agent_id} failed on turn {turn}: {e}")
-                        # Continue with other agents
+                # Run turn for all agents (bounded concurrency)
+                results = await asyncio.gather(
+                    *(run_agent_turn(agent, turn, question) for agent in self.agents)
+                )
+                agents_completed = sum(1 for ok in results if ok)
                 
                 # Update progress after turn
                 self.db_manager.update_progress(
@@ -393,7 +569,7 @@ class EBARSSimulation:
                 )
                 
                 # Delay between turns
-                if turn < num_turns:
+                if turn < num_turns and self.mode == "http":
                     await asyncio.sleep(2)
             
             # Mark as completed
@@ -436,14 +612,10 @@ class SimulationRunner:
         simulation = EBARSSimulation(session_id, db)
         simulation.initialize_tables()
         
-        # CRITICAL FIX: create_simulation returns a dict, not a string
-        result = simulation.create_simulation(questions, config)
-        if not result['success']:
-            raise Exception(f"Failed to create simulation: {result.get('error', 'Unknown error')}")
-        simulation_id = result['simulation_id']
+        simulation_id = simulation.create_simulation(questions, config)
         
-        # Add default agents
-        agents_config = [
+        # Default agent profiles; larger populations cycle through them
+        agent_profiles = [
             {
                 'agent_id': f'agent_a_{simulation_id[:8]}',
                 'agent_name': 'Ajan A (Zorlanan)',
@@ -471,7 +643,14 @@ class SimulationRunner:
         ]
         
         # Add agents
-        for agent_config in agents_config:
+        num_agents = max(1, int(config.get('num_agents', len(agent_profiles))))
+        for index in range(num_agents):
+            agent_config = dict(agent_profiles[index % len(agent_profiles)])
+            if index >= len(agent_profiles):
+                suffix = f"_{index // len(agent_profiles)}"
+                agent_config['agent_id'] += suffix
+                agent_config['user_id'] += suffix
+                agent_config['agent_name'] += f" #{index // len(agent_profiles) + 1}"
             simulation.add_agent(**agent_config)
         
         # Start simulation task
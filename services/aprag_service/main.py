@@ -89,6 +89,7 @@ except ImportError:
 
 # Import database and API modules
 from database.database import DatabaseManager
+from database import feedback_aggregates
 from api import interactions, feedback, profiles, personalization, recommendations, analytics, settings, topics, knowledge_extraction, hybrid_rag_query, session_settings, modules, async_hybrid_rag_query, survey, model_management, question_pool
 
 # Import CACS scoring (Faz 2 - Eğitsel-KBRAG)
@@ -162,6 +163,12 @@ async def lifespan(app: FastAPI):
         logger.warning(f"Could not load feature flags from database: {e}")
         logger.info("Using default feature flag values")
     
+    # Fold feedback events left over from the previous run, then keep aggregating
+    try:
+        feedback_aggregates.get_feedback_aggregator(db_manager)
+    except Exception as e:
+        logger.warning(f"Could not start feedback aggregator: {e}")
+    
     # Check if APRAG is enabled
     if not FeatureFlags.is_aprag_enabled():
         logger.warning("APRAG module is disabled. Service will start but features will be inactive.")
@@ -172,6 +179,14 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down APRAG Service...")
+    try:
+        recommendations.refresh_worker.stop()
+    except Exception as e:
+        logger.warning(f"Could not stop recommendation refresh worker: {e}")
+    try:
+        feedback_aggregates.stop_feedback_aggregators()
+    except Exception as e:
+        logger.warning(f"Could not stop feedback aggregator: {e}")
 
 
 # Create FastAPI app
@@ -13,6 +13,9 @@ import os
 from datetime import datetime
 import numpy as np
 
+from utils.turkish_text import analyze, match_terms
+from services.qa_fast_path import QA_FAST_PATH_THRESHOLD
+
 logger = logging.getLogger(__name__)
 
 # Environment variables
@@ -32,8 +35,8 @@ class HybridKnowledgeRetriever:
     
     Retrieval Strategy:
     - Query → Classify to topic
+    - Check QA similarity (fast path, find_direct_answer)
     - Retrieve chunks (traditional)
-    - Check QA similarity (fast path)
     - Get KB summary (structured knowledge)
     - Merge and rank results
     """
@@ -42,6 +45,8 @@ class HybridKnowledgeRetriever:
         self.db = db_manager
         self.qa_similarity_threshold = 0.85  # High similarity for direct answer
         self.kb_usage_threshold = 0.7  # Minimum topic classification confidence
+        self.qa_matching_threshold = 0.6  # Minimum topic confidence to check QA pairs
+        self.direct_answer_threshold = QA_FAST_PATH_THRESHOLD  # Serve the stored answer above this
     
     async def retrieve_for_query(
         self,
@@ -50,7 +55,9 @@ class HybridKnowledgeRetriever:
         top_k: int = 10,
         use_kb: bool = True,
         use_qa_pairs: bool = True,
-        embedding_model: Optional[str] = None
+        embedding_model: Optional[str] = None,
+        topic_classification: Optional[Dict[str, Any]] = None,
+        qa_matches: Optional[List[Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
         """
         Hybrid retrieval combining chunks + KB + QA
@@ -61,6 +68,10 @@ class HybridKnowledgeRetriever:
             top_k: Number of chunks to retrieve
             use_kb: Whether to use knowledge base
             use_qa_pairs: Whether to check QA pairs
+            topic_classification: Result of an earlier ``find_direct_answer``
+                (skips classification)
+            qa_matches: QA matches of an earlier ``find_direct_answer``
+                (skips QA matching)
             
         Returns:
             Dictionary with:
@@ -73,8 +84,9 @@ class HybridKnowledgeRetriever:
         retrieval_start = datetime.now()
         
         # 1. TOPIC CLASSIFICATION
-        logger.info(f"🎯 Classifying query to topics: {query[:50]}...")
-        topic_classification = await self._classify_to_topics(query, session_id)
+        if topic_classification is None:
+            logger.info(f"🎯 Classifying query to topics: {query[:50]}...")
+            topic_classification = await self._classify_to_topics(query, session_id)
         matched_topics = topic_classification.get("matched_topics", [])
         classification_confidence = topic_classification.get("confidence", 0.0)
         
@@ -83,10 +95,11 @@ class HybridKnowledgeRetriever:
         chunk_results = await self._retrieve_chunks(query, session_id, top_k, embedding_model)
         
         # 3. QA PAIRS MATCHING (if high topic confidence)
-        qa_matches = []
-        if use_qa_pairs and matched_topics and classification_confidence > 0.6:
-            logger.info(f"❓ Checking QA pairs...")
-            qa_matches = await self._match_qa_pairs(query, matched_topics, embedding_model)
+        if qa_matches is None:
+            qa_matches = []
+            if use_qa_pairs and matched_topics and classification_confidence > self.qa_matching_threshold:
+                logger.info(f"❓ Checking QA pairs...")
+                qa_matches = await self._match_qa_pairs(query, matched_topics, embedding_model)
         
         # 4. KNOWLEDGE BASE RETRIEVAL
         kb_results = []
@@ -125,6 +138,49 @@ class HybridKnowledgeRetriever:
             }
         }
     
+    async def find_direct_answer(
+        self,
+        query: str,
+        session_id: str,
+        embedding_model: Optional[str] = None,
+        threshold: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        QA fast path: topic classification and QA matching only
+        
+        Runs before any chunk retrieval. Pass ``topic_classification`` and
+        ``qa_matches`` of the result to ``retrieve_for_query`` when there is
+        no direct answer, so neither step runs twice.
+        
+        Returns:
+            {
+                "direct_answer": best QA pair above the threshold or None,
+                "topic_classification": {...},
+                "qa_matches": [...],
+                "lookup_time_ms": int
+            }
+        """
+        lookup_start = datetime.now()
+        
+        topic_classification = await self._classify_to_topics(query, session_id)
+        matched_topics = topic_classification.get("matched_topics", [])
+        
+        qa_matches = []
+        if matched_topics and topic_classification.get("confidence", 0.0) > self.qa_matching_threshold:
+            logger.info(f"❓ [QA FAST PATH] Checking QA pairs...")
+            qa_matches = await self._match_qa_pairs(query, matched_topics, embedding_model)
+        
+        direct_answer = self.get_direct_answer_if_available(
+            {"results": {"qa_pairs": qa_matches}}, threshold=threshold
+        )
+        
+        return {
+            "direct_answer": direct_answer,
+            "topic_classification": topic_classification,
+            "qa_matches": qa_matches,
+            "lookup_time_ms": int((datetime.now() - lookup_start).total_seconds() * 1000)
+        }
+    
     async def _classify_to_topics(self, query: str, session_id: str) -> Dict[str, Any]:
         """
         Classify query to one or more topics using LLM with improved fallback and caching
@@ -373,16 +429,11 @@ En alakalı 1-3 konu seç. Sadece JSON çıktısı ver."""
         - Title matching (boost)
         - Description matching (lower weight)
         """
-        query_lower = query.lower()
+        # Shared Turkish normalization: stopwords removed, light-stemmed, ASCII-folded terms
+        query_text = match_terms(query)
+        query_words = [w for w in analyze(query).terms if len(w) > 2]
         matched = []
         
-        # Extract query words (remove stopwords)
-        import re
-        stopwords = {'nedir', 'neden', 'nasıl', 'ne', 'hangi', 'kim', 'nerede', 'ne zaman', 
-                     'ile', 've', 'veya', 'için', 'gibi', 'kadar', 'daha', 'çok', 'az', 
-                     'bir', 'bu', 'şu', 'o', 'da', 'de', 'ki', 'mi', 'mı', 'mu', 'mü'}
-        query_words = [w for w in re.findall(r'\b\w+\b', query_lower) if w not in stopwords and len(w) > 2]
-        
         logger.debug(f"🔑 [KEYWORD CLASSIFICATION] Query words: {query_words}")
         
         for topic in topics:
@@ -391,11 +442,11 @@ En alakalı 1-3 konu seç. Sadece JSON çıktısı ver."""
                 continue
                 
             topic_id = topic.get("topic_id")
-            topic_title = str(topic.get("topic_title") or "").lower()
-            topic_description = str(topic.get("description") or "").lower()
+            topic_title = match_terms(str(topic.get("topic_title") or ""))
+            topic_description = match_terms(str(topic.get("description") or ""))
             keywords_raw = topic.get("keywords", []) or []
             # Filter out None values and ensure all are strings
-            keywords = [str(kw).lower() for kw in keywords_raw if kw is not None and str(kw).strip()]
+            keywords = [match_terms(str(kw)) for kw in keywords_raw if kw is not None and str(kw).strip()]
             
             # Score components
             keyword_matches = 0
@@ -404,13 +455,12 @@ En alakalı 1-3 konu seç. Sadece JSON çıktısı ver."""
             
             # 1. Exact keyword matching
             for kw in keywords:
-                if not kw or not isinstance(kw, str):
+                if not kw:
                     continue
-                kw_lower = kw.lower()
-                if kw_lower in query_lower:
+                if kw in query_text:
                     keyword_matches += 1
                 # Also check if keyword appears in query words
-                if kw_lower in query_words:
+                if kw in query_words:
                     keyword_matches += 0.5  # Partial match bonus
             
             # 2. Title matching (higher weight)
@@ -1250,17 +1300,23 @@ En alakalı 1-3 konu seç. Sadece JSON çıktısı ver."""
         
         return merged
     
-    def get_direct_answer_if_available(self, retrieval_result: Dict) -> Optional[Dict[str, Any]]:
+    def get_direct_answer_if_available(
+        self,
+        retrieval_result: Dict,
+        threshold: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Check if we have a direct answer from QA pairs
-        Returns QA pair if similarity > 0.90 (very high)
+        Returns the top QA pair if its similarity is above ``threshold``
+        (default: direct_answer_threshold, 0.90)
         """
         
+        threshold = self.direct_answer_threshold if threshold is None else threshold
         qa_matches = retrieval_result.get("results", {}).get("qa_pairs", [])
         
         if qa_matches and len(qa_matches) > 0:
             top_qa = qa_matches[0]
-            if top_qa["similarity_score"] > 0.90:
+            if top_qa["similarity_score"] > threshold:
                 logger.info(
                     f"🎯 DIRECT ANSWER AVAILABLE! "
                     f"Similarity: {top_qa['similarity_score']:.3f}"
@@ -0,0 +1,131 @@
+"""
+QA Pair Fast Path
+Direct answers from the curated QA bank for hybrid RAG queries
+
+``POST /hybrid-rag/query`` used to run topic classification, chunk retrieval,
+QA matching and KB lookup for every question, and only then check whether
+the best QA pair was good enough to answer directly. A near-exact match
+still paid for the vector search (and its embedding call) before the LLM and
+reranker were skipped.
+
+Now the endpoint asks ``HybridKnowledgeRetriever.find_direct_answer`` first
+(topic classification + QA matching only). When the best teacher-approved
+pair is above the threshold the stored answer is returned immediately,
+lightly adapted to the student's EBARS difficulty level with a fixed
+template (no LLM). Otherwise the normal path continues and reuses the
+classification and QA matches already computed.
+
+Threshold (highest priority first): request ``qa_fast_path_threshold``,
+session RAG setting ``qa_fast_path_threshold``, ``QA_FAST_PATH_THRESHOLD``
+(default 0.90, the previous direct-answer cut-off). Any value is clamped to
+[``QA_FAST_PATH_MIN_THRESHOLD`` (default 0.80), 1.0]: the stored answer skips
+retrieval and the LLM, so a client must not be able to turn loose matches
+into direct answers.
+``QA_FAST_PATH_ENABLED=false`` restores the old order.
+
+Hit/miss counts and latencies per session: database/qa_fast_path_stats.py,
+served by ``GET /hybrid-rag/qa-fast-path/{session_id}``.
+"""
+
+import logging
+import os
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+QA_FAST_PATH_ENABLED = os.getenv("QA_FAST_PATH_ENABLED", "true").lower() == "true"
+QA_FAST_PATH_THRESHOLD = float(os.getenv("QA_FAST_PATH_THRESHOLD", "0.90"))
+QA_FAST_PATH_MIN_THRESHOLD = float(os.getenv("QA_FAST_PATH_MIN_THRESHOLD", "0.80"))
+
+# Anonymous callers have no EBARS state
+ANONYMOUS_USER_ID = "student"
+
+# Template pieces per EBARS difficulty level; "normal" gives the same text as
+# the old direct answer (answer + explanation)
+DIFFICULTY_TEMPLATES: Dict[str, Dict[str, str]] = {
+    'very_struggling': {
+        'intro': "Bu soruyu birlikte, adım adım ele alalım.\n\n",
+        'explanation': "\n\n🧩 Daha basit anlatımla: {explanation}",
+        'outro': "\n\n💬 Anlamadığın bir nokta olursa bu kısmı tekrar sorabilirsin.",
+    },
+    'struggling': {
+        'intro': "",
+        'explanation': "\n\n💡 {explanation}",
+        'outro': "\n\n💬 İstersen bunu bir örnekle tekrar açıklayabilirim.",
+    },
+    'normal': {
+        'intro': "",
+        'explanation': "\n\n💡 {explanation}",
+        'outro': "",
+    },
+    'good': {
+        'intro': "",
+        'explanation': "\n\n💡 {explanation}",
+        'outro': "\n\n🚀 Bir adım ileri: bu bilgiyi farklı bir örnek üzerinde sınamayı dene.",
+    },
+    'excellent': {
+        # Kısa ve öz: açıklama atlanır, derinleştirme önerilir
+        'intro': "",
+        'explanation': "",
+        'outro': "\n\n🚀 Bir adım ileri: bu kuralın hangi durumlarda geçerli olmadığını düşünmeyi dene.",
+    },
+}
+
+
+def resolve_threshold(request_value: Optional[float], session_rag_settings: Optional[Dict[str, Any]]) -> float:
+    """Effective similarity threshold: request > session settings > environment, clamped to [min, 1.0]"""
+    for value in (request_value, (session_rag_settings or {}).get("qa_fast_path_threshold")):
+        if value is not None:
+            try:
+                return _clamp_threshold(float(value))
+            except (TypeError, ValueError):
+                logger.warning(f"⚠️ Invalid qa_fast_path_threshold ignored: {value!r}")
+    return _clamp_threshold(QA_FAST_PATH_THRESHOLD)
+
+
+def _clamp_threshold(value: float) -> float:
+    clamped = min(max(value, QA_FAST_PATH_MIN_THRESHOLD), 1.0)
+    if clamped != value:
+        logger.warning(f"⚠️ qa_fast_path_threshold {value} out of range, using {clamped}")
+    return clamped
+
+
+def get_ebars_difficulty(db, user_id: Optional[str], session_id: str) -> Optional[str]:
+    """EBARS difficulty level of the student, None when EBARS is off or unavailable"""
+    if not user_id or user_id == ANONYMOUS_USER_ID:
+        return None
+    try:
+        from config.feature_flags import FeatureFlags
+        if not FeatureFlags.is_ebars_enabled(session_id):
+            return None
+
+        from ebars.score_calculator import ComprehensionScoreCalculator
+        return ComprehensionScoreCalculator(db).get_difficulty_level(user_id, session_id)
+    except Exception as e:
+        logger.debug(f"Could not get EBARS difficulty for QA fast path (non-critical): {e}")
+        return None
+
+
+def personalize_answer(
+    qa_pair: Dict[str, Any],
+    difficulty_level: Optional[str] = None,
+    kb_summary: Optional[str] = None
+) -> str:
+    """
+    Stored QA answer formatted for the student's difficulty level
+
+    Args:
+        qa_pair: Matched topic_qa_pairs row (answer, optional explanation)
+        difficulty_level: EBARS level; unknown levels are treated as "normal"
+        kb_summary: Optional topic summary appended as extra information
+    """
+    template = DIFFICULTY_TEMPLATES.get(difficulty_level or 'normal', DIFFICULTY_TEMPLATES['normal'])
+
+    answer = template['intro'] + qa_pair["answer"]
+    if qa_pair.get("explanation") and template['explanation']:
+        answer += template['explanation'].format(explanation=qa_pair["explanation"])
+    answer += template['outro']
+
+    if kb_summary:
+        answer += f"\n\n📚 Ek Bilgi: {kb_summary[:200]}..."
+    return answer
@@ -0,0 +1,374 @@
+"""
+Recommendation Refresh Worker
+Precomputes personalized recommendations in the background
+
+GET /recommendations only reads stored rows. New interactions and feedback
+bump a per (user, session) event counter; once it reaches the threshold a
+refresh is scheduled. Refreshes are debounced per (user, session) and run
+on a single daemon thread, so a burst of activity costs one generation
+(and at most one LLM call) instead of one per dashboard read.
+
+Freshness is tracked in ``recommendation_refresh_state``:
+- generated_at: last successful generation (UTC, CURRENT_TIMESTAMP format)
+- pending_events: interactions/feedback recorded since that generation
+- failed_refreshes / last_error_at: consecutive failed generations
+
+Stored recommendations are stale once the event threshold is reached or they
+are older than the age limit; a single new event does not make them stale.
+After a failed generation no refresh is attempted for an exponentially
+growing backoff period, so a broken generator is not retried on every read.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from database.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Events (interactions + feedback) after which a refresh is scheduled proactively
+REFRESH_EVENT_THRESHOLD = int(os.getenv("RECOMMENDATION_REFRESH_THRESHOLD", "3"))
+# Quiet period before a scheduled refresh runs; new events push it back
+REFRESH_DEBOUNCE_SECONDS = float(os.getenv("RECOMMENDATION_REFRESH_DEBOUNCE_SECONDS", "30"))
+# Stored recommendations older than this are refreshed on the next read
+RECOMMENDATION_MAX_AGE_SECONDS = float(os.getenv("RECOMMENDATION_MAX_AGE_SECONDS", "3600"))
+# Wait after a failed generation; doubles per consecutive failure, capped at the age limit
+REFRESH_FAILURE_BACKOFF_SECONDS = float(os.getenv("RECOMMENDATION_REFRESH_FAILURE_BACKOFF_SECONDS", "60"))
+
+# Recommendation types written by the generator (replaced on every refresh)
+GENERATED_TYPES = ("question", "topic")
+
+Generator = Callable[[DatabaseManager, str, str], List[Dict[str, Any]]]
+
+
+def ensure_refresh_state_table(conn):
+    """Create the freshness table and the index used by the read path"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS recommendation_refresh_state (
+            user_id TEXT NOT NULL,
+            session_id TEXT NOT NULL,
+            generated_at TIMESTAMP,
+            pending_events INTEGER NOT NULL DEFAULT 0,
+            last_event_at TIMESTAMP,
+            last_error TEXT,
+            failed_refreshes INTEGER NOT NULL DEFAULT 0,
+            last_error_at TIMESTAMP,
+            PRIMARY KEY (user_id, session_id)
+        ) WITHOUT ROWID
+    """)
+    # Tables created before the failure backoff
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(recommendation_refresh_state)")}
+    if "failed_refreshes" not in columns:
+        conn.execute("ALTER TABLE recommendation_refresh_state ADD COLUMN failed_refreshes INTEGER NOT NULL DEFAULT 0")
+    if "last_error_at" not in columns:
+        conn.execute("ALTER TABLE recommendation_refresh_state ADD COLUMN last_error_at TIMESTAMP")
+    recommendations_table = conn.execute("""
+        SELECT name FROM sqlite_master
+        WHERE type='table' AND name='recommendations'
+    """).fetchone()
+    if recommendations_table:
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_recommendations_user_session_status
+            ON recommendations(user_id, session_id, status)
+        """)
+
+
+def record_activity(db: DatabaseManager, user_id: str, session_id: str) -> int:
+    """Count one interaction/feedback event; returns pending events since the last refresh"""
+    with db.get_connection() as conn:
+        conn.execute("""
+            INSERT INTO recommendation_refresh_state (user_id, session_id, pending_events, last_event_at)
+            VALUES (?, ?, 1, CURRENT_TIMESTAMP)
+            ON CONFLICT(user_id, session_id) DO UPDATE SET
+                pending_events = pending_events + 1,
+                last_event_at = CURRENT_TIMESTAMP
+        """, (user_id, session_id))
+        row = conn.execute("""
+            SELECT pending_events FROM recommendation_refresh_state
+            WHERE user_id = ? AND session_id = ?
+        """, (user_id, session_id)).fetchone()
+        conn.commit()
+    return row["pending_events"]
+
+
+def get_refresh_state(db: DatabaseManager, user_id: str, session_id: str) -> Optional[Dict[str, Any]]:
+    """Freshness stamp for a (user, session), None if never tracked"""
+    rows = db.execute_query("""
+        SELECT generated_at, pending_events, last_event_at, last_error, failed_refreshes,
+               (julianday('now') - julianday(generated_at)) * 86400.0 AS age_seconds,
+               (julianday('now') - julianday(last_error_at)) * 86400.0 AS error_age_seconds
+        FROM recommendation_refresh_state
+        WHERE user_id = ? AND session_id = ?
+    """, (user_id, session_id))
+    return rows[0] if rows else None
+
+
+def is_stale(
+    state: Optional[Dict[str, Any]],
+    max_age_seconds: float = RECOMMENDATION_MAX_AGE_SECONDS,
+    event_threshold: int = REFRESH_EVENT_THRESHOLD
+) -> bool:
+    """Stored recommendations are stale if never generated, too old, or enough activity happened since"""
+    if not state or not state.get("generated_at"):
+        return True
+    if (state.get("pending_events") or 0) >= event_threshold:
+        return True
+    return (state.get("age_seconds") or 0) > max_age_seconds
+
+
+def backoff_remaining(state: Optional[Dict[str, Any]], base_seconds: float = REFRESH_FAILURE_BACKOFF_SECONDS) -> float:
+    """Seconds until a refresh may be attempted again after failed generations (0: now)"""
+    failures = (state or {}).get("failed_refreshes") or 0
+    error_age = (state or {}).get("error_age_seconds")
+    if not failures or error_age is None:
+        return 0.0
+    backoff = min(base_seconds * 2 ** (failures - 1), max(RECOMMENDATION_MAX_AGE_SECONDS, base_seconds))
+    return max(backoff - error_age, 0.0)
+
+
+def refresh_due(state: Optional[Dict[str, Any]]) -> bool:
+    """Stale and not backing off after a failed generation"""
+    return is_stale(state) and backoff_remaining(state) == 0
+
+
+def store_recommendations(
+    db: DatabaseManager,
+    user_id: str,
+    session_id: str,
+    recommendations: List[Dict[str, Any]],
+    events_seen: int = 0
+) -> int:
+    """
+    Replace the pending generated recommendations of a (user, session)
+
+    Accepted/dismissed rows are kept. Events recorded while the generator was
+    running are not consumed (only ``events_seen`` is subtracted), so the
+    result stays stale and the next read schedules another refresh.
+    """
+    with db.get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            placeholders = ",".join("?" for _ in GENERATED_TYPES)
+            conn.execute(f"""
+                DELETE FROM recommendations
+                WHERE user_id = ? AND session_id = ? AND status = 'pending'
+                  AND recommendation_type IN ({placeholders})
+            """, (user_id, session_id) + GENERATED_TYPES)
+            conn.executemany("""
+                INSERT INTO recommendations
+                (user_id, session_id, recommendation_type, title, description, content, priority, relevance_score, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'pending')
+            """, [
+                (
+                    user_id,
+                    session_id,
+                    rec["recommendation_type"],
+                    rec["title"],
+                    rec["description"],
+                    json.dumps(rec.get("content") or {}),
+                    rec["priority"],
+                    rec["relevance_score"]
+                )
+                for rec in recommendations
+            ])
+            conn.execute("""
+                INSERT INTO recommendation_refresh_state (user_id, session_id, generated_at, pending_events)
+                VALUES (?, ?, CURRENT_TIMESTAMP, 0)
+                ON CONFLICT(user_id, session_id) DO UPDATE SET
+                    generated_at = CURRENT_TIMESTAMP,
+                    pending_events = MAX(pending_events - ?, 0),
+                    last_error = NULL,
+                    failed_refreshes = 0,
+                    last_error_at = NULL
+            """, (user_id, session_id, events_seen))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return len(recommendations)
+
+
+def _record_refresh_error(db: DatabaseManager, user_id: str, session_id: str, error: Exception):
+    try:
+        db.execute_update("""
+            INSERT INTO recommendation_refresh_state (user_id, session_id, last_error, failed_refreshes, last_error_at)
+            VALUES (?, ?, ?, 1, CURRENT_TIMESTAMP)
+            ON CONFLICT(user_id, session_id) DO UPDATE SET
+                last_error = excluded.last_error,
+                failed_refreshes = failed_refreshes + 1,
+                last_error_at = CURRENT_TIMESTAMP
+        """, (user_id, session_id, str(error)[:500]))
+    except Exception as e:
+        logger.debug(f"Could not record recommendation refresh error: {e}")
+
+
+class RecommendationRefreshWorker:
+    """
+    Debounced background generation of recommendations
+
+    Each (user, session) has at most one scheduled refresh. Scheduling again
+    pushes the due time back by ``debounce_seconds`` but never past
+    ``max_wait_seconds`` after the first request, so steady activity cannot
+    starve a student. A request arriving while that student's refresh is
+    running is queued to run once more afterwards.
+    """
+
+    def __init__(
+        self,
+        generate: Generator,
+        debounce_seconds: float = REFRESH_DEBOUNCE_SECONDS,
+        max_wait_seconds: Optional[float] = None
+    ):
+        self.generate = generate
+        self.debounce_seconds = debounce_seconds
+        self.max_wait_seconds = max_wait_seconds if max_wait_seconds is not None else 4 * debounce_seconds
+        self._cond = threading.Condition()
+        # key -> (due, first_requested, db)
+        self._scheduled: Dict[Tuple[str, str], Tuple[float, float, DatabaseManager]] = {}
+        self._running: Optional[Tuple[str, str]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def schedule(self, db: DatabaseManager, user_id: str, session_id: str, delay: Optional[float] = None):
+        """Request a refresh for (user, session) after ``delay`` seconds (default: debounce)"""
+        delay = self.debounce_seconds if delay is None else delay
+        key = (user_id, session_id)
+        now = time.monotonic()
+        with self._cond:
+            if self._stopped:
+                return
+            if key in self._scheduled:
+                due, first, _ = self._scheduled[key]
+                due = min(max(due, now + delay) if delay > 0 else now, first + self.max_wait_seconds)
+            else:
+                due, first = now + delay, now
+            self._scheduled[key] = (due, first, db)
+            self._ensure_thread()
+            self._cond.notify()
+
+    def pending(self) -> int:
+        """Number of scheduled or running refreshes"""
+        with self._cond:
+            return len(self._scheduled) + (1 if self._running else 0)
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Run everything scheduled now and wait until idle (tests, shutdown)"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            now = time.monotonic()
+            self._scheduled = {k: (now, first, db) for k, (_, first, db) in self._scheduled.items()}
+            self._cond.notify_all()
+            while self._scheduled or self._running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the worker thread; scheduled refreshes are dropped (the next read reschedules them)"""
+        with self._cond:
+            self._stopped = True
+            self._scheduled.clear()
+            self._cond.notify_all()
+            thread = self._thread
+        if thread:
+            thread.join(timeout)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run,
+                name="recommendation-refresh",
+                daemon=True
+            )
+            self._thread.start()
+
+    def _next_due(self) -> Optional[Tuple[Tuple[str, str], DatabaseManager]]:
+        """Wait for the earliest due refresh (called with the condition held)"""
+        while not self._stopped:
+            if not self._scheduled:
+                self._cond.wait()
+                continue
+            key = min(self._scheduled, key=lambda k: self._scheduled[k][0])
+            wait = self._scheduled[key][0] - time.monotonic()
+            if wait > 0:
+                self._cond.wait(wait)
+                continue
+            _, _, db = self._scheduled.pop(key)
+            self._running = key
+            return key, db
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                item = self._next_due()
+            if item is None:
+                return
+            (user_id, session_id), db = item
+            try:
+                self.refresh_now(db, user_id, session_id)
+            finally:
+                with self._cond:
+                    self._running = None
+                    self._cond.notify_all()
+
+    def refresh_now(self, db: DatabaseManager, user_id: str, session_id: str) -> Optional[int]:
+        """
+        Generate and store recommendations synchronously; returns the stored
+        count, None if generation failed or is backing off after failures
+        """
+        started = time.monotonic()
+        try:
+            state = get_refresh_state(db, user_id, session_id)
+            wait = backoff_remaining(state)
+            if wait > 0:
+                logger.debug(
+                    f"Recommendation refresh for user {user_id}, session {session_id} "
+                    f"backing off for {wait:.0f}s after {state['failed_refreshes']} failure(s)"
+                )
+                return None
+            events_seen = (state or {}).get("pending_events") or 0
+            recommendations = self.generate(db, user_id, session_id)
+            count = store_recommendations(db, user_id, session_id, recommendations, events_seen)
+            logger.info(
+                f"✅ Refreshed {count} recommendations for user {user_id}, session {session_id} "
+                f"in {(time.monotonic() - started) * 1000:.0f}ms"
+            )
+            return count
+        except Exception as e:
+            logger.warning(f"Recommendation refresh failed for user {user_id}, session {session_id} (non-critical): {e}")
+            _record_refresh_error(db, user_id, session_id, e)
+            return None
+
+
+# Worker used by notify_activity(); installed by api.recommendations
+_default_worker: Optional[RecommendationRefreshWorker] = None
+
+
+def set_default_worker(worker: Optional[RecommendationRefreshWorker]):
+    global _default_worker
+    _default_worker = worker
+
+
+def get_default_worker() -> Optional[RecommendationRefreshWorker]:
+    return _default_worker
+
+
+def notify_activity(db: DatabaseManager, user_id: str, session_id: str):
+    """
+    Record an interaction/feedback event and schedule a debounced refresh once
+    enough events accumulated. Never raises: logging activity must not fail
+    the request that produced it.
+    """
+    try:
+        pending_events = record_activity(db, str(user_id), str(session_id))
+        if pending_events >= REFRESH_EVENT_THRESHOLD and _default_worker is not None:
+            _default_worker.schedule(db, str(user_id), str(session_id))
+    except Exception as e:
+        logger.warning(f"Failed to record recommendation activity (non-critical): {e}")
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Analytics Aggregate Tests
+The SQL aggregates of GET /analytics/{user_id} against the previous
+Python computation over the loaded rows, and the half-open since/as_of window
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from api.analytics import (
+    COMMON_TOPICS,
+    _analyze_time_patterns,
+    _analyze_topic_performance,
+    _calculate_engagement_metrics,
+    _calculate_improvement_trend,
+    _load_user_analytics_aggregates,
+    get_analytics,
+)
+from database.database import DatabaseManager
+
+
+def print_section(title):
+    """Print formatted section header"""
+    print("\n" + "=" * 70)
+    print(f"  {title}")
+    print("=" * 70)
+
+
+# ----------------------------------------------------------------------------
+# Reference: the Python computation the endpoint used before the SQL aggregates
+# ----------------------------------------------------------------------------
+
+def reference_trend(feedback):
+    if len(feedback) < 3:
+        return "insufficient_data"
+    ordered = sorted(feedback, key=lambda f: f["timestamp"])
+    mid_point = len(ordered) // 2
+    first, second = ordered[:mid_point], ordered[mid_point:]
+    first_avg = sum(float(f["understanding_level"] or 0) for f in first) / len(first) if first else 0
+    second_avg = sum(float(f["understanding_level"] or 0) for f in second) / len(second) if second else 0
+    if second_avg > first_avg + 0.3:
+        return "improving"
+    elif second_avg < first_avg - 0.3:
+        return "declining"
+    return "stable"
+
+
+def reference_topics(interactions):
+    topic_stats = {}
+    for interaction in interactions:
+        query = interaction["query"].lower()
+        response = interaction["original_response"].lower()
+        for topic in COMMON_TOPICS:
+            if topic in query or topic in response:
+                topic_stats.setdefault(topic, {"count": 0, "avg_understanding": 0.0})
+                topic_stats[topic]["count"] += 1
+    return topic_stats
+
+
+def reference_engagement(interactions):
+    if not interactions:
+        return {"total_interactions": 0, "avg_per_day": 0, "most_active_day": None, "engagement_level": "low"}
+    daily_counts = {}
+    for interaction in interactions:
+        date = datetime.fromisoformat(interaction["timestamp"]).date()
+        daily_counts[date] = daily_counts.get(date, 0) + 1
+    avg_per_day = len(interactions) / len(daily_counts)
+    most_active_day = max(daily_counts.items(), key=lambda x: x[1])[0]
+    return {
+        "total_interactions": len(interactions),
+        "days_active": len(daily_counts),
+        "avg_per_day": round(avg_per_day, 2),
+        "most_active_day": str(most_active_day),
+        "engagement_level": "high" if avg_per_day >= 3 else "medium" if avg_per_day >= 1 else "low",
+    }
+
+
+def reference_time_patterns(interactions):
+    if not interactions:
+        return {"peak_hour": None, "peak_day": None, "time_distribution": {}}
+    hour_counts, day_counts = {}, {}
+    for interaction in interactions:
+        dt = datetime.fromisoformat(interaction["timestamp"])
+        hour_counts[dt.hour] = hour_counts.get(dt.hour, 0) + 1
+        day_counts[dt.strftime("%A")] = day_counts.get(dt.strftime("%A"), 0) + 1
+    return {
+        "peak_hour": max(hour_counts.items(), key=lambda x: x[1])[0],
+        "peak_day": max(day_counts.items(), key=lambda x: x[1])[0],
+        "hour_distribution": hour_counts,
+        "day_distribution": day_counts,
+    }
+
+
+# ----------------------------------------------------------------------------
+
+def create_test_db(seed: int):
+    """Fresh APRAG database with a random interaction/feedback history of u1 (and noise from u2)"""
+    db_path = str(Path(tempfile.mkdtemp()) / "analytics_test.db")
+    db = DatabaseManager(db_path)
+    rng = random.Random(seed)
+    texts = ["kimya sorusu", "Fizik ödevi", "matematik ve FİZİK", "tarih", "genel soru", "biyoloji edebiyat"]
+    start = datetime(2026, 3, 2, 8, 0, 0)
+    with db.get_connection() as conn:
+        # users is owned by auth_service; interactions and feedback reference it
+        conn.execute("CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, username TEXT UNIQUE)")
+        conn.execute("INSERT INTO users (id, username) VALUES ('u1', 'ogrenci1'), ('u2', 'ogrenci2')")
+        moment = start
+        for _ in range(60):
+            # Distinct timestamps: the old code's order among equal timestamps was undefined
+            moment += timedelta(minutes=rng.choice([7, 45, 190, 600, 1500]), seconds=1)
+            user_id = "u1" if rng.random() < 0.8 else "u2"
+            session_id = rng.choice(["s1", "s2"])
+            cursor = conn.execute(
+                "INSERT INTO student_interactions (user_id, session_id, query, original_response, timestamp) VALUES (?, ?, ?, ?, ?)",
+                (user_id, session_id, rng.choice(texts), rng.choice(texts), moment.strftime("%Y-%m-%d %H:%M:%S")),
+            )
+            if rng.random() < 0.6:
+                conn.execute(
+                    "INSERT INTO student_feedback (interaction_id, user_id, session_id, understanding_level, satisfaction_level, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+                    (cursor.lastrowid, user_id, session_id, rng.randint(1, 5), rng.randint(1, 5),
+                     (moment + timedelta(seconds=30)).strftime("%Y-%m-%d %H:%M:%S")),
+                )
+        conn.commit()
+    return db
+
+
+def load_rows(db, user_id, session_id=None, since=None, until=None):
+    """Rows as the old endpoint loaded them (SELECT *, newest first), cut to [since, until)"""
+    session_filter = " AND session_id = ?" if session_id else ""
+    params = (user_id, session_id) if session_id else (user_id,)
+    interactions = db.execute_query(
+        f"SELECT * FROM student_interactions WHERE user_id = ?{session_filter} ORDER BY timestamp DESC", params
+    )
+    feedback = db.execute_query(
+        f"SELECT sf.* FROM student_feedback sf JOIN student_interactions si ON sf.interaction_id = si.interaction_id "
+        f"WHERE sf.user_id = ?{session_filter.replace('session_id', 'sf.session_id')} ORDER BY sf.timestamp DESC",
+        params,
+    )
+
+    def in_window(row):
+        return (since is None or row["timestamp"] >= since) and (until is None or row["timestamp"] < until)
+
+    return [r for r in interactions if in_window(r)], [f for f in feedback if in_window(f)], feedback
+
+
+class TestAnalyticsAggregates:
+    """SQL aggregates vs. the previous Python computation"""
+
+    def setup_method(self):
+        self.db = create_test_db(seed=11)
+
+    def assert_matches_reference(self, session_id=None, since=None):
+        aggregates = _load_user_analytics_aggregates(self.db, "u1", session_id, since)
+        interactions, feedback, all_feedback = load_rows(self.db, "u1", session_id, since, aggregates["as_of"])
+
+        assert aggregates["total_interactions"] == len(interactions)
+        assert aggregates["feedback"]["total"] == len(feedback)
+        if feedback:
+            expected_avg = sum(f["understanding_level"] for f in feedback) / len(feedback)
+            assert abs(aggregates["feedback"]["avg_understanding"] - expected_avg) < 1e-9
+        else:
+            assert aggregates["feedback"]["avg_understanding"] is None
+        # The trend is computed over the whole history, whatever the window
+        assert _calculate_improvement_trend(aggregates["feedback"]) == reference_trend(all_feedback)
+        assert _analyze_topic_performance(aggregates, {})["interaction_topics"] == reference_topics(interactions)
+        assert _calculate_engagement_metrics(aggregates) == reference_engagement(interactions)
+        assert _analyze_time_patterns(aggregates) == reference_time_patterns(interactions)
+        return aggregates, interactions
+
+    def test_full_history_matches_python(self):
+        print_section("Test: full history, per session and across sessions")
+        for seed in range(5):
+            self.db = create_test_db(seed)
+            aggregates, interactions = self.assert_matches_reference()
+            assert aggregates["topic_counts"]
+            self.assert_matches_reference(session_id="s1")
+            self.assert_matches_reference(session_id="s2")
+        print("✅ Totals, averages, trend, topics, engagement and time patterns match")
+
+    def test_windows_match_python(self):
+        print_section("Test: since windows")
+        rows = self.db.execute_query("SELECT timestamp FROM student_interactions WHERE user_id = 'u1' ORDER BY timestamp")
+        for cut in (rows[5]["timestamp"], rows[len(rows) // 2]["timestamp"], rows[-1]["timestamp"]):
+            aggregates, interactions = self.assert_matches_reference(since=cut)
+            # Inclusive lower bound: the row at the cut itself is counted
+            assert interactions[-1]["timestamp"] == cut
+        print("✅ Windowed aggregates match the filtered Python computation")
+
+    def test_empty_windows(self):
+        print_section("Test: empty windows")
+        aggregates, _ = self.assert_matches_reference(since="2030-01-01 00:00:00")
+        assert aggregates["total_interactions"] == 0
+        assert aggregates["feedback"]["total"] == 0
+        assert _calculate_engagement_metrics(aggregates)["most_active_day"] is None
+        # Unknown user: nothing at all
+        empty = _load_user_analytics_aggregates(self.db, "nobody")
+        assert empty["total_interactions"] == 0 and empty["topic_counts"] == {}
+        assert _calculate_improvement_trend(empty["feedback"]) == "insufficient_data"
+        print("✅ Empty windows give zero counts and no peaks")
+
+    def test_consecutive_windows_do_not_overlap(self):
+        print_section("Test: since = previous as_of")
+        first = asyncio.run(get_analytics("u1", None, None, self.db))
+
+        # A row at exactly the previous as_of belongs to the next window only
+        self.db.execute_insert(
+            "INSERT INTO student_interactions (user_id, session_id, query, original_response, timestamp) VALUES ('u1', 's1', 'kimya', 'c', ?)",
+            (first.as_of,),
+        )
+        # as_of has second resolution; let the clock pass the row's second
+        time.sleep(1.1)
+        second = asyncio.run(get_analytics("u1", None, first.as_of, self.db))
+        assert second.since == first.as_of
+        assert second.total_interactions == 1
+        assert second.improvement_trend == first.improvement_trend
+
+        third = asyncio.run(get_analytics("u1", None, second.as_of, self.db))
+        assert third.total_interactions == 0
+        everything = asyncio.run(get_analytics("u1", None, None, self.db))
+        assert everything.total_interactions == first.total_interactions + second.total_interactions
+        print("✅ Consecutive windows add up to the full history")
+
+
+def main():
+    """Run all tests"""
+    print_section("🧪 Analytics Aggregate Tests")
+
+    test_suite = TestAnalyticsAggregates()
+    for name in [
+        "test_full_history_matches_python",
+        "test_windows_match_python",
+        "test_empty_windows",
+        "test_consecutive_windows_do_not_overlap",
+    ]:
+        test_suite.setup_method()
+        getattr(test_suite, name)()
+
+    print_section("✅ ALL TESTS PASSED")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@ Tests for Faz 2 - Eğitsel-KBRAG integration
 
 import sys
 import os
+import json
+import random
 from pathlib import Path
 
 # Add parent directory to path
@@ -268,6 +270,43 @@ class TestCACSScorer:
         print("✅ Singleton pattern works")
         print("   get_cacs_scorer() returns same instance")
 
+    
+    def test_bulk_scoring_matches_single(self):
+        """Test 10: Bulk scoring equals per-document scoring"""
+        print_section("Test 10: Bulk Scoring")
+        
+        rng = random.Random(11)
+        scorer = CACSScorer()
+        doc_ids = [f"doc{i}" for i in range(30)]
+        history = [
+            {
+                'doc_id': rng.choice(doc_ids + [None]),
+                'sources': json.dumps([{'doc_id': d} for d in rng.sample(doc_ids, 2)]),
+                'query': rng.choice(['hücre nedir', 'mitoz bölünme', 'hücre zarı yapısı']),
+                'feedback_score': rng.choice([None, 1, 3, 5, 0.4, '😊', '❌'])
+            }
+            for _ in range(200)
+        ]
+        global_scores = {
+            doc_id: {
+                'total_feedback_count': rng.choice([0, 3, 12, None]),
+                'positive_feedback_count': rng.randint(0, 8),
+                'negative_feedback_count': rng.choice([0, 2, None]),
+                'avg_emoji_score': rng.choice([None, 0.65])
+            }
+            for doc_id in doc_ids[::2]
+        }
+        profile = {'preferred_difficulty_level': 'intermediate', 'success_rate': 0.8}
+        documents = [(doc_id, rng.random()) for doc_id in doc_ids]
+        
+        bulk = scorer.calculate_scores_bulk(documents, profile, history, global_scores, "hücre zarı")
+        single = [
+            scorer.calculate_score(doc_id, base, profile, history, global_scores, "hücre zarı")
+            for doc_id, base in documents
+        ]
+        
+        assert bulk == single
+        print(f"✅ {len(documents)} documents: bulk results identical to per-document results")
 
 def test_integration():
     """Integration test with all components"""
@@ -399,6 +438,9 @@ def main():
         test_suite.setup_method()
         test_suite.test_cacs_disabled()
         
+        test_suite.setup_method()
+        test_suite.test_bulk_scoring_matches_single()
+        
         test_suite.setup_method()
         test_suite.test_get_cacs_scorer_singleton()
         
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+EBARS Score State Tests
+Atomic score transitions, state cache and bulk feedback
+"""
+
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database.database import DatabaseManager
+from ebars import score_calculator
+from ebars.score_calculator import ComprehensionScoreCalculator, invalidate_cached_state
+
+
+def print_section(title):
+    """Print formatted section header"""
+    print("\n" + "=" * 70)
+    print(f"  {title}")
+    print("=" * 70)
+
+
+def create_test_db() -> DatabaseManager:
+    """Fresh SQLite file with only the EBARS score tables"""
+    db_path = str(Path(tempfile.mkdtemp()) / "ebars_test.db")
+    db = DatabaseManager(db_path)
+    with db.get_connection() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS student_comprehension_scores (
+                score_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                comprehension_score DECIMAL(5,2) NOT NULL DEFAULT 50.0,
+                current_difficulty_level VARCHAR(20) NOT NULL DEFAULT 'normal',
+                total_feedback_count INTEGER DEFAULT 0,
+                positive_feedback_count INTEGER DEFAULT 0,
+                negative_feedback_count INTEGER DEFAULT 0,
+                consecutive_positive_count INTEGER DEFAULT 0,
+                consecutive_negative_count INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_feedback_at TIMESTAMP,
+                UNIQUE(user_id, session_id)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ebars_feedback_history (
+                history_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                interaction_id INTEGER,
+                emoji_feedback TEXT,
+                previous_score REAL,
+                score_delta REAL,
+                new_score REAL,
+                previous_difficulty_level TEXT,
+                new_difficulty_level TEXT,
+                difficulty_changed BOOLEAN,
+                adjustment_type TEXT,
+                timestamp TIMESTAMP
+            )
+        """)
+        conn.commit()
+    return db
+
+
+class TestScoreState:
+    """Unit tests for atomic EBARS score updates"""
+
+    def setup_method(self):
+        score_calculator._state_cache.clear()
+        self.db = create_test_db()
+
+    def test_default_state_created_once(self):
+        """Test 1: Default row is created on first read"""
+        print_section("Test 1: Default State")
+
+        calculator = ComprehensionScoreCalculator(self.db)
+        assert calculator.get_score("u1", "s1") == 50.0
+        assert calculator.get_score("u1", "s1") == 50.0
+
+        rows = self.db.execute_query("SELECT COUNT(*) AS n FROM student_comprehension_scores")
+        assert rows[0]["n"] == 1
+        print("✅ Default score row created exactly once")
+
+    def test_concurrent_updates_are_exact(self):
+        """Test 2: Concurrent feedback for the same student loses no update"""
+        print_section("Test 2: Concurrent Updates")
+
+        threads_count, events_per_thread = 8, 20
+
+        def worker():
+            calculator = ComprehensionScoreCalculator(self.db)
+            for _ in range(events_per_thread):
+                calculator.update_score("u1", "s1", "😊")
+
+        threads = [threading.Thread(target=worker) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        invalidate_cached_state("u1", "s1")
+        state = ComprehensionScoreCalculator(self.db).get_state("u1", "s1")
+        assert state["total_feedback_count"] == threads_count * events_per_thread
+        assert state["positive_feedback_count"] == threads_count * events_per_thread
+        assert state["consecutive_positive"] == threads_count * events_per_thread
+        print(f"✅ {threads_count * events_per_thread} concurrent events all applied")
+
+    def test_cache_refreshed_on_write(self):
+        """Test 3: Cached state reflects writes made in this process"""
+        print_section("Test 3: State Cache")
+
+        calculator = ComprehensionScoreCalculator(self.db)
+        assert calculator.get_score("u1", "s1") == 50.0
+        result = calculator.update_score("u1", "s1", "❌")
+        assert calculator.get_score("u1", "s1") == result["new_score"] == 45.0
+        print("✅ Cache updated after score change")
+
+    def test_bulk_feedback_in_order(self):
+        """Test 4: Bulk events apply in order, same as one by one"""
+        print_section("Test 4: Bulk Feedback")
+
+        events = [{"user_id": "u1", "session_id": "s1", "emoji": e} for e in ["❌", "❌", "😐", "👍"]]
+        bulk = ComprehensionScoreCalculator(self.db).apply_feedback_batch(events)
+
+        single_db = create_test_db()
+        calculator = ComprehensionScoreCalculator(single_db)
+        single = [calculator.update_score(e["user_id"], e["session_id"], e["emoji"]) for e in events]
+
+        assert [r["new_score"] for r in bulk] == [r["new_score"] for r in single]
+        assert bulk[2]["adjustment_type"] == "immediate_drop"
+        print("✅ Bulk results match sequential updates")
+
+    def test_bulk_feedback_is_all_or_nothing(self):
+        """Test 5: An invalid event rolls back the whole batch"""
+        print_section("Test 5: Bulk Rollback")
+
+        calculator = ComprehensionScoreCalculator(self.db)
+        events = [
+            {"user_id": "u1", "session_id": "s1", "emoji": "👍"},
+            {"user_id": "u1", "session_id": "s1", "emoji": "?"},
+        ]
+        try:
+            calculator.apply_feedback_batch(events)
+            assert False, "invalid emoji should fail the batch"
+        except ValueError:
+            pass
+
+        rows = self.db.execute_query("SELECT COUNT(*) AS n FROM student_comprehension_scores")
+        assert rows[0]["n"] == 0
+        print("✅ Failed batch left no partial writes")
+
+
+def main():
+    """Run all tests"""
+    print_section("🧪 EBARS Score State Tests")
+
+    test_suite = TestScoreState()
+    for name in [
+        "test_default_state_created_once",
+        "test_concurrent_updates_are_exact",
+        "test_cache_refreshed_on_write",
+        "test_bulk_feedback_in_order",
+        "test_bulk_feedback_is_all_or_nothing",
+    ]:
+        test_suite.setup_method()
+        getattr(test_suite, name)()
+
+    print_section("✅ ALL TESTS PASSED")
+
+
+if __name__ == "__main__":
+    main()
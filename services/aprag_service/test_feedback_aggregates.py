@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Feedback Aggregation Tests
+Write-behind global scores / emoji summaries and exact merged reads
+"""
+
+import random
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database.database import DatabaseManager
+from database.feedback_aggregates import (
+    FeedbackAggregator,
+    append_emoji_feedback,
+    flush_feedback_events,
+    load_document_global_scores,
+    load_emoji_summary,
+)
+
+EMOJI_SCORES = {'😊': 0.7, '👍': 1.0, '😐': 0.2, '❌': 0.0}
+
+
+def print_section(title):
+    """Print formatted section header"""
+    print("\n" + "=" * 70)
+    print(f"  {title}")
+    print("=" * 70)
+
+
+def create_test_db() -> DatabaseManager:
+    """Fresh SQLite file with the APRAG schema and avg_emoji_score column"""
+    db_path = str(Path(tempfile.mkdtemp()) / "feedback_test.db")
+    db = DatabaseManager(db_path)
+    with db.get_connection() as conn:
+        db.apply_avg_emoji_score_migration(conn)
+        conn.commit()
+    return db
+
+
+def record(db: DatabaseManager, user_id: str, emoji: str, doc_ids):
+    with db.get_connection() as conn:
+        append_emoji_feedback(conn, user_id, "s1", emoji, EMOJI_SCORES[emoji], doc_ids)
+        conn.commit()
+
+
+def snapshot(db: DatabaseManager, doc_ids, users):
+    with db.get_connection() as conn:
+        scores = load_document_global_scores(conn, doc_ids)
+        summaries = {user_id: load_emoji_summary(conn, user_id, "s1") for user_id in users}
+    scores = {
+        doc_id: (row["total_feedback_count"], row["positive_feedback_count"],
+                 row["negative_feedback_count"], round(row["avg_emoji_score"], 12))
+        for doc_id, row in scores.items()
+    }
+    summaries = {
+        user_id: sorted((r["emoji"], r["emoji_count"], round(r["avg_score"], 12)) for r in rows)
+        for user_id, rows in summaries.items()
+    }
+    return scores, summaries
+
+
+class TestFeedbackAggregates:
+    """Unit tests for write-behind feedback aggregation"""
+
+    def setup_method(self):
+        self.db = create_test_db()
+
+    def test_reads_exact_before_and_after_flush(self):
+        """Test 1: Merged reads equal the folded tables"""
+        print_section("Test 1: Exact Reads")
+
+        rng = random.Random(3)
+        docs = [f"doc{i}" for i in range(6)]
+        users = ["u1", "u2"]
+        for batch in range(3):
+            for _ in range(25):
+                record(self.db, rng.choice(users), rng.choice(list(EMOJI_SCORES)), rng.sample(docs, 2))
+            before = snapshot(self.db, docs, users)
+            with self.db.get_connection() as conn:
+                flush_feedback_events(conn, batch_size=30)  # partial fold
+            assert snapshot(self.db, docs, users) == before
+            with self.db.get_connection() as conn:
+                while sum(flush_feedback_events(conn).values()):
+                    pass
+            assert snapshot(self.db, docs, users) == before
+
+        remaining = self.db.execute_query("SELECT COUNT(*) AS n FROM feedback_aggregate_events")
+        assert remaining[0]["n"] == 0
+        scores, _ = snapshot(self.db, docs, users)
+        assert sum(total for total, _, _, _ in scores.values()) == 3 * 25 * 2
+        print("✅ Reads identical with pending, partially folded and fully folded events")
+
+    def test_counts_and_average(self):
+        """Test 2: Fold arithmetic matches the former synchronous update"""
+        print_section("Test 2: Fold Arithmetic")
+
+        for emoji in ['👍', '😊', '😐', '❌']:
+            record(self.db, "u1", emoji, ["doc1", "doc1"])  # duplicate source counted once
+        FeedbackAggregator(self.db).flush()
+
+        row = self.db.execute_query("SELECT * FROM document_global_scores WHERE doc_id = 'doc1'")[0]
+        assert row["total_feedback_count"] == 4
+        assert row["positive_feedback_count"] == 2
+        assert row["negative_feedback_count"] == 2
+        assert abs(row["avg_emoji_score"] - (1.0 + 0.7 + 0.2 + 0.0) / 4) < 1e-12
+
+        record(self.db, "u1", '👍', ["doc1"])
+        FeedbackAggregator(self.db).flush()
+        row = self.db.execute_query("SELECT * FROM document_global_scores WHERE doc_id = 'doc1'")[0]
+        assert row["total_feedback_count"] == 5
+        assert abs(row["avg_emoji_score"] - 2.9 / 5) < 1e-12
+        print("✅ Counts and running average correct")
+
+    def test_concurrent_writers_with_aggregator(self):
+        """Test 3: Concurrent feedback while the aggregator runs loses nothing"""
+        print_section("Test 3: Concurrent Writers")
+
+        aggregator = FeedbackAggregator(self.db, interval=0.01, batch_size=50)
+        aggregator.start()
+
+        def worker(user_id):
+            for _ in range(40):
+                record(self.db, user_id, '😊', ["hot_doc"])
+
+        threads = [threading.Thread(target=worker, args=(f"u{i}",)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        aggregator.stop()
+
+        row = self.db.execute_query("SELECT * FROM document_global_scores WHERE doc_id = 'hot_doc'")[0]
+        assert row["total_feedback_count"] == 240
+        assert row["positive_feedback_count"] == 240
+        summary = self.db.execute_query("SELECT SUM(emoji_count) AS n FROM emoji_feedback_summary")
+        assert summary[0]["n"] == 240
+        print("✅ 240 concurrent events folded exactly once")
+
+
+def main():
+    """Run all tests"""
+    print_section("🧪 Feedback Aggregation Tests")
+
+    test_suite = TestFeedbackAggregates()
+    for name in [
+        "test_reads_exact_before_and_after_flush",
+        "test_counts_and_average",
+        "test_concurrent_writers_with_aggregator",
+    ]:
+        test_suite.setup_method()
+        getattr(test_suite, name)()
+
+    print_section("✅ ALL TESTS PASSED")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Interaction Batch Tests
+POST /interactions/batch stores each row under its own savepoint and
+reports the rows it could not store
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from api.interactions import InteractionBatchCreate, create_interactions_batch
+from database.database import DatabaseManager
+
+
+def print_section(title):
+    """Print formatted section header"""
+    print("\n" + "=" * 70)
+    print(f"  {title}")
+    print("=" * 70)
+
+
+def create_test_db() -> DatabaseManager:
+    db_path = str(Path(tempfile.mkdtemp()) / "interactions_batch_test.db")
+    db = DatabaseManager(db_path)
+    with db.get_connection() as conn:
+        # users is owned by auth_service; interactions and profiles reference it
+        conn.execute("CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, username TEXT UNIQUE)")
+        conn.execute("INSERT INTO users (id, username) VALUES ('u1', 'ogrenci1'), ('u2', 'ogrenci2')")
+        # Stands in for any per-row failure (constraint, corrupt value, ...)
+        conn.execute("""
+            CREATE TRIGGER reject_bad_query BEFORE INSERT ON student_interactions
+            WHEN NEW.query = 'bad'
+            BEGIN
+                SELECT RAISE(ABORT, 'rejected row');
+            END
+        """)
+        conn.commit()
+    return db
+
+
+def interaction(query: str, user_id: str = "u1") -> dict:
+    return {"user_id": user_id, "session_id": "s1", "query": query, "response": "cevap"}
+
+
+class TestInteractionsBatch:
+    """Unit tests for partial acknowledgement of interaction batches"""
+
+    def setup_method(self):
+        self.db = create_test_db()
+
+    def test_failed_row_does_not_fail_batch(self):
+        print_section("Test: one bad row in a batch")
+        batch = InteractionBatchCreate(interactions=[
+            interaction("soru 1"), interaction("bad"), interaction("soru 3", user_id="u2"),
+        ])
+        result = asyncio.run(create_interactions_batch(batch, self.db))
+
+        ids = result["interaction_ids"]
+        assert ids[0] and ids[2] and ids[1] is None
+        assert [e["index"] for e in result["errors"]] == [1]
+        assert "rejected row" in result["errors"][0]["error"]
+
+        rows = self.db.execute_query("SELECT query FROM student_interactions ORDER BY interaction_id")
+        assert [r["query"] for r in rows] == ["soru 1", "soru 3"]
+        profiles = self.db.execute_query("SELECT user_id FROM student_profiles ORDER BY user_id")
+        assert [p["user_id"] for p in profiles] == ["u1", "u2"]
+        print("✅ Two rows stored, the rejected one reported by index")
+
+    def test_clean_batch(self):
+        print_section("Test: batch without errors")
+        batch = InteractionBatchCreate(interactions=[interaction(f"soru {i}") for i in range(4)])
+        result = asyncio.run(create_interactions_batch(batch, self.db))
+        assert result["errors"] == []
+        assert len(set(result["interaction_ids"])) == 4
+        print("✅ Four rows, no errors")
+
+
+def main():
+    """Run all tests"""
+    print_section("🧪 Interaction Batch Tests")
+
+    test_suite = TestInteractionsBatch()
+    for name in [
+        "test_failed_row_does_not_fail_batch",
+        "test_clean_batch",
+    ]:
+        test_suite.setup_method()
+        getattr(test_suite, name)()
+
+    print_section("✅ ALL TESTS PASSED")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+QA Fast Path Tests
+Direct answers before chunk retrieval, EBARS answer templates and the
+per-session hit-rate / latency report
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database.database import DatabaseManager
+from database.qa_fast_path_stats import load_fast_path_report, record_fast_path_outcome
+from services.hybrid_knowledge_retriever import HybridKnowledgeRetriever
+from services.qa_fast_path import personalize_answer, resolve_threshold
+
+
+def print_section(title):
+    """Print formatted section header"""
+    print("\n" + "=" * 70)
+    print(f"  {title}")
+    print("=" * 70)
+
+
+def create_test_db() -> DatabaseManager:
+    """Fresh SQLite file with the APRAG schema, one topic and one QA pair"""
+    db_path = str(Path(tempfile.mkdtemp()) / "qa_fast_path_test.db")
+    db = DatabaseManager(db_path)
+    with db.get_connection() as conn:
+        conn.execute(
+            "INSERT INTO course_topics (topic_id, session_id, topic_title, estimated_difficulty) "
+            "VALUES (1, 's1', 'Hücre', 'intermediate')"
+        )
+        conn.execute("""
+            INSERT INTO topic_qa_pairs (qa_id, topic_id, question, answer, difficulty_level, question_type)
+            VALUES (7, 1, 'Hücre zarı nedir?', 'Hücreyi çevreleyen seçici geçirgen yapıdır.', 'beginner', 'factual')
+        """)
+        conn.commit()
+    return db
+
+
+QA_PAIR = {
+    "qa_id": 7,
+    "question": "Hücre zarı nedir?",
+    "answer": "Hücreyi çevreleyen seçici geçirgen yapıdır.",
+    "explanation": "Madde alışverişini denetler.",
+    "difficulty_level": "beginner",
+    "question_type": "factual",
+    "bloom_level": "remember",
+    "times_asked": 3,
+}
+
+
+def make_retriever(similarity):
+    retriever = HybridKnowledgeRetriever(db_manager=None)
+    retriever._classify_to_topics = AsyncMock(return_value={
+        "matched_topics": [{"topic_id": 1, "topic_title": "Hücre", "confidence": 0.9}],
+        "confidence": 0.9,
+    })
+    retriever._match_qa_pairs = AsyncMock(return_value=[dict(QA_PAIR, similarity_score=similarity)])
+    retriever._retrieve_chunks = AsyncMock(return_value=[])
+    retriever._retrieve_knowledge_base = AsyncMock(return_value=[])
+    return retriever
+
+
+class TestQAFastPath:
+    """Unit tests for the QA pair fast path"""
+
+    def setup_method(self):
+        self.db = create_test_db()
+
+    def test_answer_templates(self):
+        print_section("Test: EBARS answer templates")
+        normal = personalize_answer(QA_PAIR, "normal", "Hücre yaşamın temel birimidir.")
+        # Same text as the old direct answer
+        assert normal == (
+            "Hücreyi çevreleyen seçici geçirgen yapıdır.\n\n💡 Madde alışverişini denetler."
+            "\n\n📚 Ek Bilgi: Hücre yaşamın temel birimidir...."
+        )
+        assert personalize_answer(QA_PAIR, None) == personalize_answer(QA_PAIR, "unknown_level")
+        assert personalize_answer(QA_PAIR, "very_struggling").startswith("Bu soruyu birlikte")
+        assert "Daha basit anlatımla: Madde" in personalize_answer(QA_PAIR, "very_struggling")
+        assert "Madde alışverişini" not in personalize_answer(QA_PAIR, "excellent")
+        assert personalize_answer(dict(QA_PAIR, explanation=None), "struggling").count("💡") == 0
+        print("✅ Template output per difficulty level")
+
+    def test_threshold_priority(self):
+        print_section("Test: threshold resolution")
+        assert resolve_threshold(0.8, {"qa_fast_path_threshold": 0.95}) == 0.8
+        assert resolve_threshold(None, {"qa_fast_path_threshold": "0.95"}) == 0.95
+        assert resolve_threshold(None, {"qa_fast_path_threshold": "yüksek"}) == 0.90
+        assert resolve_threshold(None, None) == 0.90
+        # Out-of-range values are clamped, whichever source they come from
+        assert resolve_threshold(0.1, None) == 0.80
+        assert resolve_threshold(0, {"qa_fast_path_threshold": 0.95}) == 0.80
+        assert resolve_threshold(None, {"qa_fast_path_threshold": "0.5"}) == 0.80
+        assert resolve_threshold(1.7, None) == 1.0
+        print("✅ Request > session > environment, clamped to [0.80, 1.0]")
+
+    def test_direct_answer_before_chunk_retrieval(self):
+        print_section("Test: fast path hit and miss")
+        retriever = make_retriever(similarity=0.93)
+        hit = asyncio.run(retriever.find_direct_answer("hücre zarı nedir", "s1"))
+        assert hit["direct_answer"]["qa_id"] == 7
+        retriever._retrieve_chunks.assert_not_called()
+
+        # Session threshold above the match: miss, and the normal path reuses the lookup
+        miss = asyncio.run(retriever.find_direct_answer("hücre zarı nedir", "s1", threshold=0.95))
+        assert miss["direct_answer"] is None
+        result = asyncio.run(retriever.retrieve_for_query(
+            "hücre zarı nedir", "s1",
+            topic_classification=miss["topic_classification"],
+            qa_matches=miss["qa_matches"],
+        ))
+        assert retriever._classify_to_topics.await_count == 2
+        assert retriever._match_qa_pairs.await_count == 2
+        assert result["results"]["qa_pairs"] == miss["qa_matches"]
+        retriever._retrieve_chunks.assert_awaited_once()
+        print("✅ QA lookup runs once per query, chunks only on a miss")
+
+    def test_report(self):
+        print_section("Test: hit rate and latency report")
+        with self.db.get_connection() as conn:
+            for hit, latency in [(True, 40), (True, 60), (False, 2000), (False, 3000), (True, 50)]:
+                record_fast_path_outcome(conn, "s1", hit, latency)
+            record_fast_path_outcome(conn, "s2", False, 1000)
+            conn.execute("""
+                INSERT INTO student_qa_interactions
+                (qa_id, user_id, session_id, original_question, similarity_score, response_time_ms, response_source)
+                VALUES (7, 'u1', 's1', 'hücre zarı nedir', 0.93, 45, 'direct_qa')
+            """)
+            conn.commit()
+
+            report = load_fast_path_report(conn, "s1", days=7)
+
+        assert (report["hits"], report["misses"], report["queries"]) == (3, 2, 5)
+        assert report["hit_rate"] == 0.6
+        assert report["hit_latency"] == {"avg_ms": 50.0, "max_ms": 60}
+        assert report["miss_latency"] == {"avg_ms": 2500.0, "max_ms": 3000}
+        assert report["estimated_time_saved_ms"] == 3 * (2500 - 50)
+        assert len(report["daily"]) == 1 and report["daily"][0]["hit_rate"] == 0.6
+        assert report["top_qa_pairs"][0]["qa_id"] == 7
+        assert report["top_qa_pairs"][0]["question"] == "Hücre zarı nedir?"
+        print("✅ Per-session counters and most served QA pairs")
+
+
+def main():
+    """Run all tests"""
+    print_section("🧪 QA Fast Path Tests")
+
+    test_suite = TestQAFastPath()
+    for name in [
+        "test_answer_templates",
+        "test_threshold_priority",
+        "test_direct_answer_before_chunk_retrieval",
+        "test_report",
+    ]:
+        test_suite.setup_method()
+        getattr(test_suite, name)()
+
+    print_section("✅ ALL TESTS PASSED")
+
+
+if __name__ == "__main__":
+    main()
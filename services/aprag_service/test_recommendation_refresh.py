@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Recommendation Refresh Tests
+Freshness state, debounced background generation and stored results
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database.database import DatabaseManager
+from services import recommendation_refresh
+from services.recommendation_refresh import (
+    REFRESH_EVENT_THRESHOLD,
+    RecommendationRefreshWorker,
+    backoff_remaining,
+    get_refresh_state,
+    is_stale,
+    record_activity,
+    refresh_due,
+    store_recommendations,
+)
+
+
+def print_section(title):
+    """Print formatted section header"""
+    print("\n" + "=" * 70)
+    print(f"  {title}")
+    print("=" * 70)
+
+
+def create_test_db() -> DatabaseManager:
+    """Fresh SQLite file with the APRAG schema and a users table"""
+    db_path = str(Path(tempfile.mkdtemp()) / "recommendation_test.db")
+    db = DatabaseManager(db_path)
+    with db.get_connection() as conn:
+        # users is owned by auth_service; foreign keys reference users(id)
+        conn.execute("CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, username TEXT UNIQUE)")
+        conn.execute("INSERT INTO users (id, username) VALUES ('u1', 'u1')")
+        conn.commit()
+    return db
+
+
+class CountingGenerator:
+    """Generator stub that records calls and returns one topic recommendation"""
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = []
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, db, user_id, session_id):
+        time.sleep(self.delay)
+        with self.lock:
+            self.calls.append((user_id, session_id))
+            run = len(self.calls)
+        return [{
+            "recommendation_type": "topic",
+            "title": f"Öneri {run}",
+            "description": "Test",
+            "content": {"run": run},
+            "priority": 5,
+            "relevance_score": 0.6
+        }]
+
+
+def pending_titles(db: DatabaseManager):
+    rows = db.execute_query(
+        "SELECT title FROM recommendations WHERE user_id = 'u1' AND session_id = 's1' AND status = 'pending'"
+    )
+    return [row["title"] for row in rows]
+
+
+class TestRecommendationRefresh:
+    """Unit tests for precomputed recommendations"""
+
+    def setup_method(self):
+        self.db = create_test_db()
+
+    def test_freshness_state(self):
+        """Test 1: Enough activity makes stored recommendations stale, a refresh makes them fresh"""
+        print_section("Test 1: Freshness State")
+
+        assert is_stale(get_refresh_state(self.db, "u1", "s1"))
+        for expected in range(1, REFRESH_EVENT_THRESHOLD + 2):
+            assert record_activity(self.db, "u1", "s1") == expected
+
+        # Events arrived during generation, so the result is still stale
+        store_recommendations(self.db, "u1", "s1", CountingGenerator()(self.db, "u1", "s1"), events_seen=1)
+        state = get_refresh_state(self.db, "u1", "s1")
+        assert state["generated_at"] is not None
+        assert state["pending_events"] == REFRESH_EVENT_THRESHOLD and is_stale(state)
+
+        # Below the threshold: fresh until the age limit
+        store_recommendations(self.db, "u1", "s1", [], events_seen=REFRESH_EVENT_THRESHOLD - 1)
+        state = get_refresh_state(self.db, "u1", "s1")
+        assert state["pending_events"] == 1 and not is_stale(state)
+        assert is_stale(state, max_age_seconds=-1)
+        assert is_stale(state, event_threshold=1)
+        print("✅ Staleness follows the event threshold and age")
+
+    def test_refresh_replaces_pending_only(self):
+        """Test 2: Refresh replaces pending generated rows, keeps accepted ones"""
+        print_section("Test 2: Stored Results")
+
+        generator = CountingGenerator()
+        worker = RecommendationRefreshWorker(generator, debounce_seconds=0)
+        worker.refresh_now(self.db, "u1", "s1")
+        self.db.execute_update("UPDATE recommendations SET status = 'accepted'")
+        worker.refresh_now(self.db, "u1", "s1")
+        worker.refresh_now(self.db, "u1", "s1")
+
+        assert pending_titles(self.db) == ["Öneri 3"]
+        accepted = self.db.execute_query("SELECT title FROM recommendations WHERE status = 'accepted'")
+        assert [row["title"] for row in accepted] == ["Öneri 1"]
+        print("✅ Only the latest generation is pending")
+
+    def test_debounced_burst_runs_once(self):
+        """Test 3: A burst of activity triggers a single background generation"""
+        print_section("Test 3: Debounce")
+
+        generator = CountingGenerator()
+        worker = RecommendationRefreshWorker(generator, debounce_seconds=0.2)
+        previous = recommendation_refresh.get_default_worker()
+        recommendation_refresh.set_default_worker(worker)
+        try:
+            for _ in range(10):
+                recommendation_refresh.notify_activity(self.db, "u1", "s1")
+            assert generator.calls == []
+            assert worker.flush(timeout=10)
+        finally:
+            recommendation_refresh.set_default_worker(previous)
+            worker.stop()
+
+        assert generator.calls == [("u1", "s1")]
+        assert pending_titles(self.db) == ["Öneri 1"]
+        assert not is_stale(get_refresh_state(self.db, "u1", "s1"))
+        print("✅ 10 events → 1 generation")
+
+    def test_generator_failure_is_recorded(self):
+        """Test 4: A failing generator keeps old results and records the error"""
+        print_section("Test 4: Failure")
+
+        worker = RecommendationRefreshWorker(CountingGenerator(), debounce_seconds=0)
+        worker.refresh_now(self.db, "u1", "s1")
+
+        def failing(db, user_id, session_id):
+            raise RuntimeError("model inference unavailable")
+
+        worker.generate = failing
+        assert worker.refresh_now(self.db, "u1", "s1") is None
+        assert pending_titles(self.db) == ["Öneri 1"]
+        assert "unavailable" in get_refresh_state(self.db, "u1", "s1")["last_error"]
+        print("✅ Previous recommendations kept, error recorded")
+
+    def test_backoff_after_failures(self):
+        """Test 5: Failed generations are not retried until their backoff passed"""
+        print_section("Test 5: Failure Backoff")
+
+        attempts = []
+
+        def failing(db, user_id, session_id):
+            attempts.append(1)
+            raise RuntimeError("model inference unavailable")
+
+        worker = RecommendationRefreshWorker(failing, debounce_seconds=0)
+        assert worker.refresh_now(self.db, "u1", "s1") is None
+        state = get_refresh_state(self.db, "u1", "s1")
+        assert state["failed_refreshes"] == 1
+        assert is_stale(state) and not refresh_due(state)
+        assert 0 < backoff_remaining(state) <= 60
+
+        # Reads and activity during the backoff do not call the generator again
+        assert worker.refresh_now(self.db, "u1", "s1") is None
+        assert len(attempts) == 1
+
+        # Backoff over: next failure doubles it
+        self.db.execute_update("UPDATE recommendation_refresh_state SET last_error_at = datetime('now', '-61 seconds')")
+        assert refresh_due(get_refresh_state(self.db, "u1", "s1"))
+        worker.refresh_now(self.db, "u1", "s1")
+        state = get_refresh_state(self.db, "u1", "s1")
+        assert len(attempts) == 2 and state["failed_refreshes"] == 2
+        assert 60 < backoff_remaining(state) <= 120
+
+        # A successful generation clears the counter
+        self.db.execute_update("UPDATE recommendation_refresh_state SET last_error_at = datetime('now', '-121 seconds')")
+        worker.generate = CountingGenerator()
+        assert worker.refresh_now(self.db, "u1", "s1") == 1
+        state = get_refresh_state(self.db, "u1", "s1")
+        assert state["failed_refreshes"] == 0 and backoff_remaining(state) == 0
+        assert not is_stale(state)
+        print("✅ 60s, then 120s backoff; reset after success")
+
+
+def main():
+    """Run all tests"""
+    print_section("🧪 Recommendation Refresh Tests")
+
+    test_suite = TestRecommendationRefresh()
+    for name in [
+        "test_freshness_state",
+        "test_refresh_replaces_pending_only",
+        "test_debounced_burst_runs_once",
+        "test_generator_failure_is_recorded",
+        "test_backoff_after_failures",
+    ]:
+        test_suite.setup_method()
+        getattr(test_suite, name)()
+
+    print_section("✅ ALL TESTS PASSED")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Request Context Tests
+Request-scoped memoization of session settings / metadata lookups and the
+per-request DB/HTTP call counts reported in debug timings
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config.feature_flags import FeatureFlags, get_session_settings_row
+from database.database import DatabaseManager
+from utils.request_context import (
+    DB,
+    current_request,
+    invalidate,
+    memoized_db,
+    memoized_http,
+    request_scope,
+)
+
+
+def print_section(title):
+    """Print formatted section header"""
+    print("\n" + "=" * 70)
+    print(f"  {title}")
+    print("=" * 70)
+
+
+class CountingDatabaseManager(DatabaseManager):
+    """DatabaseManager that counts execute_query calls"""
+
+    def __init__(self, db_path: str):
+        super().__init__(db_path)
+        self.queries = 0
+
+    def execute_query(self, query, params=()):
+        self.queries += 1
+        return super().execute_query(query, params)
+
+
+def create_test_db() -> CountingDatabaseManager:
+    """Fresh SQLite file with the APRAG schema and one session_settings row"""
+    db_path = str(Path(tempfile.mkdtemp()) / "request_context_test.db")
+    db = CountingDatabaseManager(db_path)
+    with db.get_connection() as conn:
+        # users is owned by auth_service; session_settings.user_id references users(username)
+        conn.execute("CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, username TEXT UNIQUE)")
+        conn.execute("INSERT INTO users (id, username) VALUES ('t1', 'teacher')")
+        # enable_ebars is added by the settings API on first use
+        conn.execute("ALTER TABLE session_settings ADD COLUMN enable_ebars BOOLEAN NOT NULL DEFAULT FALSE")
+        conn.execute("""
+            INSERT INTO session_settings (session_id, user_id, enable_ebars,
+                                          enable_personalized_responses, enable_progressive_assessment)
+            VALUES ('s1', 'teacher', 1, 1, 0)
+        """)
+        conn.commit()
+    db.queries = 0
+    return db
+
+
+class TestRequestContext:
+    """Unit tests for the request-scoped lookup memo"""
+
+    def setup_method(self):
+        self.db = create_test_db()
+        FeatureFlags.load_from_database(self.db)
+
+    def test_memo_within_scope(self):
+        print_section("Test: loader runs once per (table, key)")
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return {"rag_settings": {"min_score_threshold": 0.5}}
+
+        with request_scope() as ctx:
+            first = memoized_http("gateway_sessions", "s1", loader)
+            second = memoized_http("gateway_sessions", "s1", loader)
+            memoized_http("gateway_sessions", "s2", loader)
+            assert first is second
+            assert len(calls) == 2
+            assert ctx.stats() == {
+                "db_calls": 0,
+                "http_calls": 2,
+                "memo_hits": 1,
+                "by_table": {"http:gateway_sessions": 2},
+            }
+        assert current_request() is None
+
+        # Outside a request scope: old behaviour, no memo
+        memoized_http("gateway_sessions", "s1", loader)
+        memoized_http("gateway_sessions", "s1", loader)
+        assert len(calls) == 4
+        print("✅ One call per key inside the scope, every call outside")
+
+    def test_errors_and_invalidate(self):
+        print_section("Test: failed loads and writes")
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("db busy")
+            return [{"user_id": "u1"}]
+
+        with request_scope() as ctx:
+            try:
+                memoized_db("student_profiles", ("u1", "s1"), flaky)
+                raise AssertionError("loader error should propagate")
+            except RuntimeError:
+                pass
+            assert memoized_db("student_profiles", ("u1", "s1"), flaky) == [{"user_id": "u1"}]
+            assert len(attempts) == 2
+
+            invalidate(DB, "student_profiles", ("u1", "s1"))
+            memoized_db("student_profiles", ("u1", "s1"), flaky)
+            assert len(attempts) == 3
+            assert ctx.stats()["db_calls"] == 2
+        print("✅ Errors are not memoized, invalidate forces a reload")
+
+    def test_feature_flags_share_session_settings_row(self):
+        print_section("Test: feature flags read session_settings once")
+        with request_scope() as ctx:
+            assert FeatureFlags.is_ebars_enabled("s1") is True
+            assert FeatureFlags.is_personalized_responses_enabled("s1") is True
+            assert FeatureFlags.is_progressive_assessment_enabled("s1") is False
+            row = get_session_settings_row(self.db, "s1")
+            assert row["enable_ebars"] == 1
+            assert self.db.queries == 1
+            assert ctx.stats()["db_calls"] == 1
+            assert ctx.stats()["memo_hits"] == 3
+
+        # Without a scope every flag queries again, results unchanged
+        assert FeatureFlags.is_ebars_enabled("s1") is True
+        assert FeatureFlags.is_progressive_assessment_enabled("s1") is False
+        assert self.db.queries == 3
+
+        # Unknown session: falls back to the environment default
+        with request_scope():
+            assert FeatureFlags.is_progressive_assessment_enabled("missing") is True
+            assert get_session_settings_row(self.db, "missing") is None
+        print("✅ One session_settings query per request")
+
+    def test_concurrent_requests_are_isolated(self):
+        print_section("Test: contextvars propagation")
+
+        async def lookup(session_id):
+            await asyncio.sleep(0)
+            return memoized_http("gateway_sessions", session_id, lambda: {"id": session_id})
+
+        async def handle(session_id):
+            with request_scope() as ctx:
+                # Tasks started by the request copy its context and share the memo
+                await asyncio.gather(*(lookup(session_id) for _ in range(3)))
+                await lookup(session_id)
+                return ctx.stats()
+
+        async def run():
+            return await asyncio.gather(handle("a"), handle("b"))
+
+        for stats in asyncio.run(run()):
+            assert stats["http_calls"] == 1
+            assert stats["memo_hits"] == 3
+        print("✅ Child tasks share the request memo, requests do not")
+
+
+def main():
+    """Run all tests"""
+    print_section("🧪 Request Context Tests")
+
+    test_suite = TestRequestContext()
+    for name in [
+        "test_memo_within_scope",
+        "test_errors_and_invalidate",
+        "test_feature_flags_share_session_settings_row",
+        "test_concurrent_requests_are_isolated",
+    ]:
+        test_suite.setup_method()
+        getattr(test_suite, name)()
+
+    print_section("✅ ALL TESTS PASSED")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Student Context Tests
+Single round-trip profile/interaction/EBARS/settings loading and its TTL cache
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database import student_context
+from database.database import DatabaseManager
+from database.student_context import invalidate_student_context, load_student_context
+from ebars import score_calculator
+from ebars.score_calculator import ComprehensionScoreCalculator
+
+
+def print_section(title):
+    """Print formatted section header"""
+    print("\n" + "=" * 70)
+    print(f"  {title}")
+    print("=" * 70)
+
+
+def create_test_db() -> DatabaseManager:
+    """Fresh SQLite file with the APRAG schema, one EBARS row and session settings"""
+    db_path = str(Path(tempfile.mkdtemp()) / "context_test.db")
+    db = DatabaseManager(db_path)
+    with db.get_connection() as conn:
+        # users is owned by auth_service; foreign keys reference users(id)
+        conn.execute("CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, username TEXT UNIQUE)")
+        conn.executemany("INSERT INTO users (id, username) VALUES (?, ?)", [("u1", "u1"), ("u2", "u2")])
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS student_comprehension_scores (
+                user_id TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                comprehension_score DECIMAL(5,2) NOT NULL DEFAULT 50.0,
+                current_difficulty_level VARCHAR(20) NOT NULL DEFAULT 'normal',
+                total_feedback_count INTEGER DEFAULT 0,
+                positive_feedback_count INTEGER DEFAULT 0,
+                negative_feedback_count INTEGER DEFAULT 0,
+                consecutive_positive_count INTEGER DEFAULT 0,
+                consecutive_negative_count INTEGER DEFAULT 0,
+                last_feedback_at TIMESTAMP,
+                UNIQUE(user_id, session_id)
+            )
+        """)
+        conn.execute("""
+            INSERT INTO student_comprehension_scores
+            (user_id, session_id, comprehension_score, current_difficulty_level, total_feedback_count)
+            VALUES ('u1', 's1', 72.5, 'good', 4)
+        """)
+        conn.execute(
+            "INSERT INTO session_settings (session_id, user_id, enable_zpd) VALUES ('s1', 'u1', 0)"
+        )
+        for i in range(25):
+            conn.execute("""
+                INSERT INTO student_interactions
+                (user_id, session_id, query, original_response, sources, timestamp)
+                VALUES ('u1', 's1', ?, ?, '[]', datetime('2026-01-01', ?))
+            """, (f"soru {i}", "uzun cevap " * 50, f"+{i} minutes"))
+        conn.commit()
+    return db
+
+
+class TestStudentContext:
+    """Unit tests for the shared student context loader"""
+
+    def setup_method(self):
+        self.db = create_test_db()
+        invalidate_student_context()
+        with score_calculator._state_cache_lock:
+            score_calculator._state_cache.clear()
+
+    def test_single_load(self):
+        """Test 1: Profile, projected interactions, EBARS state and settings"""
+        print_section("Test 1: Single Load")
+
+        context = load_student_context(self.db, "u1", "s1")
+        assert context.profile_dict()["average_understanding"] == 3.0
+        assert self.db.execute_query("SELECT COUNT(*) AS n FROM student_profiles")[0]["n"] == 1
+
+        assert len(context.recent_interactions) == 20
+        assert context.recent_interactions[0]["query"] == "soru 24"
+        assert "original_response" not in context.recent_interactions[0]
+        assert context.ebars_state["difficulty_level"] == "good"
+        assert context.session_settings["enable_zpd"] == 0
+
+        # EBARS state cache primed from the same read
+        calculator = ComprehensionScoreCalculator(self.db)
+        assert calculator.get_state("u1", "s1")["comprehension_score"] == 72.5
+        print("✅ All four sources loaded on one connection")
+
+    def test_cache_and_invalidation(self):
+        """Test 2: Cached within the TTL, dropped by invalidation"""
+        print_section("Test 2: Cache")
+
+        first = load_student_context(self.db, "u1", "s1")
+        first.recent_interactions.clear()  # callers get private copies
+        self.db.execute_update("UPDATE session_settings SET enable_zpd = 1 WHERE session_id = 's1'")
+
+        cached = load_student_context(self.db, "u1", "s1")
+        assert len(cached.recent_interactions) == 20
+        assert cached.session_settings["enable_zpd"] == 0
+        assert len(load_student_context(self.db, "u1", "s1", limit=5).recent_interactions) == 5
+
+        invalidate_student_context(session_id="s1")
+        assert load_student_context(self.db, "u1", "s1").session_settings["enable_zpd"] == 1
+        print("✅ Stale reads bounded by invalidation")
+
+    def test_prime_keeps_newer_state(self):
+        """Test 3: Priming never replaces a live EBARS cache entry"""
+        print_section("Test 3: EBARS Priming")
+
+        calculator = ComprehensionScoreCalculator(self.db)
+        calculator._cache_state("u1", "s1", {**calculator.get_state("u1", "s1"), "comprehension_score": 90.0})
+        context = load_student_context(self.db, "u1", "s1")
+        assert context.ebars_state["comprehension_score"] == 72.5
+        assert calculator.get_state("u1", "s1")["comprehension_score"] == 90.0
+
+        context = load_student_context(self.db, "u2", "s1", create_profile=False)
+        assert context.ebars_state is None
+        assert context.profile_dict()["total_interactions"] == 0
+        assert not self.db.execute_query("SELECT 1 FROM student_profiles WHERE user_id = 'u2'")
+        print("✅ Newer EBARS writes win over primed reads")
+
+    def test_invalidation_during_load(self):
+        """Test 4: A load that overlaps a write does not cache the old snapshot"""
+        print_section("Test 4: Invalidation Race")
+
+        original_load = student_context._load
+
+        def load_then_write(*args, **kwargs):
+            context = original_load(*args, **kwargs)
+            # Another request writes and invalidates after our read
+            self.db.execute_update("UPDATE session_settings SET enable_zpd = 1 WHERE session_id = 's1'")
+            invalidate_student_context(session_id="s1")
+            return context
+
+        student_context._load = load_then_write
+        try:
+            raced = load_student_context(self.db, "u1", "s1")
+        finally:
+            student_context._load = original_load
+        assert raced.session_settings["enable_zpd"] == 0
+        assert load_student_context(self.db, "u1", "s1").session_settings["enable_zpd"] == 1
+
+        # Invalidating another student or session does not block caching
+        load_student_context(self.db, "u1", "s1")
+        invalidate_student_context("u2", "s2")
+        self.db.execute_update("UPDATE session_settings SET enable_zpd = 0 WHERE session_id = 's1'")
+        assert load_student_context(self.db, "u1", "s1").session_settings["enable_zpd"] == 1
+        print("✅ Racing load served once, never cached")
+
+
+def main():
+    """Run all tests"""
+    print_section("🧪 Student Context Tests")
+
+    test_suite = TestStudentContext()
+    for name in [
+        "test_single_load",
+        "test_cache_and_invalidation",
+        "test_prime_keeps_newer_state",
+        "test_invalidation_during_load",
+    ]:
+        test_suite.setup_method()
+        getattr(test_suite, name)()
+
+    print_section("✅ ALL TESTS PASSED")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Topic Analytics Rollup Tests
+Incremental maintenance, rebuild and consistency check against the views
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from api.profiles import reset_profile
+from api.topics import delete_topic
+from config.feature_flags import FeatureFlags
+from database.database import DatabaseManager
+from database.topic_rollups import (
+    check_rollup_consistency,
+    derive_topic_metrics,
+    rebuild_topic_rollups,
+    record_feedback,
+    record_topic_mapping,
+)
+
+
+def print_section(title):
+    """Print formatted section header"""
+    print("\n" + "=" * 70)
+    print(f"  {title}")
+    print("=" * 70)
+
+
+def create_test_db() -> DatabaseManager:
+    """Fresh SQLite file with the APRAG schema, analytics views, users and two topics"""
+    db_path = str(Path(tempfile.mkdtemp()) / "rollup_test.db")
+    db = DatabaseManager(db_path)
+    with db.get_connection() as conn:
+        db.apply_analytics_views(conn)
+        # users is owned by auth_service; foreign keys reference users(id)
+        conn.execute("CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, username TEXT UNIQUE)")
+        conn.executemany("INSERT INTO users (id, username) VALUES (?, ?)", [(f"u{i}", f"u{i}") for i in range(1, 6)])
+        for topic_id, title, difficulty in [(1, "Hücre", "beginner"), (2, "Mitoz", "advanced")]:
+            conn.execute(
+                "INSERT INTO course_topics (topic_id, session_id, topic_title, estimated_difficulty) VALUES (?, 's1', ?, ?)",
+                (topic_id, title, difficulty),
+            )
+        conn.execute(
+            "INSERT INTO topic_qa_pairs (topic_id, question, answer, difficulty_level, question_type) VALUES (1, 'S?', 'C', 'beginner', 'factual')"
+        )
+        conn.commit()
+    return db
+
+
+def add_interaction(db: DatabaseManager, user_id: str, processing_time_ms: int = 100) -> int:
+    return db.execute_insert(
+        "INSERT INTO student_interactions (user_id, session_id, query, original_response, processing_time_ms) VALUES (?, 's1', 'q', 'a', ?)",
+        (user_id, processing_time_ms),
+    )
+
+
+def add_mapping(db: DatabaseManager, interaction_id: int, topic_id: int, complexity: str = "intermediate"):
+    with db.get_connection() as conn:
+        cursor = conn.execute(
+            "INSERT INTO question_topic_mapping (interaction_id, topic_id, confidence_score, question_complexity) VALUES (?, ?, 0.9, ?)",
+            (interaction_id, topic_id, complexity),
+        )
+        record_topic_mapping(conn, cursor.lastrowid)
+        conn.commit()
+
+
+def add_feedback(db: DatabaseManager, interaction_id: int, user_id: str, understanding: int, satisfaction: int):
+    with db.get_connection() as conn:
+        cursor = conn.execute(
+            "INSERT INTO student_feedback (interaction_id, user_id, session_id, understanding_level, satisfaction_level) VALUES (?, ?, 's1', ?, ?)",
+            (interaction_id, user_id, understanding, satisfaction),
+        )
+        record_feedback(conn, cursor.lastrowid)
+        conn.commit()
+
+
+def rollup_rows(db: DatabaseManager):
+    users = db.execute_query("SELECT * FROM topic_user_rollup ORDER BY user_id, topic_id")
+    sessions = db.execute_query("SELECT * FROM topic_session_rollup ORDER BY session_id, topic_id")
+    for row in users + sessions:
+        row.pop("updated_at")
+    return users, sessions
+
+
+class TestTopicRollups:
+    """Unit tests for materialized topic analytics"""
+
+    def setup_method(self):
+        self.db = create_test_db()
+
+    def test_incremental_matches_views(self):
+        """Test 1: Random mapping/feedback order stays consistent with the views"""
+        print_section("Test 1: Incremental vs Views")
+
+        rng = random.Random(7)
+        for _ in range(40):
+            user_id = f"u{rng.randint(1, 5)}"
+            interaction_id = add_interaction(self.db, user_id, rng.randint(50, 500))
+            # Feedback may arrive before or after classification
+            if rng.random() < 0.5:
+                add_feedback(self.db, interaction_id, user_id, rng.randint(1, 5), rng.randint(1, 5))
+            add_mapping(self.db, interaction_id, rng.choice([1, 2]), rng.choice(["basic", "advanced"]))
+            if rng.random() < 0.5:
+                add_feedback(self.db, interaction_id, user_id, rng.randint(1, 5), rng.randint(1, 5))
+
+        with self.db.get_connection() as conn:
+            report = check_rollup_consistency(conn, "s1")
+        assert report["consistent"], report["mismatches"][:5]
+        assert report["view_rows_checked"] == 2
+        assert report["view_error"] is None
+        print(f"✅ {report['user_rows_checked']} user rows and both topics match the views")
+
+    def test_rebuild_equals_incremental(self):
+        """Test 2: Rebuild from base tables reproduces incremental rollups"""
+        print_section("Test 2: Rebuild")
+
+        i1 = add_interaction(self.db, "u1")
+        add_mapping(self.db, i1, 1)
+        add_feedback(self.db, i1, "u1", 5, 4)
+        i2 = add_interaction(self.db, "u2")
+        add_feedback(self.db, i2, "u2", 2, 2)
+        add_mapping(self.db, i2, 1)
+        incremental = rollup_rows(self.db)
+
+        with self.db.get_connection() as conn:
+            result = rebuild_topic_rollups(conn, "s1")
+        assert result == {"user_rows": 2, "session_rows": 1}
+        assert rollup_rows(self.db) == incremental
+
+        metrics = derive_topic_metrics(incremental[1][0])
+        assert metrics["students_attempted"] == 2
+        assert metrics["avg_understanding"] == 3.5
+        assert metrics["success_rate"] == 0.5
+        print("✅ Rebuilt rollups identical to incremental ones")
+
+    def test_check_detects_drift(self):
+        """Test 3: Checker reports drift, rebuild repairs it"""
+        print_section("Test 3: Drift Detection")
+
+        i1 = add_interaction(self.db, "u1")
+        add_mapping(self.db, i1, 2)
+        add_feedback(self.db, i1, "u1", 4, 4)
+        self.db.execute_update("UPDATE topic_session_rollup SET feedback_count = feedback_count + 3")
+
+        with self.db.get_connection() as conn:
+            report = check_rollup_consistency(conn)
+            assert not report["consistent"]
+            assert any(m.get("field") == "feedback_count" for m in report["mismatches"])
+            rebuild_topic_rollups(conn)
+            assert check_rollup_consistency(conn)["consistent"]
+        print("✅ Drift detected and repaired")
+
+    def _populate(self):
+        for user_id, topic_id, understanding in [("u1", 1, 5), ("u1", 2, 2), ("u2", 1, 3), ("u2", 2, 4)]:
+            interaction_id = add_interaction(self.db, user_id)
+            add_mapping(self.db, interaction_id, topic_id)
+            add_feedback(self.db, interaction_id, user_id, understanding, 3)
+
+    def test_delete_topic_drops_rollups(self):
+        """Test 4: Deleting a topic removes its rollup rows"""
+        print_section("Test 4: Topic Delete")
+
+        self._populate()
+        os.environ["APRAG_DB_PATH"] = self.db.db_path
+        FeatureFlags.load_from_database(self.db)
+        asyncio.run(delete_topic(2))
+
+        users, sessions = rollup_rows(self.db)
+        assert {row["topic_id"] for row in users + sessions} == {1}
+        with self.db.get_connection() as conn:
+            report = check_rollup_consistency(conn, "s1")
+        assert report["consistent"], report["mismatches"][:5]
+        print("✅ Topic 2 rollups gone, remaining rows match the views")
+
+    def test_reset_profile_recomputes_rollups(self):
+        """Test 5: Resetting a profile removes the student's share of the rollups"""
+        print_section("Test 5: Profile Reset")
+
+        self._populate()
+        asyncio.run(reset_profile("u1", "s1", self.db))
+
+        users, sessions = rollup_rows(self.db)
+        assert {row["user_id"] for row in users} == {"u2"}
+        assert all(row["feedback_count"] == 1 for row in sessions)
+        with self.db.get_connection() as conn:
+            report = check_rollup_consistency(conn, "s1")
+        assert report["consistent"], report["mismatches"][:5]
+        print("✅ Only u2 is counted after the reset")
+
+
+def main():
+    """Run all tests"""
+    print_section("🧪 Topic Analytics Rollup Tests")
+
+    test_suite = TestTopicRollups()
+    for name in [
+        "test_incremental_matches_views",
+        "test_rebuild_equals_incremental",
+        "test_check_detects_drift",
+        "test_delete_topic_drops_rollups",
+        "test_reset_profile_recomputes_rollups",
+    ]:
+        test_suite.setup_method()
+        getattr(test_suite, name)()
+
+    print_section("✅ ALL TESTS PASSED")
+
+
+if __name__ == "__main__":
+    main()
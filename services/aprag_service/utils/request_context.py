@@ -0,0 +1,128 @@
+"""
+Request-scoped memoization of session, profile and settings lookups
+İstek ömrü boyunca oturum / profil / ayar sorgularının tek seferlik okunması
+
+One ``POST /hybrid-rag/query`` read the same metadata several times: the
+session was fetched from the API Gateway at the start (RAG settings) and again
+before the score check (``min_score_threshold``); every ``FeatureFlags.is_*``
+session check ran its own ``session_settings`` query, and the debug block read
+the same row once more with ``SELECT *``. None of these change while a single
+request is being answered.
+
+The endpoint now opens a ``RequestContext`` at the router boundary. It is
+stored in a ``contextvars.ContextVar``, so everything awaited by the endpoint
+(and asyncio tasks it starts, which copy the context) sees the same object
+without passing it through every signature. Lookups go through
+``memoized_db`` / ``memoized_http`` with a ``(table, key)`` pair: the first
+call runs the loader, later calls in the same request get the stored value.
+Writes drop their entry with ``invalidate``.
+
+Outside a request scope (background jobs, other endpoints, tests) the loader
+simply runs every time, i.e. the old behaviour.
+
+This is not a cache across requests: nothing outlives the response, so no
+TTL or cross-process invalidation is needed. (database/student_context.py
+is the short-TTL cache of personalization inputs shared between requests.)
+
+Memoized values are shared within the request; treat them as read-only.
+``RequestContext.stats()`` reports the distinct DB/HTTP calls and memo hits
+and is added to the endpoint's ``debug_info.timing``.
+"""
+
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DB = "db"
+HTTP = "http"
+
+
+class RequestContext:
+    """Memo of (kind, table, key) lookups plus call counters for one request"""
+
+    def __init__(self):
+        self._memo: Dict[Tuple[str, str, Hashable], Any] = {}
+        self.calls: Counter = Counter()  # kind -> loader runs
+        self.memo_hits = 0
+        self.by_table: Counter = Counter()  # "kind:table" -> loader runs
+
+    def lookup(self, kind: str, table: str, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Stored value for (kind, table, key); the loader runs on the first call only"""
+        memo_key = (kind, table, key)
+        if memo_key in self._memo:
+            self.memo_hits += 1
+            return self._memo[memo_key]
+
+        # Loader errors propagate and are not stored: the next call tries again
+        value = loader()
+        self.calls[kind] += 1
+        self.by_table[f"{kind}:{table}"] += 1
+        self._memo[memo_key] = value
+        return value
+
+    def invalidate(self, kind: str, table: str, key: Hashable):
+        self._memo.pop((kind, table, key), None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Distinct DB/HTTP calls and memo hits of this request"""
+        return {
+            "db_calls": self.calls[DB],
+            "http_calls": self.calls[HTTP],
+            "memo_hits": self.memo_hits,
+            "by_table": dict(self.by_table),
+        }
+
+
+_current_request: ContextVar[Optional[RequestContext]] = ContextVar("aprag_request_context", default=None)
+
+
+def current_request() -> Optional[RequestContext]:
+    """Context of the request being answered, None outside a request scope"""
+    return _current_request.get()
+
+
+def begin_request() -> Tuple[RequestContext, Token]:
+    """Open a request scope; pass the token to ``end_request`` (in a finally block)"""
+    context = RequestContext()
+    return context, _current_request.set(context)
+
+
+def end_request(token: Token):
+    _current_request.reset(token)
+
+
+@contextmanager
+def request_scope() -> Iterator[RequestContext]:
+    """``with request_scope() as ctx:`` form of begin_request / end_request"""
+    context, token = begin_request()
+    try:
+        yield context
+    finally:
+        end_request(token)
+
+
+def memoized_db(table: str, key: Hashable, loader: Callable[[], Any]) -> Any:
+    """DB lookup memoized for the current request (runs the loader when there is none)"""
+    context = _current_request.get()
+    if context is None:
+        return loader()
+    return context.lookup(DB, table, key, loader)
+
+
+def memoized_http(resource: str, key: Hashable, loader: Callable[[], Any]) -> Any:
+    """Inter-service metadata call memoized for the current request"""
+    context = _current_request.get()
+    if context is None:
+        return loader()
+    return context.lookup(HTTP, resource, key, loader)
+
+
+def invalidate(kind: str, table: str, key: Hashable):
+    """Drop a memoized value after writing it (no-op outside a request scope)"""
+    context = _current_request.get()
+    if context is not None:
+        context.invalidate(kind, table, key)
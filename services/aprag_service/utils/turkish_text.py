@@ -0,0 +1,121 @@
+"""
+Turkish text normalization and tokenization
+Türkçe metin normalizasyonu ve tokenizasyonu
+
+One deterministic pipeline for every retrieval path (BM25, keyword topic
+classification, language detection, dedup signatures). Previously each path
+lower-cased and tokenized the same query itself, with different rules:
+Python ``str.lower()`` turns "I" into "i" and "İ" into "i̇" (i + combining
+dot), so "ISI" never matched "ısı" and "İnsan" never matched "insan".
+
+Pipeline (``analyze``):
+
+1. Unicode NFC: decomposed "ş" (s + U+0327, common in PDF text) -> "ş"
+2. Turkish case folding: "I" -> "ı", "İ" -> "i", then ``lower()``
+3. Apostrophe suffixes are dropped: "Ankara'nın" -> "ankara"
+4. ``tokens``: ``\\w+`` runs (numbers kept)
+5. ``terms``: stopwords and 1-letter tokens removed, light stemming (one
+   case/possessive suffix, then one plural suffix), ASCII folding of
+   Turkish letters so "hücrenin", "hucreler" and "Hücre" share a term
+
+Results are cached per input text; a request that normalizes the same query
+in several components pays for it once.
+
+NOTE: services/aprag_service/utils/turkish_text.py is a verbatim copy (the
+aprag image is built from its own directory); tests/unit/test_turkish_text.py
+fails when the two drift.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
+TURKISH_STOPWORDS = frozenset({
+    'acaba', 'ama', 'aslında', 'az', 'bazı', 'belki', 'bir', 'biri', 'birkaç', 'birşey', 'biz', 'bu',
+    'çok', 'çünkü', 'da', 'daha', 'de', 'defa', 'diye', 'eğer', 'en', 'gibi', 'hangi', 'hem', 'hep',
+    'hepsi', 'her', 'hiç', 'için', 'ile', 'ise', 'kadar', 'kez', 'ki', 'kim', 'mı', 'mi', 'mu', 'mü',
+    'nasıl', 'ne', 'neden', 'nedir', 'nerde', 'nerede', 'nereye', 'niçin', 'niye', 'o', 'sanki', 'şey',
+    'siz', 'şu', 'tüm', 've', 'veya', 'ya', 'yani'
+})
+
+_TR_LOWER_MAP = str.maketrans({"I": "ı", "İ": "i"})
+_ASCII_FOLD_MAP = str.maketrans("çğıöşüâîû", "cgiosuaiu")
+
+# "Ankara'nın", "DNA’ya": the suffix after the apostrophe is not part of the word
+_APOSTROPHE_SUFFIX_RE = re.compile(r"(\w)['’‘`ʼ]\w*")
+_TOKEN_RE = re.compile(r"\w+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Longest first; a suffix is stripped only if at least MIN_STEM_LENGTH characters remain
+_CASE_SUFFIXES = tuple(sorted((
+    'larından', 'lerinden', 'larının', 'lerinin', 'larını', 'lerini', 'ların', 'lerin', 'ları', 'leri',
+    'nın', 'nin', 'nun', 'nün', 'dan', 'den', 'tan', 'ten', 'daki', 'deki', 'yla', 'yle',
+    'da', 'de', 'ta', 'te', 'ın', 'in', 'un', 'ün'
+), key=len, reverse=True))
+_PLURAL_SUFFIXES = ('lar', 'ler')
+MIN_STEM_LENGTH = 3
+
+CACHE_SIZE = 4096
+
+
+class TextAnalysis(NamedTuple):
+    """Normalized forms of one text"""
+    normalized: str            # NFC, Turkish lower case, apostrophe suffixes dropped
+    tokens: Tuple[str, ...]    # every word of ``normalized``
+    terms: Tuple[str, ...]     # stopwords removed, stemmed, ASCII folded (index/match terms)
+
+
+def normalize_unicode(text: str) -> str:
+    """NFC composition only; keeps case and punctuation (for text shown to an LLM)"""
+    return unicodedata.normalize("NFC", text) if text else ""
+
+
+def turkish_lower(text: str) -> str:
+    """Turkish-aware lower case: I -> ı, İ -> i"""
+    return normalize_unicode(text).translate(_TR_LOWER_MAP).lower()
+
+
+def ascii_fold(text: str) -> str:
+    """ç/ğ/ı/ö/ş/ü -> c/g/i/o/s/u (accent-insensitive matching)"""
+    return text.translate(_ASCII_FOLD_MAP)
+
+
+def light_stem(token: str) -> str:
+    """Strip one case/possessive suffix, then one plural suffix ("hücrelerin" -> "hücre")"""
+    for suffixes in (_CASE_SUFFIXES, _PLURAL_SUFFIXES):
+        for suffix in suffixes:
+            if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+                token = token[:-len(suffix)]
+                break
+    return token
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def analyze(text: str) -> TextAnalysis:
+    """Normalize and tokenize ``text`` (cached)"""
+    normalized = _APOSTROPHE_SUFFIX_RE.sub(r"\1", turkish_lower(text or ""))
+    normalized = _WHITESPACE_RE.sub(" ", normalized).strip()
+    tokens = tuple(_TOKEN_RE.findall(normalized))
+    terms = tuple(
+        ascii_fold(light_stem(token))
+        for token in tokens
+        if len(token) > 1 and token not in TURKISH_STOPWORDS
+    )
+    return TextAnalysis(normalized, tokens, terms)
+
+
+def normalize_text(text: str) -> str:
+    """Normalized text: lower-cased the Turkish way, single spaces"""
+    return analyze(text).normalized
+
+
+def tokenize(text: str, remove_stopwords: bool = True) -> Tuple[str, ...]:
+    """``terms`` (stopwords removed, stemmed, folded) or all ``tokens``"""
+    analysis = analyze(text)
+    return analysis.terms if remove_stopwords else analysis.tokens
+
+
+def match_terms(text: str) -> str:
+    """Space-joined ``terms`` for substring/prefix matching"""
+    return " ".join(analyze(text).terms)
@@ -1,14 +1,21 @@
 """
 Chunk improvement endpoints
+
+Improvement calls the LLM and the embedding service synchronously; the work
+runs on the default thread pool so the event loop keeps serving other
+requests (e.g. the progress endpoint) meanwhile.
 """
-from fastapi import APIRouter
+import asyncio
+from functools import partial
+
+from fastapi import APIRouter, HTTPException
 from models.schemas import (
     ImproveSingleChunkRequest,
     ImproveSingleChunkResponse,
     ImproveAllChunksRequest,
     ImproveAllChunksResponse
 )
-from services.chunk_improver import improve_single_chunk, improve_all_chunks_in_session
+from services.chunk_improver import improve_single_chunk, improve_all_chunks_in_session, get_improvement_progress
 from utils.logger import logger
 
 router = APIRouter()
@@ -26,7 +33,8 @@ async def improve_chunk_endpoint(request: ImproveSingleChunkRequest):
     """
     logger.info(f"📝 Improving single chunk ({len(request.chunk_text)} chars)")
     
-    result = improve_single_chunk(
+    result = await asyncio.get_running_loop().run_in_executor(None, partial(
+        improve_single_chunk,
         chunk_text=request.chunk_text,
         language=request.language,
         model_name=request.model_name,
@@ -35,7 +43,7 @@ async def improve_chunk_endpoint(request: ImproveSingleChunkRequest):
         document_name=request.document_name,
         chunk_index=request.chunk_index,
         update_chromadb=request.update_chromadb
-    )
+    ))
     
     return ImproveSingleChunkResponse(**result)
 
@@ -47,7 +55,8 @@ async def improve_session_chunk(session_id: str, request: ImproveSingleChunkRequ
     """
     logger.info(f"📝 Improving chunk in session {session_id}")
     
-    result = improve_single_chunk(
+    result = await asyncio.get_running_loop().run_in_executor(None, partial(
+        improve_single_chunk,
         chunk_text=request.chunk_text,
         language=request.language,
         model_name=request.model_name,
@@ -56,7 +65,7 @@ async def improve_session_chunk(session_id: str, request: ImproveSingleChunkRequ
         document_name=request.document_name,
         chunk_index=request.chunk_index,
         update_chromadb=request.update_chromadb
-    )
+    ))
     
     return ImproveSingleChunkResponse(**result)
 
@@ -67,24 +76,34 @@ async def improve_all_chunks_endpoint(session_id: str, request: ImproveAllChunks
     Improve all chunks in a session using LLM post-processing
     
     Features:
-    - Bulk processing
+    - Batched processing with bounded LLM concurrency
     - Skip already improved chunks
-    - Retry mechanism
-    - Embedding preservation
+    - Batch re-embedding and one bulk upsert per batch
+    - Resume after the last committed batch
+    - Progress readable from any worker while the run is going
     """
     logger.info(f"🚀 Starting bulk chunk improvement for session {session_id}")
     
-    result = improve_all_chunks_in_session(
+    result = await asyncio.get_running_loop().run_in_executor(None, partial(
+        improve_all_chunks_in_session,
         session_id=session_id,
         language=request.language,
         model_name=request.model_name,
-        skip_already_improved=request.skip_already_improved
-    )
+        skip_already_improved=request.skip_already_improved,
+        batch_size=request.batch_size,
+        max_concurrency=request.max_concurrency,
+        resume=request.resume
+    ))
     
     return ImproveAllChunksResponse(**result)
 
 
-
-
-
-
+@router.get("/sessions/{session_id}/chunks/improve-all/progress")
+async def improve_all_progress_endpoint(session_id: str):
+    """
+    Progress of the latest bulk improvement run (batches committed, counts, ETA)
+    """
+    progress = get_improvement_progress(session_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail=f"No bulk improvement run for session {session_id}")
+    return {"session_id": session_id, **progress}
@@ -1,168 +1,212 @@
 """
 Session-related endpoints - retrieve chunks, stats, etc.
 """
-from typing import List, Dict, Any
-from fastapi import APIRouter, HTTPException
+import hashlib
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+from fastapi import APIRouter, HTTPException, Query, Body
+from fastapi.responses import StreamingResponse
 from core.chromadb_client import get_chroma_client
+from core.turkish_utils import normalize_text
 from utils.helpers import format_collection_name
 from utils.logger import logger
+from utils.chunk_query import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    build_where,
+    document_name_of,
+    fetch_chunk_page,
+    iter_chunks,
+    parse_chunk_ids,
+    parse_fields,
+    to_ndjson,
+)
 
 router = APIRouter()
 
 
+def _find_session_collections(client, session_id: str) -> List[Any]:
+    """
+    Find ALL collections for a session: the primary (non-timestamped) one
+    first, then timestamped versions created by old code.
+    """
+    # Format collection name WITHOUT timestamp
+    # CRITICAL: All files in the same session use the SAME collection (no timestamp)
+    collection_name = format_collection_name(session_id, add_timestamp=False)
+    all_collections_for_session = []
+    
+    # First try to get the non-timestamped collection
+    try:
+        collection = client.get_collection(name=collection_name)
+        all_collections_for_session.append(collection)
+        logger.info(f"✅ Found primary collection: {collection.name}")
+    except Exception as e:
+        logger.debug(f"Primary collection '{collection_name}' not found: {e}")
+    
+    # Then find ALL timestamped versions (for backward compatibility with old code)
+    try:
+        all_collections = client.list_collections()
+        all_collection_names = [c.name for c in all_collections]
+        
+        # Build base pattern to search for
+        base_patterns = [collection_name]
+        if len(session_id) == 32:
+            uuid_format = f"{session_id[:8]}-{session_id[8:12]}-{session_id[12:16]}-{session_id[16:20]}-{session_id[20:]}"
+            base_patterns.append(uuid_format)
+            base_patterns.append(f"session_{session_id}")
+        
+        # Find all collections that match this session (including timestamped)
+        for pattern in base_patterns:
+            for coll_name in sorted(all_collection_names):
+                if coll_name == pattern:
+                    # Exact match - already added if found
+                    continue
+                elif coll_name.startswith(pattern + "_"):
+                    # Timestamped version
+                    suffix = coll_name[len(pattern)+1:]
+                    if suffix.isdigit():
+                        try:
+                            alt_collection = client.get_collection(name=coll_name)
+                            if alt_collection.name not in [c.name for c in all_collections_for_session]:
+                                all_collections_for_session.append(alt_collection)
+                                logger.info(f"✅ Found additional timestamped collection: {coll_name}")
+                        except Exception as e:
+                            logger.warning(f"Could not load collection {coll_name}: {e}")
+    except Exception as e:
+        logger.warning(f"Could not list all collections: {e}")
+    
+    return all_collections_for_session
+
+
+def _shape_chunk(record: Dict[str, Any], position: int) -> Dict[str, Any]:
+    """Convert a raw chunk record into the frontend-compatible chunk format (projection-aware)."""
+    chunk: Dict[str, Any] = {"chunk_id": record["chunk_id"]}
+    metadata = record.get("chunk_metadata")
+    if metadata is not None:
+        chunk["document_name"] = metadata.get("filename", metadata.get("source_file", "unknown"))
+        chunk["chunk_index"] = metadata.get("chunk_index", position + 1)
+        chunk["chunk_metadata"] = {
+            "llm_improved": metadata.get("llm_improved", False),
+            "improvement_timestamp": metadata.get("improvement_timestamp"),
+            "original_length": metadata.get("original_length"),
+            "improved_length": metadata.get("improved_length"),
+            "model_used": metadata.get("model_used"),
+            # Keep additional metadata for backward compatibility
+            "chunk_id": record["chunk_id"],
+            "full_metadata": metadata
+        }
+    if "chunk_text" in record:
+        chunk["chunk_text"] = record["chunk_text"]  # Frontend expects 'chunk_text' not 'content'
+    if "embedding" in record:
+        chunk["embedding"] = record["embedding"]
+    return chunk
+
+
+def _dedupe_chunks(records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Skip chunks already seen by ID, or by (document, chunk_index, content hash)
+    when text and metadata were requested. Legacy timestamped collections may
+    hold copies of the same content under different chunk IDs. The hash is
+    taken over the normalized text, so case/whitespace/NFC variants match.
+
+    Duplicates are only detected within ``records``: whole-session and NDJSON
+    reads pass the complete stream, cursor pages only their own page (the
+    cursor carries no seen-set), so a copy in a later page is returned again.
+    """
+    seen_chunk_ids = set()
+    seen_chunk_signatures = set()
+    for i, record in enumerate(records):
+        chunk_id = record["chunk_id"]
+        if chunk_id in seen_chunk_ids:
+            logger.debug(f"⏭️ Skipping duplicate chunk (by ID): {chunk_id}")
+            continue
+        seen_chunk_ids.add(chunk_id)
+        
+        metadata = record.get("chunk_metadata")
+        text = record.get("chunk_text")
+        if metadata is not None and text is not None:
+            doc_name = metadata.get("filename", metadata.get("source_file", "unknown"))
+            chunk_idx = metadata.get("chunk_index", i + 1)
+            content_hash = hashlib.md5(normalize_text(text).encode('utf-8')).hexdigest()[:16]
+            content_signature = f"{doc_name}:{chunk_idx}:{content_hash}"
+            if content_signature in seen_chunk_signatures:
+                logger.debug(f"⏭️ Skipping duplicate chunk (by content): {doc_name} chunk {chunk_idx}")
+                continue
+            seen_chunk_signatures.add(content_signature)
+        yield record
+
+
 @router.get("/sessions/{session_id}/chunks")
-async def get_session_chunks(session_id: str):
+async def get_session_chunks(
+    session_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables cursor pagination"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor returned as next_cursor"),
+    fields: Optional[str] = Query(None, description="Comma separated subset of: ids, metadata, text, embeddings"),
+    document_name: Optional[str] = Query(None, description="Only chunks of this source document"),
+    chunk_ids: Optional[str] = Query(None, description="Comma separated chunk IDs"),
+    metadata_match: Optional[str] = Query(None, description="JSON object of exact metadata matches"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json or ndjson (streamed)")
+):
     """
-    Get all chunks for a specific session
+    Get chunks for a specific session
     
     Args:
         session_id: The session ID
+        limit/cursor: Cursor pagination. Without them the whole (filtered)
+            session is returned, sorted by document and chunk index.
+            Duplicate chunks are removed per page when paginating, across
+            the whole session otherwise
+        fields: Projection - defaults to ids, metadata, text (no embeddings)
+        document_name/chunk_ids/metadata_match: Server-side filters
+        format: ``ndjson`` streams one chunk per line without buffering
         
     Returns:
-        JSON with chunks array
+        JSON with chunks array (plus next_cursor when paginating)
         
     Example:
-        GET /sessions/abc123/chunks
-        Response: {"chunks": [...]}
+        GET /sessions/abc123/chunks?fields=ids,metadata&limit=200
+        Response: {"chunks": [...], "next_cursor": "..."}
     """
     try:
         logger.info(f"📦 Fetching chunks for session: {session_id}")
         
+        requested_fields = parse_fields(fields)
+        where = build_where(document_name, metadata_match)
+        ids = parse_chunk_ids(chunk_ids)
+        
         # Get ChromaDB client
         client = get_chroma_client()
-        
-        # Format collection name WITHOUT timestamp
-        # CRITICAL: All files in the same session use the SAME collection (no timestamp)
-        collection_name = format_collection_name(session_id, add_timestamp=False)
-        
-        # CRITICAL FIX: Get ALL collections for this session (including timestamped versions)
-        # This is needed because old code might have created timestamped collections
-        # We need to find ALL collections that match this session
-        all_collections_for_session = []
-        
-        # First try to get the non-timestamped collection
-        try:
-            collection = client.get_collection(name=collection_name)
-            all_collections_for_session.append(collection)
-            logger.info(f"✅ Found primary collection: {collection.name}")
-        except Exception as e:
-            logger.debug(f"Primary collection '{collection_name}' not found: {e}")
-        
-        # Then find ALL timestamped versions (for backward compatibility with old code)
-        try:
-            all_collections = client.list_collections()
-            all_collection_names = [c.name for c in all_collections]
-            
-            # Build base pattern to search for
-            base_patterns = [collection_name]
-            if len(session_id) == 32:
-                uuid_format = f"{session_id[:8]}-{session_id[8:12]}-{session_id[12:16]}-{session_id[16:20]}-{session_id[20:]}"
-                base_patterns.append(uuid_format)
-                base_patterns.append(f"session_{session_id}")
-            
-            # Find all collections that match this session (including timestamped)
-            for pattern in base_patterns:
-                for coll_name in all_collection_names:
-                    if coll_name == pattern:
-                        # Exact match - already added if found
-                        continue
-                    elif coll_name.startswith(pattern + "_"):
-                        # Timestamped version
-                        suffix = coll_name[len(pattern)+1:]
-                        if suffix.isdigit():
-                            try:
-                                alt_collection = client.get_collection(name=coll_name)
-                                if alt_collection not in all_collections_for_session:
-                                    all_collections_for_session.append(alt_collection)
-                                    logger.info(f"✅ Found additional timestamped collection: {coll_name}")
-                            except Exception as e:
-                                logger.warning(f"Could not load collection {coll_name}: {e}")
-        except Exception as e:
-            logger.warning(f"Could not list all collections: {e}")
+        all_collections_for_session = _find_session_collections(client, session_id)
         
         if not all_collections_for_session:
             logger.warning(f"⚠️ No collections found for session {session_id}")
-            return {"chunks": []}
-        
-        # Get all documents from ALL collections
-        all_chunks = []
-        chunks_by_document = {}  # Track chunks per document for logging
-        seen_chunk_ids = set()  # CRITICAL: Track chunk IDs to avoid duplicates
-        seen_chunk_signatures = set()  # CRITICAL: Track chunk content signatures to avoid content duplicates
-        
-        for coll in all_collections_for_session:
-            try:
-                result = coll.get(
-                    include=["documents", "metadatas", "embeddings"]
-                )
-                
-                documents = result.get('documents', [])
-                metadatas = result.get('metadatas', [])
-                ids = result.get('ids', [])
-                
-                logger.info(f"📊 Retrieved {len(documents)} chunks from collection: {coll.name}")
-                
-                # Format chunks - FRONTEND COMPATIBLE FORMAT
-                for i, doc in enumerate(documents):
-                    metadata = metadatas[i] if i < len(metadatas) else {}
-                    chunk_id = ids[i] if i < len(ids) else f"chunk_{i}"
-                    
-                    # CRITICAL FIX: Skip duplicate chunks (same chunk_id already seen)
-                    if chunk_id in seen_chunk_ids:
-                        logger.debug(f"⏭️ Skipping duplicate chunk (by ID): {chunk_id}")
-                        continue
-                    seen_chunk_ids.add(chunk_id)
-                    
-                    # CRITICAL FIX: Also check for content duplicates (same document_name + chunk_index + content hash)
-                    # This catches cases where same content was stored with different chunk_ids
-                    import hashlib
-                    doc_name = metadata.get("filename", metadata.get("source_file", "unknown"))
-                    chunk_idx = metadata.get("chunk_index", i + 1)
-                    content_hash = hashlib.md5(doc.encode('utf-8')).hexdigest()[:16]
-                    content_signature = f"{doc_name}:{chunk_idx}:{content_hash}"
-                    
-                    if content_signature in seen_chunk_signatures:
-                        logger.debug(f"⏭️ Skipping duplicate chunk (by content): {doc_name} chunk {chunk_idx}")
-                        continue
-                    seen_chunk_signatures.add(content_signature)
-                    
-                    # Extract document name from metadata
-                    document_name = metadata.get("filename", metadata.get("source_file", "unknown"))
-                    
-                    # Track chunks per document
-                    if document_name not in chunks_by_document:
-                        chunks_by_document[document_name] = 0
-                    chunks_by_document[document_name] += 1
-                    
-                    all_chunks.append({
-                        # Frontend expects these exact field names
-                        "document_name": document_name,
-                        "chunk_index": metadata.get("chunk_index", len(all_chunks) + 1),
-                        "chunk_text": doc,  # Frontend expects 'chunk_text' not 'content'
-                        "chunk_metadata": {
-                            "llm_improved": metadata.get("llm_improved", False),
-                            "improvement_timestamp": metadata.get("improvement_timestamp"),
-                            "original_length": metadata.get("original_length"),
-                            "improved_length": metadata.get("improved_length"),
-                            "model_used": metadata.get("model_used"),
-                            # Keep additional metadata for backward compatibility
-                            "chunk_id": chunk_id,
-                            "full_metadata": metadata
-                        }
-                    })
-            except Exception as e:
-                logger.error(f"❌ Error fetching documents from collection {coll.name}: {e}")
-                continue
+            if format == "ndjson":
+                return StreamingResponse(iter(()), media_type="application/x-ndjson")
+            return {"chunks": [], "total_count": 0, "next_cursor": None}
+        
+        if format == "ndjson":
+            records = _dedupe_chunks(iter_chunks(
+                all_collections_for_session, requested_fields, where, ids,
+                batch_size=limit or DEFAULT_PAGE_SIZE
+            ))
+            shaped = (_shape_chunk(record, i) for i, record in enumerate(records))
+            return StreamingResponse(to_ndjson(shaped), media_type="application/x-ndjson")
         
-        # Sort by document_name and chunk_index for consistent display
+        if limit is not None or cursor is not None:
+            records, next_cursor = fetch_chunk_page(
+                all_collections_for_session, requested_fields, where, ids,
+                limit=limit or DEFAULT_PAGE_SIZE, cursor=cursor
+            )
+            chunks = [_shape_chunk(record, i) for i, record in enumerate(_dedupe_chunks(records))]
+            return {"chunks": chunks, "count": len(chunks), "next_cursor": next_cursor}
+        
+        # Unpaginated: whole session, sorted for consistent display
+        records = _dedupe_chunks(iter_chunks(all_collections_for_session, requested_fields, where, ids))
+        all_chunks = [_shape_chunk(record, i) for i, record in enumerate(records)]
         all_chunks.sort(key=lambda x: (x.get("document_name", ""), x.get("chunk_index", 0)))
         
-        # Log summary
-        logger.info(f"📊 Chunks per document: {chunks_by_document}")
         logger.info(f"✅ Retrieved {len(all_chunks)} chunks from {len(all_collections_for_session)} collection(s) for session {session_id}")
-        logger.info(f"📁 Found chunks from {len(chunks_by_document)} unique document(s)")
         
-        return {"chunks": all_chunks}
+        return {"chunks": all_chunks, "total_count": len(all_chunks), "next_cursor": None}
         
     except HTTPException:
         raise
@@ -174,6 +218,89 @@ async def get_session_chunks(session_id: str):
         )
 
 
+def _restorable_metadata(chunk: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    ChromaDB metadata for a backed-up chunk
+
+    Backups read from ``/sessions/{id}/chunks`` may carry the frontend wrapper
+    built by ``_shape_chunk`` (``llm_improved``, ``model_used``, ...) with the
+    real metadata nested under ``full_metadata``. ChromaDB only accepts
+    str/int/float/bool values, so the wrapper is unwrapped and None or nested
+    values are dropped.
+    """
+    metadata = chunk.get("chunk_metadata") or chunk.get("metadata") or {}
+    if isinstance(metadata.get("full_metadata"), dict):
+        metadata = metadata["full_metadata"]
+    return {key: value for key, value in metadata.items() if isinstance(value, (str, int, float, bool))}
+
+
+@router.post("/sessions/{session_id}/restore-chunks")
+async def restore_session_chunks(session_id: str, request: dict = Body(...)):
+    """
+    Restore one batch of chunks (with embeddings when present) for a session.
+    
+    Backups are restored in batches: the first batch is sent with
+    ``replace: true`` (clears the collection when restoring onto the original
+    session), later batches with ``replace: false``. Chunks are upserted so a
+    retried batch is idempotent.
+    """
+    chunks = request.get("chunks", [])
+    original_session_id = request.get("original_session_id", session_id)
+    replace = request.get("replace", True)
+    
+    if not chunks:
+        return {"success": False, "error": "No chunks provided", "chunks_restored": 0}
+    
+    collection_name = format_collection_name(session_id, add_timestamp=False)
+    
+    try:
+        client = get_chroma_client()
+        try:
+            collection = client.get_collection(name=collection_name)
+            if replace and session_id == original_session_id:
+                logger.info(f"Clearing existing chunks in collection {collection_name}")
+                existing = collection.get(include=[])
+                if existing.get("ids"):
+                    collection.delete(ids=existing["ids"])
+        except Exception:
+            logger.info(f"Creating new collection: {collection_name}")
+            collection = client.create_collection(
+                name=collection_name,
+                metadata={"session_id": session_id, "restored_from": original_session_id}
+            )
+        
+        documents, metadatas, ids, embeddings = [], [], [], []
+        for chunk in chunks:
+            chunk_metadata = _restorable_metadata(chunk)
+            chunk_metadata["session_id"] = session_id
+            chunk_metadata["document_name"] = chunk.get("document_name") or document_name_of(chunk_metadata)
+            chunk_index = chunk.get("chunk_index", chunk_metadata.get("chunk_index"))
+            chunk_metadata["chunk_index"] = chunk_index if chunk_index is not None else len(documents) + 1
+            
+            ids.append(chunk.get("chunk_id") or chunk.get("id"))
+            documents.append(chunk.get("chunk_text") or chunk.get("text") or "")
+            metadatas.append(chunk_metadata)
+            embeddings.append(chunk.get("embedding") or None)
+        
+        has_embeddings = all(isinstance(e, list) and e for e in embeddings)
+        if has_embeddings:
+            collection.upsert(documents=documents, metadatas=metadatas, ids=ids, embeddings=embeddings)
+        else:
+            collection.upsert(documents=documents, metadatas=metadatas, ids=ids)
+        logger.info(f"✅ Restored {len(chunks)} chunks to collection {collection_name} (embeddings: {has_embeddings})")
+        
+        return {
+            "success": True,
+            "chunks_restored": len(chunks),
+            "session_id": session_id,
+            "collection_name": collection_name,
+            "has_embeddings": has_embeddings
+        }
+    except Exception as e:
+        logger.error(f"Error restoring chunks: {e}", exc_info=True)
+        return {"success": False, "error": str(e), "chunks_restored": 0}
+
+
 def _find_collection_with_alternatives(client, collection_name: str, session_id: str):
     """Find collection with alternative naming patterns"""
     try:
@@ -1,49 +1,33 @@
 """
 Turkish language utilities for text processing
 Includes stopwords, tokenization, and language-specific processing
+
+Thin wrapper over src/utils/turkish_text.py (copied into the image next to
+this service) so BM25 and dedup use the same normalization as the gateway.
 """
-import re
+import sys
+from pathlib import Path
 from typing import List
 
-# Turkish stopwords for better keyword search
-TURKISH_STOPWORDS = {
-    'acaba', 'ama', 'aslında', 'az', 'bazı', 'belki', 'biri', 'birkaç', 'birşey', 'biz', 'bu', 'çok', 'çünkü',
-    'da', 'daha', 'de', 'defa', 'diye', 'eğer', 'en', 'gibi', 'hem', 'hep', 'hepsi', 'her', 'hiç', 'için',
-    'ile', 'ise', 'kez', 'ki', 'kim', 'mı', 'mi', 'mu', 'mü', 'nasıl', 'ne', 'neden', 'nerde', 'nerede',
-    'nereye', 'niçin', 'niye', 'o', 'sanki', 'şey', 'siz', 'şu', 'tüm', 've', 'veya', 'ya', 'yani'
-}
+sys.path.append(str(Path(__file__).parent.parent.parent.parent))
+from src.utils.turkish_text import TURKISH_STOPWORDS, normalize_text, tokenize
+
 
 def tokenize_turkish(text: str, remove_stopwords: bool = True) -> List[str]:
     """
     Tokenize Turkish text for BM25 search
-    
+
     Features:
-    - Lowercase conversion
-    - Remove punctuation
-    - Optional stopword removal
-    - Keep numbers and special characters (for product codes, dates, etc.)
-    
+    - Turkish case folding (I/ı, İ/i) and NFC normalization
+    - Apostrophe suffixes dropped ("Ankara'nın" -> "ankara")
+    - Keep numbers (for product codes, dates, etc.)
+    - Optional stopword removal with light stemming and ASCII folding
+
     Args:
         text: Text to tokenize
         remove_stopwords: Whether to remove Turkish stopwords
-        
+
     Returns:
         List of tokens
     """
-    # Lowercase
-    text = text.lower()
-    
-    # Split by whitespace and basic punctuation (but keep numbers intact)
-    tokens = re.findall(r'\b[\w\d]+\b', text)
-    
-    # Remove stopwords if requested
-    if remove_stopwords:
-        tokens = [t for t in tokens if t not in TURKISH_STOPWORDS and len(t) > 1]
-    
-    return tokens
-
-
-
-
-
-
+    return list(tokenize(text or "", remove_stopwords=remove_stopwords))
@@ -5,7 +5,8 @@ import json
 import time
 from datetime import datetime
 from typing import Dict, List, Any, Optional
-from fastapi import FastAPI, HTTPException, Body
+from fastapi import FastAPI, HTTPException, Body, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import requests
 import logging
@@ -25,6 +26,18 @@ except ImportError as e:
     UNIFIED_CHUNKING_AVAILABLE = False
     logging.getLogger(__name__).warning(f"⚠️ CRITICAL: Unified chunking system not available: {e}")
 
+from utils.chunk_query import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    build_where,
+    document_name_of,
+    fetch_chunk_page,
+    iter_chunks,
+    parse_chunk_ids,
+    parse_fields,
+    to_ndjson,
+)
+
 # Import langdetect for language detection
 from langdetect import detect, LangDetectException
 
@@ -1653,11 +1666,27 @@ async def retrieve_documents(request: RetrieveRequest):
         return RetrieveResponse(success=False, results=[], total=0)
 
 @app.get("/sessions/{session_id}/chunks")
-async def get_session_chunks(session_id: str):
+async def get_session_chunks(
+    session_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    document_name: Optional[str] = None,
+    chunk_ids: Optional[str] = None,
+    metadata_match: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
     """
     Get chunks for a specific session from ChromaDB
+    
+    Supports cursor pagination (limit/cursor), field projection
+    (ids, metadata, text, embeddings), server-side filters and NDJSON
+    streaming. Without limit/cursor the whole session is returned sorted.
     """
     logger.info(f"Getting chunks for session: {session_id}")
+    requested_fields = parse_fields(fields)
+    where = build_where(document_name, metadata_match)
+    ids = parse_chunk_ids(chunk_ids)
     
     # Convert session_id to collection name format
     if len(session_id) == 32 and session_id.replace('-', '').isalnum():
@@ -1769,10 +1798,13 @@ async def get_session_chunks(session_id: str):
             logger.error(f"❌ Collection not found with any alternative names. Original error: {collection_error}")
             logger.error(f"❌ Tried alternatives: {sorted_alternatives}")
             # Return empty result
+            if format == "ndjson":
+                return StreamingResponse(iter(()), media_type="application/x-ndjson")
             return {
                 "chunks": [],
                 "total_count": 0,
-                "session_id": session_id
+                "session_id": session_id,
+                "next_cursor": None
             }
     
     # If we reach here, we have a valid collection
@@ -1817,90 +1849,61 @@ async def get_session_chunks(session_id: str):
     except Exception as e:
         logger.warning(f"Could not list all collections: {e}")
     
-    # Get all documents from ALL collections
-    # CRITICAL: Group chunks by document_name to ensure we get chunks from ALL files
-    all_chunks = []
-    chunks_by_document = {}  # Track chunks per document for logging
-    
-    for coll in all_collections_for_session:
-        results = coll.get()
-        documents = results.get('documents', [])
-        metadatas = results.get('metadatas', [])
-        ids = results.get('ids', [])
-        
-        for i, document in enumerate(documents):
-            metadata = metadatas[i] if i < len(metadatas) else {}
-            chunk_id = ids[i] if i < len(ids) else f"chunk_{i}"
-            
-            # Robust metadata parsing - check multiple possible keys for source information
-            source_files = ["Unknown"]
-            source_value = None
-            
-            # Check multiple possible keys that could contain source file information
-            for key in ["source_files", "source_file", "filename", "document_name", "file_name"]:
-                if metadata.get(key):
-                    source_value = metadata.get(key)
-                    logger.debug(f"🔍 METADATA FIX: Found source info in key '{key}': {source_value}")
-                    break
-            
-            if source_value:
-                try:
-                    # Try to parse as JSON string first (for source_files array)
-                    parsed_value = json.loads(source_value)
-                    if isinstance(parsed_value, list):
-                        source_files = [str(item) for item in parsed_value if item]
-                    else:
-                        source_files = [str(parsed_value)]
-                    logger.debug(f"🔍 METADATA FIX: Parsed JSON source_files: {source_files}")
-                except (json.JSONDecodeError, TypeError):
-                    # If it's not JSON, treat as string
-                    source_files = [str(source_value)]
-                    logger.debug(f"🔍 METADATA FIX: Using string source_files: {source_files}")
-            else:
-                logger.warning(f"🔍 METADATA FIX: No source file information found in metadata keys: {list(metadata.keys())}")
-            
-            document_name = source_files[0] if source_files and source_files[0] != "Unknown" else "Unknown"
-            logger.debug(f"🔍 METADATA FIX: Final document_name: '{document_name}'")
-            
-            # Track chunks per document for logging
-            if document_name not in chunks_by_document:
-                chunks_by_document[document_name] = 0
-            chunks_by_document[document_name] += 1
-            
+    def shape(record, position):
+        chunk = {"chunk_id": record["chunk_id"]}
+        metadata = record.get("chunk_metadata")
+        if metadata is not None:
+            chunk["document_name"] = document_name_of(metadata)
             # CRITICAL FIX: Use chunk_index from metadata if available, otherwise use global index
             chunk_index_from_metadata = metadata.get("chunk_index")
-            if chunk_index_from_metadata is not None:
-                # Use metadata chunk_index (preserves original file-based indexing)
-                chunk_index = int(chunk_index_from_metadata)
-            else:
-                # Fallback: use global index (all_chunks length + 1)
-                chunk_index = len(all_chunks) + 1
-            
-            all_chunks.append({
-                "document_name": document_name,
-                "chunk_index": chunk_index,  # Use metadata chunk_index or global index
-                "chunk_text": document,
-                "chunk_metadata": metadata,
-                "chunk_id": chunk_id
-            })
+            chunk["chunk_index"] = int(chunk_index_from_metadata) if chunk_index_from_metadata is not None else position + 1
+            chunk["chunk_metadata"] = metadata
+        if "chunk_text" in record:
+            chunk["chunk_text"] = record["chunk_text"]
+        if "embedding" in record:
+            chunk["embedding"] = record["embedding"]
+        return chunk
+    
+    if format == "ndjson":
+        records = iter_chunks(all_collections_for_session, requested_fields, where, ids,
+                              batch_size=limit or DEFAULT_PAGE_SIZE)
+        shaped = (shape(record, i) for i, record in enumerate(records))
+        return StreamingResponse(to_ndjson(shaped), media_type="application/x-ndjson")
+    
+    if limit is not None or cursor is not None:
+        records, next_cursor = fetch_chunk_page(
+            all_collections_for_session, requested_fields, where, ids,
+            limit=limit or DEFAULT_PAGE_SIZE, cursor=cursor
+        )
+        chunks = [shape(record, i) for i, record in enumerate(records)]
+        return {
+            "chunks": chunks,
+            "count": len(chunks),
+            "session_id": session_id,
+            "next_cursor": next_cursor
+        }
+    
+    # Get all documents from ALL collections
+    # CRITICAL: Group chunks by document_name to ensure we get chunks from ALL files
+    all_chunks = [
+        shape(record, i)
+        for i, record in enumerate(iter_chunks(all_collections_for_session, requested_fields, where, ids))
+    ]
     
     # Sort chunks by document_name and chunk_index for consistent display
-    all_chunks.sort(key=lambda x: (x["document_name"], x["chunk_index"]))
+    all_chunks.sort(key=lambda x: (x.get("document_name", ""), x.get("chunk_index", 0)))
     
     # Re-number chunks globally (1, 2, 3, ...) for display
     for i, chunk in enumerate(all_chunks):
         chunk["display_index"] = i + 1  # Global display index
-        # Keep original chunk_index in metadata for reference
     
-    # Log summary of chunks per document
-    logger.info(f"📊 Chunks per document: {chunks_by_document}")
     logger.info(f"✅ Retrieved {len(all_chunks)} chunks from {len(all_collections_for_session)} collection(s) for session {session_id}")
-    logger.info(f"📁 Found chunks from {len(chunks_by_document)} unique document(s)")
     
     return {
         "chunks": all_chunks,
         "total_count": len(all_chunks),
-        "session_id": session_id
+        "session_id": session_id,
+        "next_cursor": None
     }
 
 @app.get("/sessions/{session_id}/chunks-with-embeddings")
@@ -2016,13 +2019,15 @@ async def restore_session_chunks(session_id: str, request: dict = Body(...)):
                 "embedding": [0.1, 0.2, ...]  # Optional, will regenerate if missing
             }
         ],
-        "original_session_id": "..."
+        "original_session_id": "...",
+        "replace": true  # Clear existing chunks first; send false for follow-up batches
     }
     """
     logger.info(f"Restoring chunks for session: {session_id}")
     
     chunks = request.get("chunks", [])
     original_session_id = request.get("original_session_id", session_id)
+    replace = request.get("replace", True)
     
     if not chunks:
         return {
@@ -2043,10 +2048,10 @@ async def restore_session_chunks(session_id: str, request: dict = Body(...)):
         # Get or create collection
         try:
             collection = client.get_collection(name=collection_name)
-            # Clear existing chunks if restoring to same session
-            if session_id == original_session_id:
+            # Clear existing chunks if restoring to same session (first batch only)
+            if replace and session_id == original_session_id:
                 logger.info(f"Clearing existing chunks in collection {collection_name}")
-                existing = collection.get()
+                existing = collection.get(include=[])
                 if existing.get("ids"):
                     collection.delete(ids=existing["ids"])
         except:
@@ -2073,7 +2078,11 @@ async def restore_session_chunks(session_id: str, request: dict = Body(...)):
             # Ensure metadata has required fields
             chunk_metadata["session_id"] = session_id
             chunk_metadata["document_name"] = chunk.get("document_name") or chunk_metadata.get("document_name") or "Unknown"
-            chunk_metadata["chunk_index"] = chunk.get("chunk_index") or chunk_metadata.get("chunk_index") or len(documents) + 1
+            # chunk_index 0 is valid: only a missing index falls back to the position
+            chunk_index = chunk.get("chunk_index")
+            if chunk_index is None:
+                chunk_index = chunk_metadata.get("chunk_index")
+            chunk_metadata["chunk_index"] = chunk_index if chunk_index is not None else len(documents) + 1
             
             documents.append(chunk_text)
             metadatas.append(chunk_metadata)
@@ -2085,10 +2094,10 @@ async def restore_session_chunks(session_id: str, request: dict = Body(...)):
             else:
                 embeddings.append(None)  # Will be generated by ChromaDB
         
-        # Add chunks to collection
+        # Upsert so a retried batch does not fail on duplicate ids
         if has_embeddings and all(e is not None for e in embeddings):
             # Add with embeddings
-            collection.add(
+            collection.upsert(
                 documents=documents,
                 metadatas=metadatas,
                 ids=ids,
@@ -2097,7 +2106,7 @@ async def restore_session_chunks(session_id: str, request: dict = Body(...)):
             logger.info(f"✅ Added {len(chunks)} chunks with embeddings to collection {collection_name}")
         else:
             # Add without embeddings (ChromaDB will generate them)
-            collection.add(
+            collection.upsert(
                 documents=documents,
                 metadatas=metadatas,
                 ids=ids
@@ -93,6 +93,9 @@ class ImproveAllChunksRequest(BaseModel):
     language: Optional[str] = "tr"
     model_name: Optional[str] = "llama-3.1-8b-instant"
     skip_already_improved: Optional[bool] = True
+    batch_size: Optional[int] = None  # Chunks per committed batch (server default if None)
+    max_concurrency: Optional[int] = None  # Parallel LLM calls (server default if None)
+    resume: Optional[bool] = True  # Continue after the last committed batch of an interrupted run
 
 
 class ImproveAllChunksResponse(BaseModel):
@@ -105,6 +108,9 @@ class ImproveAllChunksResponse(BaseModel):
     skipped: int
     message: str
     processing_time_ms: float
+    no_embedding: int = 0  # Improved but not written (no embedding available)
+    batches_committed: Optional[int] = None
+    resumed_from: Optional[str] = None
 
 
 class RetrieveRequest(BaseModel):
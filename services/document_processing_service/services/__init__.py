@@ -3,14 +3,15 @@ Business logic services for Document Processing
 """
 from .reranker import Reranker
 from .chunking_service import chunk_text_with_strategy, extract_chunk_title_from_content
-from .chunk_improver import improve_single_chunk, improve_all_chunks_in_session
+from .chunk_improver import improve_single_chunk, improve_all_chunks_in_session, get_improvement_progress
 
 __all__ = [
     'Reranker',
     'chunk_text_with_strategy',
     'extract_chunk_title_from_content',
     'improve_single_chunk',
-    'improve_all_chunks_in_session'
+    'improve_all_chunks_in_session',
+    'get_improvement_progress'
 ]
 
 
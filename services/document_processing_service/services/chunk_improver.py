@@ -2,11 +2,30 @@
 Chunk improvement service using LLM post-processing
 Handles single and bulk chunk improvement operations
 """
+import json
+import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from utils.logger import logger
-from config import MODEL_INFERENCER_URL
+from config import MODEL_INFERENCER_URL, DEFAULT_EMBEDDING_MODEL
+
+# Bulk improvement tuning
+CHUNK_IMPROVE_BATCH_SIZE = int(os.getenv("CHUNK_IMPROVE_BATCH_SIZE", "32"))
+CHUNK_IMPROVE_CONCURRENCY = int(os.getenv("CHUNK_IMPROVE_CONCURRENCY", "4"))
+CHUNK_IMPROVE_STATE_DIR = os.getenv("CHUNK_IMPROVE_STATE_DIR", "data/chunk_improvement")
+
+# session_id -> resolved collection name (avoids list_collections on every update)
+_collection_names: Dict[str, str] = {}
+
+# session_id -> progress of the bulk run executing in this process; every
+# update is also written to <CHUNK_IMPROVE_STATE_DIR>/<session>__progress.json,
+# which is what the progress endpoint reads (the run and the poll may be served
+# by different uvicorn workers)
+_progress: Dict[str, Dict[str, Any]] = {}
+_progress_lock = threading.Lock()
 
 
 def improve_single_chunk(
@@ -119,80 +138,234 @@ def improve_single_chunk(
         }
 
 
+def _empty_bulk_result(message: str, start_time: float, total_chunks: int = 0) -> Dict[str, Any]:
+    return {
+        "success": False,
+        "total_chunks": total_chunks,
+        "processed": 0,
+        "improved": 0,
+        "failed": 0,
+        "skipped": 0,
+        "no_embedding": 0,
+        "message": message,
+        "processing_time_ms": (time.time() - start_time) * 1000
+    }
+
+
+def _load_post_processor_classes():
+    try:
+        from src.text_processing.chunk_post_processor_grok import GrokChunkPostProcessor, PostProcessingConfig
+    except ImportError:
+        from src.text_processing.chunk_post_processor import ChunkPostProcessor as GrokChunkPostProcessor, PostProcessingConfig
+    return GrokChunkPostProcessor, PostProcessingConfig
+
+
+def _checkpoint_path(session_id: str, model_name: str) -> str:
+    safe_model = "".join(c if c.isalnum() or c in "-_." else "_" for c in model_name)
+    return os.path.join(CHUNK_IMPROVE_STATE_DIR, f"{session_id}__{safe_model}.json")
+
+
+def _load_checkpoint(session_id: str, model_name: str) -> Optional[Dict[str, Any]]:
+    path = _checkpoint_path(session_id, model_name)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"⚠️ Ignoring unreadable improvement checkpoint {path}: {e}")
+        return None
+
+
+def _progress_path(session_id: str) -> str:
+    return os.path.join(CHUNK_IMPROVE_STATE_DIR, f"{session_id}__progress.json")
+
+
+def _write_json_atomic(path: str, data: Dict[str, Any]):
+    """Write temp file + rename, so readers never see a partial file."""
+    os.makedirs(CHUNK_IMPROVE_STATE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _save_checkpoint(session_id: str, model_name: str, checkpoint: Dict[str, Any]):
+    """Atomically persist the last committed batch."""
+    try:
+        _write_json_atomic(_checkpoint_path(session_id, model_name), checkpoint)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not save improvement checkpoint: {e}")
+
+
+def _clear_checkpoint(session_id: str, model_name: str):
+    try:
+        os.remove(_checkpoint_path(session_id, model_name))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"⚠️ Could not remove improvement checkpoint: {e}")
+
+
+def get_improvement_progress(session_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Latest progress snapshot of a bulk improvement run (None if never started)
+
+    Read from the progress file, so any worker process can answer. A run whose
+    worker died stays "running"; ``updated_at`` shows when it last reported.
+    """
+    try:
+        with open(_progress_path(session_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"⚠️ Unreadable improvement progress for session {session_id}: {e}")
+        return None
+
+
+def _set_progress(session_id: str, reset: bool = False, **fields):
+    with _progress_lock:
+        if reset:
+            _progress[session_id] = {}
+        progress = _progress.setdefault(session_id, {})
+        progress.update(fields, updated_at=datetime.now().isoformat())
+        snapshot = dict(progress)
+    try:
+        _write_json_atomic(_progress_path(session_id), snapshot)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not save improvement progress: {e}")
+
+
+def _embed_texts(texts: List[str], embedding_model: str) -> Optional[List[List[float]]]:
+    """Batch re-embed improved texts; None if the embedding service is unavailable."""
+    try:
+        from core.embedding_service import get_embeddings_direct
+        embeddings = get_embeddings_direct(texts, embedding_model)
+        if embeddings and len(embeddings) == len(texts):
+            return embeddings
+        logger.warning(f"⚠️ Embedding service returned {len(embeddings or [])} vectors for {len(texts)} texts")
+    except Exception as e:
+        logger.warning(f"⚠️ Re-embedding failed ({embedding_model}): {e}")
+    return None
+
+
+def _commit_improved_batch(collection, improved: List[Dict[str, Any]], model_name: str) -> int:
+    """
+    Write a batch of improved chunks with a single upsert; returns chunks written
+    
+    Improved texts are re-embedded together (grouped by the chunk's
+    embedding model). If re-embedding fails the stored embeddings are kept,
+    as the previous one-by-one implementation did. Chunks without any
+    embedding are left unchanged and not counted.
+    """
+    if not improved:
+        return 0
+    
+    timestamp = datetime.now().isoformat()
+    by_model: Dict[str, List[Dict[str, Any]]] = {}
+    for item in improved:
+        metadata = dict(item["metadata"] or {})
+        metadata['llm_improved'] = True
+        metadata['llm_model'] = model_name
+        metadata['improvement_timestamp'] = timestamp
+        item["metadata"] = metadata
+        by_model.setdefault(metadata.get("embedding_model") or DEFAULT_EMBEDDING_MODEL, []).append(item)
+    
+    ids, documents, metadatas, embeddings = [], [], [], []
+    for embedding_model, items in by_model.items():
+        vectors = _embed_texts([item["text"] for item in items], embedding_model)
+        if vectors is None:
+            existing = collection.get(ids=[item["id"] for item in items], include=['embeddings'])
+            stored = dict(zip(existing.get('ids') or [], existing.get('embeddings') or []))
+            vectors = [stored.get(item["id"]) for item in items]
+        for item, vector in zip(items, vectors):
+            if vector is None:
+                logger.warning(f"⚠️ No embedding available for chunk {item['id']}, leaving it unchanged")
+                continue
+            ids.append(item["id"])
+            documents.append(item["text"])
+            metadatas.append(item["metadata"])
+            embeddings.append([float(x) for x in vector])
+    
+    if ids:
+        _upsert_with_retry(collection, ids, documents, metadatas, embeddings)
+    return len(ids)
+
+
 def improve_all_chunks_in_session(
     session_id: str,
     language: str = "tr",
     model_name: str = "llama-3.1-8b-instant",
-    skip_already_improved: bool = True
+    skip_already_improved: bool = True,
+    batch_size: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    resume: bool = True
 ) -> Dict[str, Any]:
     """
     Improve all chunks in a session using LLM post-processing
     
+    Chunks are walked in chunk-id order, ``batch_size`` at a time. Within a
+    batch the LLM calls run on a bounded thread pool; the improved texts are
+    then re-embedded together and written with one bulk upsert. After each
+    committed batch a checkpoint is saved, so an interrupted run resumes after
+    the last committed batch. Progress and ETA are available through
+    :func:`get_improvement_progress`.
+    
+    Counters: ``improved`` chunks were written back, ``no_embedding`` were
+    improved but left unchanged because neither a new nor a stored embedding
+    was available, ``failed`` got no usable LLM output, ``skipped`` were
+    already improved.
+    
     Args:
         session_id: Session ID
         language: Language code
         model_name: LLM model to use
         skip_already_improved: Skip chunks already marked as improved
+        batch_size: Chunks per committed batch (default CHUNK_IMPROVE_BATCH_SIZE)
+        max_concurrency: Parallel LLM calls (default CHUNK_IMPROVE_CONCURRENCY)
+        resume: Continue from the last committed batch of an interrupted run
         
     Returns:
         Dictionary with bulk improvement results
     """
     start_time = time.time()
+    batch_size = max(1, batch_size or CHUNK_IMPROVE_BATCH_SIZE)
+    max_concurrency = max(1, max_concurrency or CHUNK_IMPROVE_CONCURRENCY)
     
     try:
         from core.chromadb_client import get_chroma_client
-        from utils.helpers import format_collection_name
         
-        # Import post-processor
         try:
-            from src.text_processing.chunk_post_processor_grok import GrokChunkPostProcessor, PostProcessingConfig
+            GrokChunkPostProcessor, PostProcessingConfig = _load_post_processor_classes()
         except ImportError:
-            try:
-                from src.text_processing.chunk_post_processor import ChunkPostProcessor as GrokChunkPostProcessor, PostProcessingConfig
-            except ImportError:
-                return {
-                    "success": False,
-                    "total_chunks": 0,
-                    "processed": 0,
-                    "improved": 0,
-                    "failed": 0,
-                    "skipped": 0,
-                    "message": "LLM post-processing not available",
-                    "processing_time_ms": (time.time() - start_time) * 1000
-                }
+            return _empty_bulk_result("LLM post-processing not available", start_time)
         
         logger.info(f"🚀 Starting bulk chunk improvement for session {session_id}")
         
-        # Get ChromaDB client and collection
         client = get_chroma_client()
-        collection_name = format_collection_name(session_id, add_timestamp=False)
-        
-        # Find collection (try alternatives including timestamped)
-        collection = _find_collection(client, collection_name, session_id)
-        
+        collection = _resolve_collection(client, session_id)
         if not collection:
-            return {
-                "success": False,
-                "total_chunks": 0,
-                "processed": 0,
-                "improved": 0,
-                "failed": 0,
-                "skipped": 0,
-                "message": f"Collection not found for session {session_id}",
-                "processing_time_ms": (time.time() - start_time) * 1000
-            }
+            return _empty_bulk_result(f"Collection not found for session {session_id}", start_time)
         
-        # Get all chunks INCLUDING embeddings
-        results = collection.get(include=['documents', 'metadatas', 'embeddings'])
-        documents = results.get('documents', [])
-        metadatas = results.get('metadatas', [])
-        ids = results.get('ids', [])
-        embeddings = results.get('embeddings', [])
+        # Ids only - texts/metadata are fetched per batch
+        all_ids = sorted(collection.get(include=[]).get('ids') or [])
+        total_chunks = len(all_ids)
         
-        total_chunks = len(documents)
-        logger.info(f"📊 Found {total_chunks} chunks to process")
+        counts = {"processed": 0, "improved": 0, "failed": 0, "skipped": 0, "no_embedding": 0}
+        resumed_from = None
+        checkpoint = _load_checkpoint(session_id, model_name) if resume else None
+        if checkpoint and checkpoint.get("last_chunk_id"):
+            resumed_from = checkpoint["last_chunk_id"]
+            counts.update({k: checkpoint.get(k, 0) for k in counts})
+            pending_ids = [cid for cid in all_ids if cid > resumed_from]
+            logger.info(f"↩️  Resuming after chunk {resumed_from} ({len(pending_ids)} chunks left)")
+        else:
+            pending_ids = all_ids
+        
+        total_batches = (len(pending_ids) + batch_size - 1) // batch_size
+        logger.info(f"📊 Found {total_chunks} chunks, {len(pending_ids)} to process in {total_batches} batches (concurrency={max_concurrency})")
         
-        # Create post-processor
         config = PostProcessingConfig(
             enabled=True,
             model_name=model_name,
@@ -201,91 +374,104 @@ def improve_all_chunks_in_session(
             timeout_seconds=30,
             retry_attempts=2
         )
-        post_processor = GrokChunkPostProcessor(config)
+        # Post-processors keep per-instance cache/rate-limiter state, so each worker thread gets its own
+        local = threading.local()
         
-        # Process chunks
-        processed = improved = failed = skipped = 0
+        def improve_text(text: str) -> Optional[str]:
+            post_processor = getattr(local, "post_processor", None)
+            if post_processor is None:
+                post_processor = GrokChunkPostProcessor(config)
+                # Force processing (disable worth check)
+                post_processor._is_chunk_worth_processing = lambda x: True
+                local.post_processor = post_processor
+            improved_chunks = post_processor.process_chunks([text])
+            if improved_chunks:
+                improved_text = improved_chunks[0]
+                if improved_text != text and len(improved_text.strip()) > 10:
+                    return improved_text
+            return None
         
-        for i, (doc, metadata, chunk_id, embedding) in enumerate(zip(documents, metadatas, ids, embeddings)):
-            # Skip if already improved
-            if skip_already_improved and metadata.get('llm_improved'):
-                logger.debug(f"⏭️  Skipping chunk {i+1}/{total_chunks} (already improved)")
-                skipped += 1
-                continue
-            
-            # Force processing
-            original_check = post_processor._is_chunk_worth_processing
-            post_processor._is_chunk_worth_processing = lambda x: True
-            
-            try:
-                improved_chunks = post_processor.process_chunks([doc])
+        _set_progress(
+            session_id, reset=True, status="running", total_chunks=total_chunks, total_batches=total_batches,
+            batches_committed=0, eta_seconds=None, started_at=datetime.now().isoformat(),
+            resumed_from=resumed_from, **counts
+        )
+        run_start = time.time()
+        batches_committed = 0
+        
+        with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="chunk-improve") as executor:
+            for batch_start in range(0, len(pending_ids), batch_size):
+                batch_ids = pending_ids[batch_start:batch_start + batch_size]
+                batch = collection.get(ids=batch_ids, include=['documents', 'metadatas'])
+                
+                futures = {}
+                for chunk_id, doc, metadata in zip(batch.get('ids') or [], batch.get('documents') or [], batch.get('metadatas') or []):
+                    metadata = metadata or {}
+                    if skip_already_improved and metadata.get('llm_improved'):
+                        counts["skipped"] += 1
+                        continue
+                    futures[executor.submit(improve_text, doc or "")] = (chunk_id, metadata)
                 
-                if improved_chunks and len(improved_chunks) > 0:
-                    improved_text = improved_chunks[0]
-                    
-                    if improved_text != doc and len(improved_text.strip()) > 10:
-                        # Update in ChromaDB with retry logic
-                        updated_metadata = metadata.copy()
-                        updated_metadata['llm_improved'] = True
-                        updated_metadata['llm_model'] = model_name
-                        updated_metadata['improvement_timestamp'] = datetime.now().isoformat()
-                        
-                        _update_chunk_with_retry(
-                            collection, chunk_id, improved_text, updated_metadata, embedding
-                        )
-                        
-                        improved += 1
-                        logger.info(f"✅ Chunk {i+1}/{total_chunks} improved successfully")
+                improved_batch = []
+                for future in as_completed(futures):
+                    chunk_id, metadata = futures[future]
+                    counts["processed"] += 1
+                    try:
+                        improved_text = future.result()
+                    except Exception as e:
+                        counts["failed"] += 1
+                        logger.error(f"❌ Chunk {chunk_id} error: {e}")
+                        continue
+                    if improved_text:
+                        improved_batch.append({"id": chunk_id, "text": improved_text, "metadata": metadata})
                     else:
-                        failed += 1
-                else:
-                    failed += 1
+                        counts["failed"] += 1
                 
-                processed += 1
+                written = _commit_improved_batch(collection, improved_batch, model_name)
+                counts["improved"] += written
+                counts["no_embedding"] += len(improved_batch) - written
+                batches_committed += 1
+                _save_checkpoint(session_id, model_name, {"last_chunk_id": batch_ids[-1], **counts})
                 
-            except Exception as e:
-                failed += 1
-                processed += 1
-                logger.error(f"❌ Chunk {i+1}/{total_chunks} error: {e}")
-            finally:
-                post_processor._is_chunk_worth_processing = original_check
+                elapsed = time.time() - run_start
+                eta_seconds = elapsed / batches_committed * (total_batches - batches_committed)
+                _set_progress(session_id, batches_committed=batches_committed, eta_seconds=round(eta_seconds, 1), **counts)
+                logger.info(
+                    f"📦 Batch {batches_committed}/{total_batches} committed: "
+                    f"{written} improved ({counts['improved']} total), ETA {eta_seconds:.0f}s"
+                )
         
+        _clear_checkpoint(session_id, model_name)
+        _set_progress(session_id, status="completed", eta_seconds=0, finished_at=datetime.now().isoformat())
         processing_time = (time.time() - start_time) * 1000
         
         return {
             "success": True,
             "total_chunks": total_chunks,
-            "processed": processed,
-            "improved": improved,
-            "failed": failed,
-            "skipped": skipped,
-            "message": f"Processed {processed} chunks: {improved} improved, {failed} failed, {skipped} skipped",
+            **counts,
+            "batches_committed": batches_committed,
+            "resumed_from": resumed_from,
+            "message": (
+                f"Processed {counts['processed']} chunks: {counts['improved']} improved, {counts['failed']} failed, "
+                f"{counts['skipped']} skipped, {counts['no_embedding']} without embedding"
+            ),
             "processing_time_ms": processing_time
         }
         
     except Exception as e:
         logger.error(f"❌ Error in bulk chunk improvement: {e}")
-        return {
-            "success": False,
-            "total_chunks": 0,
-            "processed": 0,
-            "improved": 0,
-            "failed": 0,
-            "skipped": 0,
-            "message": f"Error: {str(e)}",
-            "processing_time_ms": (time.time() - start_time) * 1000
-        }
+        _set_progress(session_id, status="failed", error=str(e))
+        result = _empty_bulk_result(f"Error: {str(e)}", start_time)
+        result["message"] += " (resume to continue after the last committed batch)"
+        return result
 
 
 def _update_chunk_in_chromadb(session_id, chunk_id, document_name, chunk_index, improved_text, model_name):
     """Helper function to update a single chunk in ChromaDB"""
     try:
         from core.chromadb_client import get_chroma_client
-        from utils.helpers import format_collection_name
         
-        client = get_chroma_client()
-        collection_name = format_collection_name(session_id, add_timestamp=False)
-        collection = _find_collection(client, collection_name, session_id)
+        collection = _resolve_collection(get_chroma_client(), session_id)
         
         if collection:
             # Find chunk by ID or by document_name + chunk_index
@@ -293,7 +479,7 @@ def _update_chunk_in_chromadb(session_id, chunk_id, document_name, chunk_index,
                 target_chunk_id = chunk_id
             elif document_name and chunk_index is not None:
                 # Search for chunk by metadata
-                results = collection.get()
+                results = collection.get(include=['metadatas'])
                 for i, metadata in enumerate(results.get('metadatas', [])):
                     doc_name = metadata.get('document_name') or metadata.get('filename')
                     idx = metadata.get('chunk_index')
@@ -307,21 +493,36 @@ def _update_chunk_in_chromadb(session_id, chunk_id, document_name, chunk_index,
                 logger.warning("No chunk identifier provided")
                 return
             
-            # Get existing chunk to preserve embedding
-            existing = collection.get(ids=[target_chunk_id], include=['embeddings'])
-            if existing and existing['embeddings']:
-                updated_metadata = {'llm_improved': True, 'llm_model': model_name, 'improvement_timestamp': datetime.now().isoformat()}
-                collection.update(
-                    ids=[target_chunk_id],
-                    documents=[improved_text],
-                    metadatas=[updated_metadata],
-                    embeddings=[existing['embeddings'][0]]
+            existing = collection.get(ids=[target_chunk_id], include=['metadatas'])
+            if existing and existing.get('ids'):
+                _commit_improved_batch(
+                    collection,
+                    [{"id": target_chunk_id, "text": improved_text, "metadata": existing['metadatas'][0]}],
+                    model_name
                 )
                 logger.info(f"✅ Chunk updated in ChromaDB (ID: {target_chunk_id})")
     except Exception as e:
         logger.error(f"❌ Failed to update ChromaDB: {e}")
 
 
+def _resolve_collection(client, session_id):
+    """Find the session collection, remembering the resolved name between calls"""
+    from utils.helpers import format_collection_name
+    
+    cached_name = _collection_names.get(session_id)
+    if cached_name:
+        try:
+            return client.get_collection(name=cached_name)
+        except Exception:
+            _collection_names.pop(session_id, None)
+    
+    collection_name = format_collection_name(session_id, add_timestamp=False)
+    collection = _find_collection(client, collection_name, session_id)
+    if collection is not None:
+        _collection_names[session_id] = collection.name
+    return collection
+
+
 def _find_collection(client, collection_name, session_id):
     """Helper function to find collection with alternative names"""
     try:
@@ -347,32 +548,26 @@ def _find_collection(client, collection_name, session_id):
         return None
 
 
-def _update_chunk_with_retry(collection, chunk_id, improved_text, metadata, embedding):
-    """Helper function to update chunk with retry logic"""
+def _upsert_with_retry(collection, ids, documents, metadatas, embeddings):
+    """Bulk upsert with retry logic"""
     max_retries = 5
     retry_delay = 3.0
     
     for retry in range(max_retries):
         try:
-            collection.update(
-                ids=[chunk_id],
-                documents=[improved_text],
-                metadatas=[metadata],
-                embeddings=[embedding]
+            collection.upsert(
+                ids=ids,
+                documents=documents,
+                metadatas=metadatas,
+                embeddings=embeddings
             )
             if retry > 0:
-                logger.info(f"✅ ChromaDB update succeeded on attempt {retry+1}")
+                logger.info(f"✅ ChromaDB upsert succeeded on attempt {retry+1}")
             break
         except Exception as e:
             if retry < max_retries - 1:
                 wait_time = retry_delay * (retry + 1)
-                logger.warning(f"⚠️ Update failed (attempt {retry+1}/{max_retries}), waiting {wait_time}s...")
+                logger.warning(f"⚠️ Upsert failed (attempt {retry+1}/{max_retries}), waiting {wait_time}s...")
                 time.sleep(wait_time)
             else:
                 raise
-
-
-
-
-
-
@@ -0,0 +1,216 @@
+"""
+Paginated, projection-aware chunk reads from ChromaDB
+
+Used by the ``/sessions/{session_id}/chunks`` endpoints so callers can page
+through a session with an opaque cursor, fetch only the fields they need
+(ids, metadata, text, embeddings), filter server-side and stream NDJSON
+instead of receiving one huge JSON document.
+"""
+import base64
+import json
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+
+from utils.logger import logger
+
+CHUNK_FIELDS = ("ids", "metadata", "text", "embeddings")
+DEFAULT_FIELDS = ("ids", "metadata", "text")
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+# Metadata keys under which the source document name has been stored over time
+DOCUMENT_NAME_KEYS = ("document_name", "source_file", "filename")
+# Legacy key holding a JSON list of source files (or a bare name)
+LEGACY_SOURCE_FILES_KEY = "source_files"
+
+_CHROMA_INCLUDE = {"metadata": "metadatas", "text": "documents", "embeddings": "embeddings"}
+
+
+def parse_fields(fields: Optional[str]) -> Set[str]:
+    """Parse a comma separated ``fields`` query parameter (ids are always returned)."""
+    if not fields:
+        return set(DEFAULT_FIELDS)
+    requested = {f.strip().lower() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(CHUNK_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown chunk fields: {sorted(unknown)}. Allowed: {list(CHUNK_FIELDS)}"
+        )
+    requested.add("ids")
+    return requested
+
+
+def parse_chunk_ids(chunk_ids: Optional[str]) -> Optional[List[str]]:
+    if not chunk_ids:
+        return None
+    return [cid.strip() for cid in chunk_ids.split(",") if cid.strip()]
+
+
+def build_where(document_name: Optional[str] = None, metadata_match: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Build a ChromaDB ``where`` filter from the endpoint filters
+
+    Args:
+        document_name: Matches any of the historical document name metadata keys,
+            including the legacy ``source_files`` list
+        metadata_match: JSON object of exact metadata key/value matches
+    """
+    clauses: List[Dict[str, Any]] = []
+
+    if document_name:
+        # ChromaDB has no substring match on metadata strings, so legacy
+        # ``source_files`` values are matched in the forms they were written in:
+        # a bare name or a one-element JSON list (a chunk has one source)
+        legacy_values = list(dict.fromkeys([
+            document_name,
+            json.dumps([document_name]),
+            json.dumps([document_name], ensure_ascii=False),
+        ]))
+        clauses.append({"$or": [{key: document_name} for key in DOCUMENT_NAME_KEYS]
+                        + [{LEGACY_SOURCE_FILES_KEY: {"$in": legacy_values}}]})
+
+    if metadata_match:
+        try:
+            match = json.loads(metadata_match)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="metadata_match must be a JSON object")
+        if not isinstance(match, dict):
+            raise HTTPException(status_code=400, detail="metadata_match must be a JSON object")
+        for key, value in match.items():
+            if not isinstance(value, (str, int, float, bool)):
+                raise HTTPException(status_code=400, detail=f"metadata_match value for '{key}' must be a scalar")
+            clauses.append({key: value})
+
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+
+def encode_cursor(collection_index: int, offset: int) -> str:
+    raw = json.dumps({"c": collection_index, "o": offset}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: Optional[str]) -> Tuple[int, int]:
+    if not cursor:
+        return 0, 0
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return int(data["c"]), int(data["o"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _get_page(collection, fields: Set[str], where, ids, limit: int, offset: int) -> List[Dict[str, Any]]:
+    include = [_CHROMA_INCLUDE[f] for f in fields if f in _CHROMA_INCLUDE]
+    kwargs: Dict[str, Any] = {"include": include, "limit": limit, "offset": offset}
+    if where:
+        kwargs["where"] = where
+    if ids:
+        kwargs["ids"] = ids
+    result = collection.get(**kwargs)
+
+    result_ids = result.get("ids") or []
+    documents = result.get("documents") or []
+    metadatas = result.get("metadatas") or []
+    embeddings = result.get("embeddings")
+    if embeddings is None:
+        embeddings = []
+
+    records = []
+    for i, chunk_id in enumerate(result_ids):
+        record: Dict[str, Any] = {"chunk_id": chunk_id}
+        if "text" in fields:
+            record["chunk_text"] = documents[i] if i < len(documents) else None
+        if "metadata" in fields:
+            record["chunk_metadata"] = (metadatas[i] if i < len(metadatas) else None) or {}
+        if "embeddings" in fields:
+            embedding = embeddings[i] if i < len(embeddings) else None
+            record["embedding"] = [float(x) for x in embedding] if embedding is not None else None
+        records.append(record)
+    return records
+
+
+def fetch_chunk_page(
+    collections: List[Any],
+    fields: Set[str],
+    where: Optional[Dict[str, Any]] = None,
+    ids: Optional[List[str]] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Read one page of chunks across the session's collections
+
+    Collections are walked in order (primary first, then legacy timestamped
+    ones); the cursor records the collection index and offset to resume from.
+    A collection that cannot be read is skipped with a warning, as the
+    whole-session read did before pagination.
+
+    Returns:
+        (records, next_cursor) - ``next_cursor`` is None on the last page
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    collection_index, offset = decode_cursor(cursor)
+    records: List[Dict[str, Any]] = []
+
+    while collection_index < len(collections) and len(records) < limit:
+        remaining = limit - len(records)
+        try:
+            page = _get_page(collections[collection_index], fields, where, ids, remaining, offset)
+        except Exception as e:
+            name = getattr(collections[collection_index], "name", collection_index)
+            logger.warning(f"⚠️ Skipping collection {name}, could not read chunks: {e}")
+            collection_index += 1
+            offset = 0
+            continue
+        records.extend(page)
+        if len(page) < remaining:
+            collection_index += 1
+            offset = 0
+        else:
+            offset += len(page)
+
+    next_cursor = encode_cursor(collection_index, offset) if collection_index < len(collections) else None
+    return records, next_cursor
+
+
+def iter_chunks(
+    collections: List[Any],
+    fields: Set[str],
+    where: Optional[Dict[str, Any]] = None,
+    ids: Optional[List[str]] = None,
+    batch_size: int = DEFAULT_PAGE_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """Yield every matching chunk, reading ChromaDB in ``batch_size`` pages."""
+    cursor = None
+    while True:
+        records, cursor = fetch_chunk_page(collections, fields, where, ids, batch_size, cursor)
+        yield from records
+        if cursor is None:
+            return
+
+
+def document_name_of(metadata: Dict[str, Any]) -> str:
+    """Resolve the document name from chunk metadata (JSON ``source_files`` lists included)."""
+    for key in (LEGACY_SOURCE_FILES_KEY,) + DOCUMENT_NAME_KEYS + ("file_name",):
+        value = metadata.get(key)
+        if not value:
+            continue
+        try:
+            parsed = json.loads(value)
+            if isinstance(parsed, list):
+                return str(parsed[0]) if parsed else "Unknown"
+            return str(parsed)
+        except (json.JSONDecodeError, TypeError):
+            return str(value)
+    return "Unknown"
+
+
+def to_ndjson(records: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + "\n"
@@ -0,0 +1,597 @@
+"""
+Persistent Marker conversion worker.
+
+Marker models are loaded exactly once inside a dedicated, long-lived child
+process and stay resident there. The API process only enqueues jobs into a
+bounded queue (with admission control based on free RAM) and tracks their
+state from the events the worker streams back: ``ready``, ``started``,
+``progress`` (after every page; ``PDF_WORKER_PAGES_PER_STEP`` > 1 converts
+and reports in larger page ranges), ``done`` and ``failed``.
+
+Callers can poll a job snapshot or subscribe to its progress until it
+reaches a terminal state. If the worker process dies (e.g. OOM-killed) the
+running job is marked failed and the worker is restarted; queued jobs are
+preserved because the queue belongs to the parent.
+
+Pending jobs are kept by the parent and handed to the worker one at a time.
+A handed-over job is claimed with a lease (``claimed_at`` /
+``claimed_until``) that the worker renews with heartbeats while it converts
+it. A claim whose lease runs out (the worker died or hung before reporting
+``started``, or stopped sending heartbeats) is reclaimed by the sweep in the
+event listener: a job that never started goes back to the queue (up to
+``max_attempts``), a hung worker is terminated and restarted. Every worker
+process gets a fresh job queue, so a job handed to a dead process can not be
+picked up a second time by its successor.
+"""
+
+import os
+import time
+import uuid
+import queue
+import logging
+import asyncio
+import threading
+import traceback
+import multiprocessing as mp
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+TERMINAL_STATES = (JOB_DONE, JOB_FAILED)
+
+# A claimed job is reclaimed if the worker sends no event for this long;
+# the worker renews the claim every CLAIM_RENEW_SECONDS while converting
+CLAIM_LEASE_SECONDS = float(os.getenv("PDF_WORKER_CLAIM_LEASE_SECONDS", "120"))
+CLAIM_RENEW_SECONDS = CLAIM_LEASE_SECONDS / 4
+
+
+class AdmissionError(Exception):
+    """Raised when a conversion job cannot be admitted right now."""
+
+    def __init__(self, message: str, retry_after: int = 30):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class ConversionJob:
+    """State of a single conversion job as seen by the API process."""
+
+    job_id: str
+    filename: str
+    pdf_path: str
+    file_size_bytes: int
+    owns_file: bool = True  # delete ``pdf_path`` once the job is terminal
+    status: str = JOB_QUEUED
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    pages_total: int = 0
+    pages_done: int = 0
+    content: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    version: int = 0  # bumped on every state change, used by subscribers
+    attempts: int = 0  # times the job was handed to a worker process
+    claimed_at: Optional[float] = None
+    claimed_until: Optional[float] = None  # lease, renewed by worker events
+
+    def to_dict(self, include_content: bool = False) -> Dict[str, Any]:
+        data = {
+            "job_id": self.job_id,
+            "filename": self.filename,
+            "status": self.status,
+            "pages_total": self.pages_total,
+            "pages_done": self.pages_done,
+            "progress": round(self.pages_done / self.pages_total, 3) if self.pages_total else 0.0,
+            "submitted_at": datetime.fromtimestamp(self.submitted_at).isoformat(),
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat() if self.started_at else None,
+            "finished_at": datetime.fromtimestamp(self.finished_at).isoformat() if self.finished_at else None,
+            "error": self.error,
+            "attempts": self.attempts,
+        }
+        if include_content and self.status == JOB_DONE:
+            data["content"] = self.content
+            data["metadata"] = self.metadata
+        return data
+
+
+# --- Child process side ---
+
+def _load_artifact_dict():
+    """Load Marker models once, preferring the on-disk model cache."""
+    try:
+        from model_cache_manager import get_cached_marker_models
+        artifact_dict = get_cached_marker_models(force_download=False)
+        if artifact_dict:
+            return artifact_dict
+        logger.warning("⚠️ Cache manager returned no models, loading directly")
+    except ImportError:
+        pass
+    from marker.models import create_model_dict
+    return create_model_dict()
+
+
+def _count_pages(pdf_path: str) -> int:
+    try:
+        import PyPDF2
+        with open(pdf_path, "rb") as f:
+            return len(PyPDF2.PdfReader(f).pages)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not count pages of {pdf_path}: {e}")
+        return 0
+
+
+def _worker_main(job_queue, event_queue, pages_per_step: int):
+    """Entry point of the conversion process. Runs until it receives ``None``."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - conversion-worker - %(levelname)s - %(message)s'
+    )
+    try:
+        load_start = time.time()
+        artifact_dict = _load_artifact_dict()
+        if not artifact_dict:
+            raise RuntimeError("Model dictionary is empty or None")
+        load_time = time.time() - load_start
+        logger.info(f"✅ Marker models resident in worker (pid={os.getpid()}) after {load_time:.1f}s")
+        event_queue.put(("ready", None, {"pid": os.getpid(), "model_load_seconds": load_time}))
+    except Exception as e:
+        logger.error(f"❌ Conversion worker could not load models: {e}")
+        event_queue.put(("load_failed", None, {"error": str(e)}))
+        return
+
+    while True:
+        item = job_queue.get()
+        if item is None:
+            break
+        job_id, pdf_path, attempt = item
+        with _claim_heartbeat(event_queue, job_id, attempt):
+            _convert(event_queue, artifact_dict, job_id, pdf_path, attempt, pages_per_step)
+
+
+@contextmanager
+def _claim_heartbeat(event_queue, job_id: str, attempt: int):
+    """Renew the parent's claim on the job every CLAIM_RENEW_SECONDS until the block exits."""
+    done = threading.Event()
+
+    def beat():
+        while not done.wait(CLAIM_RENEW_SECONDS):
+            event_queue.put(("heartbeat", job_id, {"attempt": attempt}))
+
+    event_queue.put(("heartbeat", job_id, {"attempt": attempt}))
+    heartbeat = threading.Thread(target=beat, name="pdf-conversion-heartbeat", daemon=True)
+    heartbeat.start()
+    try:
+        yield
+    finally:
+        done.set()
+        heartbeat.join()
+
+
+def _convert(event_queue, artifact_dict, job_id: str, pdf_path: str, attempt: int, pages_per_step: int):
+    """Convert one PDF, streaming started/progress/done/failed events."""
+    from marker.converters.pdf import PdfConverter
+    from marker.output import text_from_rendered
+
+    start_time = time.time()
+    try:
+        page_count = _count_pages(pdf_path)
+        event_queue.put(("started", job_id, {"attempt": attempt, "pages_total": page_count}))
+
+        # Convert page by page (or in ranges of pages_per_step) so progress is
+        # reported while the document is still being processed; models are
+        # shared across ranges.
+        if page_count > 0:
+            ranges = [
+                list(range(start, min(start + pages_per_step, page_count)))
+                for start in range(0, page_count, pages_per_step)
+            ]
+        else:
+            ranges = [None]
+
+        parts: List[str] = []
+        for page_range in ranges:
+            config = {"page_range": page_range} if page_range is not None else {}
+            converter = PdfConverter(artifact_dict=artifact_dict, config=config)
+            rendered = converter(pdf_path)
+            text, _, _ = text_from_rendered(rendered)
+            parts.append(text or "")
+            del rendered
+            pages_done = page_range[-1] + 1 if page_range else page_count
+            event_queue.put(("progress", job_id, {"attempt": attempt, "pages_done": pages_done}))
+
+        markdown_text = "\n\n".join(p for p in parts if p.strip())
+        event_queue.put(("done", job_id, {
+            "attempt": attempt,
+            "content": markdown_text,
+            "metadata": {
+                "source_file": os.path.basename(pdf_path),
+                "processing_method": "marker",
+                "text_length": len(markdown_text),
+                "page_count": page_count,
+                "processing_time_seconds": time.time() - start_time,
+                "worker_pid": os.getpid(),
+            },
+        }))
+    except Exception as e:
+        logger.error(f"❌ Conversion failed for job {job_id}: {e}")
+        logger.error(traceback.format_exc())
+        event_queue.put(("failed", job_id, {"attempt": attempt, "error": str(e)}))
+
+
+# --- API process side ---
+
+class ConversionWorker:
+    """Owns the conversion process, its bounded job queue and job bookkeeping."""
+
+    def __init__(
+        self,
+        max_queue_size: int = 4,
+        min_free_ram_mb: int = 1024,
+        ram_per_file_mb_factor: float = 8.0,
+        pages_per_step: int = 1,
+        job_retention: int = 100,
+        max_attempts: int = 2,
+    ):
+        self.max_queue_size = max_queue_size
+        self.min_free_ram_mb = min_free_ram_mb
+        self.ram_per_file_mb_factor = ram_per_file_mb_factor
+        self.pages_per_step = max(1, pages_per_step)
+        self.job_retention = job_retention
+        self.max_attempts = max(1, max_attempts)
+
+        self._ctx = mp.get_context("spawn")
+        self._job_queue = None  # one per worker process, see _spawn_process
+        self._event_queue = self._ctx.Queue()
+        self._process: Optional[mp.Process] = None
+        self._listener: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self.ready = threading.Event()
+        self.load_failed = threading.Event()
+
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, ConversionJob]" = OrderedDict()
+        self._running_job_id: Optional[str] = None
+        self._claimed_job_id: Optional[str] = None  # handed to the worker, at most one
+        self._restarts = 0
+        self._reclaimed = 0
+        self._completed = 0
+        self._failed = 0
+        self._model_load_seconds: Optional[float] = None
+
+    @classmethod
+    def from_env(cls) -> "ConversionWorker":
+        return cls(
+            max_queue_size=int(os.getenv("PDF_WORKER_MAX_QUEUE", "4")),
+            min_free_ram_mb=int(os.getenv("PDF_WORKER_MIN_FREE_RAM_MB", "1024")),
+            ram_per_file_mb_factor=float(os.getenv("PDF_WORKER_RAM_PER_FILE_MB_FACTOR", "8")),
+            pages_per_step=int(os.getenv("PDF_WORKER_PAGES_PER_STEP", "1")),
+            job_retention=int(os.getenv("PDF_WORKER_JOB_RETENTION", "100")),
+            max_attempts=int(os.getenv("PDF_WORKER_MAX_ATTEMPTS", "2")),
+        )
+
+    # -- lifecycle --
+
+    def start(self):
+        self._spawn_process()
+        self._listener = threading.Thread(target=self._listen, name="pdf-conversion-events", daemon=True)
+        self._listener.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stopping.set()
+        if self._process and self._process.is_alive():
+            self._job_queue.put(None)
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+        if self._listener:
+            self._listener.join(timeout)
+
+    def _spawn_process(self):
+        self.ready.clear()
+        # A fresh queue per process: a job handed to a dead process must not
+        # be picked up again by its successor (it is reclaimed instead)
+        self._job_queue = self._ctx.Queue()
+        self._process = self._ctx.Process(
+            target=_worker_main,
+            args=(self._job_queue, self._event_queue, self.pages_per_step),
+            name="pdf-conversion-worker",
+            daemon=True,
+        )
+        self._process.start()
+        logger.info(f"🚀 PDF conversion worker started (pid={self._process.pid})")
+
+    # -- admission / submission --
+
+    def _pending_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status not in TERMINAL_STATES)
+
+    def _check_memory(self, file_size_bytes: int):
+        if not PSUTIL_AVAILABLE:
+            return
+        available_mb = psutil.virtual_memory().available / (1024 * 1024)
+        required_mb = self.min_free_ram_mb + (file_size_bytes / (1024 * 1024)) * self.ram_per_file_mb_factor
+        if available_mb < required_mb:
+            raise AdmissionError(
+                f"Not enough free memory to admit conversion "
+                f"({available_mb:.0f}MB available, {required_mb:.0f}MB required)"
+            )
+
+    def submit(self, pdf_path: str, filename: str, owns_file: bool = True) -> ConversionJob:
+        """
+        Admit a job or raise ``AdmissionError``.
+
+        With ``owns_file`` the worker deletes ``pdf_path`` when the job is
+        terminal; otherwise the caller stays responsible for it.
+        """
+        if self.load_failed.is_set():
+            raise AdmissionError("Conversion worker could not load Marker models", retry_after=300)
+        file_size = os.path.getsize(pdf_path)
+        with self._lock:
+            if self._pending_count() >= self.max_queue_size:
+                raise AdmissionError(f"Conversion queue is full ({self.max_queue_size} jobs pending)")
+            self._check_memory(file_size)
+            job = ConversionJob(
+                job_id=uuid.uuid4().hex,
+                filename=filename,
+                pdf_path=pdf_path,
+                file_size_bytes=file_size,
+                owns_file=owns_file,
+            )
+            self._jobs[job.job_id] = job
+            self._evict_finished_jobs()
+            self._dispatch()
+        logger.info(f"📥 Queued conversion job {job.job_id} for {filename}")
+        return job
+
+    def _dispatch(self):
+        """Hand the oldest queued job to an idle, ready worker and claim it (lock held)."""
+        if self._claimed_job_id is not None or not self.ready.is_set():
+            return
+        job = next((j for j in self._jobs.values() if j.status == JOB_QUEUED), None)
+        if job is None:
+            return
+        now = time.time()
+        job.attempts += 1
+        job.claimed_at = now
+        job.claimed_until = now + CLAIM_LEASE_SECONDS
+        self._claimed_job_id = job.job_id
+        self._job_queue.put((job.job_id, job.pdf_path, job.attempts))
+
+    def _evict_finished_jobs(self):
+        finished = [jid for jid, job in self._jobs.items() if job.status in TERMINAL_STATES]
+        for jid in finished[:max(0, len(self._jobs) - self.job_retention)]:
+            del self._jobs[jid]
+
+    # -- queries --
+
+    def get_job(self, job_id: str) -> Optional[ConversionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def hand_over_file(self, job_id: str) -> bool:
+        """Transfer ownership of a job's input file to the worker (e.g. after a caller timeout)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in TERMINAL_STATES:
+                return False
+            job.owns_file = True
+            return True
+
+    async def subscribe(self, job_id: str, poll_interval: float = 0.5) -> AsyncIterator[Dict[str, Any]]:
+        """Yield a job snapshot on every state change until the job is terminal."""
+        last_version = -1
+        while True:
+            job = self.get_job(job_id)
+            if job is None:
+                return
+            if job.version != last_version:
+                last_version = job.version
+                yield job.to_dict()
+            if job.status in TERMINAL_STATES:
+                return
+            await asyncio.sleep(poll_interval)
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[ConversionJob]:
+        """Wait until the job is terminal (or the timeout elapses) and return it."""
+        async def _drain():
+            async for _ in self.subscribe(job_id):
+                pass
+        try:
+            await asyncio.wait_for(_drain(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.get_job(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = self._pending_count()
+            running = self._running_job_id
+        stats = {
+            "worker_alive": bool(self._process and self._process.is_alive()),
+            "worker_pid": self._process.pid if self._process else None,
+            "models_resident": self.ready.is_set(),
+            "model_load_seconds": self._model_load_seconds,
+            "pending_jobs": pending,
+            "running_job": running,
+            "max_queue_size": self.max_queue_size,
+            "completed_jobs": self._completed,
+            "failed_jobs": self._failed,
+            "reclaimed_jobs": self._reclaimed,
+            "worker_restarts": self._restarts,
+        }
+        if PSUTIL_AVAILABLE:
+            stats["available_ram_mb"] = round(psutil.virtual_memory().available / (1024 * 1024), 1)
+        return stats
+
+    # -- event handling --
+
+    def _listen(self):
+        while not self._stopping.is_set():
+            try:
+                kind, job_id, payload = self._event_queue.get(timeout=1.0)
+            except queue.Empty:
+                self._reclaim_expired_claim()
+                self._check_worker_health()
+                continue
+            except (EOFError, OSError):
+                break
+            try:
+                self._apply_event(kind, job_id, payload)
+            except Exception as e:
+                logger.error(f"❌ Failed to apply worker event {kind}: {e}")
+
+    def _apply_event(self, kind: str, job_id: Optional[str], payload: Dict[str, Any]):
+        if kind == "ready":
+            self._model_load_seconds = payload.get("model_load_seconds")
+            with self._lock:
+                self.ready.set()
+                self._dispatch()
+            return
+        if kind == "load_failed":
+            logger.error(f"❌ Conversion worker model load failed: {payload.get('error')}")
+            self.load_failed.set()
+            self._fail_pending_jobs("Marker models could not be loaded")
+            return
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            # Events of a reclaimed attempt (or of a finished job) are stale
+            if job is None or job.status in TERMINAL_STATES or payload.get("attempt") != job.attempts:
+                return
+            job.claimed_until = time.time() + CLAIM_LEASE_SECONDS
+            if kind == "heartbeat":
+                return
+            if kind == "started":
+                job.status = JOB_RUNNING
+                job.started_at = time.time()
+                job.pages_total = payload.get("pages_total", 0)
+                self._running_job_id = job_id
+            elif kind == "progress":
+                job.pages_done = payload.get("pages_done", job.pages_done)
+            elif kind == "done":
+                job.status = JOB_DONE
+                job.content = payload.get("content")
+                job.metadata = payload.get("metadata", {})
+                job.pages_done = job.pages_total
+                self._finish(job)
+                self._completed += 1
+            elif kind == "failed":
+                job.status = JOB_FAILED
+                job.error = payload.get("error")
+                self._finish(job)
+                self._failed += 1
+            job.version += 1
+            self._dispatch()
+
+    def _finish(self, job: ConversionJob):
+        job.finished_at = time.time()
+        job.claimed_until = None
+        if self._running_job_id == job.job_id:
+            self._running_job_id = None
+        if self._claimed_job_id == job.job_id:
+            self._claimed_job_id = None
+        if not job.owns_file:
+            return
+        try:
+            if job.pdf_path and os.path.exists(job.pdf_path):
+                os.remove(job.pdf_path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not clean up temporary file {job.pdf_path}: {e}")
+
+    def _fail_pending_jobs(self, reason: str):
+        with self._lock:
+            self._claimed_job_id = None
+            for job in self._jobs.values():
+                if job.status not in TERMINAL_STATES:
+                    job.status = JOB_FAILED
+                    job.error = reason
+                    self._finish(job)
+                    job.version += 1
+                    self._failed += 1
+
+    def _release_claim(self, job: ConversionJob, reason: str):
+        """
+        Take a claimed job back from the worker (lock held).
+
+        A job that started converting when its worker died is failed, as it
+        most likely caused the crash. A job that never reported ``started``
+        is queued again until it has used ``max_attempts``.
+        """
+        self._claimed_job_id = None
+        if job.status == JOB_QUEUED and job.attempts < self.max_attempts:
+            logger.warning(f"⚠️ Re-queueing conversion job {job.job_id} ({reason})")
+            job.claimed_at = None
+            job.claimed_until = None
+            self._reclaimed += 1
+        else:
+            job.status = JOB_FAILED
+            job.error = reason
+            self._finish(job)
+            self._failed += 1
+        job.version += 1
+
+    def _reclaim_expired_claim(self):
+        """Lease sweep: reclaim the claimed job if the worker stopped renewing it."""
+        with self._lock:
+            job = self._jobs.get(self._claimed_job_id) if self._claimed_job_id else None
+            if job is None or job.claimed_until is None or job.claimed_until >= time.time():
+                return
+            self._release_claim(job, f"Conversion worker sent no events for {CLAIM_LEASE_SECONDS:.0f}s")
+        # The worker is hung (or its events are lost): replace it
+        if self._process and self._process.is_alive():
+            logger.error(f"🚨 PDF conversion worker unresponsive (pid={self._process.pid}), terminating")
+            self._process.terminate()
+            self._process.join(5.0)
+
+    def _check_worker_health(self):
+        if self._stopping.is_set() or self.load_failed.is_set():
+            return
+        if self._process and not self._process.is_alive():
+            logger.error(f"🚨 PDF conversion worker died (exit code {self._process.exitcode}), restarting")
+            with self._lock:
+                job = self._jobs.get(self._claimed_job_id) if self._claimed_job_id else None
+                if job is not None:
+                    self._release_claim(
+                        job, f"Conversion worker exited unexpectedly (exit code {self._process.exitcode})"
+                    )
+            self._restarts += 1
+            self._spawn_process()
+
+
+_conversion_worker: Optional[ConversionWorker] = None
+
+
+def get_conversion_worker() -> Optional[ConversionWorker]:
+    return _conversion_worker
+
+
+def start_conversion_worker() -> ConversionWorker:
+    """Start the process-wide conversion worker (idempotent)."""
+    global _conversion_worker
+    if _conversion_worker is None:
+        _conversion_worker = ConversionWorker.from_env()
+        _conversion_worker.start()
+    return _conversion_worker
+
+
+def stop_conversion_worker():
+    global _conversion_worker
+    if _conversion_worker is not None:
+        _conversion_worker.stop()
+        _conversion_worker = None
@@ -36,8 +36,18 @@ def _setup_marker_environment():
 _setup_marker_environment()
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 import PyPDF2
+import json
+
+from conversion_worker import (
+    AdmissionError,
+    JOB_DONE,
+    get_conversion_worker,
+    start_conversion_worker,
+    stop_conversion_worker,
+)
 
 # Import local model cache manager
 try:
@@ -59,9 +69,9 @@ except ImportError:
     logging.warning("⚠️ Marker library not found. Fallback to PyPDF2 will be used.")
 
 # Global state variables
+# Marker models live in the persistent conversion worker process (see
+# conversion_worker.py); this process only queues jobs and serves results.
 service_ready = threading.Event()
-models_loading = threading.Event()
-processor_instance = None
 
 # --- Lifespan Context Manager ---
 @asynccontextmanager
@@ -77,13 +87,11 @@ async def lifespan(app: FastAPI):
     )
     
     if MARKER_AVAILABLE:
-        logging.info("🔧 Marker available - initializing processor with async model loading...")
-        # Start async model loading
-        models_loading.set()
-        background_task = asyncio.create_task(async_load_models())
-        
-        # Don't wait for models to finish loading before serving traffic
-        # Health checks will indicate when ready
+        logging.info("🔧 Marker available - starting persistent conversion worker...")
+        # Models load once inside the worker process; don't wait for them
+        # before serving traffic. Health checks will indicate when ready.
+        worker = start_conversion_worker()
+        asyncio.create_task(_wait_for_worker_ready(worker))
     else:
         logging.info("⚠️ PDF Processing Service started with PyPDF2 fallback only")
         service_ready.set()
@@ -92,6 +100,22 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logging.info("🛑 Shutting down PDF Processing Service...")
+    stop_conversion_worker()
+
+async def _wait_for_worker_ready(worker):
+    """Flip service readiness once the worker reports resident models (or gives up)."""
+    timeout_seconds = int(os.getenv("MODEL_LOAD_TIMEOUT", "600"))  # 10 minutes default
+    start_time = time.time()
+    while time.time() - start_time < timeout_seconds:
+        if worker.ready.is_set():
+            logging.info(f"✅ Conversion worker ready in {time.time() - start_time:.1f}s")
+            service_ready.set()
+            return
+        if worker.load_failed.is_set():
+            break
+        await asyncio.sleep(1)
+    logging.error("❌ Conversion worker not ready - serving with PyPDF2 fallback")
+    service_ready.set()
 
 # --- FastAPI App Definition ---
 app = FastAPI(
@@ -111,49 +135,9 @@ class PDFProcessingResponse(BaseModel):
     content: str
     metadata: PDFMetadata
 
-# --- Async Model Loading ---
-async def async_load_models():
-    """Load models asynchronously with timeout handling"""
-    global processor_instance
-    
-    def load_models_sync():
-        """Synchronous model loading in thread"""
-        global processor_instance
-        try:
-            logging.info("⏳ Starting async model loading...")
-            start_time = time.time()
-            
-            processor_instance = MarkerProcessor()
-            
-            load_time = time.time() - start_time
-            if processor_instance.models_loaded:
-                logging.info(f"✅ Models loaded successfully in {load_time:.1f}s")
-                service_ready.set()
-            else:
-                logging.error("❌ Model loading failed")
-        
-        except Exception as e:
-            logging.error(f"❌ Model loading failed: {e}")
-            logging.error(traceback.format_exc())
-        finally:
-            models_loading.clear()
-    
-    # Run model loading in thread with timeout
-    loop = asyncio.get_event_loop()
-    timeout_seconds = int(os.getenv("MODEL_LOAD_TIMEOUT", "600"))  # 10 minutes default
-    
-    try:
-        # Run in executor with timeout
-        await asyncio.wait_for(
-            loop.run_in_executor(None, load_models_sync),
-            timeout=timeout_seconds
-        )
-    except asyncio.TimeoutError:
-        logging.error(f"❌ Model loading timed out after {timeout_seconds}s")
-        models_loading.clear()
-    except Exception as e:
-        logging.error(f"❌ Unexpected error during model loading: {e}")
-        models_loading.clear()
+def _worker_ready() -> bool:
+    worker = get_conversion_worker()
+    return bool(worker and worker.ready.is_set())
 
 # --- Enhanced PDF Processor with Better Error Handling ---
 def fallback_pdf_extract(pdf_path: str) -> Tuple[str, Dict[str, Any]]:
@@ -231,119 +215,6 @@ def fallback_pdf_extract(pdf_path: str) -> Tuple[str, Dict[str, Any]]:
         logging.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"PDF processing failed: {str(e)}")
 
-# --- Enhanced Marker PDF Processor ---
-class MarkerProcessor:
-    def __init__(self):
-        self.converter = None
-        self.models_loaded = False
-        self.cache_manager = None
-        self.load_start_time = None
-        if MARKER_AVAILABLE:
-            self._load_converter()
-
-    def _load_converter(self):
-        """Load converter with comprehensive error handling and timeout"""
-        if self.models_loaded:
-            return
-        
-        self.load_start_time = time.time()
-        
-        try:
-            if CACHE_MANAGER_AVAILABLE:
-                logging.info("🔄 Loading Marker models using cache manager...")
-                self.cache_manager = get_model_cache_manager()
-                
-                # Always try to get cached models first
-                artifact_dict = get_cached_marker_models(force_download=False)
-                
-                if artifact_dict:
-                    logging.info("✅ Using cached/restored Marker models")
-                else:
-                    # Cache manager handles download and caching internally
-                    logging.error("❌ Cache manager failed to provide models")
-                    # Fallback to direct loading only as last resort
-                    logging.info("🔄 Attempting direct model loading as fallback...")
-                    from marker.models import create_model_dict
-                    artifact_dict = create_model_dict()
-            else:
-                logging.info("🔄 Loading Marker models directly (no cache manager)...")
-                from marker.models import create_model_dict
-                artifact_dict = create_model_dict()
-            
-            if not artifact_dict:
-                raise Exception("Model dictionary is empty or None")
-            
-            logging.info(f"📊 Model dictionary contains {len(artifact_dict)} components")
-            
-            self.converter = PdfConverter(artifact_dict=artifact_dict)
-            self.models_loaded = True
-            
-            load_time = time.time() - self.load_start_time
-            logging.info(f"✅ Marker models loaded successfully in {load_time:.1f}s!")
-            
-            if CACHE_MANAGER_AVAILABLE and self.cache_manager:
-                stats = self.cache_manager.get_cache_stats()
-                logging.info(f"📊 Cache stats: {stats['total_cache_size_mb']:.1f}MB cached, {stats['cached_model_sets']} model sets")
-            
-        except Exception as e:
-            load_time = time.time() - self.load_start_time if self.load_start_time else 0
-            logging.error(f"❌ Failed to load Marker models after {load_time:.1f}s: {e}")
-            logging.error(f"📋 Error details: {traceback.format_exc()}")
-            self.models_loaded = False
-
-    def process(self, pdf_path: str) -> Tuple[str, Dict[str, Any]]:
-        """Process PDF with Marker with comprehensive error handling and fallbacks"""
-        if not self.models_loaded or not self.converter:
-            logging.warning("🔄 Marker not ready, using fallback")
-            return fallback_pdf_extract(pdf_path)
-
-        start_time = time.time()
-        try:
-            # Validate file before processing
-            if not os.path.exists(pdf_path):
-                raise ValueError(f"PDF file not found: {pdf_path}")
-            
-            file_size = os.path.getsize(pdf_path)
-            if file_size == 0:
-                raise ValueError("PDF file is empty")
-            
-            logging.info(f"🔄 Processing with Marker: {os.path.basename(pdf_path)} ({file_size / (1024*1024):.1f}MB)")
-            
-            # Process with timeout
-            rendered = self.converter(pdf_path)
-            
-            if not rendered:
-                raise ValueError("Marker returned empty result")
-            
-            markdown_text, _, _ = text_from_rendered(rendered)
-            
-            if not markdown_text or not markdown_text.strip():
-                logging.warning("⚠️ Marker produced empty text, falling back to PyPDF2")
-                return fallback_pdf_extract(pdf_path)
-            
-            page_count = len(rendered.children) if hasattr(rendered, 'children') else 0
-            processing_time = time.time() - start_time
-
-            metadata = {
-                "source_file": os.path.basename(pdf_path),
-                "processing_method": "marker",
-                "text_length": len(markdown_text),
-                "page_count": page_count,
-                "file_size_mb": file_size / (1024 * 1024),
-                "processing_time_seconds": processing_time,
-                "processing_timestamp": datetime.now().isoformat()
-            }
-            
-            logging.info(f"✅ Marker processing completed in {processing_time:.1f}s: {len(markdown_text)} chars from {page_count} pages")
-            return markdown_text, metadata
-            
-        except Exception as e:
-            processing_time = time.time() - start_time
-            logging.error(f"❌ Marker processing failed after {processing_time:.1f}s: {e}")
-            logging.error(f"📋 Error details: {traceback.format_exc()}")
-            logging.info("🔄 Falling back to PyPDF2 due to Marker error")
-            return fallback_pdf_extract(pdf_path)
-
 # --- Health Check Endpoints ---
 @app.get("/health")
 async def health_check():
@@ -358,10 +229,10 @@ async def health_check():
 @app.get("/health/ready")
 async def readiness_check():
     """Readiness check - service is ready to process requests"""
-    global processor_instance
+    worker = get_conversion_worker()
     
     is_ready = service_ready.is_set()
-    models_still_loading = models_loading.is_set()
+    models_still_loading = bool(worker and not worker.ready.is_set() and not worker.load_failed.is_set())
     
     status = {
         "status": "ready" if is_ready else "not_ready",
@@ -369,21 +240,21 @@ async def readiness_check():
         "timestamp": datetime.now().isoformat(),
         "details": {
             "marker_available": MARKER_AVAILABLE,
-            "models_loaded": processor_instance.models_loaded if processor_instance else False,
+            "models_loaded": _worker_ready(),
             "models_loading": models_still_loading,
             "cache_manager_available": CACHE_MANAGER_AVAILABLE
         }
     }
     
     if not is_ready:
-        return status, 503  # Service Unavailable
+        return JSONResponse(status_code=503, content=status)  # Service Unavailable
     
     return status
 
 @app.get("/health/live")
 async def liveness_check():
     """Liveness check - service is alive and functioning"""
-    global processor_instance
+    worker = get_conversion_worker()
     
     # Basic liveness - if we can respond, we're alive
     status = {
@@ -392,7 +263,7 @@ async def liveness_check():
         "timestamp": datetime.now().isoformat(),
         "uptime_info": {
             "marker_available": MARKER_AVAILABLE,
-            "processor_available": processor_instance is not None,
+            "processor_available": bool(worker and worker.stats()["worker_alive"]),
             "cache_available": CACHE_MANAGER_AVAILABLE
         }
     }
@@ -403,9 +274,13 @@ async def liveness_check():
 async def process_pdf_endpoint(file: UploadFile = File(...), background_tasks: BackgroundTasks = None):
     """
     Process PDF file and convert to Markdown with comprehensive error handling
-    and MD saving failure checks
+    and MD saving failure checks.
+
+    Synchronous convenience wrapper around the conversion job queue: the job
+    is submitted to the persistent worker and awaited. If it does not finish
+    within PDF_PROCESS_WAIT_SECONDS a 202 with the job id is returned so the
+    caller can poll ``/jobs/{job_id}``.
     """
-    global processor_instance
     
     # Validate file type
     if not file.filename or not file.filename.lower().endswith(".pdf"):
@@ -435,9 +310,30 @@ async def process_pdf_endpoint(file: UploadFile = File(...), background_tasks: B
         logging.info(f"📄 Processing PDF: {file.filename} ({file_size / (1024*1024):.2f}MB)")
         
         # Process the PDF
-        if processor_instance and processor_instance.models_loaded:
-            logging.info("🔄 Using Marker processor")
-            md_content, processing_metadata = processor_instance.process(tmp_path)
+        worker = get_conversion_worker()
+        if _worker_ready():
+            logging.info("🔄 Using persistent Marker conversion worker")
+            try:
+                job = worker.submit(tmp_path, file.filename, owns_file=False)
+            except AdmissionError as e:
+                raise HTTPException(
+                    status_code=503,
+                    detail=str(e),
+                    headers={"Retry-After": str(e.retry_after)}
+                )
+            wait_seconds = float(os.getenv("PDF_PROCESS_WAIT_SECONDS", "900"))
+            job = await worker.wait(job.job_id, timeout=wait_seconds)
+            if job.status == JOB_DONE and job.content and job.content.strip():
+                md_content, processing_metadata = job.content, dict(job.metadata)
+                processing_metadata["file_size_mb"] = file_size / (1024 * 1024)
+            elif job.status == JOB_DONE or job.error:
+                logging.warning(f"🔄 Marker job {job.job_id} produced no content ({job.error}), falling back to PyPDF2")
+                md_content, processing_metadata = fallback_pdf_extract(tmp_path)
+            else:
+                # Still running - the worker keeps the file, caller polls the job
+                worker.hand_over_file(job.job_id)
+                tmp_path = None
+                return JSONResponse(status_code=202, content=job.to_dict())
         else:
             logging.info("🔄 Using PyPDF2 fallback processor")
             md_content, processing_metadata = fallback_pdf_extract(tmp_path)
@@ -535,10 +431,69 @@ async def save_md_for_frontend_access(filename: str, md_content: str, metadata:
     except Exception as e:
         logging.warning(f"⚠️ Could not save MD for frontend access: {e}")
 
+# --- Conversion Job Endpoints ---
+@app.post("/jobs", status_code=202)
+async def submit_conversion_job(file: UploadFile = File(...)):
+    """Queue a PDF for conversion by the persistent Marker worker and return its job id."""
+    if not file.filename or not file.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Invalid file type. Only PDF files are supported.")
+    
+    worker = get_conversion_worker()
+    if not _worker_ready():
+        raise HTTPException(
+            status_code=503,
+            detail="Marker conversion worker is not ready. Use /process for PyPDF2 fallback.",
+            headers={"Retry-After": "30"}
+        )
+    
+    file_content = await file.read()
+    if not file_content:
+        raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+    max_size = 50 * 1024 * 1024  # 50MB
+    if len(file_content) > max_size:
+        raise HTTPException(status_code=400, detail=f"File too large. Maximum size is {max_size // (1024*1024)}MB.")
+    
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+        tmp.write(file_content)
+        tmp_path = tmp.name
+    
+    try:
+        job = worker.submit(tmp_path, file.filename)
+    except AdmissionError as e:
+        os.remove(tmp_path)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}")
+async def get_conversion_job(job_id: str, include_content: bool = True):
+    """Poll a conversion job; the markdown content is included once it is done."""
+    worker = get_conversion_worker()
+    job = worker.get_job(job_id) if worker else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Conversion job not found")
+    return job.to_dict(include_content=include_content)
+
+@app.get("/jobs/{job_id}/events")
+async def stream_conversion_job(job_id: str):
+    """
+    Subscribe to per-page progress of a conversion job as Server-Sent Events.
+    With PDF_WORKER_PAGES_PER_STEP > 1 progress advances once per page range.
+    """
+    worker = get_conversion_worker()
+    if not worker or worker.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Conversion job not found")
+    
+    async def event_stream():
+        async for snapshot in worker.subscribe(job_id):
+            yield f"event: {snapshot['status']}\ndata: {json.dumps(snapshot)}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @app.get("/status")
 async def service_status():
     """Get detailed service status including model loading state"""
-    global processor_instance
+    worker = get_conversion_worker()
     
     return {
         "service": "pdf-processing",
@@ -547,11 +502,12 @@ async def service_status():
         "capabilities": {
             "marker_available": MARKER_AVAILABLE,
             "cache_manager_available": CACHE_MANAGER_AVAILABLE,
-            "models_loaded": processor_instance.models_loaded if processor_instance else False,
-            "models_loading": models_loading.is_set(),
+            "models_loaded": _worker_ready(),
+            "models_loading": bool(worker and not worker.ready.is_set() and not worker.load_failed.is_set()),
             "fallback_available": True
         },
-        "cache_info": processor_instance.cache_manager.get_cache_stats() if processor_instance and processor_instance.cache_manager else None,
+        "conversion_worker": worker.stats() if worker else None,
+        "cache_info": get_model_cache_manager().get_cache_stats() if CACHE_MANAGER_AVAILABLE else None,
         "version": "1.0.0"
     }
 
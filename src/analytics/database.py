@@ -500,6 +500,45 @@ class ExperimentDatabase:
             self.logger.debug(f"Logged interaction {interaction_id} for user {user_id}.")
             return interaction_id
 
+    def add_interactions_batch(self, entries: List[Dict[str, Any]]) -> List[int]:
+        """
+        Adds several interactions in one transaction (telemetry outbox flush).
+
+        Each entry holds ``rag_params`` plus the keyword arguments of
+        ``add_interaction`` except ``rag_config_hash``.
+        """
+        rows = []
+        configs = {}
+        for entry in entries:
+            params_str = json.dumps(entry.get("rag_params") or {}, sort_keys=True)
+            config_hash = hashlib.sha256(params_str.encode('utf-8')).hexdigest()
+            configs[config_hash] = params_str
+            rows.append((
+                entry["user_id"], entry.get("session_id"), entry["query"], entry.get("response"),
+                json.dumps(entry.get("retrieved_context") or []), config_hash,
+                entry.get("uncertainty_score"), entry.get("feedback_requested"),
+                entry.get("processing_time_ms"), entry.get("success", True),
+                entry.get("error_message"), entry.get("chain_type"),
+            ))
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                "INSERT OR IGNORE INTO rag_configurations (config_hash, rag_params) VALUES (?, ?)",
+                list(configs.items())
+            )
+            interaction_ids = []
+            for row in rows:
+                cursor.execute("""
+                    INSERT INTO interactions (user_id, session_id, query, response, retrieved_context,
+                                              rag_config_hash, uncertainty_score, feedback_requested, processing_time_ms,
+                                              success, error_message, chain_type)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, row)
+                interaction_ids.append(cursor.lastrowid)
+            self.logger.debug(f"Logged {len(interaction_ids)} interactions in one batch.")
+            return interaction_ids
+
     def delete_interactions_by_session(self, session_id: str) -> int:
         """Delete interactions for a given session_id. Returns count deleted."""
         if not session_id:
@@ -10,6 +10,7 @@ Key Features:
 - Resource utilization tracking
 - Optimization recommendations
 - Export capabilities for analysis
+- Streaming latency percentiles (DDSketch per chain type per hour bucket)
 
 Based on research findings from Şakar & Emekci (2024) regarding RAG efficiency metrics.
 """
@@ -23,8 +24,12 @@ from dataclasses import dataclass, asdict
 from pathlib import Path
 import threading
 from collections import defaultdict
+from src.analytics.quantile_sketch import DDSketch, DEFAULT_RELATIVE_ACCURACY
 from src.utils.logger import get_logger
 
+# Latency sketches are kept per chain type per bucket of this size
+SKETCH_BUCKET = timedelta(hours=1)
+
 @dataclass
 class PerformanceMetric:
     """Single performance measurement record."""
@@ -82,6 +87,7 @@ class PerformanceTracker:
         
         # Database setup
         self.db_path = config.get("analytics_db_path", "data/analytics/performance.db")
+        self.sketch_accuracy = config.get("latency_sketch_accuracy", DEFAULT_RELATIVE_ACCURACY)
         self._init_database()
         
         # In-memory cache for real-time metrics
@@ -151,6 +157,86 @@ class PerformanceTracker:
             conn.execute("""
                 CREATE INDEX IF NOT EXISTS idx_chain_type ON performance_metrics(chain_type);
             """)
+            
+            # Serialized DDSketch of successful execution times per chain type per bucket
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS performance_sketches (
+                    chain_type TEXT NOT NULL,
+                    bucket_start TEXT NOT NULL,
+                    sample_count INTEGER NOT NULL,
+                    sketch BLOB NOT NULL,
+                    PRIMARY KEY (chain_type, bucket_start)
+                )
+            """)
+            
+            has_sketches = conn.execute("SELECT 1 FROM performance_sketches LIMIT 1").fetchone()
+            has_metrics = conn.execute("SELECT 1 FROM performance_metrics WHERE success = 1 LIMIT 1").fetchone()
+        
+        if has_metrics and not has_sketches:
+            self.rebuild_sketches()
+    
+    @staticmethod
+    def _bucket_floor(moment: datetime) -> datetime:
+        """Start of the sketch bucket containing ``moment``."""
+        bucket_seconds = int(SKETCH_BUCKET.total_seconds())
+        day_start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        elapsed = int((moment - day_start).total_seconds())
+        return day_start + timedelta(seconds=elapsed - elapsed % bucket_seconds)
+    
+    def _bucket_start(self, timestamp: str) -> Optional[str]:
+        """Bucket key for an ISO timestamp (None if the timestamp is malformed)."""
+        try:
+            return self._bucket_floor(datetime.fromisoformat(timestamp)).isoformat()
+        except (TypeError, ValueError):
+            return None
+    
+    def _add_to_sketch(self, conn: sqlite3.Connection, chain_type: str, timestamp: str, execution_time: float):
+        """Fold one execution time into its bucket sketch (caller holds the write transaction)."""
+        bucket = self._bucket_start(timestamp)
+        if bucket is None:
+            return
+        row = conn.execute(
+            "SELECT sketch FROM performance_sketches WHERE chain_type = ? AND bucket_start = ?",
+            (chain_type, bucket)
+        ).fetchone()
+        sketch = DDSketch.from_bytes(row[0]) if row else DDSketch(self.sketch_accuracy)
+        sketch.add(execution_time)
+        conn.execute("""
+            INSERT OR REPLACE INTO performance_sketches (chain_type, bucket_start, sample_count, sketch)
+            VALUES (?, ?, ?, ?)
+        """, (chain_type, bucket, sketch.count, sketch.to_bytes()))
+    
+    def rebuild_sketches(self):
+        """Recompute all latency sketches from performance_metrics (one pass)."""
+        try:
+            sketches: Dict[Tuple[str, str], DDSketch] = {}
+            with self._db_lock:
+                with sqlite3.connect(self.db_path) as conn:
+                    cursor = conn.execute(
+                        "SELECT chain_type, timestamp, execution_time FROM performance_metrics WHERE success = 1"
+                    )
+                    for chain_type, timestamp, execution_time in cursor:
+                        bucket = self._bucket_start(timestamp)
+                        if bucket is None:
+                            continue
+                        key = (chain_type, bucket)
+                        if key not in sketches:
+                            sketches[key] = DDSketch(self.sketch_accuracy)
+                        sketches[key].add(execution_time)
+                    
+                    conn.execute("DELETE FROM performance_sketches")
+                    conn.executemany("""
+                        INSERT INTO performance_sketches (chain_type, bucket_start, sample_count, sketch)
+                        VALUES (?, ?, ?, ?)
+                    """, [
+                        (chain_type, bucket, sketch.count, sketch.to_bytes())
+                        for (chain_type, bucket), sketch in sketches.items()
+                    ])
+            
+            self.logger.info(f"Rebuilt {len(sketches)} latency sketches")
+            
+        except Exception as e:
+            self.logger.error(f"Failed to rebuild latency sketches: {e}")
     
     def record_performance(self, metric: PerformanceMetric):
         """
@@ -181,6 +267,10 @@ class PerformanceTracker:
                         metric.documents_retrieved, metric.context_length,
                         metric.estimated_cost, metric.cost_per_token
                     ))
+                    
+                    # Same transaction, so the sketch never drifts from the raw rows
+                    if metric.success:
+                        self._add_to_sketch(conn, metric.chain_type, metric.timestamp, metric.execution_time)
             
             # Update real-time metrics
             self._update_real_time_metrics(metric)
@@ -291,6 +381,8 @@ class PerformanceTracker:
                 cursor = conn.execute(query, params)
                 results = cursor.fetchall()
             
+            sketches = self._load_window_sketches(time_range_hours, chain_type) if results else {}
+            
             stats_list = []
             for row in results:
                 (ct, total, successful, failed, avg_time, avg_tokens, 
@@ -298,8 +390,9 @@ class PerformanceTracker:
                 
                 success_rate = successful / total if total > 0 else 0.0
                 
-                # Get 95th percentile execution time
-                percentile_95 = self._get_percentile_time(ct, 95, time_range_hours)
+                # 95th percentile execution time from the merged bucket sketches
+                sketch = sketches.get(ct)
+                percentile_95 = (sketch.quantile(0.95) if sketch else None) or 0.0
                 
                 stats = ChainPerformanceStats(
                     chain_type=ct,
@@ -323,30 +416,79 @@ class PerformanceTracker:
             self.logger.error(f"Failed to get chain performance stats: {e}")
             return []
     
-    def _get_percentile_time(self, chain_type: str, percentile: int, time_range_hours: int) -> float:
-        """Get percentile execution time for a chain type."""
+    def _load_window_sketches(self, time_range_hours: int,
+                              chain_type: Optional[str] = None) -> Dict[str, DDSketch]:
+        """
+        Merged latency sketch per chain type for the last ``time_range_hours``.
+        
+        Whole buckets inside the window are merged from performance_sketches;
+        the partial bucket at the start of the window is read from the raw rows,
+        so the window boundary is exact and only bucket-sized scans remain.
+        """
+        cutoff = datetime.now() - timedelta(hours=time_range_hours)
+        first_full_bucket = self._bucket_floor(cutoff)
+        if first_full_bucket < cutoff:
+            first_full_bucket += SKETCH_BUCKET
+        
+        chain_filter = " AND chain_type = ?" if chain_type else ""
+        chain_params = [chain_type] if chain_type else []
+        merged: Dict[str, DDSketch] = {}
+        
+        def sketch_for(ct: str) -> DDSketch:
+            if ct not in merged:
+                merged[ct] = DDSketch(self.sketch_accuracy)
+            return merged[ct]
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute(
+                "SELECT chain_type, sketch FROM performance_sketches WHERE bucket_start >= ?" + chain_filter,
+                [first_full_bucket.isoformat()] + chain_params
+            )
+            for ct, blob in cursor:
+                sketch_for(ct).merge(DDSketch.from_bytes(blob))
+            
+            cursor = conn.execute(
+                """
+                SELECT chain_type, execution_time FROM performance_metrics
+                WHERE success = 1 AND timestamp >= ? AND timestamp < ?
+                """ + chain_filter,
+                [cutoff.isoformat(), first_full_bucket.isoformat()] + chain_params
+            )
+            for ct, execution_time in cursor:
+                sketch_for(ct).add(execution_time)
+        
+        return merged
+    
+    def get_percentile_times(self,
+                             percentiles: Tuple[int, ...] = (50, 95, 99),
+                             chain_type: Optional[str] = None,
+                             time_range_hours: int = 24) -> Dict[str, Dict[str, float]]:
+        """
+        Execution time percentiles per chain type from the latency sketches.
+        
+        Estimates are within ``latency_sketch_accuracy`` (default 1%) relative
+        error of the exact percentile over successful queries in the window.
+        
+        Returns:
+            {chain_type: {"p50": ..., "p95": ..., "p99": ..., "count": n}}
+        """
         try:
-            cutoff_time = (datetime.now() - timedelta(hours=time_range_hours)).isoformat()
+            sketches = self._load_window_sketches(time_range_hours, chain_type)
+            result = {}
+            for ct, sketch in sketches.items():
+                values = sketch.quantiles([p / 100 for p in percentiles])
+                result[ct] = {f"p{p}": value or 0.0 for p, value in zip(percentiles, values)}
+                result[ct]["count"] = sketch.count
+            return result
             
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("""
-                    SELECT execution_time 
-                    FROM performance_metrics 
-                    WHERE chain_type = ? AND timestamp >= ? AND success = 1
-                    ORDER BY execution_time
-                """, (chain_type, cutoff_time))
-                
-                times = [row[0] for row in cursor.fetchall()]
-                
-                if not times:
-                    return 0.0
-                
-                index = int(len(times) * percentile / 100)
-                return times[min(index, len(times) - 1)]
-                
         except Exception as e:
-            self.logger.warning(f"Failed to get percentile time: {e}")
-            return 0.0
+            self.logger.warning(f"Failed to get percentile times: {e}")
+            return {}
+    
+    def _get_percentile_time(self, chain_type: str, percentile: int, time_range_hours: int) -> float:
+        """Get percentile execution time for a chain type."""
+        stats = self.get_percentile_times((percentile,), chain_type, time_range_hours)
+        return stats.get(chain_type, {}).get(f"p{percentile}", 0.0)
     
     def get_cost_analysis(self, time_range_hours: int = 24) -> Dict[str, Any]:
         """
@@ -631,6 +773,12 @@ class PerformanceTracker:
                         (cutoff_time,)
                     )
                     deleted_count = cursor.rowcount
+                    
+                    # Drop sketch buckets that end before the cutoff
+                    conn.execute(
+                        "DELETE FROM performance_sketches WHERE bucket_start < ?",
+                        (self._bucket_start(cutoff_time),)
+                    )
             
             self.logger.info(f"Cleaned up {deleted_count} performance records older than {older_than_days} days")
             
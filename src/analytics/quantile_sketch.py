@@ -0,0 +1,165 @@
+"""
+Mergeable streaming quantile sketch (DDSketch) for latency percentiles.
+
+Values are counted in logarithmic buckets: bucket ``i`` covers
+``(gamma^(i-1), gamma^i]`` with ``gamma = (1 + alpha) / (1 - alpha)``. A
+quantile is answered with the midpoint ``2 * gamma^i / (gamma + 1)`` of the
+bucket holding the requested rank, so
+
+    |estimate - exact| <= alpha * exact
+
+for every quantile, independent of the data distribution and of how many
+sketches were merged (merging adds bucket counts, which is exact). The rank
+follows the tracker's historical definition, ``min(int(n * q), n - 1)`` over
+the ascending values.
+
+Values ``<= MIN_INDEXABLE`` (including 0.0 and negatives) go to a separate
+zero bucket and are reported as 0.0. With the default ``alpha = 0.01`` one
+bucket spans 2%, so latencies from 1 ms to 1 hour need about 760 buckets;
+serialized sketches store only the dense range between the smallest and
+largest used bucket.
+
+Based on Masson, Rim & Lee, "DDSketch: A Fast and Fully-Mergeable Quantile
+Sketch with Relative-Error Guarantees" (VLDB 2019).
+"""
+
+import math
+import struct
+import sys
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+MIN_INDEXABLE = 1e-9
+
+_HEADER = struct.Struct("<BdQddiI")
+_FORMAT_VERSION = 1
+
+
+class DDSketch:
+    """Relative-error quantile sketch with exact merges."""
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        if not 0.0 < relative_accuracy < 1.0:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1.0 + relative_accuracy) / (1.0 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    # --- Updates ---
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        return 2.0 * self.gamma ** key / (self.gamma + 1.0)
+
+    def add(self, value: float, count: int = 1):
+        """Add ``value`` ``count`` times."""
+        if count <= 0:
+            return
+        if value <= MIN_INDEXABLE:
+            self.zero_count += count
+        else:
+            key = self._key(value)
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.count += count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "DDSketch"):
+        """Add all values of ``other`` (must use the same accuracy)."""
+        if other.count == 0:
+            return
+        if not math.isclose(self.gamma, other.gamma):
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    # --- Queries ---
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated value at quantile ``q`` (0..1), None if empty."""
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs: Iterable[float]) -> List[Optional[float]]:
+        """Estimate several quantiles with a single walk over the buckets."""
+        qs = list(qs)
+        if self.count == 0:
+            return [None for _ in qs]
+
+        ranks = [min(int(self.count * min(max(q, 0.0), 1.0)), self.count - 1) for q in qs]
+        order = sorted(range(len(qs)), key=lambda i: ranks[i])
+        results: List[Optional[float]] = [None] * len(qs)
+
+        seen = self.zero_count
+        keys = sorted(self.bins)
+        key_index = 0
+        for i in order:
+            rank = ranks[i]
+            if rank < self.zero_count:
+                results[i] = 0.0
+                continue
+            while seen <= rank:
+                seen += self.bins[keys[key_index]]
+                key_index += 1
+            # Clamp to observed extremes: never worse, often exact at the tails
+            results[i] = min(max(self._value(keys[key_index - 1]), self.min), self.max)
+        return results
+
+    # --- Serialization ---
+
+    def to_bytes(self) -> bytes:
+        """Compact binary form: header + zlib-compressed dense bucket counts."""
+        if self.bins:
+            offset = min(self.bins)
+            counts = array("Q", [0] * (max(self.bins) - offset + 1))
+            for key, count in self.bins.items():
+                counts[key - offset] = count
+            if sys.byteorder == "big":
+                counts.byteswap()
+            payload = zlib.compress(counts.tobytes())
+            size = len(counts)
+        else:
+            offset, size, payload = 0, 0, b""
+        header = _HEADER.pack(
+            _FORMAT_VERSION,
+            self.relative_accuracy,
+            self.zero_count,
+            self.min if self.count else 0.0,
+            self.max if self.count else 0.0,
+            offset,
+            size,
+        )
+        return header + payload
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "DDSketch":
+        version, accuracy, zero_count, min_value, max_value, offset, size = _HEADER.unpack_from(data)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported sketch format version: {version}")
+        sketch = cls(accuracy)
+        sketch.zero_count = zero_count
+        if size:
+            counts = array("Q")
+            counts.frombytes(zlib.decompress(data[_HEADER.size:]))
+            if sys.byteorder == "big":
+                counts.byteswap()
+            sketch.bins = {offset + i: c for i, c in enumerate(counts) if c}
+        sketch.count = zero_count + sum(sketch.bins.values())
+        if sketch.count:
+            sketch.min, sketch.max = min_value, max_value
+        return sketch
+
+    def __len__(self) -> int:
+        return self.count
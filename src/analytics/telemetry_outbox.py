@@ -0,0 +1,432 @@
+"""
+Durable local outbox for telemetry written after a RAG answer.
+
+``/rag/query`` used to log on the student-visible path: a new
+``ExperimentDatabase`` (schema creation and column probing on every call), a
+RAG configuration lookup plus an interaction insert, and the APRAG
+interaction POST run in the default executor. The request now only appends
+a row to a local SQLite outbox (WAL mode, one short write) and gets a
+locally generated interaction ID back; a background flusher delivers the
+rows:
+
+- ``experiment_interaction``: batched into the experiment database, one
+  transaction per flush (``ExperimentDatabase.add_interactions_batch``)
+- ``aprag_interaction``: one POST to ``/api/aprag/interactions/batch`` per
+  flush (per-interaction POSTs against an APRAG service without the batch
+  endpoint); topic classification is queued as ``aprag_classify`` events
+- failures are retried with exponential backoff; after ``MAX_ATTEMPTS`` or a
+  permanent error (4xx) the row is kept as ``dead`` for inspection
+
+Failures are kept to the rows that caused them:
+
+- handlers may return one result per payload (an exception marks that row
+  as failed), so a partially accepted batch only retries the rest
+- a permanent error for a whole batch is bisected at once, so one invalid
+  row does not dead-letter the other rows of its batch
+- rows that failed before are delivered in groups halved per attempt
+  (``batch_size >> attempts``), so a row that keeps failing is alone well
+  before ``MAX_ATTEMPTS``, without multiplying requests during an outage
+
+Rows are claimed with a lease, so several gateway workers sharing the file
+do not deliver the same row concurrently (delivery is at-least-once). The
+lease is renewed while a handler runs, so slow deliveries (e.g. the
+per-interaction fallback) do not let another worker claim the rows. Queue
+depth is reported by ``stats()`` (``GET /health/telemetry``).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_OUTBOX_PATH = os.getenv("TELEMETRY_OUTBOX_PATH", "data/analytics/telemetry_outbox.db")
+FLUSH_INTERVAL_SECONDS = float(os.getenv("TELEMETRY_FLUSH_INTERVAL_SECONDS", "1.0"))
+FLUSH_BATCH_SIZE = int(os.getenv("TELEMETRY_FLUSH_BATCH_SIZE", "200"))
+MAX_ATTEMPTS = 10
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 300.0
+# A claimed row becomes deliverable again if its worker died mid-flush;
+# renewed every CLAIM_RENEW_SECONDS while its batch is being delivered
+CLAIM_LEASE_SECONDS = 120.0
+CLAIM_RENEW_SECONDS = CLAIM_LEASE_SECONDS / 4
+DEAD_RETENTION_SECONDS = 7 * 24 * 3600
+
+KIND_EXPERIMENT_INTERACTION = "experiment_interaction"
+KIND_APRAG_INTERACTION = "aprag_interaction"
+KIND_APRAG_CLASSIFY = "aprag_classify"
+
+STATUS_PENDING = "pending"
+STATUS_DEAD = "dead"
+
+# Returns None (all delivered) or one result per payload; an exception
+# result marks that row as failed, anything else as delivered
+Handler = Callable[[List[Dict[str, Any]]], Optional[List[Any]]]
+
+
+class PermanentDeliveryError(Exception):
+    """Delivery failed in a way retries cannot fix (e.g. HTTP 4xx)."""
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Delay before retry number ``attempts`` (1, 2, 4, ... capped)."""
+    return min(BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)), BACKOFF_MAX_SECONDS)
+
+
+def new_local_id() -> str:
+    """Interaction ID generated in the gateway, before any remote write."""
+    return uuid.uuid4().hex
+
+
+class TelemetryOutbox:
+    """
+    Append-only SQLite queue with a background flusher.
+
+    Handlers are registered per event kind and receive the payloads of one
+    batch. Raising retries the batch (in smaller groups on later attempts);
+    ``PermanentDeliveryError`` bisects it until the rejected rows are found
+    and moves those to ``dead``. Per-row failures are reported by returning
+    one result per payload, with an exception for each failed row.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_OUTBOX_PATH,
+                 handlers: Optional[Dict[str, Handler]] = None,
+                 flush_interval: float = FLUSH_INTERVAL_SECONDS,
+                 batch_size: int = FLUSH_BATCH_SIZE):
+        self.db_path = db_path
+        self.handlers: Dict[str, Handler] = dict(handlers or {})
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._worker_id = uuid.uuid4().hex
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS telemetry_outbox (
+                    event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    local_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    claimed_by TEXT,
+                    claimed_until REAL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_telemetry_outbox_due
+                ON telemetry_outbox(status, next_attempt_at)
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Request path
+    # ------------------------------------------------------------------
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], local_id: Optional[str] = None) -> str:
+        """Append one event; returns its local ID. Starts the flusher if needed."""
+        local_id = local_id or new_local_id()
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO telemetry_outbox (local_id, kind, payload, next_attempt_at, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (local_id, kind, json.dumps(payload, default=str), now, now)
+            )
+        self.start()
+        return local_id
+
+    # ------------------------------------------------------------------
+    # Flusher
+    # ------------------------------------------------------------------
+
+    def start(self):
+        with self._thread_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="telemetry-outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                while self.flush_once() and not self._stop.is_set():
+                    pass
+            except Exception as e:
+                logger.warning(f"Telemetry outbox flush failed (non-critical): {e}")
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+
+    def _claim(self, conn: sqlite3.Connection) -> List[sqlite3.Row]:
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                """
+                UPDATE telemetry_outbox
+                SET claimed_by = ?, claimed_until = ?
+                WHERE event_id IN (
+                    SELECT event_id FROM telemetry_outbox
+                    WHERE status = 'pending' AND next_attempt_at <= ?
+                      AND (claimed_until IS NULL OR claimed_until < ?)
+                    ORDER BY event_id
+                    LIMIT ?
+                )
+                """,
+                (self._worker_id, now + CLAIM_LEASE_SECONDS, now, now, self.batch_size)
+            )
+            rows = conn.execute(
+                """
+                SELECT event_id, kind, payload, attempts FROM telemetry_outbox
+                WHERE claimed_by = ? AND claimed_until > ? AND status = 'pending'
+                ORDER BY event_id
+                """,
+                (self._worker_id, now)
+            ).fetchall()
+            conn.execute("COMMIT")
+            return rows
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def flush_once(self) -> int:
+        """Deliver one batch of due events; returns how many rows were handled."""
+        with self._connect() as conn:
+            rows = self._claim(conn)
+            if not rows:
+                self._prune(conn)
+                return 0
+
+            with self._lease_renewal([row["event_id"] for row in rows]):
+                for group in self._delivery_groups(rows):
+                    self._deliver(conn, group)
+            return len(rows)
+
+    def _delivery_groups(self, rows: List[sqlite3.Row]) -> Iterator[List[sqlite3.Row]]:
+        """Rows per kind and attempt count; retried rows in groups of ``batch_size >> attempts``."""
+        groups: Dict[tuple, List[sqlite3.Row]] = {}
+        for row in rows:
+            groups.setdefault((row["kind"], row["attempts"]), []).append(row)
+        for (_, attempts), group in groups.items():
+            size = max(1, self.batch_size >> attempts)
+            for start in range(0, len(group), size):
+                yield group[start:start + size]
+
+    def _deliver(self, conn: sqlite3.Connection, rows: List[sqlite3.Row]):
+        kind = rows[0]["kind"]
+        handler = self.handlers.get(kind)
+        if handler is None:
+            self._fail(conn, rows, f"No handler for kind '{kind}'", permanent=True)
+            return
+        try:
+            results = handler([json.loads(row["payload"]) for row in rows])
+        except PermanentDeliveryError as e:
+            if len(rows) == 1:
+                self._fail(conn, rows, str(e), permanent=True)
+                return
+            # The request is rejected as a whole; split until only the bad rows fail
+            middle = len(rows) // 2
+            self._deliver(conn, rows[:middle])
+            self._deliver(conn, rows[middle:])
+            return
+        except Exception as e:
+            self._fail(conn, rows, str(e), permanent=False)
+            return
+
+        failed = []
+        if isinstance(results, list) and len(results) == len(rows):
+            failed = [(row, result) for row, result in zip(rows, results) if isinstance(result, Exception)]
+        failed_ids = {row["event_id"] for row, _ in failed}
+        delivered = [row["event_id"] for row in rows if row["event_id"] not in failed_ids]
+        conn.executemany("DELETE FROM telemetry_outbox WHERE event_id = ?", [(i,) for i in delivered])
+        logger.debug(f"Delivered {len(delivered)} {kind} events")
+        for row, error in failed:
+            self._fail(conn, [row], str(error), permanent=isinstance(error, PermanentDeliveryError))
+
+    @contextmanager
+    def _lease_renewal(self, event_ids: List[int]):
+        """Extend the claim on ``event_ids`` every CLAIM_RENEW_SECONDS until the block exits."""
+        done = threading.Event()
+
+        def renew():
+            while not done.wait(CLAIM_RENEW_SECONDS):
+                try:
+                    with self._connect() as conn:
+                        conn.executemany(
+                            """
+                            UPDATE telemetry_outbox SET claimed_until = ?
+                            WHERE event_id = ? AND claimed_by = ?
+                            """,
+                            [(time.time() + CLAIM_LEASE_SECONDS, i, self._worker_id) for i in event_ids]
+                        )
+                except Exception as e:
+                    logger.warning(f"Telemetry outbox lease renewal failed (non-critical): {e}")
+
+        renewer = threading.Thread(target=renew, name="telemetry-outbox-lease", daemon=True)
+        renewer.start()
+        try:
+            yield
+        finally:
+            done.set()
+            renewer.join()
+
+    def _fail(self, conn: sqlite3.Connection, rows: List[sqlite3.Row], error: str, permanent: bool):
+        now = time.time()
+        updates = []
+        for row in rows:
+            attempts = row["attempts"] + 1
+            dead = permanent or attempts >= MAX_ATTEMPTS
+            updates.append((
+                STATUS_DEAD if dead else STATUS_PENDING,
+                attempts,
+                now + backoff_seconds(attempts),
+                error[:1000],
+                row["event_id"],
+            ))
+        conn.executemany(
+            """
+            UPDATE telemetry_outbox
+            SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?,
+                claimed_by = NULL, claimed_until = NULL
+            WHERE event_id = ?
+            """,
+            updates
+        )
+        dead = sum(1 for update in updates if update[0] == STATUS_DEAD)
+        logger.warning(f"Telemetry delivery failed for {len(rows)} {rows[0]['kind']} events "
+                       f"({dead} moved to dead, {len(rows) - dead} will retry): {error}")
+
+    def _prune(self, conn: sqlite3.Connection):
+        conn.execute(
+            "DELETE FROM telemetry_outbox WHERE status = 'dead' AND created_at < ?",
+            (time.time() - DEAD_RETENTION_SECONDS,)
+        )
+
+    def flush(self, timeout: float = 30.0) -> int:
+        """Deliver everything that is currently due (tests, shutdown)."""
+        deadline = time.time() + timeout
+        handled = 0
+        while time.time() < deadline:
+            count = self.flush_once()
+            if not count:
+                break
+            handled += count
+        return handled
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth: pending/dead rows per kind and the oldest pending age."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT kind, status, COUNT(*) AS n, MIN(created_at) AS oldest
+                FROM telemetry_outbox
+                GROUP BY kind, status
+                """
+            ).fetchall()
+        now = time.time()
+        pending = sum(r["n"] for r in rows if r["status"] == STATUS_PENDING)
+        oldest = min((r["oldest"] for r in rows if r["status"] == STATUS_PENDING), default=None)
+        return {
+            "pending": pending,
+            "dead": sum(r["n"] for r in rows if r["status"] == STATUS_DEAD),
+            "by_kind": {f"{r['kind']}:{r['status']}": r["n"] for r in rows},
+            "oldest_pending_seconds": round(now - oldest, 1) if oldest else 0.0,
+            "flusher_running": bool(self._thread and self._thread.is_alive()),
+        }
+
+
+# ----------------------------------------------------------------------
+# Default outbox with the gateway's handlers
+# ----------------------------------------------------------------------
+
+_outbox: Optional[TelemetryOutbox] = None
+_outbox_lock = threading.Lock()
+
+
+def _deliver_experiment_interactions(payloads: List[Dict[str, Any]]):
+    from src.analytics.database import get_experiment_db
+    get_experiment_db().add_interactions_batch(payloads)
+
+
+def _deliver_aprag_interactions(payloads: List[Dict[str, Any]]) -> List[Any]:
+    from src.utils import aprag_middleware
+    results = aprag_middleware.post_interactions_batch(payloads)
+    outbox = get_telemetry_outbox()
+    for payload, result in zip(payloads, results):
+        if result and not isinstance(result, Exception):
+            outbox.enqueue(KIND_APRAG_CLASSIFY, {
+                "session_id": payload["session_id"],
+                "query": payload["query"],
+                "interaction_id": result,
+            })
+    return results
+
+
+def _deliver_aprag_classifications(payloads: List[Dict[str, Any]]):
+    from src.utils import aprag_middleware
+    for payload in payloads:
+        # Best effort, as before: a failed classification is not retried
+        aprag_middleware.classify_question_to_topic(
+            payload["session_id"], payload["query"], payload["interaction_id"]
+        )
+
+
+def get_telemetry_outbox() -> TelemetryOutbox:
+    """Process-wide outbox (flusher starts on the first enqueue)."""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = TelemetryOutbox(handlers={
+                KIND_EXPERIMENT_INTERACTION: _deliver_experiment_interactions,
+                KIND_APRAG_INTERACTION: _deliver_aprag_interactions,
+                KIND_APRAG_CLASSIFY: _deliver_aprag_classifications,
+            })
+        return _outbox
+
+
+def enqueue_experiment_interaction(rag_params: Dict[str, Any], **interaction: Any) -> str:
+    """
+    Queue an experiment-database interaction row.
+
+    ``interaction`` takes the keyword arguments of
+    ``ExperimentDatabase.add_interaction`` except ``rag_config_hash``; the
+    configuration is stored from ``rag_params`` at flush time.
+    """
+    return get_telemetry_outbox().enqueue(
+        KIND_EXPERIMENT_INTERACTION, {"rag_params": rag_params, **interaction}
+    )
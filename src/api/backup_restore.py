@@ -6,17 +6,23 @@ Allows full backup and restore of session data including:
 - Topics
 - Knowledge base
 - QA pairs
+
+Two formats are supported: the original single JSON document (``/backup``,
+``/restore``) and a streamed ZIP archive with binary float32 embeddings
+(``/backup/archive``, ``/restore/archive``, see ``session_archive``).
 """
 import os
 import json
 import logging
 from datetime import datetime
-from typing import Dict, List, Any, Optional
-from fastapi import APIRouter, HTTPException, Response
-from fastapi.responses import JSONResponse
+from typing import Dict, List, Any, Iterable, Iterator, Optional
+from fastapi import APIRouter, HTTPException, Response, UploadFile, File, Form, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 import requests
 
+from src.api.session_archive import stream_session_archive, SessionArchiveReader
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/sessions", tags=["backup-restore"])
@@ -40,6 +46,9 @@ from contextlib import contextmanager
 # Get database path from environment or use default
 APRAG_DB_PATH = os.getenv("APRAG_DB_PATH", os.getenv("DATABASE_PATH", "data/rag_assistant.db"))
 
+# Chunks sent per restore-chunks request (keeps request bodies bounded)
+RESTORE_BATCH_SIZE = int(os.getenv("SESSION_RESTORE_BATCH_SIZE", "256"))
+
 @contextmanager
 def get_aprag_db_connection():
     """Get APRAG database connection"""
@@ -113,49 +122,34 @@ async def backup_session(session_id: str) -> BackupResponse:
             backup_data["data"]["session_metadata"] = None
         
         # 2. Get all chunks WITH EMBEDDINGS from document processing service
+        # Single streamed NDJSON read (one chunk per line) instead of fetching
+        # the session twice (plain chunks + chunks-with-embeddings).
         logger.info("📄 Fetching document chunks with embeddings...")
+        chunks = []
+        chunks_with_embeddings = []
         try:
-            # First get chunks normally
-            chunks_response = requests.get(
+            with requests.get(
                 f"{DOCUMENT_PROCESSING_URL}/sessions/{session_id}/chunks",
-                timeout=60
-            )
-            if chunks_response.status_code == 200:
-                chunks_data = chunks_response.json()
-                chunks = chunks_data.get("chunks", [])
-                
-                # Now get embeddings from ChromaDB directly via document processing service
-                # We'll need to add an endpoint for this, or we can try to get them via the collection
-                # For now, we'll store chunks with their metadata and try to restore embeddings later
-                # If embeddings are not available, they can be re-generated during restore
-                
-                backup_data["data"]["chunks"] = chunks
-                backup_data["data"]["chunks_with_embeddings"] = []  # Will be populated if available
-                
-                # Try to get embeddings via a special endpoint (we'll create this)
-                try:
-                    embeddings_response = requests.get(
-                        f"{DOCUMENT_PROCESSING_URL}/sessions/{session_id}/chunks-with-embeddings",
-                        timeout=120
-                    )
-                    if embeddings_response.status_code == 200:
-                        embeddings_data = embeddings_response.json()
-                        backup_data["data"]["chunks_with_embeddings"] = embeddings_data.get("chunks", [])
-                        logger.info(f"✅ Fetched {len(backup_data['data']['chunks_with_embeddings'])} chunks with embeddings")
-                    else:
-                        logger.warning("Embeddings endpoint not available, will regenerate during restore")
-                except Exception as e:
-                    logger.warning(f"Could not fetch embeddings (will regenerate): {e}")
-                
-                logger.info(f"✅ Fetched {len(chunks)} chunks")
-            else:
-                logger.warning(f"Could not fetch chunks: {chunks_response.status_code}")
-                backup_data["data"]["chunks"] = []
-                backup_data["data"]["chunks_with_embeddings"] = []
+                params={"fields": "ids,metadata,text,embeddings", "format": "ndjson"},
+                stream=True,
+                timeout=120
+            ) as chunks_response:
+                if chunks_response.status_code == 200:
+                    for line in chunks_response.iter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        chunks_with_embeddings.append(chunk)
+                        chunks.append({k: v for k, v in chunk.items() if k != "embedding"})
+                    logger.info(f"✅ Fetched {len(chunks)} chunks ({len(chunks_with_embeddings)} with embeddings)")
+                else:
+                    logger.warning(f"Could not fetch chunks: {chunks_response.status_code}")
         except Exception as e:
             logger.error(f"Error fetching chunks: {e}")
-            backup_data["data"]["chunks"] = []
-            backup_data["data"]["chunks_with_embeddings"] = []
+            chunks = []
+            chunks_with_embeddings = []
+        backup_data["data"]["chunks"] = chunks
+        backup_data["data"]["chunks_with_embeddings"] = chunks_with_embeddings
         
         # 3. Get all topics from APRAG service via API
         logger.info("📚 Fetching topics...")
@@ -270,6 +264,201 @@ async def backup_session(session_id: str) -> BackupResponse:
         raise HTTPException(status_code=500, detail=f"Backup failed: {str(e)}")
 
 
+def _json_field(value: Any, types=(list,)) -> Any:
+    """Serialize list/dict fields for SQLite; pass DB-native (already JSON) values through."""
+    return json.dumps(value) if isinstance(value, types) else value
+
+
+def _restore_topics(conn, topics: Iterable[Dict[str, Any]], target_session_id: str) -> Dict[Any, int]:
+    """Insert topics for the target session and return the old -> new topic_id mapping."""
+    topic_id_mapping = {}
+    parent_links = []  # (old_topic_id, old_parent_id) - resolved once all topics exist
+    
+    for topic in topics:
+        old_topic_id = topic.get("topic_id")
+        cursor = conn.execute("""
+            INSERT INTO course_topics (
+                session_id, topic_title, parent_topic_id, topic_order,
+                description, keywords, estimated_difficulty, estimated_time_minutes,
+                prerequisites, related_chunk_ids, extraction_method,
+                extraction_confidence, is_active
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            target_session_id,
+            topic.get("topic_title"),
+            None,  # Will update after all topics are inserted
+            topic.get("topic_order"),
+            topic.get("description"),
+            _json_field(topic.get("keywords", [])),
+            topic.get("estimated_difficulty"),
+            topic.get("estimated_time_minutes"),
+            _json_field(topic.get("prerequisites", [])),
+            _json_field(topic.get("related_chunk_ids", [])),
+            topic.get("extraction_method"),
+            topic.get("extraction_confidence"),
+            topic.get("is_active", True)
+        ))
+        topic_id_mapping[old_topic_id] = cursor.lastrowid
+        if topic.get("parent_topic_id"):
+            parent_links.append((old_topic_id, topic.get("parent_topic_id")))
+    
+    # Update parent_topic_id references
+    for old_topic_id, old_parent_id in parent_links:
+        if old_parent_id in topic_id_mapping:
+            conn.execute("""
+                UPDATE course_topics
+                SET parent_topic_id = ?
+                WHERE topic_id = ?
+            """, (topic_id_mapping[old_parent_id], topic_id_mapping[old_topic_id]))
+    
+    return topic_id_mapping
+
+
+def _restore_knowledge_base(conn, kb: Dict[str, Any], topic_id_mapping: Dict[Any, int]) -> bool:
+    old_topic_id = kb.get("topic_id")
+    if old_topic_id not in topic_id_mapping:
+        return False
+    
+    conn.execute("""
+        INSERT INTO topic_knowledge_base (
+            topic_id, topic_summary, key_concepts, learning_objectives,
+            definitions, formulas, examples, related_topics,
+            prerequisite_concepts, real_world_applications, common_misconceptions,
+            content_quality_score, extraction_model, is_validated, view_count
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        topic_id_mapping[old_topic_id],
+        kb.get("topic_summary"),
+        _json_field(kb.get("key_concepts", []), (list, dict)),
+        _json_field(kb.get("learning_objectives", []), (list, dict)),
+        _json_field(kb.get("definitions", {}), (dict,)),
+        _json_field(kb.get("formulas", [])),
+        _json_field(kb.get("examples", [])),
+        _json_field(kb.get("related_topics", [])),
+        _json_field(kb.get("prerequisite_concepts", [])),
+        _json_field(kb.get("real_world_applications", [])),
+        _json_field(kb.get("common_misconceptions", [])),
+        kb.get("content_quality_score"),
+        kb.get("extraction_model"),
+        kb.get("is_validated", False),
+        kb.get("view_count", 0)
+    ))
+    return True
+
+
+def _restore_qa_pair(conn, qa: Dict[str, Any], topic_id_mapping: Dict[Any, int]) -> bool:
+    old_topic_id = qa.get("topic_id")
+    if old_topic_id not in topic_id_mapping:
+        return False
+    
+    conn.execute("""
+        INSERT INTO topic_qa_pairs (
+            topic_id, question, answer, explanation,
+            difficulty_level, question_type, bloom_taxonomy_level,
+            source_chunk_ids, extraction_method, extraction_model,
+            quality_score, is_active, related_concepts
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        topic_id_mapping[old_topic_id],
+        qa.get("question"),
+        qa.get("answer"),
+        qa.get("explanation"),
+        qa.get("difficulty_level"),
+        qa.get("question_type"),
+        qa.get("bloom_taxonomy_level"),
+        _json_field(qa.get("source_chunk_ids", [])),
+        qa.get("extraction_method", "llm_generated"),
+        qa.get("extraction_model"),
+        qa.get("quality_score"),
+        qa.get("is_active", True),
+        _json_field(qa.get("related_concepts", []))
+    ))
+    return True
+
+
+def _restore_chunk_batch(
+    target_session_id: str,
+    original_session_id: str,
+    chunks: List[Dict[str, Any]],
+    replace: bool
+) -> int:
+    """Write one batch of chunks to ChromaDB through document processing service."""
+    restore_response = requests.post(
+        f"{DOCUMENT_PROCESSING_URL}/sessions/{target_session_id}/restore-chunks",
+        json={
+            "chunks": chunks,
+            "session_id": target_session_id,
+            "original_session_id": original_session_id,
+            "replace": replace
+        },
+        timeout=300
+    )
+    if restore_response.status_code != 200:
+        raise RuntimeError(f"{restore_response.status_code} - {restore_response.text}")
+    result = restore_response.json()
+    if not result.get("success", True):
+        raise RuntimeError(result.get("error", "unknown error"))
+    return result.get("chunks_restored", 0)
+
+
+def _restore_aprag_data(
+    topics: Iterable[Dict[str, Any]],
+    knowledge_bases: Iterable[Dict[str, Any]],
+    qa_pairs: Iterable[Dict[str, Any]],
+    target_session_id: str,
+    restore_summary: Dict[str, Any],
+    restore_topics: bool = True,
+    restore_kb: bool = True,
+    restore_qa: bool = True
+):
+    """Restore topics, KBs and QA pairs; KB/QA rows are only restorable for restored topics."""
+    if not restore_topics:
+        return
+    
+    topic_id_mapping = {}
+    try:
+        with get_aprag_db_connection() as conn:
+            topic_id_mapping = _restore_topics(conn, topics, target_session_id)
+        restore_summary["topics_restored"] = len(topic_id_mapping)
+        logger.info(f"✅ Restored {restore_summary['topics_restored']} topics")
+    except Exception as e:
+        logger.error(f"Error restoring topics: {e}", exc_info=True)
+        restore_summary["errors"].append(f"Topic restoration error: {str(e)}")
+        return
+    
+    if restore_kb:
+        try:
+            with get_aprag_db_connection() as conn:
+                for kb in knowledge_bases:
+                    if _restore_knowledge_base(conn, kb, topic_id_mapping):
+                        restore_summary["knowledge_bases_restored"] += 1
+            logger.info(f"✅ Restored {restore_summary['knowledge_bases_restored']} knowledge bases")
+        except Exception as e:
+            logger.error(f"Error restoring knowledge bases: {e}", exc_info=True)
+            restore_summary["errors"].append(f"KB restoration error: {str(e)}")
+    
+    if restore_qa:
+        try:
+            with get_aprag_db_connection() as conn:
+                for qa in qa_pairs:
+                    if _restore_qa_pair(conn, qa, topic_id_mapping):
+                        restore_summary["qa_pairs_restored"] += 1
+            logger.info(f"✅ Restored {restore_summary['qa_pairs_restored']} QA pairs")
+        except Exception as e:
+            logger.error(f"Error restoring QA pairs: {e}", exc_info=True)
+            restore_summary["errors"].append(f"QA restoration error: {str(e)}")
+
+
+def _new_restore_summary() -> Dict[str, Any]:
+    return {
+        "chunks_restored": 0,
+        "topics_restored": 0,
+        "knowledge_bases_restored": 0,
+        "qa_pairs_restored": 0,
+        "errors": []
+    }
+
+
 @router.post("/restore")
 async def restore_session(request: RestoreRequest) -> Dict[str, Any]:
     """
@@ -286,14 +475,7 @@ async def restore_session(request: RestoreRequest) -> Dict[str, Any]:
         
         logger.info(f"🔄 Starting restore: {original_session_id} -> {target_session_id}")
         
-        restore_summary = {
-            "chunks_restored": 0,
-            "topics_restored": 0,
-            "knowledge_bases_restored": 0,
-            "qa_pairs_restored": 0,
-            "errors": []
-        }
-        
+        restore_summary = _new_restore_summary()
         session_data = backup_data.get("data", {})
         
         # 1. Restore chunks WITH EMBEDDINGS to document processing service
@@ -302,228 +484,31 @@ async def restore_session(request: RestoreRequest) -> Dict[str, Any]:
             if chunks_to_restore:
                 logger.info(f"📄 Restoring {len(chunks_to_restore)} chunks with embeddings...")
                 try:
-                    # Use special restore endpoint in document processing service
-                    restore_response = requests.post(
-                        f"{DOCUMENT_PROCESSING_URL}/sessions/{target_session_id}/restore-chunks",
-                        json={
-                            "chunks": chunks_to_restore,
-                            "session_id": target_session_id,
-                            "original_session_id": original_session_id
-                        },
-                        timeout=300  # 5 minutes for large sessions
-                    )
-                    
-                    if restore_response.status_code == 200:
-                        result = restore_response.json()
-                        restore_summary["chunks_restored"] = result.get("chunks_restored", 0)
-                        logger.info(f"✅ Restored {restore_summary['chunks_restored']} chunks")
-                    else:
-                        error_msg = restore_response.text
-                        logger.error(f"Chunk restoration failed: {restore_response.status_code} - {error_msg}")
-                        restore_summary["errors"].append(f"Chunk restoration failed: {error_msg}")
+                    for start in range(0, len(chunks_to_restore), RESTORE_BATCH_SIZE):
+                        restore_summary["chunks_restored"] += _restore_chunk_batch(
+                            target_session_id,
+                            original_session_id,
+                            chunks_to_restore[start:start + RESTORE_BATCH_SIZE],
+                            replace=(start == 0)
+                        )
+                    logger.info(f"✅ Restored {restore_summary['chunks_restored']} chunks")
                 except Exception as e:
                     logger.error(f"Error restoring chunks: {e}", exc_info=True)
                     restore_summary["errors"].append(f"Chunk restoration error: {str(e)}")
             else:
                 logger.warning("⚠️ No chunks found in backup data")
         
-        # 2. Restore topics
-        if request.restore_topics and session_data.get("topics"):
-            logger.info(f"📚 Restoring {len(session_data['topics'])} topics...")
-            try:
-                with get_aprag_db_connection() as conn:
-                    # Create a mapping from old topic_id to new topic_id
-                    topic_id_mapping = {}
-                    
-                    for topic in session_data["topics"]:
-                        old_topic_id = topic.get("topic_id")
-                        
-                        # Prepare topic data for insertion
-                        topic_data = {
-                            "session_id": target_session_id,
-                            "topic_title": topic.get("topic_title"),
-                            "parent_topic_id": None,  # Will update after all topics are inserted
-                            "topic_order": topic.get("topic_order"),
-                            "description": topic.get("description"),
-                            "keywords": json.dumps(topic.get("keywords", [])) if isinstance(topic.get("keywords"), list) else topic.get("keywords"),
-                            "estimated_difficulty": topic.get("estimated_difficulty"),
-                            "estimated_time_minutes": topic.get("estimated_time_minutes"),
-                            "prerequisites": json.dumps(topic.get("prerequisites", [])) if isinstance(topic.get("prerequisites"), list) else topic.get("prerequisites"),
-                            "related_chunk_ids": json.dumps(topic.get("related_chunk_ids", [])) if isinstance(topic.get("related_chunk_ids"), list) else topic.get("related_chunk_ids"),
-                            "extraction_method": topic.get("extraction_method"),
-                            "extraction_confidence": topic.get("extraction_confidence"),
-                            "is_active": topic.get("is_active", True)
-                        }
-                        
-                        cursor = conn.execute("""
-                            INSERT INTO course_topics (
-                                session_id, topic_title, parent_topic_id, topic_order,
-                                description, keywords, estimated_difficulty, estimated_time_minutes,
-                                prerequisites, related_chunk_ids, extraction_method,
-                                extraction_confidence, is_active
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            topic_data["session_id"],
-                            topic_data["topic_title"],
-                            topic_data["parent_topic_id"],
-                            topic_data["topic_order"],
-                            topic_data["description"],
-                            topic_data["keywords"],
-                            topic_data["estimated_difficulty"],
-                            topic_data["estimated_time_minutes"],
-                            topic_data["prerequisites"],
-                            topic_data["related_chunk_ids"],
-                            topic_data["extraction_method"],
-                            topic_data["extraction_confidence"],
-                            topic_data["is_active"]
-                        ))
-                        
-                        new_topic_id = cursor.lastrowid
-                        topic_id_mapping[old_topic_id] = new_topic_id
-                        restore_summary["topics_restored"] += 1
-                    
-                    # Update parent_topic_id references
-                    for topic in session_data["topics"]:
-                        old_topic_id = topic.get("topic_id")
-                        old_parent_id = topic.get("parent_topic_id")
-                        
-                        if old_parent_id and old_parent_id in topic_id_mapping:
-                            new_topic_id = topic_id_mapping[old_topic_id]
-                            new_parent_id = topic_id_mapping[old_parent_id]
-                            
-                            conn.execute("""
-                                UPDATE course_topics
-                                SET parent_topic_id = ?
-                                WHERE topic_id = ?
-                            """, (new_parent_id, new_topic_id))
-                    
-                    conn.commit()
-                    logger.info(f"✅ Restored {restore_summary['topics_restored']} topics")
-            except Exception as e:
-                logger.error(f"Error restoring topics: {e}", exc_info=True)
-                restore_summary["errors"].append(f"Topic restoration error: {str(e)}")
-        
-        # 3. Restore knowledge bases
-        if request.restore_kb and session_data.get("knowledge_bases") and "topic_id_mapping" in locals():
-            logger.info(f"🧠 Restoring {len(session_data['knowledge_bases'])} knowledge bases...")
-            try:
-                with get_aprag_db_connection() as conn:
-                    for kb in session_data["knowledge_bases"]:
-                        old_topic_id = kb.get("topic_id")
-                        if old_topic_id not in topic_id_mapping:
-                            continue
-                        
-                        new_topic_id = topic_id_mapping[old_topic_id]
-                        
-                        kb_data = {
-                            "topic_id": new_topic_id,
-                            "topic_summary": kb.get("topic_summary"),
-                            "key_concepts": json.dumps(kb.get("key_concepts", [])) if isinstance(kb.get("key_concepts"), (list, dict)) else kb.get("key_concepts"),
-                            "learning_objectives": json.dumps(kb.get("learning_objectives", [])) if isinstance(kb.get("learning_objectives"), (list, dict)) else kb.get("learning_objectives"),
-                            "definitions": json.dumps(kb.get("definitions", {})) if isinstance(kb.get("definitions"), dict) else kb.get("definitions"),
-                            "formulas": json.dumps(kb.get("formulas", [])) if isinstance(kb.get("formulas"), list) else kb.get("formulas"),
-                            "examples": json.dumps(kb.get("examples", [])) if isinstance(kb.get("examples"), list) else kb.get("examples"),
-                            "related_topics": json.dumps(kb.get("related_topics", [])) if isinstance(kb.get("related_topics"), list) else kb.get("related_topics"),
-                            "prerequisite_concepts": json.dumps(kb.get("prerequisite_concepts", [])) if isinstance(kb.get("prerequisite_concepts"), list) else kb.get("prerequisite_concepts"),
-                            "real_world_applications": json.dumps(kb.get("real_world_applications", [])) if isinstance(kb.get("real_world_applications"), list) else kb.get("real_world_applications"),
-                            "common_misconceptions": json.dumps(kb.get("common_misconceptions", [])) if isinstance(kb.get("common_misconceptions"), list) else kb.get("common_misconceptions"),
-                            "content_quality_score": kb.get("content_quality_score"),
-                            "extraction_model": kb.get("extraction_model"),
-                            "is_validated": kb.get("is_validated", False),
-                            "view_count": kb.get("view_count", 0)
-                        }
-                        
-                        conn.execute("""
-                            INSERT INTO topic_knowledge_base (
-                                topic_id, topic_summary, key_concepts, learning_objectives,
-                                definitions, formulas, examples, related_topics,
-                                prerequisite_concepts, real_world_applications, common_misconceptions,
-                                content_quality_score, extraction_model, is_validated, view_count
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            kb_data["topic_id"],
-                            kb_data["topic_summary"],
-                            kb_data["key_concepts"],
-                            kb_data["learning_objectives"],
-                            kb_data["definitions"],
-                            kb_data["formulas"],
-                            kb_data["examples"],
-                            kb_data["related_topics"],
-                            kb_data["prerequisite_concepts"],
-                            kb_data["real_world_applications"],
-                            kb_data["common_misconceptions"],
-                            kb_data["content_quality_score"],
-                            kb_data["extraction_model"],
-                            kb_data["is_validated"],
-                            kb_data["view_count"]
-                        ))
-                        
-                        restore_summary["knowledge_bases_restored"] += 1
-                    
-                    conn.commit()
-                    logger.info(f"✅ Restored {restore_summary['knowledge_bases_restored']} knowledge bases")
-            except Exception as e:
-                logger.error(f"Error restoring knowledge bases: {e}", exc_info=True)
-                restore_summary["errors"].append(f"KB restoration error: {str(e)}")
-        
-        # 4. Restore QA pairs
-        if request.restore_qa and session_data.get("qa_pairs") and "topic_id_mapping" in locals():
-            logger.info(f"❓ Restoring {len(session_data['qa_pairs'])} QA pairs...")
-            try:
-                with get_aprag_db_connection() as conn:
-                    for qa in session_data["qa_pairs"]:
-                        old_topic_id = qa.get("topic_id")
-                        if old_topic_id not in topic_id_mapping:
-                            continue
-                        
-                        new_topic_id = topic_id_mapping[old_topic_id]
-                        
-                        qa_data = {
-                            "topic_id": new_topic_id,
-                            "question": qa.get("question"),
-                            "answer": qa.get("answer"),
-                            "explanation": qa.get("explanation"),
-                            "difficulty_level": qa.get("difficulty_level"),
-                            "question_type": qa.get("question_type"),
-                            "bloom_taxonomy_level": qa.get("bloom_taxonomy_level"),
-                            "source_chunk_ids": json.dumps(qa.get("source_chunk_ids", [])) if isinstance(qa.get("source_chunk_ids"), list) else qa.get("source_chunk_ids"),
-                            "extraction_method": qa.get("extraction_method", "llm_generated"),
-                            "extraction_model": qa.get("extraction_model"),
-                            "quality_score": qa.get("quality_score"),
-                            "is_active": qa.get("is_active", True),
-                            "related_concepts": json.dumps(qa.get("related_concepts", [])) if isinstance(qa.get("related_concepts"), list) else qa.get("related_concepts")
-                        }
-                        
-                        conn.execute("""
-                            INSERT INTO topic_qa_pairs (
-                                topic_id, question, answer, explanation,
-                                difficulty_level, question_type, bloom_taxonomy_level,
-                                source_chunk_ids, extraction_method, extraction_model,
-                                quality_score, is_active, related_concepts
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            qa_data["topic_id"],
-                            qa_data["question"],
-                            qa_data["answer"],
-                            qa_data["explanation"],
-                            qa_data["difficulty_level"],
-                            qa_data["question_type"],
-                            qa_data["bloom_taxonomy_level"],
-                            qa_data["source_chunk_ids"],
-                            qa_data["extraction_method"],
-                            qa_data["extraction_model"],
-                            qa_data["quality_score"],
-                            qa_data["is_active"],
-                            qa_data["related_concepts"]
-                        ))
-                        
-                        restore_summary["qa_pairs_restored"] += 1
-                    
-                    conn.commit()
-                    logger.info(f"✅ Restored {restore_summary['qa_pairs_restored']} QA pairs")
-            except Exception as e:
-                logger.error(f"Error restoring QA pairs: {e}", exc_info=True)
-                restore_summary["errors"].append(f"QA restoration error: {str(e)}")
+        # 2-4. Restore topics, knowledge bases and QA pairs
+        _restore_aprag_data(
+            session_data.get("topics") or [],
+            session_data.get("knowledge_bases") or [],
+            session_data.get("qa_pairs") or [],
+            target_session_id,
+            restore_summary,
+            restore_topics=request.restore_topics,
+            restore_kb=request.restore_kb,
+            restore_qa=request.restore_qa
+        )
         
         logger.info(f"✅ Restore completed: {restore_summary}")
         
@@ -561,3 +546,135 @@ async def download_backup(session_id: str):
         logger.error(f"Download backup failed: {e}")
         raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
 
+
+
+# ==================== STREAMING ARCHIVE (v2) ====================
+
+def _iter_session_chunks(session_id: str) -> Iterator[Dict[str, Any]]:
+    """Stream chunks with embeddings from document processing service, one at a time."""
+    with requests.get(
+        f"{DOCUMENT_PROCESSING_URL}/sessions/{session_id}/chunks",
+        params={"fields": "ids,metadata,text,embeddings", "format": "ndjson"},
+        stream=True,
+        timeout=120
+    ) as chunks_response:
+        if chunks_response.status_code != 200:
+            logger.warning(f"Could not fetch chunks: {chunks_response.status_code}")
+            return
+        for line in chunks_response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            # Archive the raw ChromaDB metadata, not the frontend wrapper around it
+            metadata = chunk.get("chunk_metadata") or {}
+            if isinstance(metadata.get("full_metadata"), dict):
+                chunk["chunk_metadata"] = metadata["full_metadata"]
+            yield chunk
+
+
+def _iter_aprag_rows(query: str, session_id: str) -> Iterator[Dict[str, Any]]:
+    with get_aprag_db_connection() as conn:
+        for row in conn.execute(query, (session_id,)):
+            yield dict(row)
+
+
+@router.get("/{session_id}/backup/archive")
+async def download_backup_archive(
+    session_id: str,
+    compress: bool = Query(True, description="DEFLATE-compress archive members")
+):
+    """
+    Download a streamed session archive (ZIP, embeddings as float32 .npy parts).
+    
+    Nothing is buffered in full: chunks are read page by page from the document
+    processing service and topics/KB/QA rows straight from the APRAG database.
+    """
+    logger.info(f"🔄 Streaming archive backup for session: {session_id}")
+    topics_query = "SELECT * FROM course_topics WHERE session_id = ? ORDER BY topic_order, topic_id"
+    session_topics = "SELECT topic_id FROM course_topics WHERE session_id = ?"
+    
+    archive = stream_session_archive(
+        session_id,
+        chunks=_iter_session_chunks(session_id),
+        topics=_iter_aprag_rows(topics_query, session_id),
+        knowledge_bases=_iter_aprag_rows(
+            f"SELECT * FROM topic_knowledge_base WHERE topic_id IN ({session_topics})", session_id
+        ),
+        qa_pairs=_iter_aprag_rows(
+            f"SELECT * FROM topic_qa_pairs WHERE topic_id IN ({session_topics})", session_id
+        ),
+        compress=compress,
+        part_size=RESTORE_BATCH_SIZE,
+        extra_manifest={"backup_id": f"backup_{session_id}_{int(datetime.now().timestamp())}"}
+    )
+    return StreamingResponse(
+        archive,
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="session_backup_{session_id}_{int(datetime.now().timestamp())}.zip"'
+        }
+    )
+
+
+@router.post("/restore/archive")
+async def restore_session_archive(
+    file: UploadFile = File(...),
+    new_session_id: Optional[str] = Form(None),
+    restore_chunks: bool = Form(True),
+    restore_topics: bool = Form(True),
+    restore_kb: bool = Form(True),
+    restore_qa: bool = Form(True)
+) -> Dict[str, Any]:
+    """
+    Restore a session from a streamed archive, one chunk part at a time.
+    """
+    try:
+        reader = SessionArchiveReader(file.file)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid session archive: {str(e)}")
+    
+    try:
+        with reader:
+            original_session_id = reader.session_id
+            target_session_id = new_session_id or original_session_id
+            logger.info(f"🔄 Starting archive restore: {original_session_id} -> {target_session_id}")
+            
+            restore_summary = _new_restore_summary()
+            
+            if restore_chunks:
+                try:
+                    first = True
+                    for batch in reader.iter_chunk_batches():
+                        restore_summary["chunks_restored"] += _restore_chunk_batch(
+                            target_session_id, original_session_id, batch, replace=first
+                        )
+                        first = False
+                    logger.info(f"✅ Restored {restore_summary['chunks_restored']} chunks")
+                except Exception as e:
+                    logger.error(f"Error restoring chunks: {e}", exc_info=True)
+                    restore_summary["errors"].append(f"Chunk restoration error: {str(e)}")
+            
+            _restore_aprag_data(
+                reader.iter_topics(),
+                reader.iter_knowledge_bases(),
+                reader.iter_qa_pairs(),
+                target_session_id,
+                restore_summary,
+                restore_topics=restore_topics,
+                restore_kb=restore_kb,
+                restore_qa=restore_qa
+            )
+        
+        logger.info(f"✅ Archive restore completed: {restore_summary}")
+        return {
+            "success": True,
+            "original_session_id": original_session_id,
+            "target_session_id": target_session_id,
+            "summary": restore_summary,
+            "message": f"Restored: {restore_summary['chunks_restored']} chunks, {restore_summary['topics_restored']} topics, {restore_summary['knowledge_bases_restored']} KBs, {restore_summary['qa_pairs_restored']} QA pairs"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Archive restore failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Restore failed: {str(e)}")
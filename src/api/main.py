@@ -5,7 +5,7 @@ No heavy dependencies like ChromaDB, FAISS, or ML libraries
 from typing import List, Optional, Dict, Any
 import os
 import json
-import asyncio
+import base64
 import uuid
 import logging
 import traceback
@@ -19,7 +19,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Response, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi import Body
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
@@ -89,6 +89,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Microservice URLs from environment variables - Google Cloud Run compatible
@@ -344,6 +345,18 @@ async def check_microservices():
     
     return {"gateway": "ok", "services": results}
 
+@app.get("/health/telemetry")
+def telemetry_outbox_health():
+    """Queue depth of the local telemetry outbox (interaction/experiment logging)"""
+    from src.analytics.telemetry_outbox import get_telemetry_outbox
+    return {"status": "ok", "outbox": get_telemetry_outbox().stats()}
+
+@app.get("/health/models")
+def model_registry_health():
+    """Models loaded in this process: footprint, idle time, hit/miss/eviction counters"""
+    from src.utils.model_registry import get_model_registry
+    return {"status": "ok", "registry": get_model_registry().get_stats()}
+
 # Session Management - Real Implementation with SQLite Database
 def _convert_metadata_to_response(metadata: SessionMetadata) -> SessionResponse:
     """Convert SessionMetadata to SessionResponse"""
@@ -385,8 +398,14 @@ def _convert_metadata_to_response(metadata: SessionMetadata) -> SessionResponse:
 
 @app.get("/sessions", response_model=List[SessionResponse])
 def list_sessions(created_by: Optional[str] = None, category: Optional[str] = None,
-                  status: Optional[str] = None, limit: int = 50, request: Request = None):
-    """List sessions from SQLite database"""
+                  status: Optional[str] = None, limit: int = 50, cursor: Optional[str] = None,
+                  request: Request = None, response: Response = None):
+    """
+    List sessions from SQLite database
+    
+    Role filters (teacher: own sessions, student: active sessions) run in SQL.
+    Pages are keyset-based: pass the X-Next-Cursor response header back as ?cursor=.
+    """
     try:
         # Determine requester and role
         current_user = _get_current_user(request)
@@ -403,67 +422,39 @@ def list_sessions(created_by: Optional[str] = None, category: Optional[str] = No
                 status_enum = SessionStatus(status)
             except ValueError:
                 raise HTTPException(status_code=400, detail=f"Invalid status: {status}")
+        limit = max(1, limit)
+        before = _decode_session_cursor(cursor) if cursor else None
 
         sessions: List[SessionMetadata]
         if _is_admin(current_user):
             # Admin sees all
             sessions = professional_session_manager.list_sessions(
-                created_by=None, category=category_enum, status=status_enum, limit=limit
+                category=category_enum, status=status_enum, limit=limit, before=before
             )
             logger.info(f"[SESSION LIST] Admin user - returning {len(sessions)} sessions")
         elif _is_teacher(current_user):
-            # Teachers see only their own sessions
-            # Fetch and filter by owner keys to be tolerant of historical data
-            all_sessions = professional_session_manager.list_sessions(
-                created_by=None, category=category_enum, status=status_enum, limit=limit
+            # Teachers see only their own sessions (owner keys matched case-insensitively in SQL)
+            owner_keys = _user_owner_keys(current_user)
+            sessions = professional_session_manager.list_sessions(
+                category=category_enum, status=status_enum, limit=limit,
+                owner_keys=owner_keys, before=before
             )
-            owner_keys = set(_user_owner_keys(current_user))
-            logger.info(f"[SESSION LIST] Teacher user - owner_keys: {owner_keys}, all_sessions count: {len(all_sessions)}")
-            logger.info(f"[SESSION LIST] Current user info: {current_user}")
-            
-            # Debug: log first few session created_by values BEFORE filtering
-            if len(all_sessions) > 0:
-                sample_created_by = [s.created_by for s in all_sessions[:5]]
-                logger.info(f"[SESSION LIST] Sample created_by values from DB: {sample_created_by}")
-            
-            sessions = [s for s in all_sessions if s.created_by in owner_keys]
-            logger.info(f"[SESSION LIST] Filtered sessions count: {len(sessions)}")
-            
-            # If no sessions found but sessions exist, log mismatch details
-            if len(sessions) == 0 and len(all_sessions) > 0:
-                all_created_by = set([s.created_by for s in all_sessions])
-                logger.warning(f"[SESSION LIST] No matching sessions! Owner keys: {owner_keys}, All created_by values: {all_created_by}")
-                logger.warning(f"[SESSION LIST] Mismatch detected - trying case-insensitive and partial matching...")
-                
-                # Try case-insensitive matching
-                owner_keys_lower = {k.lower() for k in owner_keys}
-                sessions = [s for s in all_sessions if s.created_by and s.created_by.lower() in owner_keys_lower]
-                if len(sessions) > 0:
-                    logger.info(f"[SESSION LIST] Found {len(sessions)} sessions with case-insensitive matching")
+            logger.info(f"[SESSION LIST] Teacher user - owner_keys: {owner_keys}, returning {len(sessions)} sessions")
         else:
             # Students: show only active sessions (ignore query parameter status)
-            # Always force ACTIVE status for students regardless of query parameter
-            all_sessions = professional_session_manager.list_sessions(
-                created_by=None, category=category_enum, status=None, limit=limit * 2  # Get more to filter
+            sessions = professional_session_manager.list_sessions(
+                category=category_enum, status=SessionStatus.ACTIVE, limit=limit, before=before
             )
-            
-            # Double filter: backend filter + frontend safety filter
-            sessions = [
-                s for s in all_sessions 
-                if s.status == SessionStatus.ACTIVE
-            ]
-            
-            # Debug: Log all sessions and filtered results
-            if all_sessions:
-                all_statuses = [f"{s.name}: {s.status.value if hasattr(s.status, 'value') else s.status}" for s in all_sessions]
-                logger.info(f"[SESSION LIST] Student user - ALL sessions: {all_statuses}")
-            
-            if sessions:
-                session_statuses = [f"{s.name}: {s.status.value if hasattr(s.status, 'value') else s.status}" for s in sessions]
-                logger.info(f"[SESSION LIST] Student user - FILTERED active sessions ({len(sessions)}): {session_statuses}")
+            if not sessions and not cursor:
+                logger.warning("[SESSION LIST] Student user - NO ACTIVE SESSIONS FOUND!")
             else:
-                logger.warning(f"[SESSION LIST] Student user - NO ACTIVE SESSIONS FOUND! Total sessions: {len(all_sessions)}")
+                logger.info(f"[SESSION LIST] Student user - returning {len(sessions)} active sessions")
+
+        if response is not None and len(sessions) == limit:
+            response.headers["X-Next-Cursor"] = _encode_session_cursor(sessions[-1])
         return [_convert_metadata_to_response(session) for session in sessions]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list sessions: {str(e)}")
 
@@ -615,11 +606,35 @@ def update_session_status(session_id: str, request: StatusUpdateRequest, req: Re
         raise HTTPException(status_code=500, detail=f"Failed to update session status: {str(e)}")
 
 @app.get("/sessions/{session_id}/chunks")
-def get_session_chunks(session_id: str):
-    """Get chunks for a session from Document Processing Service"""
+def get_session_chunks(session_id: str, request: Request = None):
+    """
+    Get chunks for a session from Document Processing Service.
+    
+    Pagination (limit/cursor), projection (fields), filters and
+    format=ndjson are passed through unchanged.
+    """
+    params = dict(request.query_params) if request is not None else {}
     try:
+        if params.get("format") == "ndjson":
+            upstream = requests.get(
+                f"{DOCUMENT_PROCESSOR_URL}/sessions/{session_id}/chunks",
+                params=params,
+                stream=True,
+                timeout=30
+            )
+            if upstream.status_code != 200:
+                raise HTTPException(
+                    status_code=upstream.status_code,
+                    detail=f"Failed to fetch chunks from Document Processing Service: {upstream.text}"
+                )
+            return StreamingResponse(
+                upstream.iter_content(chunk_size=64 * 1024),
+                media_type="application/x-ndjson"
+            )
+        
         response = requests.get(
             f"{DOCUMENT_PROCESSOR_URL}/sessions/{session_id}/chunks",
+            params=params,
             timeout=30
         )
         
@@ -661,9 +676,10 @@ async def generate_course_questions(session_id: str, request: Request, req: Gene
                     raise HTTPException(status_code=403, detail="You do not have access to this session")
             # For students, we allow access to active sessions (no ownership check)
         
-        # Get chunks from document processing service
+        # Get chunks from document processing service (text is all we sample from)
         chunks_response = requests.get(
             f"{DOCUMENT_PROCESSOR_URL}/sessions/{session_id}/chunks",
+            params={"fields": "ids,text"},
             timeout=30
         )
         
@@ -1598,6 +1614,18 @@ def _user_owner_keys(user: Optional[Dict[str, Any]]) -> List[str]:
         vals.append(str(user.get("email")))
     return [v for v in vals if v]
 
+def _encode_session_cursor(metadata: SessionMetadata) -> str:
+    """Keyset cursor of the last listed session: (updated_at, session_id)"""
+    raw = json.dumps([metadata.updated_at, metadata.session_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def _decode_session_cursor(cursor: str) -> tuple:
+    try:
+        updated_at, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(updated_at), str(session_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 def _require_owner_or_admin(request: Request, session_id: str) -> SessionMetadata:
     metadata = professional_session_manager.get_session_metadata(session_id)
     if not metadata:
@@ -1922,23 +1950,12 @@ async def rag_query(req: RAGQueryRequest, request: Request):
                     else (current_user.get("username") if current_user else "student")
                 )
                 
-                # Track student entry first
-                professional_session_manager.track_student_entry(req.session_id, student_identifier)
-                
-                # Then update query count
-                meta = professional_session_manager.get_session_metadata(req.session_id)
-                if meta:
-                    professional_session_manager.update_session_metadata(
-                        req.session_id,
-                        query_count=int(meta.query_count or 0) + 1,
-                        last_accessed=datetime.now().isoformat()
-                    )
-                    logger.info(f"[QUERY COUNT] Updated query_count to {int(meta.query_count or 0) + 1} for session {req.session_id}")
+                # Coalesced counters: flushed in the background with atomic increments
+                professional_session_manager.record_query(req.session_id, student_identifier)
             except Exception as update_err:
                 logger.warning(f"Failed to update query_count/student_entry for session {req.session_id}: {update_err}")
             try:
-                from src.analytics.database import ExperimentDatabase
-                db = ExperimentDatabase()
+                from src.analytics.telemetry_outbox import enqueue_experiment_interaction
                 rag_params = {
                     "use_direct_llm": True,
                     "model": effective["model"],
@@ -1947,15 +1964,14 @@ async def rag_query(req: RAGQueryRequest, request: Request):
                     "max_context_chars": None,
                     "chain_type": None,
                 }
-                config_hash = db.add_or_get_rag_configuration(rag_params)
                 current_user = _get_current_user(request)
                 user_identifier = str(current_user.get("id")) if current_user and current_user.get("id") is not None else (current_user.get("username") if current_user else "student")
-                db.add_interaction(
+                enqueue_experiment_interaction(
+                    rag_params,
                     user_id=user_identifier,
                     query=req.query,
                     response=result.get("response", ""),
                     retrieved_context=[],
-                    rag_config_hash=config_hash,
                     session_id=req.session_id,
                     uncertainty_score=None,
                     feedback_requested=False,
@@ -1970,7 +1986,7 @@ async def rag_query(req: RAGQueryRequest, request: Request):
             # APRAG Integration: Personalization and Interaction Logging
             final_answer = result.get("response", "")
             try:
-                from src.utils.aprag_middleware import personalize_response_async, log_interaction_async, get_user_id_from_request
+                from src.utils.aprag_middleware import personalize_response_async, enqueue_interaction, get_user_id_from_request
                 user_id = get_user_id_from_request(request)
                 
                 # Try personalization (non-blocking, with timeout)
@@ -1989,8 +2005,8 @@ async def rag_query(req: RAGQueryRequest, request: Request):
                     except Exception as pers_err:
                         logger.debug(f"APRAG personalization failed (non-critical): {pers_err}")
                 
-                # Log interaction (async, non-blocking)
-                asyncio.create_task(log_interaction_async(
+                # Queue interaction in the local telemetry outbox (flushed in the background)
+                enqueue_interaction(
                     user_id=user_id,
                     session_id=req.session_id,
                     query=req.query,
@@ -2001,7 +2017,7 @@ async def rag_query(req: RAGQueryRequest, request: Request):
                     chain_type="direct_llm",
                     sources=[],
                     metadata={"use_direct_llm": True}
-                ))
+                )
             except Exception as aprag_err:
                 logger.debug(f"APRAG integration failed (non-critical): {aprag_err}")
             
@@ -2129,23 +2145,12 @@ async def rag_query(req: RAGQueryRequest, request: Request):
                 else (current_user.get("username") if current_user else "student")
             )
             
-            # Track student entry first
-            professional_session_manager.track_student_entry(req.session_id, student_identifier)
-            
-            # Then update query count
-            meta = professional_session_manager.get_session_metadata(req.session_id)
-            if meta:
-                professional_session_manager.update_session_metadata(
-                    req.session_id,
-                    query_count=int(meta.query_count or 0) + 1,
-                    last_accessed=datetime.now().isoformat()
-                )
-                logger.info(f"[QUERY COUNT] Updated query_count to {int(meta.query_count or 0) + 1} for session {req.session_id}")
+            # Coalesced counters: flushed in the background with atomic increments
+            professional_session_manager.record_query(req.session_id, student_identifier)
         except Exception as update_err:
             logger.warning(f"Failed to update query_count/student_entry for session {req.session_id}: {update_err}")
         try:
-            from src.analytics.database import ExperimentDatabase
-            db = ExperimentDatabase()
+            from src.analytics.telemetry_outbox import enqueue_experiment_interaction
             rag_params = {
                 "use_direct_llm": False,
                 "model": effective["model"] or "",
@@ -2154,15 +2159,14 @@ async def rag_query(req: RAGQueryRequest, request: Request):
                 "max_context_chars": effective["max_context_chars"],
                 "chain_type": payload.get("chain_type") or result.get("chain_type"),
             }
-            config_hash = db.add_or_get_rag_configuration(rag_params)
             current_user = _get_current_user(request)
             user_identifier = str(current_user.get("id")) if current_user and current_user.get("id") is not None else (current_user.get("username") if current_user else "student")
-            db.add_interaction(
+            enqueue_experiment_interaction(
+                rag_params,
                 user_id=user_identifier,
                 query=req.query,
                 response=result.get("answer", ""),
                 retrieved_context=result.get("sources", []),
-                rag_config_hash=config_hash,
                 session_id=req.session_id,
                 uncertainty_score=None,
                 feedback_requested=False,
@@ -2178,7 +2182,7 @@ async def rag_query(req: RAGQueryRequest, request: Request):
         final_answer = result.get("answer", "")
         final_sources = result.get("sources", [])
         try:
-            from src.utils.aprag_middleware import personalize_response_async, log_interaction_async, get_user_id_from_request
+            from src.utils.aprag_middleware import personalize_response_async, enqueue_interaction, get_user_id_from_request
             user_id = get_user_id_from_request(request)
             
             # Extract quality parameters from request for APRAG/eBars integration
@@ -2212,8 +2216,8 @@ async def rag_query(req: RAGQueryRequest, request: Request):
                 except Exception as pers_err:
                     logger.debug(f"APRAG personalization failed (non-critical): {pers_err}")
             
-            # Log interaction with quality parameters (async, non-blocking)
-            asyncio.create_task(log_interaction_async(
+            # Queue interaction with quality parameters in the local telemetry outbox
+            enqueue_interaction(
                 user_id=user_id,
                 session_id=req.session_id,
                 query=req.query,
@@ -2229,7 +2233,7 @@ async def rag_query(req: RAGQueryRequest, request: Request):
                     "min_score": effective["min_score"],
                     "quality_params": quality_params  # Add quality parameters to metadata
                 }
-            ))
+            )
         except Exception as aprag_err:
             logger.debug(f"APRAG integration failed (non-critical): {aprag_err}")
         
@@ -2246,18 +2250,16 @@ async def rag_query(req: RAGQueryRequest, request: Request):
         logger.error(f"❌ RAG Query RequestException: {error_detail}")
         logger.error(f"❌ Traceback: {traceback.format_exc()}")
         try:
-            from src.analytics.database import ExperimentDatabase
-            db = ExperimentDatabase()
+            from src.analytics.telemetry_outbox import enqueue_experiment_interaction
             rag_params = {"use_direct_llm": bool(getattr(req, 'use_direct_llm', False)), "model": req.model or ""}
-            config_hash = db.add_or_get_rag_configuration(rag_params)
             current_user = _get_current_user(request)
             user_identifier = str(current_user.get("id")) if current_user and current_user.get("id") is not None else (current_user.get("username") if current_user else "student")
-            db.add_interaction(
+            enqueue_experiment_interaction(
+                rag_params,
                 user_id=user_identifier,
                 query=req.query,
                 response="",
                 retrieved_context=[],
-                rag_config_hash=config_hash,
                 session_id=req.session_id,
                 uncertainty_score=None,
                 feedback_requested=False,
@@ -2285,18 +2287,16 @@ async def rag_query(req: RAGQueryRequest, request: Request):
         
         # Try to log the failure
         try:
-            from src.analytics.database import ExperimentDatabase
-            db = ExperimentDatabase()
+            from src.analytics.telemetry_outbox import enqueue_experiment_interaction
             rag_params = {"use_direct_llm": bool(getattr(req, 'use_direct_llm', False)), "model": req.model or ""}
-            config_hash = db.add_or_get_rag_configuration(rag_params)
             current_user = _get_current_user(request)
             user_identifier = str(current_user.get("id")) if current_user and current_user.get("id") is not None else (current_user.get("username") if current_user else "student")
-            db.add_interaction(
+            enqueue_experiment_interaction(
+                rag_params,
                 user_id=user_identifier,
                 query=req.query,
                 response="",
                 retrieved_context=[],
-                rag_config_hash=config_hash,
                 session_id=req.session_id,
                 uncertainty_score=None,
                 feedback_requested=False,
@@ -2615,6 +2615,7 @@ def export_session(session_id: str, format: str = "zip", request: Request = None
                 # Get chunks from document-processing-service to find source files
                 response = requests.get(
                     f"{DOCUMENT_PROCESSOR_URL}/sessions/{session_id}/chunks",
+                    params={"fields": "ids,metadata"},
                     timeout=30
                 )
                 if response.status_code == 200:
@@ -2623,7 +2624,8 @@ def export_session(session_id: str, format: str = "zip", request: Request = None
                     source_files = set()
                     if isinstance(chunks_data, dict) and "chunks" in chunks_data:
                         for chunk in chunks_data["chunks"]:
-                            metadata_item = chunk.get("metadata", {})
+                            metadata_item = chunk.get("chunk_metadata") or chunk.get("metadata") or {}
+                            metadata_item = metadata_item.get("full_metadata", metadata_item)
                             source_file = metadata_item.get("source_file") or metadata_item.get("filename")
                             if source_file:
                                 source_files.add(source_file)
@@ -3655,9 +3657,9 @@ def api_update_session_status(session_id: str, request: StatusUpdateRequest, req
     return update_session_status(session_id, request, req)
 
 @app.get("/api/sessions/{session_id}/chunks")
-def api_get_session_chunks(session_id: str):
+def api_get_session_chunks(session_id: str, request: Request):
     """Get chunks for a session from Document Processing Service - API prefix version"""
-    return get_session_chunks(session_id)
+    return get_session_chunks(session_id, request)
 
 @app.get("/api/sessions/{session_id}/stats")
 def get_session_stats(session_id: str):
@@ -0,0 +1,243 @@
+"""
+Streaming session archive format (backup/export v2)
+
+A session archive is a ZIP file written and read member by member, so neither
+the producer nor the consumer ever holds the whole session in memory:
+
+    manifest.json                 format, version, session id, counts, embedding dim
+    chunks/part-00000.jsonl       one chunk per line (id, text, metadata)
+    embeddings/part-00000.npy     float32 matrix, row i = line i of the matching part
+    topics.jsonl                  course_topics rows
+    knowledge_bases.jsonl         topic_knowledge_base rows
+    qa_pairs.jsonl                topic_qa_pairs rows
+
+Chunks are written in fixed-size parts; each part's embeddings are stored as a
+raw little-endian float32 ``.npy`` (readable with ``numpy.load``) instead of
+JSON text. Members are optionally DEFLATE-compressed. The manifest is written
+last since counts are only known at the end.
+"""
+import io
+import json
+import struct
+import sys
+import zipfile
+from array import array
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+ARCHIVE_FORMAT = "rag-session-archive"
+ARCHIVE_VERSION = 2
+DEFAULT_PART_SIZE = 256
+
+_NPY_MAGIC = b"\x93NUMPY\x01\x00"
+
+
+# --- .npy encoding (float32, 2-D) without a numpy dependency ---
+
+def encode_npy_float32(rows: List[List[float]], dim: int) -> bytes:
+    """Encode a list of equal-length float vectors as a ``<f4`` .npy payload."""
+    header = "{'descr': '<f4', 'fortran_order': False, 'shape': (%d, %d), }" % (len(rows), dim)
+    # Pad so that magic + len field + header is a multiple of 64 bytes
+    padding = 64 - (len(_NPY_MAGIC) + 2 + len(header) + 1) % 64
+    header_bytes = (header + " " * padding + "\n").encode("latin1")
+
+    values = array("f")
+    for row in rows:
+        values.extend(row)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return _NPY_MAGIC + struct.pack("<H", len(header_bytes)) + header_bytes + values.tobytes()
+
+
+def decode_npy_float32(stream: BinaryIO) -> List[List[float]]:
+    """Decode a ``<f4`` 2-D .npy payload written by :func:`encode_npy_float32` (or numpy)."""
+    magic = stream.read(len(_NPY_MAGIC))
+    if magic[:6] != _NPY_MAGIC[:6]:
+        raise ValueError("Not a .npy payload")
+    major = magic[6]
+    header_len_size = 2 if major == 1 else 4
+    (header_len,) = struct.unpack("<H" if major == 1 else "<I", stream.read(header_len_size))
+    header = stream.read(header_len).decode("latin1")
+    if "'<f4'" not in header or "'fortran_order': False" not in header:
+        raise ValueError(f"Unsupported .npy header: {header.strip()}")
+    shape_text = header.split("'shape':")[1].split(")")[0].strip(" (")
+    dims = [int(d) for d in shape_text.split(",") if d.strip()]
+    rows, dim = (dims + [0])[:2]
+
+    values = array("f")
+    values.frombytes(stream.read(rows * dim * 4))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return [values[i * dim:(i + 1) * dim].tolist() for i in range(rows)]
+
+
+# --- Writing ---
+
+class _StreamBuffer(io.RawIOBase):
+    """Write-only, non-seekable sink; ZipFile then emits data descriptors."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_session_archive(
+    session_id: str,
+    chunks: Iterable[Dict[str, Any]],
+    topics: Iterable[Dict[str, Any]],
+    knowledge_bases: Iterable[Dict[str, Any]],
+    qa_pairs: Iterable[Dict[str, Any]],
+    compress: bool = True,
+    part_size: int = DEFAULT_PART_SIZE,
+    extra_manifest: Optional[Dict[str, Any]] = None,
+) -> Iterator[bytes]:
+    """
+    Produce a session archive incrementally, yielding bytes as parts are written
+
+    ``chunks`` yields dicts with ``chunk_id``, ``chunk_text``, ``chunk_metadata``
+    and optionally ``embedding``. All inputs are consumed lazily.
+    """
+    sink = _StreamBuffer()
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    counts = {"chunks": 0, "chunks_with_embeddings": 0, "topics": 0, "knowledge_bases": 0, "qa_pairs": 0}
+    embedding_dim: Optional[int] = None
+    part_index = 0
+
+    with zipfile.ZipFile(sink, mode="w", compression=compression) as zf:
+
+        def write_part(batch: List[Dict[str, Any]]):
+            nonlocal embedding_dim, part_index
+            vectors = [c.get("embedding") for c in batch]
+            has_vectors = all(v for v in vectors)
+            if has_vectors:
+                dim = len(vectors[0])
+                if embedding_dim is None:
+                    embedding_dim = dim
+                if any(len(v) != embedding_dim for v in vectors):
+                    raise ValueError("Inconsistent embedding dimensions in session")
+            name = f"part-{part_index:05d}"
+            with zf.open(f"chunks/{name}.jsonl", "w") as member:
+                for chunk in batch:
+                    record = {
+                        "chunk_id": chunk.get("chunk_id"),
+                        "chunk_text": chunk.get("chunk_text"),
+                        "chunk_metadata": chunk.get("chunk_metadata") or {},
+                    }
+                    member.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            if has_vectors:
+                zf.writestr(f"embeddings/{name}.npy", encode_npy_float32(vectors, embedding_dim))
+                counts["chunks_with_embeddings"] += len(batch)
+            counts["chunks"] += len(batch)
+            part_index += 1
+
+        batch: List[Dict[str, Any]] = []
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= part_size:
+                write_part(batch)
+                batch = []
+                yield sink.drain()
+        if batch:
+            write_part(batch)
+            yield sink.drain()
+
+        for member_name, rows, key in (
+            ("topics.jsonl", topics, "topics"),
+            ("knowledge_bases.jsonl", knowledge_bases, "knowledge_bases"),
+            ("qa_pairs.jsonl", qa_pairs, "qa_pairs"),
+        ):
+            with zf.open(member_name, "w") as member:
+                for row in rows:
+                    member.write((json.dumps(row, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+                    counts[key] += 1
+            yield sink.drain()
+
+        manifest = {
+            "format": ARCHIVE_FORMAT,
+            "version": ARCHIVE_VERSION,
+            "session_id": session_id,
+            "created_at": datetime.utcnow().isoformat(),
+            "embedding_dtype": "float32",
+            "embedding_dim": embedding_dim,
+            "chunk_parts": part_index,
+            "compressed": compress,
+            "counts": counts,
+        }
+        if extra_manifest:
+            manifest.update(extra_manifest)
+        zf.writestr("manifest.json", json.dumps(manifest, indent=2, ensure_ascii=False))
+
+    yield sink.drain()
+
+
+# --- Reading ---
+
+class SessionArchiveReader:
+    """Read a session archive member by member from a seekable file object."""
+
+    def __init__(self, fileobj: BinaryIO):
+        self._zf = zipfile.ZipFile(fileobj, mode="r")
+        names = set(self._zf.namelist())
+        if "manifest.json" not in names:
+            raise ValueError("Invalid session archive: manifest.json missing")
+        self.manifest: Dict[str, Any] = json.loads(self._zf.read("manifest.json"))
+        if self.manifest.get("format") != ARCHIVE_FORMAT:
+            raise ValueError(f"Unsupported archive format: {self.manifest.get('format')}")
+        self._names = names
+
+    @property
+    def session_id(self) -> Optional[str]:
+        return self.manifest.get("session_id")
+
+    def iter_chunk_batches(self) -> Iterator[List[Dict[str, Any]]]:
+        """Yield one batch of chunks per archive part, embeddings attached when present."""
+        for index in range(int(self.manifest.get("chunk_parts", 0))):
+            name = f"part-{index:05d}"
+            batch = list(self._iter_jsonl(f"chunks/{name}.jsonl"))
+            npy_name = f"embeddings/{name}.npy"
+            if npy_name in self._names:
+                with self._zf.open(npy_name) as member:
+                    vectors = decode_npy_float32(member)
+                if len(vectors) != len(batch):
+                    raise ValueError(f"Embedding rows do not match chunks in {name}")
+                for chunk, vector in zip(batch, vectors):
+                    chunk["embedding"] = vector
+            yield batch
+
+    def iter_topics(self) -> Iterator[Dict[str, Any]]:
+        return self._iter_jsonl("topics.jsonl")
+
+    def iter_knowledge_bases(self) -> Iterator[Dict[str, Any]]:
+        return self._iter_jsonl("knowledge_bases.jsonl")
+
+    def iter_qa_pairs(self) -> Iterator[Dict[str, Any]]:
+        return self._iter_jsonl("qa_pairs.jsonl")
+
+    def _iter_jsonl(self, name: str) -> Iterator[Dict[str, Any]]:
+        if name not in self._names:
+            return
+        with self._zf.open(name) as member:
+            for line in io.TextIOWrapper(member, encoding="utf-8"):
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    def close(self):
+        self._zf.close()
+
+    def __enter__(self) -> "SessionArchiveReader":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
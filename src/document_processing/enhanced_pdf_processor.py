@@ -151,6 +151,11 @@ else:
 
 # Fallback için mevcut PDF processor
 from src.document_processing.pdf_processor import process_pdf as fallback_pdf_extract
+from src.utils.model_registry import get_model_registry
+
+# Marker model dict in the process model registry (shared by all processors, LRU-evictable)
+MARKER_MODELS_KEY = "marker:model_dict"
+MARKER_MODELS_ESTIMATED_MB = float(os.getenv("MARKER_MODELS_ESTIMATED_MB", "3000"))
 
 
 class MarkerPDFProcessor:
@@ -354,8 +359,12 @@ class MarkerPDFProcessor:
                     logger.warning(f"⚠️ Cache directory missing: {torch_cache}")
                 
                 # Create model dict - this will use cached models due to env vars
+                # Registry: one model dict per process; an eviction drops our converter too
                 try:
-                    artifact_dict = create_model_dict()
+                    artifact_dict = get_model_registry().get(
+                        MARKER_MODELS_KEY, create_model_dict, MARKER_MODELS_ESTIMATED_MB,
+                        on_evict=self._on_marker_models_evicted
+                    )
                     logger.info("✅ Model dict created with cached models")
                 except Exception as model_error:
                     logger.error(f"❌ Failed to create model dict: {model_error}")
@@ -392,6 +401,11 @@ class MarkerPDFProcessor:
             self.converter = None
             self.models_loaded = False
     
+    def _on_marker_models_evicted(self):
+        """Model registry evicted the Marker models: drop the converter, reload on next PDF"""
+        self.converter = None
+        self.models_loaded = False
+    
     def _debug_cache_status(self):
         """Debug cache status before model loading"""
         logger.info("🔍 CACHE DEBUG STATUS:")
@@ -459,7 +473,8 @@ class MarkerPDFProcessor:
         
         self._load_converter_if_needed()
         
-        if not self.models_loaded or self.converter is None:
+        converter = self.converter
+        if not self.models_loaded or converter is None:
             logger.warning("Marker converter yüklenemedi, fallback kullanılacak")
             return self._process_with_fallback(pdf_path)
         
@@ -580,7 +595,9 @@ class MarkerPDFProcessor:
                 layout_progress_thread.start()
                 
                 # MARKER İŞLEME - Layout recognition burada yapılıyor
-                rendered = self.converter(pdf_path)
+                # (models are protected from registry eviction while the converter runs)
+                with get_model_registry().in_use(MARKER_MODELS_KEY, create_model_dict, MARKER_MODELS_ESTIMATED_MB):
+                    rendered = converter(pdf_path)
                 
                 # Layout recognition finished
                 current_progress += progress_stages["layout_recognition"]
@@ -1157,7 +1174,8 @@ class MarkerPDFProcessor:
             "processing_method": method,
             "api_version": "new_with_llm_cached" if MARKER_AVAILABLE and self.use_llm else "new_cached" if MARKER_AVAILABLE else "none",
             "model_cache_available": MODEL_CACHE_AVAILABLE,
-            "cache_stats": cache_stats
+            "cache_stats": cache_stats,
+            "model_registry": get_model_registry().get_stats()
         }
 
 
@@ -1,9 +1,32 @@
 import re
 import time
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple
 from src.utils.logger import get_logger
+from src.utils.rule_sets import compile_substring_set, compile_word_rules
+from src.utils.turkish_text import analyze, normalize_text, normalize_unicode
 from src.embedding.embedding_generator import generate_embeddings
 
+# Substring indicators (matched with ``in`` on the normalized query)
+QUESTION_DEPTH_WORDS = ["neden", "nasıl", "analiz"]
+TURKISH_INDICATORS = ['nedir', 'nasıl', 'neden', 'hangi', 'için', 'ile', 've', 'bir', 'bu', 'şu']
+ENGLISH_INDICATORS = ['what', 'how', 'why', 'which', 'for', 'with', 'and', 'the', 'is', 'this']
+FORMAL_INDICATORS = ['lütfen', 'rica etsem', 'mümkün mü', 'please', 'could you']
+INFORMAL_INDICATORS = ['nasıl', 'ne', 'hey', 'what', 'how']
+
+KEY_TERM_STOP_WORDS = frozenset({
+    # tr
+    'bir', 'bu', 'şu', 've', 'ile', 'için', 'de', 'da', 'ki', 'mi', 'mı', 'ne', 'nə',
+    # en
+    'a', 'an', 'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with'
+})
+
+TECHNICAL_PATTERNS = [
+    r'\b(python|java|sql|html|css|javascript)\b',
+    r'\b(algoritma|veri|analiz|model|sistem)\b',
+    r'\b(fonksiyon|değişken|döngü|koşul)\b',
+    r'\b(database|framework|library|api)\b'
+]
+
 class EnhancedQueryProcessor:
     """
     Enhanced query processor with semantic analysis capabilities for Edu-ModRAG system.
@@ -14,6 +37,10 @@ class EnhancedQueryProcessor:
     - Intent classification
     - Query expansion and refinement
     - Integration with modular RAG routing
+    
+    Every keyword list is compiled into one substring scanner
+    (utils/rule_sets.py): ``semantic_analysis`` scans the normalized query
+    once and all ``_detect_*`` helpers read the set of keywords found.
     """
 
     def __init__(self, config: Dict[str, Any]):
@@ -70,6 +97,24 @@ class EnhancedQueryProcessor:
                 "evaluation": ["hangi", "en iyi", "değerlendir", "seç"]
             }
         }
+        
+        keywords = [
+            keyword
+            for group in self.educational_patterns.values()
+            for keyword_list in group.values()
+            for keyword in keyword_list
+        ]
+        keywords += QUESTION_DEPTH_WORDS + TURKISH_INDICATORS + ENGLISH_INDICATORS
+        keywords += FORMAL_INDICATORS + INFORMAL_INDICATORS
+        # Shared by every processor instance with the same patterns
+        self._keyword_set = compile_substring_set(tuple(keywords))
+        self._technical_rules = compile_word_rules(
+            tuple((f"technical:{i}", pattern) for i, pattern in enumerate(TECHNICAL_PATTERNS))
+        )
+    
+    def _find_keywords(self, query: str) -> FrozenSet[str]:
+        """All known keywords occurring in the normalized query (one scan)"""
+        return self._keyword_set.find(normalize_text(query))
 
     def preprocess(self, query: str) -> str:
         """
@@ -100,18 +145,8 @@ class EnhancedQueryProcessor:
         return query
 
     def _normalize_turkish_chars(self, text: str) -> str:
-        """Normalize Turkish characters for better processing."""
-        # Common Turkish character issues
-        replacements = {
-            'ı': 'ı', 'İ': 'İ', 'ş': 'ş', 'Ş': 'Ş',
-            'ğ': 'ğ', 'Ğ': 'Ğ', 'ü': 'ü', 'Ü': 'Ü',
-            'ö': 'ö', 'Ö': 'Ö', 'ç': 'ç', 'Ç': 'Ç'
-        }
-        
-        for old, new in replacements.items():
-            text = text.replace(old, new)
-        
-        return text
+        """Normalize Turkish characters for better processing (decomposed ş/ğ/ü... -> NFC)."""
+        return normalize_unicode(text)
 
     def validate(self, query: str) -> Tuple[bool, Optional[str]]:
         """
@@ -143,7 +178,7 @@ class EnhancedQueryProcessor:
                 return False, "Sorgunuzda uygunsuz içerik tespit edildi."
         
         # Check if query contains any actual content
-        content_words = re.findall(r'\w+', query.lower())
+        content_words = analyze(query).tokens
         if len(content_words) == 0:
             return False, "Sorgunuz anlamlı kelimeler içermelidir."
         
@@ -171,23 +206,25 @@ class EnhancedQueryProcessor:
                     use_cache=True
                 )
             
+            # One keyword scan and one token pass shared by every detector
+            found = self._find_keywords(query)
+            key_terms = self._extract_key_terms(query)
+            has_technical_terms = self._has_technical_terms(query)
+            
             # Detect educational subject
-            detected_subject = self._detect_subject(query)
+            detected_subject = self._detect_subject(query, found)
             
             # Detect cognitive level (Bloom's taxonomy)
-            cognitive_level = self._detect_cognitive_level(query)
+            cognitive_level = self._detect_cognitive_level(query, found)
             
             # Detect educational intent
-            educational_intent = self._detect_educational_intent(query)
+            educational_intent = self._detect_educational_intent(query, found)
             
             # Analyze query complexity
-            complexity_score = self._analyze_complexity(query)
+            complexity_score = self._analyze_complexity(query, found, key_terms, has_technical_terms)
             
             # Detect language
-            language = self._detect_language(query)
-            
-            # Extract key terms
-            key_terms = self._extract_key_terms(query)
+            language = self._detect_language(query, found)
             
             analysis_time = time.time() - analysis_start
             
@@ -203,8 +240,8 @@ class EnhancedQueryProcessor:
                 "semantic_features": {
                     "has_question_mark": "?" in query,
                     "word_count": len(query.split()),
-                    "has_technical_terms": self._has_technical_terms(query),
-                    "formality_level": self._assess_formality(query)
+                    "has_technical_terms": has_technical_terms,
+                    "formality_level": self._assess_formality(query, found)
                 }
             }
             
@@ -222,13 +259,13 @@ class EnhancedQueryProcessor:
                 "error": str(e)
             }
 
-    def _detect_subject(self, query: str) -> str:
+    def _detect_subject(self, query: str, found: Optional[FrozenSet[str]] = None) -> str:
         """Detect the academic subject of the query."""
-        query_lower = query.lower()
+        found = found if found is not None else self._find_keywords(query)
         subject_scores = {}
         
         for subject, keywords in self.educational_patterns["subjects"].items():
-            score = sum(1 for keyword in keywords if keyword in query_lower)
+            score = sum(1 for keyword in keywords if keyword in found)
             if score > 0:
                 subject_scores[subject] = score
         
@@ -237,46 +274,53 @@ class EnhancedQueryProcessor:
         
         return "genel"
 
-    def _detect_cognitive_level(self, query: str) -> str:
+    def _detect_cognitive_level(self, query: str, found: Optional[FrozenSet[str]] = None) -> str:
         """Detect cognitive level based on Bloom's taxonomy."""
-        query_lower = query.lower()
+        found = found if found is not None else self._find_keywords(query)
         
         for level, keywords in self.educational_patterns["cognitive_levels"].items():
-            if any(keyword in query_lower for keyword in keywords):
+            if any(keyword in found for keyword in keywords):
                 return level
         
         return "understand"  # Default level
 
-    def _detect_educational_intent(self, query: str) -> str:
+    def _detect_educational_intent(self, query: str, found: Optional[FrozenSet[str]] = None) -> str:
         """Detect the educational intent of the query."""
-        query_lower = query.lower()
+        found = found if found is not None else self._find_keywords(query)
         
         for intent, keywords in self.educational_patterns["educational_intents"].items():
-            if any(keyword in query_lower for keyword in keywords):
+            if any(keyword in found for keyword in keywords):
                 return intent
         
         return "explanation"  # Default intent
 
-    def _analyze_complexity(self, query: str) -> float:
+    def _analyze_complexity(
+        self,
+        query: str,
+        found: Optional[FrozenSet[str]] = None,
+        key_terms: Optional[List[str]] = None,
+        has_technical_terms: Optional[bool] = None
+    ) -> float:
         """Analyze query complexity and return a score between 0 and 1."""
+        found = found if found is not None else self._find_keywords(query)
+        key_terms = key_terms if key_terms is not None else self._extract_key_terms(query)
+        if has_technical_terms is None:
+            has_technical_terms = self._has_technical_terms(query)
         complexity_indicators = {
             "length": len(query.split()) / 20,  # Normalize by typical query length
-            "technical_terms": 0.3 if self._has_technical_terms(query) else 0,
-            "multiple_concepts": len(self._extract_key_terms(query)) / 10,
-            "question_depth": 0.2 if any(word in query.lower() for word in ["neden", "nasıl", "analiz"]) else 0
+            "technical_terms": 0.3 if has_technical_terms else 0,
+            "multiple_concepts": len(key_terms) / 10,
+            "question_depth": 0.2 if any(word in found for word in QUESTION_DEPTH_WORDS) else 0
         }
         
         total_score = sum(complexity_indicators.values())
         return min(1.0, total_score)  # Cap at 1.0
 
-    def _detect_language(self, query: str) -> str:
+    def _detect_language(self, query: str, found: Optional[FrozenSet[str]] = None) -> str:
         """Simple language detection for Turkish/English."""
-        turkish_indicators = ['nedir', 'nasıl', 'neden', 'hangi', 'için', 'ile', 've', 'bir', 'bu', 'şu']
-        english_indicators = ['what', 'how', 'why', 'which', 'for', 'with', 'and', 'the', 'is', 'this']
-        
-        query_lower = query.lower()
-        turkish_score = sum(1 for word in turkish_indicators if word in query_lower)
-        english_score = sum(1 for word in english_indicators if word in query_lower)
+        found = found if found is not None else self._find_keywords(query)
+        turkish_score = sum(1 for word in TURKISH_INDICATORS if word in found)
+        english_score = sum(1 for word in ENGLISH_INDICATORS if word in found)
         
         if turkish_score > english_score:
             return "tr"
@@ -286,44 +330,18 @@ class EnhancedQueryProcessor:
             return "mixed"
 
     def _extract_key_terms(self, query: str) -> List[str]:
-        """Extract key terms from the query."""
-        # Remove common stop words
-        stop_words = {
-            'tr': ['bir', 'bu', 'şu', 've', 'ile', 'için', 'de', 'da', 'ki', 'mi', 'mı', 'ne', 'nə'],
-            'en': ['a', 'an', 'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with']
-        }
-        
-        # Extract words
-        words = re.findall(r'\w+', query.lower())
-        
-        # Filter out stop words
-        key_terms = []
-        for word in words:
-            if len(word) > 2 and not any(word in stop_list for stop_list in stop_words.values()):
-                key_terms.append(word)
-        
-        return key_terms
+        """Extract key terms from the query (tokens minus stop words)."""
+        return [word for word in analyze(query).tokens if len(word) > 2 and word not in KEY_TERM_STOP_WORDS]
 
     def _has_technical_terms(self, query: str) -> bool:
         """Check if query contains technical terms."""
-        technical_patterns = [
-            r'\b(python|java|sql|html|css|javascript)\b',
-            r'\b(algoritma|veri|analiz|model|sistem)\b',
-            r'\b(fonksiyon|değişken|döngü|koşul)\b',
-            r'\b(database|framework|library|api)\b'
-        ]
-        
-        query_lower = query.lower()
-        return any(re.search(pattern, query_lower) for pattern in technical_patterns)
+        return any(self._technical_rules.counts(normalize_text(query)).values())
 
-    def _assess_formality(self, query: str) -> str:
+    def _assess_formality(self, query: str, found: Optional[FrozenSet[str]] = None) -> str:
         """Assess the formality level of the query."""
-        formal_indicators = ['lütfen', 'rica etsem', 'mümkün mü', 'please', 'could you']
-        informal_indicators = ['nasıl', 'ne', 'hey', 'what', 'how']
-        
-        query_lower = query.lower()
-        formal_count = sum(1 for indicator in formal_indicators if indicator in query_lower)
-        informal_count = sum(1 for indicator in informal_indicators if indicator in query_lower)
+        found = found if found is not None else self._find_keywords(query)
+        formal_count = sum(1 for indicator in FORMAL_INDICATORS if indicator in found)
+        informal_count = sum(1 for indicator in INFORMAL_INDICATORS if indicator in found)
         
         if formal_count > informal_count:
             return "formal"
@@ -386,10 +404,10 @@ class EnhancedQueryProcessor:
         
         intent = analysis.get("educational_intent", "explanation")
         
-        if intent == "definition" and "nedir" not in query.lower():
+        if intent == "definition" and "nedir" not in normalize_text(query):
             alternatives.append(f"{query.rstrip('?')} nedir?")
         
-        if intent == "explanation" and "nasıl" not in query.lower():
+        if intent == "explanation" and "nasıl" not in normalize_text(query):
             alternatives.append(f"{query.rstrip('?')} nasıl açıklanır?")
         
         return alternatives
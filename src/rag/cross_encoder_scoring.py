@@ -0,0 +1,298 @@
+"""
+Shared cross-encoder scoring layer for ReRanker and RetrievalEvaluator.
+
+Previously both classes handed every (query, document) pair straight to
+``CrossEncoder.predict`` with the library default batch of 32 in input order,
+so a batch containing one long chunk padded every short chunk to its length.
+Nothing was remembered between calls: in a classroom the same question is
+asked many times, and the CRAG flow in rag_pipeline scores the same pairs
+twice per query (``evaluate_retrieval`` then ``filter_by_threshold``).
+
+CrossEncoderScorer:
+
+1. Cache: LRU keyed by (model, normalized query hash, chunk id + content
+   hash). "Hücre zarı nedir?" and "hücre zarı nedir" share entries; only the
+   missing pairs reach the model. The content hash is part of the key even
+   when the store provides a chunk id, so a chunk whose text changed under
+   the same id (re-chunking, LLM improvement) is scored again.
+2. Dynamic batching: missing pairs are sorted by estimated token length and
+   cut into batches bounded by ``batch_size`` pairs and ``max_batch_tokens``
+   padded tokens, so short pairs travel in large batches and long pairs in
+   small ones. Scores are returned in input order.
+3. Truncation: the model is loaded with ``max_length`` so over-long chunks
+   are cut by the tokenizer instead of failing or dominating the batch.
+4. Optional int8 dynamic quantization of the Linear layers (CPU only).
+
+Scorers are shared per (model, max_length, quantize) through
+``get_cross_encoder_scorer``. The model itself lives in the process model
+registry (utils/model_registry): loaded on first use, evictable under
+memory pressure and reloaded lazily; cached scores survive an eviction.
+
+Benchmark (batch sizes 1-64): scripts/benchmark_cross_encoder.py
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..utils.model_registry import ModelHandle, get_model_registry
+from ..utils.turkish_text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = int(os.getenv("CROSS_ENCODER_BATCH_SIZE", "32"))
+DEFAULT_MAX_LENGTH = int(os.getenv("CROSS_ENCODER_MAX_LENGTH", "512"))
+DEFAULT_MAX_BATCH_TOKENS = int(os.getenv("CROSS_ENCODER_MAX_BATCH_TOKENS", "8192"))
+DEFAULT_CACHE_SIZE = int(os.getenv("CROSS_ENCODER_CACHE_SIZE", "20000"))
+DEFAULT_QUANTIZE = os.getenv("CROSS_ENCODER_QUANTIZE", "false").lower() == "true"
+# Registry footprint estimate before the first load (MiniLM-L12 is ~130MB on disk)
+ESTIMATED_MODEL_MB = float(os.getenv("CROSS_ENCODER_ESTIMATED_MB", "300"))
+
+# Sorting only needs an order, not exact counts: ~4 characters per subword token
+CHARS_PER_TOKEN = 4
+# [CLS] query [SEP] document [SEP]
+SPECIAL_TOKENS = 3
+
+CacheKey = Tuple[str, str, str]
+
+
+def query_hash(query: str) -> str:
+    """Hash of the normalized query (Turkish case folding, single spaces)"""
+    return hashlib.sha1(normalize_text(query).encode("utf-8")).hexdigest()
+
+
+def document_key(text: str, doc_id: Optional[str] = None) -> str:
+    """Hash of the content, prefixed with the chunk id when the store provides one"""
+    content_hash = hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+    if doc_id:
+        return f"id:{doc_id}:sha1:{content_hash}"
+    return "sha1:" + content_hash
+
+
+def quantize_for_cpu(model: Any) -> bool:
+    """
+    int8 dynamic quantization of the Linear layers of a CrossEncoder (in place).
+
+    Returns True when the model was quantized. GPU models and environments
+    without torch quantization support are left unchanged.
+    """
+    try:
+        import torch
+
+        device = str(getattr(model, "device", None) or getattr(model, "_target_device", "cpu"))
+        if not device.startswith("cpu"):
+            logger.info(f"Quantization skipped: model runs on {device}")
+            return False
+
+        model.model = torch.quantization.quantize_dynamic(model.model, {torch.nn.Linear}, dtype=torch.qint8)
+        logger.info("⚡ Cross-encoder quantized to int8 (dynamic, Linear layers)")
+        return True
+    except Exception as e:
+        logger.warning(f"⚠️ Cross-encoder quantization failed, using float model (non-critical): {e}")
+        return False
+
+
+class CrossEncoderScorer:
+    """
+    Batched, cached (query, document) relevance scoring.
+
+    Example:
+        >>> scorer = get_cross_encoder_scorer("cross-encoder/ms-marco-MiniLM-L-6-v2")
+        >>> scorer.score("Hücre zarı nedir?", ["Hücre zarı...", "Mitoz..."])
+        [7.41, -3.12]
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        model_name: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_length: int = DEFAULT_MAX_LENGTH,
+        max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ):
+        """
+        Args:
+            model: Model with ``predict(pairs, batch_size=...)`` (CrossEncoder),
+                or a registry ModelHandle resolved on each use
+            model_name: Part of the cache key
+            batch_size: Upper bound on pairs per forward pass
+            max_length: Token limit per pair (used for the length estimate)
+            max_batch_tokens: Upper bound on padded tokens per forward pass
+            cache_size: Number of cached pair scores (0 disables the cache)
+        """
+        self._model = model
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.max_length = max_length
+        self.max_batch_tokens = max(max_batch_tokens, max_length)
+        self.cache_size = cache_size
+
+        self._cache: "OrderedDict[CacheKey, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "batches": 0}
+
+    @property
+    def model(self) -> Any:
+        """The loaded model (loads it through the registry when needed)"""
+        return self._model.get() if isinstance(self._model, ModelHandle) else self._model
+
+    def estimate_tokens(self, query: str, text: str) -> int:
+        """Approximate token length of a pair, capped at max_length"""
+        estimate = (len(query) + len(text)) // CHARS_PER_TOKEN + SPECIAL_TOKENS
+        return min(estimate, self.max_length)
+
+    def plan_batches(self, pairs: Sequence[Tuple[str, str]]) -> List[List[int]]:
+        """
+        Group pair indices into batches of similar length.
+
+        Indices are sorted by estimated length; a batch is closed when it
+        reaches ``batch_size`` pairs or when padding every pair to the
+        longest one would exceed ``max_batch_tokens``.
+        """
+        lengths = [self.estimate_tokens(query, text) for query, text in pairs]
+        order = sorted(range(len(pairs)), key=lambda i: lengths[i])
+
+        batches: List[List[int]] = []
+        current: List[int] = []
+        for index in order:
+            # Sorted ascending: the newest pair is the longest in the batch
+            padded = lengths[index] * (len(current) + 1)
+            if current and (len(current) >= self.batch_size or padded > self.max_batch_tokens):
+                batches.append(current)
+                current = []
+            current.append(index)
+        if current:
+            batches.append(current)
+        return batches
+
+    def predict_pairs(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        """Score pairs without the cache (length-sorted dynamic batches)"""
+        scores: List[float] = [0.0] * len(pairs)
+        # Registry models are protected from eviction while the batches run
+        acquire = self._model.in_use() if isinstance(self._model, ModelHandle) else nullcontext(self._model)
+        with acquire as model:
+            for batch in self.plan_batches(pairs):
+                batch_scores = model.predict(
+                    [pairs[i] for i in batch], batch_size=len(batch), show_progress_bar=False
+                )
+                for index, score in zip(batch, batch_scores):
+                    scores[index] = float(score)
+                with self._lock:
+                    self._stats["batches"] += 1
+        return scores
+
+    def score(
+        self,
+        query: str,
+        texts: Sequence[str],
+        doc_ids: Optional[Sequence[Optional[str]]] = None,
+    ) -> List[float]:
+        """
+        Relevance scores of ``texts`` for ``query``, in input order.
+
+        Args:
+            query: User query
+            texts: Document/chunk texts
+            doc_ids: Optional chunk ids (same length as texts); content is
+                hashed for documents without an id
+
+        Raises:
+            Whatever the model raises; callers keep their own fallbacks.
+        """
+        if not texts:
+            return []
+
+        q_hash = query_hash(query)
+        keys = [
+            (self.model_name, q_hash, document_key(text, doc_ids[i] if doc_ids else None))
+            for i, text in enumerate(texts)
+        ]
+
+        scores: List[Optional[float]] = [None] * len(texts)
+        missing: Dict[CacheKey, List[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key) if self.cache_size else None
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    scores[i] = cached
+                else:
+                    # Duplicate chunks inside one request are scored once
+                    missing.setdefault(key, []).append(i)
+            self._stats["hits"] += len(texts) - sum(len(v) for v in missing.values())
+            self._stats["misses"] += len(missing)
+
+        if missing:
+            missing_keys = list(missing)
+            fresh = self.predict_pairs([(query, texts[missing[key][0]]) for key in missing_keys])
+            with self._lock:
+                for key, value in zip(missing_keys, fresh):
+                    for i in missing[key]:
+                        scores[i] = value
+                    if self.cache_size:
+                        self._cache[key] = value
+                        self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return scores  # type: ignore[return-value]
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "model_name": self.model_name,
+                "batch_size": self.batch_size,
+                "max_length": self.max_length,
+                "max_batch_tokens": self.max_batch_tokens,
+                "cache_entries": len(self._cache),
+                "cache_size": self.cache_size,
+                "cache_hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                **self._stats,
+            }
+
+
+_scorers: Dict[Tuple[str, int, bool], CrossEncoderScorer] = {}
+_scorers_lock = threading.Lock()
+
+
+def get_cross_encoder_scorer(
+    model_name: str,
+    max_length: int = DEFAULT_MAX_LENGTH,
+    quantize: bool = DEFAULT_QUANTIZE,
+    **scorer_kwargs,
+) -> CrossEncoderScorer:
+    """
+    Process-wide scorer for ``model_name``.
+
+    The model is loaded through the model registry on first use; accessing
+    ``scorer.model`` raises ImportError / OSError when sentence-transformers
+    or the model is unavailable (ReRanker and RetrievalEvaluator check this
+    at construction and treat it as "not loaded").
+    """
+    key = (model_name, max_length, quantize)
+    with _scorers_lock:
+        scorer = _scorers.get(key)
+        if scorer is None:
+            def load():
+                from sentence_transformers import CrossEncoder
+
+                model = CrossEncoder(model_name, max_length=max_length)
+                if quantize:
+                    quantize_for_cpu(model)
+                return model
+
+            registry_key = f"cross-encoder:{model_name}:{max_length}:{'int8' if quantize else 'fp32'}"
+            handle = get_model_registry().handle(registry_key, load, ESTIMATED_MODEL_MB)
+            scorer = CrossEncoderScorer(handle, model_name, max_length=max_length, **scorer_kwargs)
+            _scorers[key] = scorer
+        return scorer
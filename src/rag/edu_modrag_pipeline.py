@@ -11,10 +11,18 @@ the most appropriate RAG strategy based on query analysis. It integrates:
 
 Based on: "Eğitimde Kişiselleştirilmiş ve Güvenilir Bilgi Erişimi için
 Retrieval-Augmented Generation (RAG) Sistemlerinin Potansiyeli ve Optimizasyonu"
+
+Speculative mode (``speculative_execution`` config or ``execute(speculative=True)``)
+runs the routed chain and the cheap Stuff chain in parallel and returns the
+first result whose confidence reaches ``speculative_quality_threshold``; if
+neither does, the routed chain's answer is used. The other chain is not
+interrupted, its result is discarded.
 """
 
+import threading
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
@@ -25,6 +33,26 @@ from src.analytics.performance_tracker import PerformanceTracker, PerformanceMet
 from src.utils.logger import get_logger
 from src.utils.cache import get_cache
 
+SPECULATIVE_FALLBACK_CHAIN = "stuff"
+DEFAULT_SPECULATIVE_THRESHOLD = 0.6
+
+# Chain-level pool for speculative runs; chains themselves only submit leaf
+# calls to the step pool in rag_chains, so the two pools cannot deadlock.
+_speculation_executor: Optional[ThreadPoolExecutor] = None
+_speculation_executor_lock = threading.Lock()
+
+
+def _get_speculation_executor(max_workers: int) -> ThreadPoolExecutor:
+    global _speculation_executor
+    if _speculation_executor is None:
+        with _speculation_executor_lock:
+            if _speculation_executor is None:
+                _speculation_executor = ThreadPoolExecutor(
+                    max_workers=max(2, int(max_workers)), thread_name_prefix="rag-speculative"
+                )
+    return _speculation_executor
+
+
 @dataclass
 class SourceAttribution:
     """
@@ -79,6 +107,14 @@ class EduModRAGPipeline:
         # Initialize core components
         self.query_router = QueryRouter(config)
         self.chain_instances = {}  # Cache for chain instances
+        self._chain_lock = threading.Lock()
+        self._analytics_lock = threading.Lock()
+        
+        # Speculative execution (routed chain vs. cheap fallback in parallel)
+        self.speculative_execution = config.get("speculative_execution", False)
+        self.speculative_quality_threshold = config.get(
+            "speculative_quality_threshold", DEFAULT_SPECULATIVE_THRESHOLD
+        )
         
         # Initialize performance tracker
         self.performance_tracker = PerformanceTracker(config)
@@ -100,7 +136,8 @@ class EduModRAGPipeline:
         
         self.logger.info("Edu-ModRAG pipeline initialized successfully")
     
-    def execute(self, query: str, top_k: int = None, force_chain: str = None) -> EduModRAGResponse:
+    def execute(self, query: str, top_k: int = None, force_chain: str = None,
+                speculative: Optional[bool] = None) -> EduModRAGResponse:
         """
         Execute the complete Edu-ModRAG pipeline for a given query.
         
@@ -108,6 +145,8 @@ class EduModRAGPipeline:
             query: User's question/query
             top_k: Number of documents to retrieve (auto-selected if None)
             force_chain: Force specific chain for testing (overrides routing)
+            speculative: Race the routed chain against the Stuff chain
+                (defaults to the ``speculative_execution`` config)
             
         Returns:
             EduModRAGResponse containing comprehensive results
@@ -116,7 +155,8 @@ class EduModRAGPipeline:
         query_id = str(uuid.uuid4())
         timestamp = datetime.now().isoformat()
         
-        self.performance_analytics["total_queries"] += 1
+        with self._analytics_lock:
+            self.performance_analytics["total_queries"] += 1
         
         self.logger.info(f"Executing Edu-ModRAG pipeline for query_id: {query_id}")
         
@@ -139,13 +179,21 @@ class EduModRAGPipeline:
             if top_k is None:
                 top_k = self._get_optimal_top_k(selected_chain_type, query_analysis)
             
-            # Step 4: Execute Selected Chain
-            chain_response = self._execute_chain(
-                selected_chain_type,
-                query,
-                top_k,
-                query_analysis
-            )
+            # Step 4: Execute Selected Chain (optionally raced against the fallback chain)
+            if speculative is None:
+                speculative = self.speculative_execution
+            if speculative and not force_chain and selected_chain_type != SPECULATIVE_FALLBACK_CHAIN:
+                chain_response = self._execute_speculative(
+                    selected_chain_type, query, top_k, query_analysis
+                )
+                selected_chain_type = chain_response.get("chain_type", selected_chain_type)
+            else:
+                chain_response = self._execute_chain(
+                    selected_chain_type,
+                    query,
+                    top_k,
+                    query_analysis
+                )
             
             # Step 5: Generate Source Attributions
             source_attributions = self._generate_source_attributions(
@@ -265,13 +313,7 @@ class EduModRAGPipeline:
         Returns:
             Chain execution results
         """
-        # Get or create chain instance (caching for performance)
-        if chain_type not in self.chain_instances:
-            self.chain_instances[chain_type] = RAGChainFactory.create_chain(
-                chain_type, self.config, self.chroma_store
-            )
-        
-        chain = self.chain_instances[chain_type]
+        chain = self._get_chain(chain_type)
         
         # Execute the chain
         self.logger.info(f"Executing {chain_type} chain with top_k={top_k}")
@@ -283,6 +325,78 @@ class EduModRAGPipeline:
         
         return result
     
+    def _get_chain(self, chain_type: str) -> BaseRAGChain:
+        """Get or create chain instance (caching for performance, safe across threads)"""
+        chain = self.chain_instances.get(chain_type)
+        if chain is None:
+            with self._chain_lock:
+                chain = self.chain_instances.get(chain_type)
+                if chain is None:
+                    chain = RAGChainFactory.create_chain(chain_type, self.config, self.chroma_store)
+                    self.chain_instances[chain_type] = chain
+        return chain
+    
+    def _execute_speculative(self, chain_type: str, query: str, top_k: int,
+                             query_analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run the routed chain and the fallback chain in parallel.
+        
+        Returns the first result meeting the quality threshold, otherwise the
+        routed chain's result (the fallback's if the routed chain failed).
+        The result gets a ``speculation`` entry with per-candidate timings.
+        """
+        fallback_type = SPECULATIVE_FALLBACK_CHAIN
+        executor = _get_speculation_executor(self.config.get("speculative_max_workers", 4))
+        started = time.time()
+        futures = {
+            executor.submit(self._execute_chain, chain_type, query, top_k, query_analysis): chain_type,
+            executor.submit(
+                self._execute_chain, fallback_type, query,
+                self._get_optimal_top_k(fallback_type, query_analysis), query_analysis
+            ): fallback_type,
+        }
+        
+        results: Dict[str, Dict[str, Any]] = {}
+        candidates: Dict[str, Dict[str, Any]] = {}
+        winner = None
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"answer": "", "sources": [], "chain_type": name, "error": str(e)}
+            confidence = self._calculate_overall_confidence(result)
+            results[name] = result
+            candidates[name] = {
+                "finished_after": round(time.time() - started, 4),
+                "confidence": round(confidence, 3),
+                "error": result.get("error"),
+            }
+            if "error" not in result and result.get("sources") and confidence >= self.speculative_quality_threshold:
+                winner = name
+                break
+        
+        if winner is None:
+            winner = chain_type if "error" not in results.get(chain_type, {"error": True}) else fallback_type
+            if winner not in results:
+                winner = next(iter(results))
+        
+        self.logger.info(
+            f"Speculative execution: {winner} chain selected after {time.time() - started:.2f}s "
+            f"(routed: {chain_type}, fallback: {fallback_type})"
+        )
+        
+        response = results[winner]
+        response["speculation"] = {
+            "routed_chain": chain_type,
+            "fallback_chain": fallback_type,
+            "winner": winner,
+            "quality_threshold": self.speculative_quality_threshold,
+            "candidates": candidates,
+            "still_running": [name for future, name in futures.items() if not future.done()],
+        }
+        return response
+    
     def _get_optimal_top_k(self, chain_type: str, query_analysis: Dict[str, Any]) -> int:
         """
         Determine optimal top_k based on chain type and query characteristics.
@@ -432,7 +546,9 @@ class EduModRAGPipeline:
                 "Kaynak belgeleri doğrudan kontrol edin",
                 "Güncel kaynaklarla çapraz kontrol yapın",
                 "Farklı bakış açıları için ek kaynaklar araştırın"
-            ]
+            ],
+            "step_timings": chain_response.get("step_timings", {}),
+            "speculation": chain_response.get("speculation")
         }
     
     def _get_alternative_chains(self, query_analysis: Dict[str, Any]) -> List[str]:
@@ -580,44 +696,49 @@ class EduModRAGPipeline:
             success: Whether execution was successful
         """
         try:
-            # Update chain performance
-            if chain_type in self.performance_analytics["chain_performance"]:
-                chain_stats = self.performance_analytics["chain_performance"][chain_type]
-                chain_stats["count"] += 1
-                
-                if success and performance_metrics:
-                    chain_time = performance_metrics.get("chain_execution_time", 0.0)
-                    chain_stats["total_time"] += chain_time
-                    chain_stats["avg_time"] = chain_stats["total_time"] / chain_stats["count"]
-                    
-                    # Update success rate
-                    current_successes = chain_stats["count"] * chain_stats["success_rate"]
-                    if success:
-                        current_successes += 1
-                    chain_stats["success_rate"] = current_successes / chain_stats["count"]
-            
-            # Update query type performance
-            query_type = query_analysis.get("query_type")
-            if query_type and query_type.value in self.performance_analytics["query_type_performance"]:
-                type_stats = self.performance_analytics["query_type_performance"][query_type.value]
-                type_stats["count"] += 1
-                
-                if success and performance_metrics:
-                    total_time = performance_metrics.get("total_execution_time", 0.0)
-                    if type_stats["avg_time"] == 0:
-                        type_stats["avg_time"] = total_time
-                    else:
-                        type_stats["avg_time"] = (
-                            (type_stats["avg_time"] * (type_stats["count"] - 1) + total_time) 
-                            / type_stats["count"]
-                        )
-            
-            # Identify optimization opportunities
-            self._identify_optimization_opportunities(performance_metrics)
-            
+            with self._analytics_lock:
+                self._update_analytics_locked(chain_type, query_analysis, performance_metrics, success)
         except Exception as e:
             self.logger.warning(f"Failed to update analytics: {e}")
     
+    def _update_analytics_locked(self, chain_type: str, query_analysis: Dict[str, Any],
+                                 performance_metrics: Dict[str, Any], success: bool):
+        """_update_analytics body; caller holds _analytics_lock (worker threads share the dicts)"""
+        # Update chain performance
+        if chain_type in self.performance_analytics["chain_performance"]:
+            chain_stats = self.performance_analytics["chain_performance"][chain_type]
+            chain_stats["count"] += 1
+            
+            if success and performance_metrics:
+                chain_time = performance_metrics.get("chain_execution_time", 0.0)
+                chain_stats["total_time"] += chain_time
+                chain_stats["avg_time"] = chain_stats["total_time"] / chain_stats["count"]
+                
+                # Update success rate
+                current_successes = chain_stats["count"] * chain_stats["success_rate"]
+                if success:
+                    current_successes += 1
+                chain_stats["success_rate"] = current_successes / chain_stats["count"]
+        
+        # Update query type performance
+        query_type = query_analysis.get("query_type")
+        if query_type and query_type.value in self.performance_analytics["query_type_performance"]:
+            type_stats = self.performance_analytics["query_type_performance"][query_type.value]
+            type_stats["count"] += 1
+            
+            if success and performance_metrics:
+                total_time = performance_metrics.get("total_execution_time", 0.0)
+                if type_stats["avg_time"] == 0:
+                    type_stats["avg_time"] = total_time
+                else:
+                    type_stats["avg_time"] = (
+                        (type_stats["avg_time"] * (type_stats["count"] - 1) + total_time) 
+                        / type_stats["count"]
+                    )
+        
+        # Identify optimization opportunities
+        self._identify_optimization_opportunities(performance_metrics)
+    
     def _identify_optimization_opportunities(self, performance_metrics: Dict[str, Any]):
         """
         Identify potential optimization opportunities based on performance data.
@@ -14,6 +14,8 @@ from typing import Dict, Any, List, Optional
 from enum import Enum
 import ollama
 from src.utils.logger import get_logger
+from src.utils.rule_sets import compile_word_rules
+from src.utils.turkish_text import analyze, ascii_fold, normalize_text
 from src.embedding.embedding_generator import generate_embeddings
 
 class QueryType(Enum):
@@ -43,11 +45,34 @@ class RAGChainType(Enum):
     REFINE = "refine"         # Iterative refinement
     MAP_REDUCE = "map_reduce" # Multi-document summarization
 
+# Enum members are not ordered; chain selection compares these ranks
+_COMPLEXITY_RANK = {QueryComplexity.LOW: 0, QueryComplexity.MEDIUM: 1, QueryComplexity.HIGH: 2}
+
+# Specific complexity indicators (each adds 1 to the complexity score)
+HIGH_COMPLEXITY_INDICATORS = [
+    r'\b(detaylı|comprehensive|extensive|thorough)\b',
+    r'\b(birden.+fazla|multiple|several|various)\b',
+    r'\b(analiz|analysis|evaluate|değerlendir)\b',
+    r'\b(karşılaştır.+özetle|compare.+summarize)\b'
+]
+CODE_KEYWORDS_PATTERN = r'\b(python|r|sql|kod|code|function|def)\b'
+_NUMBER_RE = re.compile(r'\d')
+
+
 class QueryRouter:
     """
     Intelligent query router that analyzes queries and selects optimal RAG chains.
+    
+    All classification patterns (query types, complexity indicators, code
+    keywords) are compiled into one rule set (utils/rule_sets.py) and
+    evaluated in a single pass per query; the per-rule counts are identical
+    to calling ``re.findall`` per pattern.
     """
     
+    # Language indicator words, ASCII folded like the query tokens ("için" -> "icin")
+    _TURKISH_INDICATORS = frozenset({'nedir', 'nasil', 'neden', 'hangi', 'icin', 'ile', 've', 'bir', 'bu'})
+    _ENGLISH_INDICATORS = frozenset({'what', 'how', 'why', 'which', 'for', 'with', 'and', 'the', 'is'})
+    
     def __init__(self, config: Dict[str, Any]):
         """
         Initialize the Query Router.
@@ -101,6 +126,20 @@ class QueryRouter:
                 r'\b(mantık|logic|principle|ilke)\b',
             ]
         }
+        
+        rules = [
+            (f"{query_type.value}:{i}", pattern)
+            for query_type, patterns in self.patterns.items()
+            for i, pattern in enumerate(patterns)
+        ]
+        rules += [(f"complexity:{i}", pattern) for i, pattern in enumerate(HIGH_COMPLEXITY_INDICATORS)]
+        rules.append(("code_keywords", CODE_KEYWORDS_PATTERN))
+        # Shared by every router instance with the same patterns
+        self._rule_set = compile_word_rules(tuple(rules), re.IGNORECASE)
+    
+    def _rule_counts(self, query: str) -> Dict[str, int]:
+        """Match count of every classification rule, one pass over the query"""
+        return self._rule_set.counts(query)
     
     def classify_query(self, query: str) -> Dict[str, Any]:
         """
@@ -112,19 +151,22 @@ class QueryRouter:
         Returns:
             Dict containing classification results
         """
-        query_clean = query.lower().strip()
+        query_clean = normalize_text(query)
+        
+        # All pattern rules, evaluated once
+        counts = self._rule_counts(query_clean)
         
         # Detect query type using patterns
-        query_type = self._detect_query_type(query_clean)
+        query_type = self._detect_query_type(query_clean, counts)
         
         # Determine complexity based on query characteristics
-        complexity = self._assess_complexity(query_clean, query_type)
+        complexity = self._assess_complexity(query_clean, query_type, counts)
         
         # Select appropriate RAG chain
         recommended_chain = self._select_rag_chain(query_type, complexity)
         
         # Extract additional features
-        features = self._extract_features(query_clean)
+        features = self._extract_features(query_clean, counts)
         
         classification = {
             "query_type": query_type,
@@ -146,22 +188,23 @@ class QueryRouter:
         
         return classification
     
-    def _detect_query_type(self, query: str) -> QueryType:
+    def _detect_query_type(self, query: str, counts: Optional[Dict[str, int]] = None) -> QueryType:
         """
         Detect query type using pattern matching.
         
         Args:
             query: Preprocessed query string
+            counts: Rule counts from ``_rule_counts`` (computed if omitted)
             
         Returns:
             Detected QueryType
         """
+        counts = counts if counts is not None else self._rule_counts(query)
         type_scores = {qtype: 0 for qtype in QueryType}
         
         for query_type, patterns in self.patterns.items():
-            for pattern in patterns:
-                matches = re.findall(pattern, query, re.IGNORECASE)
-                type_scores[query_type] += len(matches)
+            for i in range(len(patterns)):
+                type_scores[query_type] += counts[f"{query_type.value}:{i}"]
         
         # Find the type with highest score
         max_score = max(type_scores.values())
@@ -172,17 +215,20 @@ class QueryRouter:
         
         return QueryType.UNKNOWN
     
-    def _assess_complexity(self, query: str, query_type: QueryType) -> QueryComplexity:
+    def _assess_complexity(self, query: str, query_type: QueryType,
+                           counts: Optional[Dict[str, int]] = None) -> QueryComplexity:
         """
         Assess query complexity based on multiple factors.
         
         Args:
             query: Preprocessed query string
             query_type: Detected query type
+            counts: Rule counts from ``_rule_counts`` (computed if omitted)
             
         Returns:
             QueryComplexity level
         """
+        counts = counts if counts is not None else self._rule_counts(query)
         complexity_score = 0
         
         # Length-based scoring
@@ -204,15 +250,8 @@ class QueryRouter:
         complexity_score += type_complexity.get(query_type, 1)
         
         # Specific complexity indicators
-        high_complexity_indicators = [
-            r'\b(detaylı|comprehensive|extensive|thorough)\b',
-            r'\b(birden.+fazla|multiple|several|various)\b',
-            r'\b(analiz|analysis|evaluate|değerlendir)\b',
-            r'\b(karşılaştır.+özetle|compare.+summarize)\b'
-        ]
-        
-        for indicator in high_complexity_indicators:
-            if re.search(indicator, query, re.IGNORECASE):
+        for i in range(len(HIGH_COMPLEXITY_INDICATORS)):
+            if counts[f"complexity:{i}"]:
                 complexity_score += 1
         
         # Map score to complexity level
@@ -244,12 +283,14 @@ class QueryRouter:
         if complexity == QueryComplexity.HIGH:
             return RAGChainType.REFINE
         
+        at_least_medium = _COMPLEXITY_RANK[complexity] >= _COMPLEXITY_RANK[QueryComplexity.MEDIUM]
+        
         # Applied/procedural queries benefit from refinement
-        if query_type == QueryType.APPLIED_PROCEDURAL and complexity >= QueryComplexity.MEDIUM:
+        if query_type == QueryType.APPLIED_PROCEDURAL and at_least_medium:
             return RAGChainType.REFINE
         
         # Comparative queries with medium+ complexity use refinement
-        if query_type == QueryType.COMPARATIVE and complexity >= QueryComplexity.MEDIUM:
+        if query_type == QueryType.COMPARATIVE and at_least_medium:
             return RAGChainType.REFINE
         
         # Simple factual queries use fast Stuff chain
@@ -264,22 +305,24 @@ class QueryRouter:
         else:
             return RAGChainType.MAP_REDUCE
     
-    def _extract_features(self, query: str) -> Dict[str, Any]:
+    def _extract_features(self, query: str, counts: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         """
         Extract additional features from the query.
         
         Args:
             query: Preprocessed query string
+            counts: Rule counts from ``_rule_counts`` (computed if omitted)
             
         Returns:
             Dictionary of extracted features
         """
+        counts = counts if counts is not None else self._rule_counts(query)
         features = {
             "word_count": len(query.split()),
             "char_count": len(query),
             "has_question_mark": "?" in query,
-            "has_numbers": bool(re.search(r'\d', query)),
-            "has_code_keywords": bool(re.search(r'\b(python|r|sql|kod|code|function|def)\b', query, re.IGNORECASE)),
+            "has_numbers": bool(_NUMBER_RE.search(query)),
+            "has_code_keywords": bool(counts["code_keywords"]),
             "language": self._detect_language(query),
             "confidence": 0.8  # Default confidence, could be improved with ML models
         }
@@ -296,12 +339,10 @@ class QueryRouter:
         Returns:
             Detected language code
         """
-        # Simple Turkish language detection
-        turkish_indicators = ['nedir', 'nasıl', 'neden', 'hangi', 'için', 'ile', 've', 'bir', 'bu']
-        english_indicators = ['what', 'how', 'why', 'which', 'for', 'with', 'and', 'the', 'is']
-        
-        turkish_score = sum(1 for word in turkish_indicators if word in query.lower())
-        english_score = sum(1 for word in english_indicators if word in query.lower())
+        # Simple Turkish language detection (whole words: "ve" no longer matches "every")
+        words = {ascii_fold(token) for token in analyze(query).tokens}
+        turkish_score = len(words & self._TURKISH_INDICATORS)
+        english_score = len(words & self._ENGLISH_INDICATORS)
         
         if turkish_score > english_score:
             return "tr"
@@ -8,12 +8,20 @@ This module implements different RAG chain strategies:
 
 Features Re-ranking for improved document relevance scoring.
 
+Independent sub-steps (per-query vector searches, Map step summaries, Refine
+context pre-fetch) run on one bounded, process-wide thread pool
+(``chain_max_workers``, default 4). Only leaf calls are submitted to it, so a
+step never waits on another queued step. Every chain result carries
+``step_timings`` (seconds per step).
+
 Based on research findings from "Şakar & Emekci (2024)" and "Gao et al. (2024)"
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, Iterable, List, Optional, Union
+import threading
 import time
+from contextlib import contextmanager
 import ollama
 from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from src.utils.logger import get_logger
@@ -21,9 +29,37 @@ from src.config import is_cloud_environment
 from src.vector_store.chroma_store import ChromaVectorStore
 from src.embedding.embedding_generator import generate_embeddings
 from src.utils.prompt_templates import BilingualPromptManager
-from src.utils.language_detector import detect_language
+from src.utils.language_detector import detect_query_language as detect_language
 # from src.rag.re_ranker import ReRanker  # DISABLED: Using reranker-service instead
 
+DEFAULT_CHAIN_MAX_WORKERS = 4
+
+_step_executor: Optional[ThreadPoolExecutor] = None
+_step_executor_lock = threading.Lock()
+
+
+def get_step_executor(max_workers: int = DEFAULT_CHAIN_MAX_WORKERS) -> ThreadPoolExecutor:
+    """Bounded pool shared by all chains of this process (created on first use)"""
+    global _step_executor
+    if _step_executor is None:
+        with _step_executor_lock:
+            if _step_executor is None:
+                _step_executor = ThreadPoolExecutor(
+                    max_workers=max(1, int(max_workers)), thread_name_prefix="rag-chain-step"
+                )
+    return _step_executor
+
+
+@contextmanager
+def timed_step(timings: Dict[str, float], name: str):
+    """Record the duration of a chain step into ``timings``"""
+    start = time.time()
+    try:
+        yield
+    finally:
+        timings[name] = round(time.time() - start, 4)
+
+
 class BaseRAGChain(ABC):
     """
     Abstract base class for all RAG chain implementations.
@@ -53,7 +89,8 @@ class BaseRAGChain(ABC):
         self.reranker = None
         self.logger.info("Local re-ranker disabled - using reranker-service instead")
         
-        # Performance tracking
+        # Performance tracking (cached chain instances are shared across request threads)
+        self._stats_lock = threading.Lock()
         self.performance_stats = {
             "total_queries": 0,
             "total_time": 0.0,
@@ -92,17 +129,35 @@ class BaseRAGChain(ABC):
         """
         pass
     
-    def _retrieve_documents(self, queries: List[str], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+    def _map_concurrently(self, fn: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+        """
+        Run ``fn`` over independent items on the shared step pool.
+        
+        Results keep the input order. ``fn`` must be a leaf call (vector search,
+        LLM request) that does not submit to the pool itself.
+        """
+        items = list(items)
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        executor = get_step_executor(self.config.get("chain_max_workers", DEFAULT_CHAIN_MAX_WORKERS))
+        return list(executor.map(fn, items))
+    
+    def _retrieve_documents(self, queries: Union[str, List[str]], top_k: int = 5) -> List[Dict[str, Any]]:
         """
         Retrieve relevant documents from vector store with optional re-ranking.
         
+        Multi-query retrieval: queries are embedded in one batch and searched
+        concurrently; hits are merged by text, keeping the best score.
+        
         Args:
-            queries: List of user queries
+            queries: User query or list of query variants
             top_k: Number of documents to retrieve
             
         Returns:
-            List of lists of retrieved documents with metadata, potentially re-ranked
+            Retrieved documents with metadata (best score first), potentially re-ranked
         """
+        if isinstance(queries, str):
+            queries = [queries]
         try:
             # Get batch size from config or use default of 25
             batch_size = self.config.get("model_config", {}).get("embedding_batch_size", 25)
@@ -128,16 +183,24 @@ class BaseRAGChain(ABC):
             else:
                 initial_k = top_k
             
-            search_results = []
-            for query_embedding in query_embeddings:
-                search_result = self.chroma_store.search(query_embedding, initial_k)
-                search_results.append(search_result)
+            search_results = self._map_concurrently(
+                lambda query_embedding: self.chroma_store.search(query_embedding, initial_k) or [],
+                query_embeddings
+            )
+            
+            # Merge hits of all queries (same text -> best score)
+            best_hits: Dict[str, tuple] = {}
+            for hits in search_results:
+                for text, score, metadata in hits:
+                    if text not in best_hits or score > best_hits[text][1]:
+                        best_hits[text] = (text, score, metadata)
+            merged_hits = sorted(best_hits.values(), key=lambda hit: hit[1], reverse=True)
             
             # Convert to the format expected by re-ranker
             retrieved_chunks = []
             reranker_input = []
             
-            for text, score, metadata in search_results:
+            for text, score, metadata in merged_hits:
                 retrieved_chunks.append({
                     "text": text,
                     "score": score,
@@ -150,7 +213,7 @@ class BaseRAGChain(ABC):
             if self.use_reranking and self.reranker and len(reranker_input) > top_k:
                 try:
                     self.logger.info(f"Re-ranking {len(reranker_input)} documents")
-                    reranked_results = self.reranker.rerank(query, reranker_input, top_k)
+                    reranked_results = self.reranker.rerank(queries[0], reranker_input, top_k)
                     
                     # Convert back to our format
                     retrieved_chunks = []
@@ -236,6 +299,11 @@ class BaseRAGChain(ABC):
     def _update_performance_stats(self, execution_time: float, success: bool, 
                                 tokens_used: int = 0):
         """Update performance statistics."""
+        with self._stats_lock:
+            self._update_performance_stats_locked(execution_time, success, tokens_used)
+    
+    def _update_performance_stats_locked(self, execution_time: float, success: bool,
+                                         tokens_used: int = 0):
         self.performance_stats["total_queries"] += 1
         self.performance_stats["total_time"] += execution_time
         self.performance_stats["total_tokens"] += tokens_used
@@ -274,17 +342,20 @@ class StuffChain(BaseRAGChain):
             Response dictionary with answer and sources
         """
         start_time = time.time()
+        timings: Dict[str, float] = {}
         self.logger.info(f"Executing Stuff chain for query: '{query}'")
         
         try:
             # Step 1: Retrieve documents
-            documents = self._retrieve_documents(query, top_k)
+            with timed_step(timings, "retrieval"):
+                documents = self._retrieve_documents(query, top_k)
             if not documents:
                 return {
                     "answer": "Bu konuda bilgi bulunamadı.",
                     "sources": [],
                     "chain_type": "stuff",
-                    "execution_time": time.time() - start_time
+                    "execution_time": time.time() - start_time,
+                    "step_timings": timings
                 }
             
             # Step 2: Detect query language and format context properly
@@ -310,7 +381,8 @@ class StuffChain(BaseRAGChain):
             system_prompt = self.prompt_manager.get_system_prompt(query_language, 'rag')
             user_prompt = self.prompt_manager.get_user_prompt(query_language, query, context)
             
-            answer = self._generate_with_ollama(system_prompt, user_prompt, temperature=0.3)
+            with timed_step(timings, "generation"):
+                answer = self._generate_with_ollama(system_prompt, user_prompt, temperature=0.3)
             
             execution_time = time.time() - start_time
             self._update_performance_stats(execution_time, True, len(context.split()))
@@ -322,7 +394,8 @@ class StuffChain(BaseRAGChain):
                 "sources": documents,
                 "chain_type": "stuff",
                 "execution_time": execution_time,
-                "context_length": len(context)
+                "context_length": len(context),
+                "step_timings": timings
             }
             
         except Exception as e:
@@ -335,6 +408,7 @@ class StuffChain(BaseRAGChain):
                 "sources": [],
                 "chain_type": "stuff",
                 "execution_time": execution_time,
+                "step_timings": timings,
                 "error": str(e)
             }
 
@@ -358,17 +432,20 @@ class RefineChain(BaseRAGChain):
             Response dictionary with refined answer and sources
         """
         start_time = time.time()
+        timings: Dict[str, float] = {}
         self.logger.info(f"Executing Refine chain for query: '{query}'")
         
         try:
             # Step 1: Retrieve documents
-            documents = self._retrieve_documents(query, top_k)
+            with timed_step(timings, "retrieval"):
+                documents = self._retrieve_documents(query, top_k)
             if not documents:
                 return {
                     "answer": "Bu konuda bilgi bulunamadı.",
                     "sources": [],
                     "chain_type": "refine",
-                    "execution_time": time.time() - start_time
+                    "execution_time": time.time() - start_time,
+                    "step_timings": timings
                 }
             
             # Step 2: Initial answer from first document using strict prompts
@@ -386,10 +463,26 @@ class RefineChain(BaseRAGChain):
             
             initial_prompt = self.prompt_manager.get_user_prompt(query_language, query, initial_context)
             
-            current_answer = self._generate_with_ollama(
-                system_prompt, initial_prompt, temperature=0.5
+            # Pre-fetch: refinement contexts are formatted on the step pool while
+            # the initial answer is generated (each refinement waits on the previous answer)
+            refine_docs = documents[1:max(1, self.config.get("max_refinement_steps", 4))]
+            executor = get_step_executor(self.config.get("chain_max_workers", DEFAULT_CHAIN_MAX_WORKERS))
+            prefetched_contexts = executor.submit(
+                lambda: [
+                    self.prompt_manager.format_context_with_sources(
+                        query_language, [doc['text']], [doc['metadata']]
+                    )
+                    for doc in refine_docs
+                ]
             )
             
+            with timed_step(timings, "initial_generation"):
+                current_answer = self._generate_with_ollama(
+                    system_prompt, initial_prompt, temperature=0.5
+                )
+            with timed_step(timings, "prefetch_wait"):
+                refine_contexts = prefetched_contexts.result()
+            
             refinement_steps = []
             refinement_steps.append({
                 "step": 1,
@@ -397,16 +490,9 @@ class RefineChain(BaseRAGChain):
                 "answer": current_answer
             })
             
-            # Step 3: Refine answer with remaining documents
-            for i, doc in enumerate(documents[1:], 2):
-                if i > self.config.get("max_refinement_steps", 4):
-                    break  # Limit refinement steps
-                
-                # Format additional context with proper source attribution
-                additional_context = self.prompt_manager.format_context_with_sources(
-                    query_language, [doc['text']], [doc['metadata']]
-                )
-                
+            # Step 3: Refine answer with remaining documents (limited to max_refinement_steps)
+            refine_start = time.time()
+            for i, (doc, additional_context) in enumerate(zip(refine_docs, refine_contexts), 2):
                 refine_prompt_template = (
                     "Mevcut cevap:\n{current_answer}\n\n"
                     "Ek bağlam:\n{additional_context}\n\n"
@@ -442,6 +528,8 @@ class RefineChain(BaseRAGChain):
                         "answer": current_answer
                     })
             
+            timings["refinement"] = round(time.time() - refine_start, 4)
+            
             execution_time = time.time() - start_time
             self._update_performance_stats(
                 execution_time, True, 
@@ -459,7 +547,8 @@ class RefineChain(BaseRAGChain):
                 "chain_type": "refine",
                 "execution_time": execution_time,
                 "refinement_steps": len(refinement_steps),
-                "refinement_details": refinement_steps
+                "refinement_details": refinement_steps,
+                "step_timings": timings
             }
             
         except Exception as e:
@@ -472,6 +561,7 @@ class RefineChain(BaseRAGChain):
                 "sources": [],
                 "chain_type": "refine",
                 "execution_time": execution_time,
+                "step_timings": timings,
                 "error": str(e)
             }
 
@@ -495,17 +585,20 @@ class MapReduceChain(BaseRAGChain):
             Response dictionary with comprehensive analysis
         """
         start_time = time.time()
+        timings: Dict[str, float] = {}
         self.logger.info(f"Executing Map-Reduce chain for query: '{query}'")
         
         try:
             # Step 1: Retrieve documents (more documents for comprehensive analysis)
-            documents = self._retrieve_documents(query, top_k)
+            with timed_step(timings, "retrieval"):
+                documents = self._retrieve_documents(query, top_k)
             if not documents:
                 return {
                     "answer": "Bu konuda bilgi bulunamadı.",
                     "sources": [],
                     "chain_type": "map_reduce",
-                    "execution_time": time.time() - start_time
+                    "execution_time": time.time() - start_time,
+                    "step_timings": timings
                 }
             
             # Step 2: Map phase - Generate individual summaries using strict prompts
@@ -528,7 +621,7 @@ class MapReduceChain(BaseRAGChain):
                 "Create a brief summary. If the document is not relevant, say 'No relevant information'."
             )
             
-            for i, doc in enumerate(documents):
+            def summarize(doc):
                 doc_context = self.prompt_manager.format_context_with_sources(
                     query_language, [doc['text']], [doc['metadata']]
                 )
@@ -538,10 +631,15 @@ class MapReduceChain(BaseRAGChain):
                     query=query
                 )
                 
-                summary = self._generate_with_ollama(
+                return self._generate_with_ollama(
                     system_prompt, map_prompt, temperature=0.3
                 )
-                
+            
+            # Map calls are independent: run them on the bounded step pool
+            with timed_step(timings, "map"):
+                summaries = self._map_concurrently(summarize, documents)
+            
+            for i, (doc, summary) in enumerate(zip(documents, summaries)):
                 if "ilgili bilgi yok" not in summary.lower() and len(summary.strip()) > 10:
                     document_summaries.append({
                         "document_index": i,
@@ -554,7 +652,8 @@ class MapReduceChain(BaseRAGChain):
                     "answer": "Bulunan belgelerde soruyla ilgili bilgi bulunmadı.",
                     "sources": documents,
                     "chain_type": "map_reduce",
-                    "execution_time": time.time() - start_time
+                    "execution_time": time.time() - start_time,
+                    "step_timings": timings
                 }
             
             # Step 3: Reduce phase - Combine summaries into final answer
@@ -582,11 +681,12 @@ class MapReduceChain(BaseRAGChain):
                 query=query
             )
             
-            final_answer = self._generate_with_ollama(
-                system_prompt,
-                reduce_prompt,
-                temperature=0.4
-            )
+            with timed_step(timings, "reduce"):
+                final_answer = self._generate_with_ollama(
+                    system_prompt,
+                    reduce_prompt,
+                    temperature=0.4
+                )
             
             execution_time = time.time() - start_time
             self._update_performance_stats(
@@ -605,7 +705,8 @@ class MapReduceChain(BaseRAGChain):
                 "chain_type": "map_reduce",
                 "execution_time": execution_time,
                 "documents_processed": len(document_summaries),
-                "map_summaries": document_summaries
+                "map_summaries": document_summaries,
+                "step_timings": timings
             }
             
         except Exception as e:
@@ -618,6 +719,7 @@ class MapReduceChain(BaseRAGChain):
                 "sources": [],
                 "chain_type": "map_reduce",
                 "execution_time": execution_time,
+                "step_timings": timings,
                 "error": str(e)
             }
 
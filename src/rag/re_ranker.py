@@ -3,11 +3,12 @@ Re-ranking module for improving RAG system performance.
 
 This module implements a Cross-Encoder based re-ranking system that improves
 the quality of retrieved documents by providing more accurate relevance scores.
+Scoring goes through the shared batched/cached layer in cross_encoder_scoring.
 """
 
 import logging
 from typing import List, Tuple, Dict, Any
-from sentence_transformers import CrossEncoder
+from .cross_encoder_scoring import get_cross_encoder_scorer
 from ..utils.helpers import setup_logging
 
 logger = setup_logging()
@@ -22,27 +23,36 @@ class ReRanker:
     2. Re-ranking filters and ranks these documents for better relevance
     """
     
-    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-12-v2"):
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-12-v2", **scorer_options):
         """
         Initialize the ReRanker with a Cross-Encoder model.
         
         Args:
             model_name: Name of the Cross-Encoder model to use for re-ranking.
                        Default is a more robust multilingual model for better Turkish support.
+            scorer_options: max_length, quantize, batch_size, max_batch_tokens,
+                       cache_size (see cross_encoder_scoring.get_cross_encoder_scorer)
         """
         self.model_name = model_name
-        self.model = None
-        self._load_model()
+        self.scorer = None
+        self._load_model(**scorer_options)
     
-    def _load_model(self):
-        """Load the Cross-Encoder model."""
+    @property
+    def model(self):
+        """Shared model from the model registry (reloaded lazily after an eviction)."""
+        return self.scorer.model if self.scorer else None
+    
+    def _load_model(self, **scorer_options):
+        """Load the Cross-Encoder model (shared with other users of the same model)."""
         try:
             logger.info(f"Loading Cross-Encoder model: {self.model_name}")
-            self.model = CrossEncoder(self.model_name)
+            scorer = get_cross_encoder_scorer(self.model_name, **scorer_options)
+            scorer.model  # load now so a missing model is reported here
+            self.scorer = scorer
             logger.info("Cross-Encoder model loaded successfully")
         except Exception as e:
             logger.error(f"Failed to load Cross-Encoder model: {e}")
-            self.model = None
+            self.scorer = None
     
     def rerank(self, query: str, documents: List[Dict[str, Any]], top_k: int = 5) -> List[Dict[str, Any]]:
         """
@@ -56,7 +66,7 @@ class ReRanker:
         Returns:
             List of re-ranked document dictionaries with updated scores, limited to top_k results
         """
-        if not self.model:
+        if not self.scorer:
             logger.warning("Cross-Encoder model not available, returning original ranking")
             return documents[:top_k]
         
@@ -67,12 +77,10 @@ class ReRanker:
         try:
             logger.info(f"Re-ranking {len(documents)} documents for query: '{query[:50]}...'")
             
-            # Prepare query-document pairs for Cross-Encoder
+            # Cached pairs are reused; the rest are scored in length-sorted batches
             doc_texts = [doc.get('text', '') for doc in documents]
-            query_doc_pairs = [[query, doc_text] for doc_text in doc_texts]
-            
-            # Get relevance scores from Cross-Encoder
-            relevance_scores = self.model.predict(query_doc_pairs)
+            doc_ids = [(doc.get('metadata') or {}).get('chunk_id') for doc in documents]
+            relevance_scores = self.scorer.score(query, doc_texts, doc_ids)
             
             # Add new scores to documents
             for i, doc in enumerate(documents):
@@ -103,7 +111,8 @@ class ReRanker:
         """
         return {
             "model_name": self.model_name,
-            "model_loaded": self.model is not None,
+            "model_loaded": self.scorer is not None,
+            "scoring": self.scorer.get_stats() if self.scorer else None,
             "description": "Cross-Encoder model for document re-ranking",
             "purpose": "Improve retrieval quality by providing accurate relevance scores"
         }
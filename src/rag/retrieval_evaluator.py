@@ -4,17 +4,20 @@ Retrieval Quality Evaluator for CRAG (Corrective RAG).
 This module implements a lightweight evaluator that assesses the quality
 of retrieved documents using a cross-encoder model. It helps filter out
 irrelevant documents and reject queries that are not related to the
-document corpus.
+document corpus. Pairs are scored through the shared batched/cached layer
+in cross_encoder_scoring, so ``filter_by_threshold`` right after
+``evaluate_retrieval`` reuses the scores instead of running the model again.
 
 Based on: Corrective Retrieval Augmented Generation (CRAG)
 Paper: https://arxiv.org/abs/2401.15884
 """
 
-from sentence_transformers import CrossEncoder
 import numpy as np
 from typing import List, Dict, Tuple, Optional
 import logging
 
+from .cross_encoder_scoring import get_cross_encoder_scorer
+
 logger = logging.getLogger(__name__)
 
 
@@ -41,7 +44,8 @@ class RetrievalEvaluator:
         model_name: str = 'cross-encoder/ms-marco-MiniLM-L-6-v2',
         correct_threshold: float = 0.7,
         incorrect_threshold: float = 0.3,
-        filter_threshold: float = 0.5
+        filter_threshold: float = 0.5,
+        **scorer_options
     ):
         """
         Initialize the Retrieval Evaluator.
@@ -55,6 +59,8 @@ class RetrievalEvaluator:
             correct_threshold: Avg score above this → 'correct' confidence
             incorrect_threshold: Max score below this → 'incorrect' confidence
             filter_threshold: Filter documents with score below this
+            scorer_options: max_length, quantize, batch_size, max_batch_tokens,
+                cache_size (see cross_encoder_scoring.get_cross_encoder_scorer)
         """
         self.model_name = model_name
         self.correct_threshold = correct_threshold
@@ -63,15 +69,22 @@ class RetrievalEvaluator:
         
         try:
             logger.info(f"Loading retrieval evaluator model: {model_name}")
-            self.model = CrossEncoder(model_name)
+            scorer = get_cross_encoder_scorer(model_name, **scorer_options)
+            scorer.model  # load now so a missing model is reported here
+            self.scorer = scorer
             self.loaded = True
             logger.info("✅ Retrieval evaluator loaded successfully")
         except Exception as e:
             logger.error(f"❌ Failed to load evaluator model: {e}")
             logger.warning("Retrieval evaluation will be disabled")
-            self.model = None
+            self.scorer = None
             self.loaded = False
     
+    @property
+    def model(self):
+        """Shared model from the model registry (reloaded lazily after an eviction)"""
+        return self.scorer.model if self.scorer else None
+    
     def evaluate_retrieval(
         self, 
         query: str, 
@@ -134,12 +147,9 @@ class RetrievalEvaluator:
                 'message': 'No documents retrieved'
             }
         
-        # Prepare query-document pairs for cross-encoder
-        pairs = [(query, doc[0]) for doc in retrieved_docs]
-        
-        # Score all pairs
+        # Score all pairs (cached pairs are reused)
         try:
-            scores = self.model.predict(pairs)
+            scores = self._score(query, retrieved_docs)
         except Exception as e:
             logger.error(f"Error during cross-encoder scoring: {e}")
             # Fallback to accepting if scoring fails
@@ -189,7 +199,7 @@ class RetrievalEvaluator:
         result = {
             'confidence': confidence,
             'action': action,
-            'scores': scores.tolist(),
+            'scores': scores,
             'avg_score': avg_score,
             'max_score': max_score,
             'min_score': min_score,
@@ -238,11 +248,9 @@ class RetrievalEvaluator:
         
         threshold = threshold if threshold is not None else self.filter_threshold
         
-        # Score all documents
-        pairs = [(query, doc[0]) for doc in retrieved_docs]
-        
+        # Score all documents (usually cache hits from evaluate_retrieval)
         try:
-            scores = self.model.predict(pairs)
+            scores = self._score(query, retrieved_docs)
         except Exception as e:
             logger.error(f"Error during filtering: {e}")
             return retrieved_docs  # Return all if scoring fails
@@ -266,6 +274,12 @@ class RetrievalEvaluator:
         
         return filtered
     
+    def _score(self, query: str, retrieved_docs: List[Tuple[str, float, Dict]]) -> List[float]:
+        """Cross-encoder scores in document order"""
+        texts = [doc[0] for doc in retrieved_docs]
+        doc_ids = [(doc[2] or {}).get('chunk_id') if len(doc) > 2 else None for doc in retrieved_docs]
+        return self.scorer.score(query, texts, doc_ids)
+    
     def get_stats(self) -> Dict:
         """
         Get evaluator statistics and configuration.
@@ -277,7 +291,8 @@ class RetrievalEvaluator:
                 'model_name': str,
                 'correct_threshold': float,
                 'incorrect_threshold': float,
-                'filter_threshold': float
+                'filter_threshold': float,
+                'scoring': dict   # batching/cache statistics
             }
         """
         return {
@@ -285,7 +300,8 @@ class RetrievalEvaluator:
             'model_name': self.model_name,
             'correct_threshold': self.correct_threshold,
             'incorrect_threshold': self.incorrect_threshold,
-            'filter_threshold': self.filter_threshold
+            'filter_threshold': self.filter_threshold,
+            'scoring': self.scorer.get_stats() if self.scorer else None
         }
 
 
@@ -12,6 +12,7 @@ Bu modül öğretmenlerin ders oturumlarını veritabanı tabanlı olarak yönet
 """
 
 import os
+import re
 import json
 import sqlite3
 import shutil
@@ -28,6 +29,28 @@ import logging
 # from src.utils.logger import get_logger
 from src.config import config, get_storage_config
 from src.utils.cloud_storage_manager import cloud_storage_manager
+from src.utils.turkish_text import ascii_fold, turkish_lower
+
+
+def normalize_owner_key(value: Any) -> str:
+    """created_by / kullanıcı anahtarı karşılaştırma biçimi (büyük/küçük harf duyarsız)"""
+    return str(value).strip().lower() if value is not None else ""
+
+
+def fold_search_text(text: Optional[str]) -> str:
+    """Oturum araması için Türkçe duyarlı case folding: "Işık", "ışık", "isik" aynı terim"""
+    if not text:
+        return ""
+    return ascii_fold(turkish_lower(text))
+
+
+def _search_document(name, description, tags, notes) -> Tuple[str, str, str, str]:
+    """sessions satırından sessions_fts kolonları (tags ASCII kaçışlı JSON olarak saklanır)"""
+    try:
+        tags = " ".join(str(tag) for tag in json.loads(tags or "[]"))
+    except (TypeError, ValueError):
+        pass
+    return tuple(fold_search_text(value) for value in (name, description, tags, notes))
 
 
 class SessionStatus(Enum):
@@ -236,6 +259,13 @@ class ProfessionalSessionManager:
                     cursor.execute("ALTER TABLE sessions ADD COLUMN student_entry_count INTEGER DEFAULT 0")
                     conn.commit()
                     self.logger.info("Successfully added student_entry_count column")
+                
+                if "owner_key" not in cols:
+                    # Normalized created_by: role filters run in SQL on an index
+                    self.logger.info("Adding missing column: owner_key")
+                    cursor.execute("ALTER TABLE sessions ADD COLUMN owner_key TEXT")
+                    conn.commit()
+                    self.logger.info("Successfully added owner_key column")
                     
                 # Verify columns after migration
                 cursor.execute("PRAGMA table_info(sessions)")
@@ -322,6 +352,9 @@ class ProfessionalSessionManager:
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_category ON sessions (category)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_status ON sessions (status)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions (updated_at)")
+            # Role-aware listing: owner/status predicate + keyset order (updated_at, session_id)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_owner_key_updated ON sessions (owner_key, updated_at, session_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_status_updated ON sessions (status, updated_at, session_id)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_session_activity_session_id ON session_activity (session_id)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_session_activity_timestamp ON session_activity (timestamp)")
 
@@ -335,8 +368,73 @@ class ProfessionalSessionManager:
                 )
             """)
             
+            self._backfill_owner_keys(cursor)
+            self.search_fts_enabled = self._init_search_index(cursor)
+            
             self.logger.info("Professional session management database schema initialized")
     
+    def _backfill_owner_keys(self, cursor):
+        """owner_key boş olan (eski) kayıtları doldur, status değerlerini normalize et"""
+        cursor.execute("SELECT session_id, created_by FROM sessions WHERE owner_key IS NULL")
+        rows = cursor.fetchall()
+        if rows:
+            cursor.executemany(
+                "UPDATE sessions SET owner_key = ? WHERE session_id = ?",
+                [(normalize_owner_key(row[1]), row[0]) for row in rows]
+            )
+            self.logger.info(f"Backfilled owner_key for {len(rows)} sessions")
+        # Status filtresi index üzerinden eşitlikle çalışsın ("Active " -> "active")
+        cursor.execute("""
+            UPDATE sessions SET status = LOWER(TRIM(status))
+            WHERE status IS NOT NULL AND status != LOWER(TRIM(status))
+        """)
+    
+    def _init_search_index(self, cursor) -> bool:
+        """
+        FTS5 arama indeksi (sessions_fts)
+        
+        Metin Python tarafında fold_search_text ile katlanarak yazılır; SQLite
+        LOWER() sadece ASCII karakterleri küçültür. İndeks sessions ile aynı
+        sayıda kayıt içermiyorsa yeniden kurulur.
+        """
+        try:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5(
+                    session_id UNINDEXED, name, description, tags, notes,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            self.logger.warning(f"FTS5 not available, session search falls back to LIKE (non-critical): {e}")
+            return False
+        
+        indexed = cursor.execute("SELECT COUNT(*) FROM sessions_fts").fetchone()[0]
+        total = cursor.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        if indexed != total:
+            cursor.execute("DELETE FROM sessions_fts")
+            cursor.execute("SELECT session_id, name, description, tags, notes FROM sessions")
+            cursor.executemany(
+                "INSERT INTO sessions_fts (session_id, name, description, tags, notes) VALUES (?, ?, ?, ?, ?)",
+                [(row[0], *_search_document(*row[1:])) for row in cursor.fetchall()]
+            )
+            self.logger.info(f"Rebuilt session search index ({total} sessions)")
+        return True
+    
+    def _index_session_search(self, cursor, session_id: str):
+        """Tek oturumun arama kaydını güncelle (oturum yoksa sadece siler)"""
+        if not self.search_fts_enabled:
+            return
+        cursor.execute("DELETE FROM sessions_fts WHERE session_id = ?", (session_id,))
+        cursor.execute(
+            "SELECT name, description, tags, notes FROM sessions WHERE session_id = ?", (session_id,)
+        )
+        row = cursor.fetchone()
+        if row:
+            cursor.execute(
+                "INSERT INTO sessions_fts (session_id, name, description, tags, notes) VALUES (?, ?, ?, ?, ?)",
+                (session_id, *_search_document(*row))
+            )
+    
     def create_session(self, name: str, description: str, category: SessionCategory,
                       created_by: str, grade_level: str = "", subject_area: str = "",
                       learning_objectives: List[str] = None, tags: List[str] = None,
@@ -397,16 +495,18 @@ class ProfessionalSessionManager:
                 INSERT INTO sessions (
                     session_id, name, description, category, status, created_by,
                     created_at, updated_at, last_accessed, grade_level, subject_area,
-                    learning_objectives, tags, is_public, collaborators, rag_settings
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    learning_objectives, tags, is_public, collaborators, rag_settings, owner_key
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 session_id, metadata.name, metadata.description, category.value,
                 metadata.status.value, created_by, now, now, now,
                 grade_level, subject_area,
                 json.dumps(learning_objectives or []),
                 json.dumps(tags or []),
-                is_public, json.dumps(metadata.collaborators or []), json.dumps(metadata.rag_settings or {})
+                is_public, json.dumps(metadata.collaborators or []), json.dumps(metadata.rag_settings or {}),
+                normalize_owner_key(created_by)
             ))
+            self._index_session_search(cursor, session_id)
         
         # Log activity
         self._log_activity(session_id, "created", f"Session '{name}' created", created_by)
@@ -526,6 +626,8 @@ class ProfessionalSessionManager:
             cursor = conn.cursor()
             query = f"UPDATE sessions SET {', '.join(update_fields)} WHERE session_id = ?"
             cursor.execute(query, update_values)
+            if updates.keys() & {'name', 'description', 'tags', 'notes'}:
+                self._index_session_search(cursor, session_id)
         
         # Log activity
         self._log_activity(session_id, "modified", f"Session metadata updated: {', '.join(updates.keys())}")
@@ -571,40 +673,65 @@ class ProfessionalSessionManager:
         
         return True
     
+    _LIST_COLUMNS = """
+        s.session_id, s.name, s.description, s.category, s.status, s.created_by,
+        s.created_at, s.updated_at, s.last_accessed, s.grade_level, s.subject_area,
+        s.learning_objectives, s.tags, s.document_count, s.total_chunks, s.query_count,
+        s.student_entry_count, s.avg_response_time, s.user_rating, s.notes,
+        s.is_public, s.collaborators, s.backup_count,
+        COALESCE(s.rag_settings, '') as rag_settings
+    """
+    
     def list_sessions(self, created_by: Optional[str] = None,
                      category: Optional[SessionCategory] = None,
                      status: Optional[SessionStatus] = None,
-                     limit: int = 50) -> List[SessionMetadata]:
-        """Oturumları listele"""
+                     limit: int = 50,
+                     owner_keys: Optional[List[str]] = None,
+                     before: Optional[Tuple[str, str]] = None) -> List[SessionMetadata]:
+        """
+        Oturumları listele (updated_at DESC, session_id DESC)
+        
+        Args:
+            created_by: Oluşturan kişi (birebir eşleşme)
+            category: Kategori
+            status: Durum
+            limit: Sayfa boyutu
+            owner_keys: Sahip anahtarları (id/username/email), büyük/küçük harf duyarsız
+            before: Keyset sayfalama - önceki sayfanın son (updated_at, session_id) değeri
+        """
+        if owner_keys is not None:
+            owner_keys = sorted({normalize_owner_key(k) for k in owner_keys if normalize_owner_key(k)})
+            if not owner_keys:
+                return []
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            query = """
-                SELECT session_id, name, description, category, status, created_by, 
-                       created_at, updated_at, last_accessed, grade_level, subject_area,
-                       learning_objectives, tags, document_count, total_chunks, query_count,
-                       student_entry_count, avg_response_time, user_rating, notes, 
-                       is_public, collaborators, backup_count,
-                       COALESCE(rag_settings, '') as rag_settings
-                FROM sessions WHERE 1=1
-            """
+            query = f"SELECT {self._LIST_COLUMNS} FROM sessions s WHERE 1=1"
             params = []
             
             if created_by:
-                query += " AND created_by = ?"
+                query += " AND s.created_by = ?"
                 params.append(created_by)
             
+            if owner_keys:
+                query += f" AND s.owner_key IN ({', '.join('?' for _ in owner_keys)})"
+                params.extend(owner_keys)
+            
             if category:
-                query += " AND category = ?"
+                query += " AND s.category = ?"
                 params.append(category.value)
                 
             if status:
-                # Case-insensitive status matching for robustness
-                # Also filter out NULL and empty status values
-                query += " AND status IS NOT NULL AND status != '' AND LOWER(status) = LOWER(?)"
+                # status değerleri şema açılışında normalize edilir (_backfill_owner_keys)
+                query += " AND s.status = ?"
                 params.append(status.value)
             
-            query += " ORDER BY updated_at DESC LIMIT ?"
+            if before:
+                query += " AND (s.updated_at, s.session_id) < (?, ?)"
+                params.extend(before)
+            
+            query += " ORDER BY s.updated_at DESC, s.session_id DESC LIMIT ?"
             params.append(limit)
             
             cursor.execute(query, params)
@@ -616,28 +743,52 @@ class ProfessionalSessionManager:
             
             return [self._row_to_metadata(row_dict) for row_dict in row_dicts]
     
-    def search_sessions(self, query: str, created_by: Optional[str] = None) -> List[SessionMetadata]:
-        """Oturumlarda arama yap"""
+    def search_sessions(self, query: str, created_by: Optional[str] = None,
+                        owner_keys: Optional[List[str]] = None,
+                        limit: int = 20) -> List[SessionMetadata]:
+        """
+        Oturumlarda arama yap (FTS5, Türkçe duyarlı case folding)
+        
+        Her kelime önek olarak aranır ("mat" -> "Matematik"); sonuçlar bm25
+        skoruna göre sıralanır. FTS5 yoksa eski LIKE aramasına düşer.
+        """
+        terms = re.findall(r"\w+", fold_search_text(query))
+        if not terms:
+            return []
+        if owner_keys is not None:
+            owner_keys = sorted({normalize_owner_key(k) for k in owner_keys if normalize_owner_key(k)})
+            if not owner_keys:
+                return []
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            search_query = """
-                SELECT session_id, name, description, category, status, created_by, 
-                       created_at, updated_at, last_accessed, grade_level, subject_area,
-                       learning_objectives, tags, document_count, total_chunks, query_count,
-                       student_entry_count, avg_response_time, user_rating, notes, 
-                       is_public, collaborators, backup_count,
-                       COALESCE(rag_settings, '') as rag_settings
-                FROM sessions 
-                WHERE (name LIKE ? OR description LIKE ? OR tags LIKE ? OR notes LIKE ?)
-            """
-            params = [f"%{query}%", f"%{query}%", f"%{query}%", f"%{query}%"]
+            if self.search_fts_enabled:
+                search_query = f"""
+                    SELECT {self._LIST_COLUMNS}
+                    FROM sessions_fts f JOIN sessions s ON s.session_id = f.session_id
+                    WHERE sessions_fts MATCH ?
+                """
+                params = [" ".join(f'"{term}"*' for term in terms)]
+            else:
+                search_query = f"""
+                    SELECT {self._LIST_COLUMNS}
+                    FROM sessions s
+                    WHERE (s.name LIKE ? OR s.description LIKE ? OR s.tags LIKE ? OR s.notes LIKE ?)
+                """
+                params = [f"%{query}%", f"%{query}%", f"%{query}%", f"%{query}%"]
             
             if created_by:
-                search_query += " AND created_by = ?"
+                search_query += " AND s.created_by = ?"
                 params.append(created_by)
             
-            search_query += " ORDER BY updated_at DESC LIMIT 20"
+            if owner_keys:
+                search_query += f" AND s.owner_key IN ({', '.join('?' for _ in owner_keys)})"
+                params.extend(owner_keys)
+            
+            order = "f.rank, s.updated_at DESC" if self.search_fts_enabled else "s.updated_at DESC"
+            search_query += f" ORDER BY {order} LIMIT ?"
+            params.append(limit)
             
             cursor.execute(search_query, params)
             rows = cursor.fetchall()
@@ -762,6 +913,7 @@ class ProfessionalSessionManager:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                self._index_session_search(cursor, session_id)
             
             # Log activity (before deletion for record keeping)
             self._log_activity(
@@ -1136,6 +1288,24 @@ class ProfessionalSessionManager:
             self.logger.error(f"Failed to track student entry for session {session_id}: {e}")
             return False
     
+    @property
+    def usage_counter(self):
+        """Coalesced query/student entry counters of this manager (created on first use)"""
+        counter = getattr(self, "_usage_counter", None)
+        if counter is None:
+            from src.services.session_usage import SessionUsageCounter
+            counter = self._usage_counter = SessionUsageCounter(self)
+        return counter
+    
+    def record_query(self, session_id: str, student_identifier: Optional[str] = None):
+        """
+        Count a student query: query_count, student entry and unique students
+        
+        Sadece bellekteki sayaçlar güncellenir; veritabanına periyodik olarak
+        atomik artışlarla yazılır (bkz. session_usage).
+        """
+        self.usage_counter.record_query(session_id, student_identifier)
+    
     def get_student_entry_stats(self, session_id: str) -> Dict[str, Any]:
         """Get student entry statistics for a session"""
         try:
@@ -0,0 +1,155 @@
+"""
+Coalesced session usage counters
+Oturum kullanım sayaçları (toplu yazım)
+
+Every ``/rag/query`` used to call ``track_student_entry`` (upsert plus a
+``COUNT(DISTINCT student_identifier)`` over the whole session) and then
+``get_session_metadata`` + ``update_session_metadata(query_count=n + 1)``.
+The read-then-write lost increments across gateway workers and every query
+took the sessions table's write lock.
+
+``SessionUsageCounter.record_query`` now only updates in-memory deltas:
+queries per session and (session, student) entry counts. A background
+thread flushes them every ``SESSION_USAGE_FLUSH_SECONDS`` in one
+transaction:
+
+- ``student_entries``: ``INSERT OR IGNORE`` tells whether the student is new
+  to the session; existing rows get ``entry_count = entry_count + ?``
+- ``sessions``: ``query_count = query_count + ?`` and
+  ``student_entry_count = student_entry_count + <new students>``
+
+Both updates are relative, so any number of workers (processes) flushing
+into the same database stay exact. Counters read from the database lag by
+at most one flush interval; a failed flush keeps its deltas for the next one.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+SESSION_USAGE_FLUSH_SECONDS = float(os.getenv("SESSION_USAGE_FLUSH_SECONDS", "2.0"))
+
+
+class SessionUsageCounter:
+    """In-memory per-session query/student deltas with periodic flushing"""
+
+    def __init__(self, session_manager, flush_interval: float = SESSION_USAGE_FLUSH_SECONDS):
+        self.session_manager = session_manager
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        # Serializes flushes of this process (timer thread vs. explicit flush)
+        self._flush_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        # session_id -> (query delta, last access ISO timestamp)
+        self._queries: Dict[str, Tuple[int, str]] = {}
+        # (session_id, student_identifier) -> (entry delta, first seen, last seen)
+        self._entries: Dict[Tuple[str, str], Tuple[int, str, str]] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record_query(self, session_id: str, student_identifier: str = None):
+        """Count one query (and the student's entry); no database access"""
+        if not session_id:
+            return
+        now = datetime.now().isoformat()
+        with self._lock:
+            count, _ = self._queries.get(session_id, (0, now))
+            self._queries[session_id] = (count + 1, now)
+            if student_identifier:
+                key = (session_id, str(student_identifier))
+                entry = self._entries.get(key)
+                self._entries[key] = (entry[0] + 1, entry[1], now) if entry else (1, now, now)
+        self._ensure_thread()
+
+    def pending(self) -> Dict[str, int]:
+        """Not yet flushed query deltas per session"""
+        with self._lock:
+            return {session_id: count for session_id, (count, _) in self._queries.items()}
+
+    def flush(self) -> int:
+        """Write all pending deltas in one transaction; returns the number of queries written"""
+        with self._flush_lock:
+            with self._lock:
+                queries, self._queries = self._queries, {}
+                entries, self._entries = self._entries, {}
+            if not queries and not entries:
+                return 0
+            try:
+                self._write(queries, entries)
+            except Exception as e:
+                self._restore(queries, entries)
+                logger.warning(f"Session usage flush failed, will retry (non-critical): {e}")
+                return 0
+            return sum(count for count, _ in queries.values())
+
+    def _write(self, queries, entries):
+        new_students: Dict[str, int] = {}
+        # Same ISO format as update_session_metadata: listing is keyset-paginated on updated_at
+        updated_at = datetime.now().isoformat()
+        with self.session_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            # Write lock up front: the new-student check and the count update are one unit
+            cursor.execute("BEGIN IMMEDIATE")
+            for (session_id, student), (count, first_seen, last_seen) in entries.items():
+                cursor.execute("""
+                    INSERT OR IGNORE INTO student_entries
+                    (session_id, student_identifier, first_entry, last_entry, entry_count)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (session_id, student, first_seen, last_seen, count))
+                if cursor.rowcount == 1:
+                    new_students[session_id] = new_students.get(session_id, 0) + 1
+                else:
+                    cursor.execute("""
+                        UPDATE student_entries
+                        SET last_entry = ?, entry_count = entry_count + ?
+                        WHERE session_id = ? AND student_identifier = ?
+                    """, (last_seen, count, session_id, student))
+
+            for session_id in set(queries) | set(new_students):
+                count, last_accessed = queries.get(session_id, (0, None))
+                cursor.execute("""
+                    UPDATE sessions
+                    SET query_count = COALESCE(query_count, 0) + ?,
+                        student_entry_count = COALESCE(student_entry_count, 0) + ?,
+                        last_accessed = COALESCE(?, last_accessed),
+                        updated_at = ?
+                    WHERE session_id = ?
+                """, (count, new_students.get(session_id, 0), last_accessed, updated_at, session_id))
+
+    def _restore(self, queries, entries):
+        with self._lock:
+            for session_id, (count, last_accessed) in queries.items():
+                current, newer = self._queries.get(session_id, (0, last_accessed))
+                self._queries[session_id] = (current + count, max(newer, last_accessed))
+            for key, (count, first_seen, last_seen) in entries.items():
+                current = self._entries.get(key)
+                self._entries[key] = (
+                    (current[0] + count, first_seen, current[2]) if current else (count, first_seen, last_seen)
+                )
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="session-usage-flush", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def stop(self):
+        """Stop the flusher and write what is left"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
@@ -27,11 +27,13 @@ from dataclasses import dataclass
 from collections import Counter
 import math
 
+from ..utils.model_registry import sentence_transformer_handle
+
 # Enhanced dependencies for Phase 1
 # NOTE: This module is deprecated - lightweight chunking system is now used instead
 # Keeping for backward compatibility only
 try:
-    from sentence_transformers import SentenceTransformer
+    import sentence_transformers  # noqa: F401 - availability check; models come from the registry
     from sklearn.metrics.pairwise import cosine_similarity, euclidean_distances
     from sklearn.cluster import KMeans
     from sklearn.decomposition import PCA
@@ -121,8 +123,8 @@ class AdvancedChunkValidator:
         self.min_topic_consistency = 0.65
         self.max_topic_drift = 0.4
         
-        # Initialize embedding model and cache
-        self.embedding_model = None
+        # Initialize embedding model (shared via the model registry) and cache
+        self._embedding_handle = None
         self.embedding_cache = LRUCache(maxsize=1000)
         self.validation_cache = LRUCache(maxsize=500)
         
@@ -136,10 +138,17 @@ class AdvancedChunkValidator:
         if not EMBEDDING_SUPPORT:
             print("Warning: Falling back to pattern-based validation without embeddings")
             
+    @property
+    def embedding_model(self):
+        """Shared SentenceTransformer; reloaded lazily if the registry evicted it."""
+        return self._embedding_handle.get() if self._embedding_handle else None
+
     def _initialize_embedding_model(self, model_name: str):
         """Initialize the sentence transformer model for validation."""
         try:
-            self.embedding_model = SentenceTransformer(model_name)
+            handle = sentence_transformer_handle(model_name)
+            handle.get()
+            self._embedding_handle = handle
             print(f"Validation embedding model loaded: {model_name}")
         except Exception as e:
             print(f"Failed to load validation embedding model {model_name}: {e}")
@@ -20,9 +20,11 @@ from typing import List, Dict, Optional, Tuple, Set
 from dataclasses import dataclass, field
 import hashlib
 
+from ..utils.model_registry import sentence_transformer_handle
+
 # Embedding için (Opsiyonel, yoksa sadece structural çalışır)
 try:
-    from sentence_transformers import SentenceTransformer
+    import sentence_transformers  # noqa: F401 - availability check; models come from the registry
     from sklearn.metrics.pairwise import cosine_similarity
     EMBEDDING_AVAILABLE = True
 except ImportError:
@@ -118,14 +120,21 @@ class MorphoSemanticChunker:
         self.semantic_threshold = semantic_threshold
         self.logger = logging.getLogger(__name__)
 
-        self.model = None
+        # Model registry'den paylaşılan model; bellek baskısında tahliye edilebilir
+        self._model_handle = None
         if EMBEDDING_AVAILABLE:
             try:
                 self.logger.info(f"Loading embedding model: {embedding_model_name}")
-                self.model = SentenceTransformer(embedding_model_name)
+                handle = sentence_transformer_handle(embedding_model_name)
+                handle.get()
+                self._model_handle = handle
             except Exception as e:
                 self.logger.warning(f"Model yüklenemedi, sadece yapısal çalışacak: {e}")
 
+    @property
+    def model(self):
+        return self._model_handle.get() if self._model_handle else None
+
     def process_markdown(self, markdown_text: str) -> List[EnrichedChunk]:
         """
         Markdown metnini alır, işler ve zenginleştirilmiş chunklar döner.
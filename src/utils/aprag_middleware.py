@@ -6,7 +6,7 @@ Handles interaction logging and personalization integration
 import os
 import logging
 import requests
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import time
 
 logger = logging.getLogger(__name__)
@@ -121,6 +121,44 @@ def classify_question_to_topic(
         return None
 
 
+def build_interaction_payload(
+    user_id: str,
+    session_id: str,
+    query: str,
+    response: str,
+    personalized_response: Optional[str] = None,
+    processing_time_ms: Optional[int] = None,
+    model_used: Optional[str] = None,
+    chain_type: Optional[str] = None,
+    sources: Optional[list] = None,
+    metadata: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Request body of POST /api/aprag/interactions"""
+    # Extract and log quality parameters if available
+    quality_params = None
+    if metadata and "quality_params" in metadata:
+        quality_params = metadata["quality_params"]
+        logger.info(f"📊 Logging interaction with quality parameters: {quality_params}")
+    
+    payload = {
+        "user_id": user_id,
+        "session_id": session_id,
+        "query": query,
+        "response": response,
+        "personalized_response": personalized_response,
+        "processing_time_ms": processing_time_ms,
+        "model_used": model_used,
+        "chain_type": chain_type,
+        "sources": sources or [],
+        "metadata": metadata or {}
+    }
+    
+    # Add quality parameters to root level of payload for easier access by APRAG
+    if quality_params:
+        payload["quality_params"] = quality_params
+    return payload
+
+
 def log_interaction_sync(
     user_id: str,
     session_id: str,
@@ -145,28 +183,11 @@ def log_interaction_sync(
         return None
     
     try:
-        # Extract and log quality parameters if available
-        quality_params = None
-        if metadata and "quality_params" in metadata:
-            quality_params = metadata["quality_params"]
-            logger.info(f"📊 Logging interaction with quality parameters: {quality_params}")
-        
-        payload = {
-            "user_id": user_id,
-            "session_id": session_id,
-            "query": query,
-            "response": response,
-            "personalized_response": personalized_response,
-            "processing_time_ms": processing_time_ms,
-            "model_used": model_used,
-            "chain_type": chain_type,
-            "sources": sources or [],
-            "metadata": metadata or {}
-        }
-        
-        # Add quality parameters to root level of payload for easier access by APRAG
-        if quality_params:
-            payload["quality_params"] = quality_params
+        payload = build_interaction_payload(
+            user_id, session_id, query, response, personalized_response,
+            processing_time_ms, model_used, chain_type, sources, metadata
+        )
+        quality_params = payload.get("quality_params")
         
         # Non-blocking request with timeout
         response = requests.post(
@@ -238,6 +259,120 @@ async def log_interaction_async(
     )
 
 
+def enqueue_interaction(
+    user_id: str,
+    session_id: str,
+    query: str,
+    response: str,
+    personalized_response: Optional[str] = None,
+    processing_time_ms: Optional[int] = None,
+    model_used: Optional[str] = None,
+    chain_type: Optional[str] = None,
+    sources: Optional[list] = None,
+    metadata: Optional[Dict[str, Any]] = None
+) -> Optional[str]:
+    """
+    Queue an interaction for APRAG in the local telemetry outbox
+    
+    Only a local SQLite append happens on the request path; the outbox
+    flusher posts queued interactions in batches and classifies them.
+    
+    Returns:
+        Locally generated interaction ID (also sent as metadata.client_interaction_id),
+        None if APRAG is known to be disabled
+    """
+    # Cached status only: no health request on the request path
+    if _aprag_enabled_cache is False and (time.time() - _aprag_cache_timestamp) < CACHE_DURATION_SECONDS:
+        return None
+    
+    from src.analytics.telemetry_outbox import KIND_APRAG_INTERACTION, get_telemetry_outbox, new_local_id
+    
+    local_id = new_local_id()
+    payload = build_interaction_payload(
+        user_id, session_id, query, response, personalized_response,
+        processing_time_ms, model_used, chain_type, sources,
+        {**(metadata or {}), "client_interaction_id": local_id}
+    )
+    return get_telemetry_outbox().enqueue(KIND_APRAG_INTERACTION, payload, local_id=local_id)
+
+
+def post_interactions_batch(payloads: List[Dict[str, Any]]) -> List[Any]:
+    """
+    Deliver queued interactions to APRAG (telemetry outbox handler)
+    
+    One POST to /api/aprag/interactions/batch; APRAG services without the
+    batch endpoint get one POST per interaction. Raises when nothing was
+    delivered so the outbox retries; 4xx responses are not retried.
+    
+    Returns:
+        One result per payload, in payload order: the APRAG interaction ID
+        (None if APRAG is disabled) or the exception for a row that was not
+        stored. The outbox retries only those rows.
+    """
+    from src.analytics.telemetry_outbox import PermanentDeliveryError
+    
+    if not is_aprag_enabled():
+        logger.debug(f"APRAG disabled, dropping {len(payloads)} queued interactions")
+        return [None] * len(payloads)
+    
+    response = requests.post(
+        f"{APRAG_SERVICE_URL}/api/aprag/interactions/batch",
+        json={"interactions": payloads},
+        timeout=15,
+        headers={"Content-Type": "application/json"}
+    )
+    if response.status_code in (404, 405):
+        return _post_interactions_one_by_one(payloads, PermanentDeliveryError)
+    
+    _raise_for_delivery(response, PermanentDeliveryError)
+    body = response.json()
+    results: List[Any] = list(body.get("interaction_ids") or [None] * len(payloads))
+    # Rows the service could not store; older services fail the whole request instead
+    for error in body.get("errors") or []:
+        results[error["index"]] = RuntimeError(f"APRAG interaction logging failed: {error.get('error')}")
+    return results
+
+
+def _post_interactions_one_by_one(payloads: List[Dict[str, Any]], permanent_error) -> List[Any]:
+    """
+    Per-interaction POSTs; each row is acknowledged on its own
+    
+    A rejected row (4xx) fails alone. A transient error stops the loop: the
+    remaining rows are reported failed without being sent, so a retry never
+    re-sends interactions that were already stored.
+    """
+    results: List[Any] = []
+    with requests.Session() as http:
+        for index, payload in enumerate(payloads):
+            try:
+                single = http.post(
+                    f"{APRAG_SERVICE_URL}/api/aprag/interactions",
+                    json=payload,
+                    timeout=5,
+                    headers={"Content-Type": "application/json"}
+                )
+                _raise_for_delivery(single, permanent_error)
+            except permanent_error as e:
+                results.append(e)
+                continue
+            except Exception as e:
+                if not results:
+                    raise
+                results.extend([e] * (len(payloads) - index))
+                break
+            results.append(single.json().get("interaction_id"))
+    return results
+
+
+def _raise_for_delivery(response, permanent_error):
+    if response.status_code < 300:
+        return
+    message = f"APRAG interaction logging failed: {response.status_code} - {response.text[:200]}"
+    if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+        raise permanent_error(message)
+    raise RuntimeError(message)
+
+
 def personalize_response_sync(
     user_id: str,
     session_id: str,
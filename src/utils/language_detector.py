@@ -6,6 +6,13 @@ Detects whether a query is in Turkish or English to provide appropriate response
 import re
 from typing import Literal, Dict, Any
 
+from src.utils.turkish_text import analyze, ascii_fold, turkish_lower
+
+
+def _fold_all(words):
+    """Keyword lists in the same form as the folded query text"""
+    return frozenset(ascii_fold(turkish_lower(w)) for w in words)
+
 class LanguageDetector:
     """
     Simple but effective language detector for Turkish and English.
@@ -48,6 +55,12 @@ class LanguageDetector:
     # Turkish-specific characters
     TURKISH_CHARS = set('çğıöşüÇĞIİÖŞÜ')
     
+    # Folded once: query tokens are ASCII folded so "I"/"ı" variants compare equal
+    _TR_WORDS = _fold_all(TURKISH_KEYWORDS['common_words'])
+    _EN_WORDS = _fold_all(ENGLISH_KEYWORDS['common_words'])
+    _TR_PHRASES = _fold_all(TURKISH_KEYWORDS['question_words'])
+    _EN_PHRASES = _fold_all(ENGLISH_KEYWORDS['question_words'])
+    
     @classmethod
     def detect_language(cls, text: str) -> Literal['tr', 'en']:
         """
@@ -62,8 +75,10 @@ class LanguageDetector:
         if not text or not text.strip():
             return 'tr'  # Default to Turkish
             
-        text_lower = text.lower().strip()
-        words = re.findall(r'\b\w+\b', text_lower)
+        analysis = analyze(text)
+        text_lower = analysis.normalized
+        text_folded = ascii_fold(text_lower)
+        words = [ascii_fold(word) for word in analysis.tokens]
         
         if not words:
             return 'tr'
@@ -79,19 +94,18 @@ class LanguageDetector:
         
         # 2. Check for common words
         for word in words:
-            if word in cls.TURKISH_KEYWORDS['common_words']:
+            if word in cls._TR_WORDS:
                 turkish_score += 3
-            if word in cls.ENGLISH_KEYWORDS['common_words']:
+            if word in cls._EN_WORDS:
                 english_score += 3
         
         # 3. Check for question words (higher weight)
-        text_phrases = text_lower
-        for phrase in cls.TURKISH_KEYWORDS['question_words']:
-            if phrase in text_phrases:
+        for phrase in cls._TR_PHRASES:
+            if phrase in text_folded:
                 turkish_score += 5
         
-        for phrase in cls.ENGLISH_KEYWORDS['question_words']:
-            if phrase in text_phrases:
+        for phrase in cls._EN_PHRASES:
+            if phrase in text_folded:
                 english_score += 5
         
         # 4. Turkish suffix patterns (ending analysis)
@@ -101,7 +115,7 @@ class LanguageDetector:
             'dır', 'dir', 'dur', 'dür', 'tır', 'tir', 'tur', 'tür'
         ]
         
-        for word in words:
+        for word in analysis.tokens:
             for suffix in turkish_suffixes:
                 if word.endswith(suffix) and len(word) > len(suffix):
                     turkish_score += 1
@@ -116,7 +130,7 @@ class LanguageDetector:
         ]
         
         for pattern in english_patterns:
-            if re.search(pattern, text_lower):
+            if re.search(pattern, text_folded):
                 english_score += 2
         
         # 6. Character frequency analysis (additional check)
@@ -160,7 +174,7 @@ class LanguageDetector:
             'language_name': 'Turkish' if detected_lang == 'tr' else 'English',
             'confidence': 'high' if any(char in cls.TURKISH_CHARS for char in text) else 'medium',
             'text_length': len(text),
-            'word_count': len(re.findall(r'\b\w+\b', text.lower()))
+            'word_count': len(analyze(text).tokens)
         }
 
 
@@ -29,6 +29,7 @@ class MemoryManager:
         self.monitoring_thread = None
         self.stop_monitoring = threading.Event()
         self.memory_callbacks = []  # Functions to call when memory gets high
+        self.warning_callbacks = []  # Functions to call at warning level (e.g. model registry LRU eviction)
         
     def get_memory_usage(self) -> Dict[str, float]:
         """Get detailed memory usage information"""
@@ -103,6 +104,10 @@ class MemoryManager:
         """Add a function to call during memory cleanup"""
         self.memory_callbacks.append(callback)
     
+    def add_warning_callback(self, callback: Callable):
+        """Add a function to call when memory reaches the warning level"""
+        self.warning_callbacks.append(callback)
+    
     def start_monitoring(self, check_interval: float = 5.0):
         """Start background memory monitoring"""
         if self.monitoring_active:
@@ -131,6 +136,11 @@ class MemoryManager:
                         logger.warning(f"⚠️ System memory: {memory_info['system_used_percent']:.1f}%")
                         
                         # Light cleanup
+                        for callback in self.warning_callbacks:
+                            try:
+                                callback()
+                            except Exception as e:
+                                logger.warning(f"Memory warning callback failed: {e}")
                         gc.collect()
                     
                     self.stop_monitoring.wait(check_interval)
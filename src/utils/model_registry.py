@@ -0,0 +1,375 @@
+"""
+Process-level model registry
+Süreç genelinde model kaydı: tembel yükleme, paylaşım ve bellek baskısında LRU tahliye
+
+Previously every component loaded and held its own model: the CRAG
+cross-encoder, the AdvancedChunkValidator and MorphoSemanticChunker
+SentenceTransformers (often the same model twice), and the Marker model dict
+inside each EnhancedPDFProcessor. MemoryManager only saw the total RSS and
+could run generic gc callbacks, which free nothing while the owners keep
+their references, so the 8GB deployment swapped under mixed load.
+
+ModelRegistry:
+
+1. Lazy, deduplicated loading: ``get(key, loader)`` loads on first use;
+   concurrent callers for the same key wait for one loader run and share
+   the result.
+2. Accounting: each entry records its footprint (``estimated_mb``, or the
+   RSS delta measured around the loader) and last-use time.
+3. Eviction: before a load that would exceed ``budget_mb``, and when
+   MemoryManager reports warning/critical pressure, least-recently-used
+   entries are dropped. Entries inside ``in_use(key)`` are never evicted.
+   Owners that cache a model themselves pass ``on_evict`` to drop their
+   reference; ``ModelHandle`` re-fetches lazily so it holds none.
+4. Metrics: hits, misses, loads, load failures, evictions, per-model
+   footprint and idle time (``get_stats()``, GET /health/models).
+"""
+
+import gc
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 0 = no fixed budget (only memory pressure evicts)
+DEFAULT_BUDGET_MB = float(os.getenv("MODEL_REGISTRY_BUDGET_MB", "0"))
+# Under warning pressure only models idle at least this long are evicted
+DEFAULT_MIN_IDLE_SECONDS = float(os.getenv("MODEL_REGISTRY_MIN_IDLE_SECONDS", "60"))
+
+WARNING = "warning"
+CRITICAL = "critical"
+
+
+@dataclass
+class ModelEntry:
+    """One registered model"""
+    key: str
+    loader: Callable[[], Any]
+    estimated_mb: Optional[float] = None
+    model: Any = None
+    footprint_mb: float = 0.0
+    last_used: float = 0.0
+    loaded_at: Optional[float] = None
+    in_use: int = 0
+    hits: int = 0
+    loads: int = 0
+    evictions: int = 0
+    on_evict: List[Callable[[], None]] = field(default_factory=list)
+    load_lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+
+class ModelHandle:
+    """
+    Lazy reference to a registry model.
+
+    Holds the key and loader, not the model: ``get()`` returns the loaded
+    model (loading it again after an eviction), so the owner never pins it.
+    """
+
+    def __init__(self, registry: "ModelRegistry", key: str, loader: Callable[[], Any],
+                 estimated_mb: Optional[float] = None):
+        self.registry = registry
+        self.key = key
+        self.loader = loader
+        self.estimated_mb = estimated_mb
+
+    def get(self) -> Any:
+        return self.registry.get(self.key, self.loader, self.estimated_mb)
+
+    def in_use(self):
+        """Context manager: load and protect from eviction for the block"""
+        return self.registry.in_use(self.key, self.loader, self.estimated_mb)
+
+
+class ModelRegistry:
+    """
+    Shared, lazily loaded models with LRU eviction.
+
+    Example:
+        >>> registry = get_model_registry()
+        >>> model = registry.get("sentence-transformer:all-MiniLM-L6-v2",
+        ...                      lambda: SentenceTransformer("all-MiniLM-L6-v2"), estimated_mb=120)
+    """
+
+    def __init__(self, memory_manager: Any = None, budget_mb: float = DEFAULT_BUDGET_MB,
+                 min_idle_seconds: float = DEFAULT_MIN_IDLE_SECONDS):
+        """
+        Args:
+            memory_manager: MemoryManager (or compatible) used for RSS
+                measurement and pressure checks; None disables both
+            budget_mb: Upper bound on the summed footprint of loaded models (0 = none)
+            min_idle_seconds: Idle time before a model may be evicted under warning pressure
+        """
+        self.memory_manager = memory_manager
+        self.budget_mb = budget_mb
+        self.min_idle_seconds = min_idle_seconds
+        self._entries: Dict[str, ModelEntry] = {}
+        self._lock = threading.RLock()
+        self._stats = {"hits": 0, "misses": 0, "loads": 0, "load_failures": 0, "evictions": 0}
+
+    # ------------------------------------------------------------------ access
+
+    def _entry(self, key: str, loader: Callable[[], Any], estimated_mb: Optional[float]) -> ModelEntry:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = ModelEntry(key=key, loader=loader, estimated_mb=estimated_mb)
+                self._entries[key] = entry
+            return entry
+
+    def get(self, key: str, loader: Callable[[], Any], estimated_mb: Optional[float] = None,
+            on_evict: Optional[Callable[[], None]] = None) -> Any:
+        """
+        Return the model for ``key``, loading it with ``loader`` on a miss.
+
+        Args:
+            key: Registry key, e.g. "cross-encoder:<model name>"
+            loader: Zero-argument callable that builds the model
+            estimated_mb: Expected footprint (used for the budget before loading)
+            on_evict: Called when the entry is evicted (owners drop their reference)
+
+        Raises:
+            Whatever ``loader`` raises; the entry stays unloaded.
+        """
+        entry = self._entry(key, loader, estimated_mb)
+        if on_evict is not None:
+            with self._lock:
+                if on_evict not in entry.on_evict:
+                    entry.on_evict.append(on_evict)
+
+        with self._lock:
+            if entry.model is not None:
+                entry.hits += 1
+                entry.last_used = time.time()
+                self._stats["hits"] += 1
+                return entry.model
+
+        # One loader run per key; concurrent callers wait here and share it
+        with entry.load_lock:
+            with self._lock:
+                if entry.model is not None:
+                    entry.hits += 1
+                    entry.last_used = time.time()
+                    self._stats["hits"] += 1
+                    return entry.model
+                self._stats["misses"] += 1
+
+            self._make_room(entry)
+            rss_before = self._rss_mb()
+            started = time.time()
+            # The caller's loader wins: a later caller can recover an entry whose load failed
+            entry.loader = loader
+            try:
+                model = loader()
+            except Exception:
+                with self._lock:
+                    self._stats["load_failures"] += 1
+                raise
+            rss_after = self._rss_mb()
+            measured = rss_after - rss_before if rss_before is not None and rss_after is not None else 0.0
+
+            with self._lock:
+                entry.model = model
+                entry.footprint_mb = measured if measured > 0 else (entry.estimated_mb or 0.0)
+                entry.loads += 1
+                entry.loaded_at = entry.last_used = time.time()
+                self._stats["loads"] += 1
+            logger.info(
+                f"📦 Model loaded: {key} ({entry.footprint_mb:.0f}MB, {time.time() - started:.1f}s)"
+            )
+            return model
+
+    def handle(self, key: str, loader: Callable[[], Any], estimated_mb: Optional[float] = None) -> ModelHandle:
+        """Lazy handle; nothing is loaded until ``get()``"""
+        self._entry(key, loader, estimated_mb)
+        return ModelHandle(self, key, loader, estimated_mb)
+
+    @contextmanager
+    def in_use(self, key: str, loader: Callable[[], Any], estimated_mb: Optional[float] = None):
+        """Load ``key`` and protect it from eviction inside the block"""
+        entry = self._entry(key, loader, estimated_mb)
+        with self._lock:
+            entry.in_use += 1
+        try:
+            yield self.get(key, loader, estimated_mb)
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.time()
+
+    # ---------------------------------------------------------------- eviction
+
+    def evict(self, key: str, reason: str = "manual") -> bool:
+        """Drop the model for ``key`` (no-op for unknown, unloaded or in-use entries)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.model is None or entry.in_use:
+                return False
+            entry.model = None
+            entry.evictions += 1
+            self._stats["evictions"] += 1
+            callbacks = list(entry.on_evict)
+            freed = entry.footprint_mb
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"⚠️ on_evict callback for {key} failed (non-critical): {e}")
+        gc.collect()
+        logger.info(f"🧹 Model evicted: {key} (~{freed:.0f}MB, reason: {reason})")
+        return True
+
+    def _candidates(self, min_idle_seconds: float = 0.0) -> List[ModelEntry]:
+        """Loaded, unused entries, least recently used first"""
+        now = time.time()
+        with self._lock:
+            entries = [
+                e for e in self._entries.values()
+                if e.model is not None and not e.in_use and now - e.last_used >= min_idle_seconds
+            ]
+        return sorted(entries, key=lambda e: e.last_used)
+
+    def evict_lru(self, target_mb: float, min_idle_seconds: float = 0.0, reason: str = "lru") -> List[str]:
+        """Evict LRU entries until at least ``target_mb`` is freed (estimated)"""
+        evicted, freed = [], 0.0
+        for entry in self._candidates(min_idle_seconds):
+            if freed >= target_mb:
+                break
+            footprint = entry.footprint_mb
+            if self.evict(entry.key, reason):
+                evicted.append(entry.key)
+                freed += footprint
+        return evicted
+
+    def relieve_pressure(self, level: str) -> List[str]:
+        """
+        MemoryManager callback for warning/critical pressure.
+
+        Frees the RSS overshoot above the warning limit (estimated from model
+        footprints). Warning only touches models idle for ``min_idle_seconds``;
+        critical ignores idle time and, under system-wide pressure without a
+        process overshoot, still evicts the least recently used model.
+        MemoryManager.force_cleanup also runs before large PDFs; nothing is
+        evicted then unless memory is actually critical.
+        """
+        overshoot = 0.0
+        if self.memory_manager is not None:
+            usage = self.memory_manager.get_memory_usage()
+            warning_mb = self.memory_manager.max_memory_mb * self.memory_manager.warning_threshold
+            overshoot = max(usage.get("rss_mb", 0.0) - warning_mb, 0.0)
+
+        if level == CRITICAL:
+            if not overshoot and (self.memory_manager is None or self.memory_manager.is_memory_critical()):
+                overshoot = 0.01
+            evicted = self.evict_lru(overshoot, reason=CRITICAL) if overshoot else []
+        else:
+            evicted = self.evict_lru(overshoot, self.min_idle_seconds, reason=WARNING) if overshoot else []
+        if evicted:
+            logger.warning(f"⚠️ Memory {level}: evicted {len(evicted)} model(s): {', '.join(evicted)}")
+        return evicted
+
+    def _make_room(self, entry: ModelEntry):
+        """Evict before loading when the budget or memory pressure requires it"""
+        needed = entry.estimated_mb or entry.footprint_mb
+        if self.budget_mb and needed:
+            with self._lock:
+                loaded_mb = sum(e.footprint_mb for e in self._entries.values() if e.model is not None)
+            overflow = loaded_mb + needed - self.budget_mb
+            if overflow > 0:
+                self.evict_lru(overflow, reason="budget")
+
+        if self.memory_manager is not None:
+            try:
+                if self.memory_manager.is_memory_critical():
+                    self.relieve_pressure(CRITICAL)
+                elif self.memory_manager.is_memory_warning():
+                    self.relieve_pressure(WARNING)
+            except Exception as e:
+                logger.warning(f"Memory pressure check failed (non-critical): {e}")
+
+    def _rss_mb(self) -> Optional[float]:
+        if self.memory_manager is None:
+            return None
+        try:
+            return self.memory_manager.get_memory_usage()["rss_mb"]
+        except Exception:
+            return None
+
+    # ----------------------------------------------------------------- metrics
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            models = {
+                e.key: {
+                    "loaded": e.loaded,
+                    "footprint_mb": round(e.footprint_mb, 1),
+                    "estimated_mb": e.estimated_mb,
+                    "idle_seconds": round(now - e.last_used, 1) if e.last_used else None,
+                    "in_use": e.in_use,
+                    "hits": e.hits,
+                    "loads": e.loads,
+                    "evictions": e.evictions,
+                }
+                for e in self._entries.values()
+            }
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "loaded_models": sum(1 for e in self._entries.values() if e.model is not None),
+                "loaded_mb": round(sum(e.footprint_mb for e in self._entries.values() if e.model is not None), 1),
+                "budget_mb": self.budget_mb,
+                "models": models,
+            }
+
+
+# Global registry instance
+_model_registry = None
+_model_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """
+    Get the global model registry.
+
+    Hooks into the global MemoryManager: warning and critical callbacks evict
+    LRU models, and background monitoring is started (MODEL_REGISTRY_MONITOR=false
+    disables it). Without psutil the registry works without pressure checks.
+    """
+    global _model_registry
+    with _model_registry_lock:
+        if _model_registry is None:
+            memory_manager = None
+            try:
+                from .memory_manager import get_memory_manager
+                memory_manager = get_memory_manager()
+            except ImportError as e:
+                logger.warning(f"⚠️ Memory manager not available, model eviction only by budget (non-critical): {e}")
+
+            _model_registry = ModelRegistry(memory_manager)
+            if memory_manager is not None:
+                memory_manager.add_warning_callback(lambda: _model_registry.relieve_pressure(WARNING))
+                memory_manager.add_cleanup_callback(lambda: _model_registry.relieve_pressure(CRITICAL))
+                if os.getenv("MODEL_REGISTRY_MONITOR", "true").lower() == "true":
+                    memory_manager.start_monitoring()
+        return _model_registry
+
+
+def sentence_transformer_handle(model_name: str, estimated_mb: Optional[float] = None) -> ModelHandle:
+    """Shared SentenceTransformer handle (one instance per model name per process)"""
+    def load():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+
+    return get_model_registry().handle(f"sentence-transformer:{model_name}", load, estimated_mb)
@@ -0,0 +1,188 @@
+"""
+Compiled keyword/regex rule sets for query classification
+Sorgu sınıflandırma kuralları: tek geçişte derlenmiş anahtar kelime taraması
+
+QueryRouter and EnhancedQueryProcessor used to classify a query by looping
+over pattern lists: one ``re.findall``/``re.search`` call (with a regex cache
+lookup) or one ``keyword in text`` scan per pattern, and several helpers
+normalized and split the query again. A query went through ~20 regex scans
+and ~100 substring scans.
+
+Two compiled forms, both exact replacements for the loops they replace:
+
+``SubstringSet``
+    Which keywords occur in the text as substrings (``keyword in text``).
+    One regex ``(?=(k1|k2|...))`` with keywords longest first reports, at
+    every position, the longest keyword starting there; keywords that are
+    prefixes of it are added from a precomputed table. That yields every
+    occurring keyword, overlapping ones included (what an Aho-Corasick
+    automaton would report), from one C-level scan.
+
+``WordRuleSet``
+    Named regex rules whose per-rule counts equal ``len(re.findall(rule,
+    text, flags))``. Word rules of the form ``\\b(a|b|c d)\\b`` are merged
+    into one ``\\b(?=(...)\\b)`` scan; the non-overlapping matches of each
+    rule are then replayed from the matched positions. Other rules
+    ("X .+ Y") are precompiled and only run when a literal of their first
+    group occurs in the text.
+
+Compiled sets are cached per rule definition, so every instance shares them.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+# \b(alt|alt two)\b with literal alternatives only
+_WORD_RULE_RE = re.compile(r"\\b\(([^\\()\[\]{}.*+?^$]+)\)\\b")
+_REGEX_META = set("\\.[](){}*+?^$|")
+_WORD_CHAR_RE = re.compile(r"\w")
+
+CACHE_SIZE = 64
+
+
+def fold_case(text: str) -> str:
+    """Lower case plus the extra equivalences of ``re.IGNORECASE`` (ı ~ i, ſ ~ s)"""
+    return text.lower().replace("ı", "i").replace("ſ", "s")
+
+
+class SubstringSet:
+    """Keywords occurring in a text as substrings, found in one scan"""
+
+    def __init__(self, keywords: Iterable[str]):
+        unique = sorted({k for k in keywords if k}, key=len, reverse=True)
+        self.keywords: FrozenSet[str] = frozenset(unique)
+        self._scan = re.compile("(?=(" + "|".join(map(re.escape, unique)) + "))") if unique else None
+        # A keyword found at a position implies every keyword that is a prefix of it
+        self._implied = {k: frozenset(p for p in unique if k.startswith(p)) for k in unique}
+
+    def find(self, text: str) -> FrozenSet[str]:
+        """Same result as ``{k for k in keywords if k in text}``"""
+        if self._scan is None or not text:
+            return frozenset()
+        found = set()
+        for match in self._scan.finditer(text):
+            found |= self._implied[match.group(1)]
+        return frozenset(found)
+
+
+class WordRuleSet:
+    """Named regex rules evaluated together; ``counts`` matches per-rule ``re.findall``"""
+
+    def __init__(self, rules: Sequence[Tuple[str, str]], flags: int = 0):
+        """
+        Args:
+            rules: (name, pattern) pairs
+            flags: Regex flags shared by all rules (re.IGNORECASE or 0)
+        """
+        self.flags = flags
+        self._key = fold_case if flags & re.IGNORECASE else (lambda s: s)
+        self._word_rules: Dict[str, List[str]] = {}
+        self._other_rules: Dict[str, Tuple["re.Pattern", Optional[Tuple[str, ...]]]] = {}
+
+        for name, pattern in rules:
+            match = _WORD_RULE_RE.fullmatch(pattern)
+            if match:
+                self._word_rules[name] = [self._key(alt) for alt in match.group(1).split("|")]
+            else:
+                self._other_rules[name] = (re.compile(pattern, flags), self._gate(pattern))
+
+        keys = sorted({alt for alts in self._word_rules.values() for alt in alts}, key=len, reverse=True)
+        self._keys = frozenset(keys)
+        self._scan = (
+            re.compile(r"\b(?=(" + "|".join(map(re.escape, keys)) + r")\b)", flags) if keys else None
+        )
+        # Keys that also match (with a word boundary after them) where a longer key matched
+        self._implied = {
+            k: frozenset(
+                p for p in keys
+                if k.startswith(p) and (len(p) == len(k) or not _WORD_CHAR_RE.match(k[len(p)]))
+            )
+            for k in keys
+        }
+        self._literal_keys = {k: re.compile(re.escape(k), flags) for k in keys}
+        # Word rules that can match where a key matched; only those are replayed
+        self._touched = {
+            k: tuple(name for name, alternatives in self._word_rules.items() if implied.intersection(alternatives))
+            for k, implied in self._implied.items()
+        }
+        # One substring scan of the gate literals decides which other rules run
+        self._gates = SubstringSet(
+            literal for _, gate in self._other_rules.values() if gate is not None for literal in gate
+        )
+        self._zero = {name: 0 for name, _ in rules}
+
+    def _gate(self, pattern: str) -> Optional[Tuple[str, ...]]:
+        """
+        Literal prefixes of the first group's alternatives; one of them must
+        occur in any match. None when no such literal can be derived.
+        """
+        start = pattern.find("(")
+        end = pattern.find(")", start)
+        if start < 0 or end < 0 or "(" in pattern[start + 1:end]:
+            return None
+        if pattern[end + 1:end + 2] in ("?", "*", "{"):
+            return None
+        literals = []
+        for alternative in pattern[start + 1:end].split("|"):
+            literal = ""
+            for char in alternative:
+                if char in _REGEX_META:
+                    break
+                literal += char
+            if not literal:
+                return None
+            literals.append(self._key(literal))
+        return tuple(literals)
+
+    def _lookup(self, matched: str) -> str:
+        key = self._key(matched)
+        if key in self._keys:
+            return key
+        # Case equivalences fold_case does not model (e.g. "İ"): ask the regex engine
+        return next(k for k, rx in self._literal_keys.items() if len(k) == len(matched) and rx.fullmatch(matched))
+
+    def counts(self, text: str) -> Dict[str, int]:
+        """Per-rule match counts (``len(re.findall(pattern, text, flags))``)"""
+        counts = dict(self._zero)
+        if not text:
+            return counts
+
+        occurrences = []
+        touched = set()
+        if self._scan is not None:
+            for m in self._scan.finditer(text):
+                key = self._lookup(m.group(1))
+                occurrences.append((m.start(), self._implied[key]))
+                touched.update(self._touched[key])
+
+        # Replay each word rule: first alternative (rule order) at each position, skip past the match
+        for name in touched:
+            count, resume = 0, 0
+            for start, matched in occurrences:
+                if start < resume:
+                    continue
+                for alternative in self._word_rules[name]:
+                    if alternative in matched:
+                        count += 1
+                        resume = start + len(alternative)
+                        break
+            counts[name] = count
+
+        gates = self._gates.find(self._key(text)) if self._other_rules else frozenset()
+        for name, (regex, gate) in self._other_rules.items():
+            if gate is None or gates.intersection(gate):
+                counts[name] = len(regex.findall(text))
+        return counts
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_word_rules(rules: Tuple[Tuple[str, str], ...], flags: int = 0) -> WordRuleSet:
+    """Shared WordRuleSet per rule definition"""
+    return WordRuleSet(rules, flags)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_substring_set(keywords: Tuple[str, ...]) -> SubstringSet:
+    """Shared SubstringSet per keyword list"""
+    return SubstringSet(keywords)
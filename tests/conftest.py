@@ -1,3 +1,4 @@
+import importlib
 import pytest
 import sys
 import os
@@ -42,4 +43,49 @@ def mock_db():
 # Gelecekteki testler için ortak fixture'lar buraya eklenecek.
 # Örnekler:
 # - API testleri için bir TestClient fixture'ı
-# - Mock data üreten fixture'lar
\ No newline at end of file
+# - Mock data üreten fixture'lar
+
+
+DOCUMENT_SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../services/document_processing_service'))
+# Top-level packages of the document processing service that clash with src/ and other services
+_DOCUMENT_SERVICE_PACKAGES = ("api", "core", "utils", "config", "models", "services")
+
+
+@pytest.fixture(scope="function")
+def document_service_import(monkeypatch):
+    """
+    importlib.import_module for modules of the document processing service.
+
+    The service's own api/core/utils/... packages are imported in isolation and
+    the previously imported packages of the same names are restored afterwards.
+    Third-party modules (numpy, chromadb) stay loaded.
+    """
+    def owned(name):
+        return name.split(".")[0] in _DOCUMENT_SERVICE_PACKAGES
+
+    saved = {name: module for name, module in sys.modules.items() if owned(name)}
+    for name in saved:
+        del sys.modules[name]
+    monkeypatch.syspath_prepend(DOCUMENT_SERVICE_DIR)
+    try:
+        yield importlib.import_module
+    finally:
+        for name in [name for name in sys.modules if owned(name)]:
+            del sys.modules[name]
+        sys.modules.update(saved)
+
+
+@pytest.fixture
+def document_service(document_service_import, monkeypatch):
+    """Sessions router of the document processing service on an in-memory ChromaDB"""
+    pytest.importorskip("fastapi")
+    chromadb = pytest.importorskip("chromadb")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    sessions = document_service_import("api.routes.sessions")
+    chroma = chromadb.EphemeralClient()
+    monkeypatch.setattr(sessions, "get_chroma_client", lambda: chroma)
+    app = FastAPI()
+    app.include_router(sessions.router)
+    yield TestClient(app), chroma
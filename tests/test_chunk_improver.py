@@ -0,0 +1,141 @@
+"""
+Unit tests for bulk chunk improvement (document processing service):
+checkpoint resume, outcome counters and the cross-worker progress file.
+"""
+
+import pytest
+
+
+class FakeCollection:
+    """The subset of the ChromaDB collection API used by the improver"""
+
+    def __init__(self, chunks):
+        # id -> (text, metadata, embedding)
+        self.chunks = dict(chunks)
+        self.upserts = []
+        self.fail_on_upsert = None
+
+    def get(self, ids=None, include=()):
+        ids = sorted(self.chunks) if ids is None else [i for i in ids if i in self.chunks]
+        result = {"ids": ids}
+        if "documents" in include:
+            result["documents"] = [self.chunks[i][0] for i in ids]
+        if "metadatas" in include:
+            result["metadatas"] = [self.chunks[i][1] for i in ids]
+        if "embeddings" in include:
+            result["embeddings"] = [self.chunks[i][2] for i in ids]
+        return result
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        if self.fail_on_upsert is not None and len(self.upserts) == self.fail_on_upsert:
+            raise RuntimeError("worker killed")
+        self.upserts.append(list(ids))
+        for chunk_id, text, metadata, embedding in zip(ids, documents, metadatas, embeddings):
+            self.chunks[chunk_id] = (text, metadata, embedding)
+
+
+class FakePostProcessor:
+    """Upper-cases text; "same" texts come back unchanged, "boom" texts raise"""
+
+    seen = []
+
+    def __init__(self, config):
+        self.config = config
+
+    def process_chunks(self, texts):
+        FakePostProcessor.seen.extend(texts)
+        text = texts[0]
+        if "boom" in text:
+            raise RuntimeError("LLM error")
+        if "same" in text:
+            return [text]
+        return [text.upper() + " (düzeltildi)"]
+
+
+@pytest.fixture
+def improver(document_service_import, monkeypatch, tmp_path):
+    """chunk_improver module of the service with fake LLM, embeddings and storage"""
+    module = document_service_import("services.chunk_improver")
+    monkeypatch.setattr(module, "CHUNK_IMPROVE_STATE_DIR", str(tmp_path))
+    monkeypatch.setattr(module, "_load_post_processor_classes", lambda: (FakePostProcessor, dict))
+    monkeypatch.setattr(document_service_import("core.chromadb_client"), "get_chroma_client", lambda: None)
+    # Re-embedding: one vector per text, except for texts marked "noemb"
+    monkeypatch.setattr(
+        module, "_embed_texts",
+        lambda texts, model: None if any("NOEMB" in t for t in texts) else [[1.0, 0.0]] * len(texts),
+    )
+    FakePostProcessor.seen = []
+    return module
+
+
+def _use(improver, monkeypatch, collection):
+    monkeypatch.setattr(improver, "_resolve_collection", lambda client, session_id: collection)
+
+
+@pytest.mark.unit
+def test_counters(improver, monkeypatch):
+    collection = FakeCollection({
+        "c0": ("birinci parça", {}, [0.0, 1.0]),
+        "c1": ("same metin", {}, [0.0, 1.0]),
+        "c2": ("boom metin", {}, [0.0, 1.0]),
+        "c3": ("zaten iyi", {"llm_improved": True}, [0.0, 1.0]),
+        # Improved, but neither a new nor a stored embedding is available
+        "c4": ("noemb metin", {}, None),
+        "c5": ("ikinci parça", {}, [0.0, 1.0]),
+    })
+    _use(improver, monkeypatch, collection)
+
+    result = improver.improve_all_chunks_in_session("s1", batch_size=10, max_concurrency=2)
+
+    assert result["success"]
+    assert {k: result[k] for k in ("processed", "improved", "failed", "skipped", "no_embedding")} == {
+        "processed": 5, "improved": 2, "failed": 2, "skipped": 1, "no_embedding": 1,
+    }
+    assert sorted(collection.upserts[0]) == ["c0", "c5"]
+    assert collection.chunks["c4"][0] == "noemb metin"
+    assert collection.chunks["c0"][1]["llm_improved"] is True
+
+
+@pytest.mark.unit
+def test_resume_from_checkpoint(improver, monkeypatch):
+    collection = FakeCollection({f"c{i:02d}": (f"parça {i}", {}, [0.0, 1.0]) for i in range(10)})
+    _use(improver, monkeypatch, collection)
+
+    # Batches of 3; the process dies while writing the third batch
+    collection.fail_on_upsert = 2
+    first = improver.improve_all_chunks_in_session("s1", batch_size=3, skip_already_improved=False)
+    assert not first["success"]
+    assert improver._load_checkpoint("s1", "llama-3.1-8b-instant")["last_chunk_id"] == "c05"
+
+    collection.fail_on_upsert = None
+    FakePostProcessor.seen = []
+    second = improver.improve_all_chunks_in_session("s1", batch_size=3, skip_already_improved=False)
+
+    assert second["success"]
+    assert second["resumed_from"] == "c05"
+    # Only chunks after the last committed batch are sent to the LLM again
+    assert sorted(FakePostProcessor.seen) == [f"parça {i}" for i in range(6, 10)]
+    assert second["improved"] == 10 and second["processed"] == 10
+    assert improver._load_checkpoint("s1", "llama-3.1-8b-instant") is None
+
+    # resume=False starts over
+    FakePostProcessor.seen = []
+    third = improver.improve_all_chunks_in_session("s1", batch_size=3, skip_already_improved=False, resume=False)
+    assert third["resumed_from"] is None and len(FakePostProcessor.seen) == 10
+
+
+@pytest.mark.unit
+def test_progress_is_read_from_state_file(improver, monkeypatch):
+    collection = FakeCollection({f"c{i}": (f"parça {i}", {}, [0.0, 1.0]) for i in range(4)})
+    _use(improver, monkeypatch, collection)
+    assert improver.get_improvement_progress("s1") is None
+
+    improver.improve_all_chunks_in_session("s1", batch_size=2)
+
+    # Another worker has no in-memory state for the run
+    improver._progress.clear()
+    progress = improver.get_improvement_progress("s1")
+    assert progress["status"] == "completed"
+    assert progress["batches_committed"] == 2 and progress["total_batches"] == 2
+    assert progress["improved"] == 4 and progress["no_embedding"] == 0
+    assert "updated_at" in progress
@@ -0,0 +1,137 @@
+"""
+Unit tests for the streamed session archive format (backup/restore v2).
+"""
+
+import io
+import json
+import uuid
+
+import pytest
+
+from src.api.session_archive import (
+    SessionArchiveReader,
+    decode_npy_float32,
+    encode_npy_float32,
+    stream_session_archive,
+)
+
+
+def _chunks(count, dim=4):
+    for i in range(count):
+        yield {
+            "chunk_id": f"chunk-{i}",
+            "chunk_text": f"Metin parçası {i}",
+            "chunk_metadata": {"document_name": "ders.pdf", "chunk_index": i},
+            "embedding": [float(i), 0.5, -0.25, 1.0][:dim],
+        }
+
+
+def _build(chunks, part_size=10, compress=True):
+    topics = [{"topic_id": 1, "topic_title": "Hücre", "parent_topic_id": None}]
+    kbs = [{"topic_id": 1, "topic_summary": "Özet"}]
+    qas = [{"topic_id": 1, "question": "Soru?", "answer": "Cevap"}]
+    payload = b"".join(
+        stream_session_archive("s1", chunks, topics, kbs, qas, compress=compress, part_size=part_size)
+    )
+    return io.BytesIO(payload)
+
+
+@pytest.mark.unit
+def test_npy_roundtrip():
+    rows = [[1.0, 2.0, 3.0], [-1.5, 0.0, 4.25]]
+    payload = encode_npy_float32(rows, 3)
+    assert len(payload) % 4 == 0
+    assert decode_npy_float32(io.BytesIO(payload)) == rows
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("compress", [True, False])
+def test_archive_roundtrip(compress):
+    with SessionArchiveReader(_build(_chunks(25), part_size=10, compress=compress)) as reader:
+        assert reader.session_id == "s1"
+        assert reader.manifest["chunk_parts"] == 3
+        assert reader.manifest["counts"]["chunks"] == 25
+        assert reader.manifest["embedding_dim"] == 4
+
+        batches = list(reader.iter_chunk_batches())
+        assert [len(b) for b in batches] == [10, 10, 5]
+        restored = [c for b in batches for c in b]
+        assert restored == list(_chunks(25))
+
+        assert list(reader.iter_topics())[0]["topic_title"] == "Hücre"
+        assert len(list(reader.iter_knowledge_bases())) == 1
+        assert len(list(reader.iter_qa_pairs())) == 1
+
+
+@pytest.mark.unit
+def test_archive_without_embeddings():
+    chunks = [{"chunk_id": "a", "chunk_text": "x", "chunk_metadata": {}}]
+    with SessionArchiveReader(_build(chunks)) as reader:
+        assert reader.manifest["counts"]["chunks_with_embeddings"] == 0
+        (batch,) = list(reader.iter_chunk_batches())
+        assert "embedding" not in batch[0]
+
+
+@pytest.mark.unit
+def test_reader_rejects_non_archive():
+    with pytest.raises(Exception):
+        SessionArchiveReader(io.BytesIO(b"not a zip"))
+
+
+# --- Export -> archive -> restore through the document processing endpoints ---
+
+@pytest.mark.unit
+def test_archive_export_restore_roundtrip(document_service):
+    client, chroma = document_service
+    source_id, target_id = uuid.uuid4().hex, uuid.uuid4().hex
+
+    # Metadata as written by the chunk improver: a None-free scalar dict
+    originals = {
+        f"chunk-{i}": {
+            "filename": "ders.pdf",
+            "chunk_index": i,
+            "llm_improved": i % 2 == 0,
+            "model_used": "llama-3.1-8b-instant" if i % 2 == 0 else "",
+            "original_length": 100 + i,
+        }
+        for i in range(7)
+    }
+    # Collections are named by the session id in UUID form
+    source = chroma.create_collection(name=str(uuid.UUID(source_id)))
+    source.add(
+        ids=list(originals),
+        documents=[f"Metin parçası {i}" for i in range(7)],
+        metadatas=list(originals.values()),
+        embeddings=[[float(i), 0.5, -0.25, 1.0] for i in range(7)],
+    )
+
+    # Export: the shaped NDJSON chunks (frontend wrapper with None values and full_metadata)
+    response = client.get(
+        f"/sessions/{source_id}/chunks",
+        params={"fields": "ids,metadata,text,embeddings", "format": "ndjson"},
+    )
+    assert response.status_code == 200
+    exported = [json.loads(line) for line in response.text.splitlines() if line]
+    assert exported[1]["chunk_metadata"]["improvement_timestamp"] is None
+
+    archive = io.BytesIO(b"".join(stream_session_archive("src", exported, [], [], [], part_size=3)))
+
+    # Restore part by part, as POST /api/sessions/restore/archive does
+    with SessionArchiveReader(archive) as reader:
+        for index, batch in enumerate(reader.iter_chunk_batches()):
+            result = client.post(
+                f"/sessions/{target_id}/restore-chunks",
+                json={"chunks": batch, "original_session_id": source_id, "replace": index == 0},
+            ).json()
+            assert result["success"], result
+            assert result["has_embeddings"]
+
+    restored = chroma.get_collection(name=str(uuid.UUID(target_id))).get(include=["metadatas", "documents", "embeddings"])
+    assert sorted(restored["ids"]) == sorted(originals)
+    for chunk_id, metadata, document, embedding in zip(
+        restored["ids"], restored["metadatas"], restored["documents"], restored["embeddings"]
+    ):
+        index = int(chunk_id.split("-")[1])
+        assert metadata == {**originals[chunk_id], "session_id": target_id, "document_name": "ders.pdf"}
+        assert document == f"Metin parçası {index}"
+        assert [round(float(x), 4) for x in embedding] == [float(index), 0.5, -0.25, 1.0]
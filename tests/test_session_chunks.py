@@ -0,0 +1,179 @@
+"""
+Unit tests for the session chunks endpoint of the document processing service.
+"""
+
+import json
+import uuid
+
+import pytest
+
+
+class UnreadableCollection:
+    name = "legacy_1700000000"
+
+    def get(self, **kwargs):
+        raise RuntimeError("hnsw segment missing")
+
+
+@pytest.fixture
+def session_with_broken_collection(document_service, document_service_import, monkeypatch):
+    client, chroma = document_service
+    session_id = uuid.uuid4().hex
+    good = chroma.create_collection(name=str(uuid.UUID(session_id)))
+    good.add(
+        ids=[f"chunk-{i}" for i in range(3)],
+        documents=[f"Metin parçası {i}" for i in range(3)],
+        metadatas=[{"filename": "ders.pdf", "chunk_index": i} for i in range(3)],
+        embeddings=[[float(i), 1.0] for i in range(3)],
+    )
+    sessions = document_service_import("api.routes.sessions")
+    monkeypatch.setattr(
+        sessions, "_find_session_collections",
+        lambda chroma_client, sid: [UnreadableCollection(), good],
+    )
+    return client, session_id
+
+
+@pytest.mark.unit
+def test_unreadable_collection_is_skipped(session_with_broken_collection):
+    client, session_id = session_with_broken_collection
+
+    whole = client.get(f"/sessions/{session_id}/chunks")
+    assert whole.status_code == 200
+    assert [c["chunk_index"] for c in whole.json()["chunks"]] == [0, 1, 2]
+
+    page = client.get(f"/sessions/{session_id}/chunks", params={"limit": 2})
+    assert page.status_code == 200
+    assert len(page.json()["chunks"]) == 2 and page.json()["next_cursor"]
+
+    stream = client.get(f"/sessions/{session_id}/chunks", params={"format": "ndjson", "fields": "ids,metadata"})
+    assert stream.status_code == 200
+    assert [json.loads(line)["chunk_id"] for line in stream.text.splitlines()] == ["chunk-0", "chunk-1", "chunk-2"]
+
+
+@pytest.mark.unit
+def test_metadata_projection_keeps_document_and_index(session_with_broken_collection):
+    client, session_id = session_with_broken_collection
+
+    # The projection EBARS question generation requests
+    response = client.get(f"/sessions/{session_id}/chunks", params={"fields": "ids,metadata,text"})
+    chunk = response.json()["chunks"][1]
+    assert chunk["document_name"] == "ders.pdf"
+    assert chunk["chunk_index"] == 1
+    assert chunk["chunk_text"] == "Metin parçası 1"
+    assert "embedding" not in chunk
+
+
+@pytest.fixture
+def session_with_legacy_copy(document_service):
+    """Primary collection of five chunks and a timestamped legacy copy of chunks 0-1"""
+    client, chroma = document_service
+    session_id = uuid.uuid4().hex
+    primary_name = str(uuid.UUID(session_id))
+    primary = chroma.create_collection(name=primary_name)
+    primary.add(
+        ids=[f"chunk-{i}" for i in range(5)],
+        documents=[f"Metin parçası {i}" for i in range(5)],
+        metadatas=[
+            {"filename": "ders.pdf", "chunk_index": 0, "bolum": "giris"},
+            {"filename": "ders.pdf", "chunk_index": 1, "bolum": "giris"},
+            {"filename": "ek.pdf", "chunk_index": 0, "bolum": "ozet"},
+            # Written before filename existed: JSON list of source files
+            {"source_files": json.dumps(["ders.pdf"]), "chunk_index": 2, "bolum": "ozet"},
+            {"source_files": "ders.pdf", "chunk_index": 3, "bolum": "ozet"},
+        ],
+        embeddings=[[float(i), 1.0] for i in range(5)],
+    )
+    legacy = chroma.create_collection(name=f"{primary_name}_1700000000")
+    legacy.add(
+        ids=["old-0", "old-1"],
+        documents=["Metin parçası 0", "  metin PARÇASI 1 "],
+        metadatas=[{"filename": "ders.pdf", "chunk_index": 0}, {"filename": "ders.pdf", "chunk_index": 1}],
+        embeddings=[[0.0, 1.0], [1.0, 1.0]],
+    )
+    return client, session_id
+
+
+def _ids(response):
+    return [c["chunk_id"] for c in response.json()["chunks"]]
+
+
+@pytest.mark.unit
+def test_cursor_round_trip_across_pages_and_collections(session_with_legacy_copy):
+    client, session_id = session_with_legacy_copy
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 2, "fields": "ids"}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(f"/sessions/{session_id}/chunks", params=params)
+        assert response.status_code == 200
+        seen.extend(_ids(response))
+        pages += 1
+        cursor = response.json()["next_cursor"]
+        if cursor is None:
+            break
+
+    # Every chunk of both collections exactly once, primary collection first
+    assert seen == [f"chunk-{i}" for i in range(5)] + ["old-0", "old-1"]
+    assert pages == 4
+
+    bad = client.get(f"/sessions/{session_id}/chunks", params={"limit": 2, "cursor": "not-a-cursor"})
+    assert bad.status_code == 400
+
+
+@pytest.mark.unit
+def test_document_name_filter_matches_legacy_source_files(session_with_legacy_copy):
+    client, session_id = session_with_legacy_copy
+
+    ders = client.get(f"/sessions/{session_id}/chunks", params={"document_name": "ders.pdf", "fields": "ids"})
+    assert sorted(_ids(ders)) == ["chunk-0", "chunk-1", "chunk-3", "chunk-4", "old-0", "old-1"]
+
+    ek = client.get(f"/sessions/{session_id}/chunks", params={"document_name": "ek.pdf", "fields": "ids"})
+    assert _ids(ek) == ["chunk-2"]
+
+
+@pytest.mark.unit
+def test_chunk_ids_filter(session_with_legacy_copy):
+    client, session_id = session_with_legacy_copy
+
+    response = client.get(f"/sessions/{session_id}/chunks", params={"chunk_ids": "chunk-4, old-1,missing"})
+    assert response.status_code == 200
+    assert sorted(_ids(response)) == ["chunk-4", "old-1"]
+
+
+@pytest.mark.unit
+def test_metadata_match_filter(session_with_legacy_copy):
+    client, session_id = session_with_legacy_copy
+
+    response = client.get(f"/sessions/{session_id}/chunks", params={
+        "metadata_match": json.dumps({"bolum": "ozet"}), "document_name": "ders.pdf", "fields": "ids",
+    })
+    assert sorted(_ids(response)) == ["chunk-3", "chunk-4"]
+
+    by_index = client.get(f"/sessions/{session_id}/chunks", params={
+        "metadata_match": json.dumps({"chunk_index": 0}), "fields": "ids",
+    })
+    assert sorted(_ids(by_index)) == ["chunk-0", "chunk-2", "old-0"]
+
+    for invalid in ("[1, 2]", "{bolum", json.dumps({"bolum": ["ozet"]})):
+        response = client.get(f"/sessions/{session_id}/chunks", params={"metadata_match": invalid})
+        assert response.status_code == 400
+
+
+@pytest.mark.unit
+def test_ndjson_stream_drops_legacy_duplicates(session_with_legacy_copy):
+    client, session_id = session_with_legacy_copy
+
+    # Small batches: the copies in the legacy collection arrive in a later batch
+    stream = client.get(f"/sessions/{session_id}/chunks", params={"format": "ndjson", "limit": 2})
+    assert stream.status_code == 200
+    assert stream.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in stream.text.splitlines()]
+    # old-0 / old-1 repeat chunk-0 / chunk-1 (same document, index and normalized text)
+    assert [line["chunk_id"] for line in lines] == [f"chunk-{i}" for i in range(5)]
+
+    # Without text the content cannot be compared: only ID duplicates are dropped
+    ids_only = client.get(f"/sessions/{session_id}/chunks", params={"format": "ndjson", "fields": "ids,metadata"})
+    assert len(ids_only.text.splitlines()) == 7
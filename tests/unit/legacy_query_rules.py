@@ -0,0 +1,238 @@
+"""
+Reference copies of the per-pattern classification loops that
+utils/rule_sets.py replaced (QueryRouter and EnhancedQueryProcessor).
+
+Used by test_query_rule_sets.py (identical results on QUERY_CORPUS) and by
+scripts/benchmark_query_rules.py (timing baseline). Do not "fix" these:
+they must keep the old behaviour.
+"""
+
+import re
+
+from src.utils.turkish_text import analyze, normalize_text
+
+QUERY_CORPUS = [
+    # Tanım
+    "Hücre nedir?",
+    "hucre nedir",
+    "HÜCRE ZARI NEDİR?",
+    "Mitokondri ne demek?",
+    "Fotosentezi tanımla",
+    "Atatürk kimdir?",
+    "Osmoz ne?",
+    "Enzim tanımı nedir ve ne işe yarar?",
+    "DNA'nın yapısı nedir?",
+    "What is photosynthesis?",
+    "define entropy",
+    # Karşılaştırma
+    "Mitoz ile mayoz arasındaki farklar nelerdir?",
+    "Mitoz ve mayoz bölünmeyi karşılaştır",
+    "Bitki hücresi ile hayvan hücresi arasında benzer yapılar hangileri?",
+    "Hangisi daha hızlı, difüzyon mu osmoz mu?",
+    "Hangi yöntem en verimli?",
+    "DNA vs RNA farklılık",
+    "Compare mitosis and meiosis, what is the difference between them?",
+    "Aktif taşıma ile pasif taşıma arasındaki fark",
+    "ilerleme ile gelişim farklı mı?",
+    # Uygulama / prosedür
+    "Python'da liste nasıl oluşturulur?",
+    "python ile t-testi nasil yapilir adim adim goster",
+    "R kodu ile regresyon örneği göster",
+    "SQL sorgusu yaz ve örnek ver",
+    "How to implement a binary search in Python?",
+    "Deney düzeneği nasıl kurulur, adımları nelerdir?",
+    "Matlab ile grafik çizmek için kod örneği",
+    "Bir fonksiyon yarat ve değişken döngü koşul kullan",
+    "create a demo that shows steps",
+    # Çoklu belge
+    "Tüm ders notlarını özetle",
+    "Ders notları ve laboratuvar kılavuzunu kullanarak genel bir özet çıkar",
+    "Bütün konuları birleştir ve hepsini özetle",
+    "Summarize all documents",
+    "Use multiple sources and several documents to give an overall summary",
+    "kılavuz içindeki deneyleri özetle",
+    # Kavramsal
+    "Neden gökyüzü mavidir?",
+    "Hücre zarı niçin seçici geçirgendir? Açıkla",
+    "Enzimlerin çalışma mantığını detaylı anlat",
+    "Why does ice float? Explain the principle",
+    "Bu deneyin amacı ne için önemlidir?",
+    "Mendel yasalarının ilkesi nedir ve sebebi ne?",
+    "Describe the purpose of mitochondria in detail",
+    # Karmaşıklık göstergeleri
+    "Birden fazla kaynağı karşılaştır ve sonuçları özetle",
+    "Fotosentez ve solunumu detaylı analiz et ve değerlendir",
+    "Give a comprehensive and thorough analysis of the evaluate step",
+    "compare the two methods and summarize the results",
+    "various approaches multiple times several sources document",
+    "İstatistiksel hipotez testi ile olasılık dağılımı arasındaki ilişkiyi detaylı olarak açıklayıp farklı örneklerle değerlendirir misiniz lütfen",
+    # Karışık / sınır durumlar
+    "Lütfen bana yardım eder misiniz, rica etsem",
+    "hey what is this?",
+    "Could you please explain how it works?",
+    "Bu konu hakkında bir şey söyler misin",
+    "2023 yılında kaç öğrenci mezun oldu?",
+    "ne",
+    "?",
+    "   ",
+    "r",
+    "R programlama dili",
+    "Kurallar, kurumlar ve kuruluşlar",
+    "Bu algoritmanın karmaşıklığı nedir? Veri yapısı, model ve sistem",
+    "html css javascript database framework library api",
+    "Yapay zeka ne zaman ortaya çıktı ve hangi alanlarda kullanılır?",
+    "Türev ve integral hesapla, sonucu yorumla",
+    "Kuvvet, enerji ve hareket arasındaki ilişki nedir? Dalga ve elektrik örnekleri ver",
+    "Molekül, atom ve bileşik; reaksiyon sırasında ne olur?",
+    "Protein sentezi organizma için neden önemlidir?",
+    "Java ile algoritma yazmak, program ve yazılım geliştirmek",
+    "Kategorize et, incele ve ayır",
+    "Eleştir, savun ve karar ver",
+    "Tasarla, geliştir, oluştur",
+    "En iyi yöntemi seç",
+    "Süreç adımları ve yöntem: nasıl yapılır?",
+    "Misal ver, demo göster",
+    "Anlamı nedir, tanım ver",
+    "arasında ne zaman ne demek nasıl yapılır en iyi",
+    "ISI ve SICAKLIK farkı nedir?",
+    "IŞIK neden kırılır?",
+    "Işığın kırılması ile yansıması arasındaki fark",
+]
+
+
+# ---------------------------------------------------------------- QueryRouter
+
+HIGH_COMPLEXITY_INDICATORS = [
+    r'\b(detaylı|comprehensive|extensive|thorough)\b',
+    r'\b(birden.+fazla|multiple|several|various)\b',
+    r'\b(analiz|analysis|evaluate|değerlendir)\b',
+    r'\b(karşılaştır.+özetle|compare.+summarize)\b'
+]
+
+
+def router_type_scores(patterns, query):
+    """QueryRouter._detect_query_type scores: one re.findall per pattern"""
+    scores = {}
+    for query_type, type_patterns in patterns.items():
+        scores[query_type] = 0
+        for pattern in type_patterns:
+            scores[query_type] += len(re.findall(pattern, query, re.IGNORECASE))
+    return scores
+
+
+def router_detect_query_type(patterns, query, query_types):
+    """QueryRouter._detect_query_type; ``query_types`` is the QueryType enum"""
+    type_scores = {qtype: 0 for qtype in query_types}
+    type_scores.update(router_type_scores(patterns, query))
+    max_score = max(type_scores.values())
+    if max_score > 0:
+        for qtype, score in type_scores.items():
+            if score == max_score:
+                return qtype
+    return query_types.UNKNOWN
+
+
+def router_complexity_score(query):
+    """Complexity indicator part of QueryRouter._assess_complexity"""
+    return sum(1 for indicator in HIGH_COMPLEXITY_INDICATORS if re.search(indicator, query, re.IGNORECASE))
+
+
+def router_pattern_features(query):
+    return {
+        "has_numbers": bool(re.search(r'\d', query)),
+        "has_code_keywords": bool(re.search(r'\b(python|r|sql|kod|code|function|def)\b', query, re.IGNORECASE)),
+    }
+
+
+# --------------------------------------------------- EnhancedQueryProcessor
+
+def processor_detect_subject(patterns, query):
+    query_lower = normalize_text(query)
+    subject_scores = {}
+    for subject, keywords in patterns["subjects"].items():
+        score = sum(1 for keyword in keywords if keyword in query_lower)
+        if score > 0:
+            subject_scores[subject] = score
+    if subject_scores:
+        return max(subject_scores, key=subject_scores.get)
+    return "genel"
+
+
+def processor_first_match(group, query, default):
+    query_lower = normalize_text(query)
+    for name, keywords in group.items():
+        if any(keyword in query_lower for keyword in keywords):
+            return name
+    return default
+
+
+def processor_extract_key_terms(query):
+    stop_words = {
+        'tr': ['bir', 'bu', 'şu', 've', 'ile', 'için', 'de', 'da', 'ki', 'mi', 'mı', 'ne', 'nə'],
+        'en': ['a', 'an', 'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with']
+    }
+    return [
+        word for word in analyze(query).tokens
+        if len(word) > 2 and not any(word in stop_list for stop_list in stop_words.values())
+    ]
+
+
+def processor_has_technical_terms(query):
+    technical_patterns = [
+        r'\b(python|java|sql|html|css|javascript)\b',
+        r'\b(algoritma|veri|analiz|model|sistem)\b',
+        r'\b(fonksiyon|değişken|döngü|koşul)\b',
+        r'\b(database|framework|library|api)\b'
+    ]
+    query_lower = normalize_text(query)
+    return any(re.search(pattern, query_lower) for pattern in technical_patterns)
+
+
+def processor_complexity(query):
+    indicators = {
+        "length": len(query.split()) / 20,
+        "technical_terms": 0.3 if processor_has_technical_terms(query) else 0,
+        "multiple_concepts": len(processor_extract_key_terms(query)) / 10,
+        "question_depth": 0.2 if any(word in normalize_text(query) for word in ["neden", "nasıl", "analiz"]) else 0
+    }
+    return min(1.0, sum(indicators.values()))
+
+
+def processor_language(query):
+    turkish_indicators = ['nedir', 'nasıl', 'neden', 'hangi', 'için', 'ile', 've', 'bir', 'bu', 'şu']
+    english_indicators = ['what', 'how', 'why', 'which', 'for', 'with', 'and', 'the', 'is', 'this']
+    query_lower = normalize_text(query)
+    turkish_score = sum(1 for word in turkish_indicators if word in query_lower)
+    english_score = sum(1 for word in english_indicators if word in query_lower)
+    if turkish_score > english_score:
+        return "tr"
+    elif english_score > turkish_score:
+        return "en"
+    return "mixed"
+
+
+def processor_formality(query):
+    formal_indicators = ['lütfen', 'rica etsem', 'mümkün mü', 'please', 'could you']
+    informal_indicators = ['nasıl', 'ne', 'hey', 'what', 'how']
+    query_lower = normalize_text(query)
+    formal_count = sum(1 for indicator in formal_indicators if indicator in query_lower)
+    informal_count = sum(1 for indicator in informal_indicators if indicator in query_lower)
+    if formal_count > informal_count:
+        return "formal"
+    elif informal_count > formal_count:
+        return "informal"
+    return "neutral"
+
+
+def processor_analysis(patterns, query):
+    """The pattern-derived fields of EnhancedQueryProcessor.semantic_analysis"""
+    return {
+        "detected_subject": processor_detect_subject(patterns, query),
+        "cognitive_level": processor_first_match(patterns["cognitive_levels"], query, "understand"),
+        "educational_intent": processor_first_match(patterns["educational_intents"], query, "explanation"),
+        "complexity_score": processor_complexity(query),
+        "language": processor_language(query),
+        "key_terms": processor_extract_key_terms(query),
+        "has_technical_terms": processor_has_technical_terms(query),
+        "formality_level": processor_formality(query),
+    }
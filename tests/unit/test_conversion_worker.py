@@ -0,0 +1,147 @@
+"""
+Unit tests for the PDF conversion worker's job claims: lease sweep and
+reclaiming jobs of a worker process that died or hung.
+"""
+
+import queue
+import time
+
+import pytest
+
+from services.pdf_processing_service import conversion_worker
+from services.pdf_processing_service.conversion_worker import (
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    ConversionWorker,
+)
+
+
+class FakeProcess:
+    def __init__(self, alive=True, exitcode=None):
+        self.alive = alive
+        self.exitcode = exitcode
+        self.pid = 4242
+        self.terminated = False
+
+    def is_alive(self):
+        return self.alive
+
+    def terminate(self):
+        self.terminated = True
+        self.alive = False
+        self.exitcode = -15
+
+    def join(self, timeout=None):
+        pass
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    """Worker without a child process; handed-over jobs land in a plain queue"""
+    monkeypatch.setattr(conversion_worker, "PSUTIL_AVAILABLE", False)
+    w = ConversionWorker(max_queue_size=4, max_attempts=2)
+    w._job_queue = queue.Queue()
+    w._process = FakeProcess()
+    spawned = []
+
+    def spawn():
+        spawned.append(1)
+        w._process = FakeProcess()
+        w._job_queue = queue.Queue()
+        w.ready.clear()
+
+    monkeypatch.setattr(w, "_spawn_process", spawn)
+    w.spawned = spawned
+    return w
+
+
+def submit(worker, tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(b"%PDF-1.4")
+    return worker.submit(str(path), name, owns_file=False)
+
+
+def expire(job):
+    job.claimed_until = time.time() - 1
+
+
+@pytest.mark.unit
+def test_jobs_are_handed_over_one_at_a_time(worker, tmp_path):
+    first = submit(worker, tmp_path, "a.pdf")
+    second = submit(worker, tmp_path, "b.pdf")
+    # Not ready yet: nothing is handed over
+    assert worker._job_queue.empty()
+
+    worker._apply_event("ready", None, {"model_load_seconds": 1.0})
+    assert worker._job_queue.get_nowait() == (first.job_id, first.pdf_path, 1)
+    assert worker._job_queue.empty()
+    assert first.claimed_at is not None and second.claimed_at is None
+
+    worker._apply_event("started", first.job_id, {"attempt": 1, "pages_total": 2})
+    worker._apply_event("done", first.job_id, {"attempt": 1, "content": "# A"})
+    assert first.claimed_until is None
+    assert worker._job_queue.get_nowait() == (second.job_id, second.pdf_path, 1)
+
+
+@pytest.mark.unit
+def test_events_renew_the_lease(worker, tmp_path):
+    worker._apply_event("ready", None, {})
+    job = submit(worker, tmp_path, "a.pdf")
+    expire(job)
+    worker._apply_event("heartbeat", job.job_id, {"attempt": 1})
+    worker._reclaim_expired_claim()
+    assert job.status == JOB_QUEUED and job.attempts == 1
+    assert not worker._process.terminated
+
+
+@pytest.mark.unit
+def test_claim_without_started_is_requeued_after_lease(worker, tmp_path):
+    worker._apply_event("ready", None, {})
+    job = submit(worker, tmp_path, "a.pdf")
+    worker._job_queue.get_nowait()
+
+    # Worker took the job and went silent before "started"
+    expire(job)
+    worker._reclaim_expired_claim()
+    assert job.status == JOB_QUEUED and job.claimed_at is None
+    assert worker._process.terminated
+    worker._check_worker_health()
+    assert worker.spawned == [1]
+
+    worker._apply_event("ready", None, {})
+    assert worker._job_queue.get_nowait() == (job.job_id, job.pdf_path, 2)
+    # Late events of the first attempt are ignored
+    worker._apply_event("started", job.job_id, {"attempt": 1, "pages_total": 9})
+    assert job.status == JOB_QUEUED and job.pages_total == 0
+
+    # Second attempt expires as well: max_attempts reached
+    expire(job)
+    worker._reclaim_expired_claim()
+    assert job.status == JOB_FAILED
+    assert "no events" in job.error
+    assert worker.stats()["reclaimed_jobs"] == 1
+
+
+@pytest.mark.unit
+def test_worker_death_requeues_unstarted_and_fails_running_job(worker, tmp_path):
+    worker._apply_event("ready", None, {})
+    claimed = submit(worker, tmp_path, "a.pdf")
+    waiting = submit(worker, tmp_path, "b.pdf")
+
+    worker._process = FakeProcess(alive=False, exitcode=-9)
+    worker._check_worker_health()
+    assert claimed.status == JOB_QUEUED and waiting.status == JOB_QUEUED
+
+    worker._apply_event("ready", None, {})
+    assert worker._job_queue.get_nowait()[0] == claimed.job_id
+    worker._apply_event("started", claimed.job_id, {"attempt": 2, "pages_total": 3})
+    assert claimed.status == JOB_RUNNING
+
+    worker._process.alive = False
+    worker._process.exitcode = -9
+    worker._check_worker_health()
+    assert claimed.status == JOB_FAILED
+    assert "exit code -9" in claimed.error
+    worker._apply_event("ready", None, {})
+    assert worker._job_queue.get_nowait()[0] == waiting.job_id
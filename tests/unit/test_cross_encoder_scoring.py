@@ -0,0 +1,65 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.rag.cross_encoder_scoring import CrossEncoderScorer
+
+
+@pytest.fixture
+def model():
+    """Fake CrossEncoder: score = document length, records every batch"""
+    fake = MagicMock()
+    fake.predict.side_effect = lambda pairs, batch_size=32, show_progress_bar=False: [
+        float(len(text)) for _, text in pairs
+    ]
+    return fake
+
+
+def batches(model):
+    return [[text for _, text in call.args[0]] for call in model.predict.call_args_list]
+
+
+def test_scores_keep_input_order_with_length_sorted_batches(model):
+    scorer = CrossEncoderScorer(model, "ce", batch_size=2, max_batch_tokens=10_000)
+    texts = ["x" * 400, "a", "x" * 40, "bb", "x" * 4000]
+
+    assert scorer.score("soru", texts) == [400.0, 1.0, 40.0, 2.0, 4000.0]
+    assert batches(model) == [["a", "bb"], ["x" * 40, "x" * 400], ["x" * 4000]]
+
+
+def test_token_budget_shrinks_batches_of_long_pairs(model):
+    scorer = CrossEncoderScorer(model, "ce", batch_size=64, max_length=512, max_batch_tokens=1024)
+    texts = [f"kısa {i}" for i in range(10)] + [f"uzun {i} " * 1000 for i in range(3)]
+
+    scorer.score("soru", texts)
+
+    sizes = [len(batch) for batch in batches(model)]
+    assert sizes == [10, 2, 1]  # long pairs are capped at max_length=512 tokens
+
+
+def test_cache_is_keyed_by_normalized_query_and_chunk(model):
+    scorer = CrossEncoderScorer(model, "ce", cache_size=100)
+
+    scorer.score("Hücre zarı nedir?", ["zar", "mitoz"], doc_ids=["c1", None])
+    scorer.score("HÜCRE  ZARI NEDİR?", ["zar", "mitoz", "mitoz"], doc_ids=["c1", None, None])
+    assert model.predict.call_count == 1  # same chunk id and same content hash
+
+    # Same chunk id, new text (re-extracted chunk): scored again
+    assert scorer.score("hücre zarı nedir", ["zar (yeniden çıkarıldı)"], doc_ids=["c1"]) == [23.0]
+    assert model.predict.call_count == 2
+
+    scorer.score("Mitoz nedir?", ["mitoz"])
+    assert model.predict.call_count == 3
+    stats = scorer.get_stats()
+    assert (stats["hits"], stats["misses"], stats["cache_entries"]) == (3, 4, 4)
+
+
+def test_cache_evicts_least_recently_used(model):
+    scorer = CrossEncoderScorer(model, "ce", cache_size=2)
+    scorer.score("q", ["a", "b"])
+    scorer.score("q", ["a"])       # refreshes "a"
+    scorer.score("q", ["c"])       # evicts "b"
+    model.predict.reset_mock()
+
+    scorer.score("q", ["a", "b"])
+    assert batches(model) == [["b"]]
@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+
+from src.utils.model_registry import CRITICAL, WARNING, ModelRegistry
+
+
+class FakeMemoryManager:
+    max_memory_mb = 1000
+    warning_threshold = 0.8
+
+    def __init__(self, rss_mb=0.0, critical=False):
+        self.rss_mb = rss_mb
+        self.critical = critical
+
+    def get_memory_usage(self):
+        return {"rss_mb": self.rss_mb}
+
+    def is_memory_critical(self):
+        return self.critical
+
+    def is_memory_warning(self):
+        return self.rss_mb > self.max_memory_mb * self.warning_threshold
+
+
+def loader(name, delay=0.0):
+    calls = []
+
+    def load():
+        calls.append(name)
+        time.sleep(delay)
+        return object()
+
+    load.calls = calls
+    return load
+
+
+def test_concurrent_callers_share_one_load():
+    registry = ModelRegistry()
+    load = loader("ce", delay=0.1)
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(registry.get("ce", load))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(load.calls) == 1
+    assert len({id(model) for model in results}) == 1
+    stats = registry.get_stats()
+    assert (stats["loads"], stats["misses"], stats["hits"]) == (1, 1, 7)
+
+
+def test_budget_evicts_least_recently_used_but_not_in_use():
+    registry = ModelRegistry(budget_mb=250)
+    evicted = []
+    registry.get("a", loader("a"), estimated_mb=100, on_evict=lambda: evicted.append("a"))
+    handle_b = registry.handle("b", loader("b"), estimated_mb=100)
+    handle_b.get()
+    registry.get("a", loader("a"))  # "b" is now least recently used
+
+    with handle_b.in_use():
+        registry.get("c", loader("c"), estimated_mb=100)  # "b" is protected -> "a" goes
+    assert evicted == ["a"]
+
+    registry.get("d", loader("d"), estimated_mb=100)  # "b" was used last when in_use ended
+    stats = registry.get_stats()
+    assert [k for k, m in stats["models"].items() if m["loaded"]] == ["b", "d"]
+    assert stats["evictions"] == 2 and stats["loaded_mb"] == 200
+
+    handle_c = registry.handle("c", loader("c"), estimated_mb=100)
+    handle_c.get()  # evicted handles reload lazily
+    assert registry.get_stats()["models"]["c"]["loads"] == 2
+
+
+def test_load_failure_is_counted_and_retried():
+    registry = ModelRegistry()
+
+    def broken():
+        raise OSError("model not found")
+
+    with pytest.raises(OSError):
+        registry.get("x", broken)
+    assert registry.get_stats()["load_failures"] == 1
+    assert registry.get("x", loader("x")) is not None
+
+
+def test_pressure_eviction_follows_overshoot_and_idle_time():
+    memory = FakeMemoryManager(rss_mb=500)
+    registry = ModelRegistry(memory, min_idle_seconds=60)
+    registry.get("old", loader("old"), estimated_mb=150)
+    registry.get("new", loader("new"), estimated_mb=150)
+    registry._entries["old"].last_used -= 120
+
+    # Below the warning limit (800MB): nothing to free, even for an explicit critical call
+    assert registry.relieve_pressure(WARNING) == []
+    assert registry.relieve_pressure(CRITICAL) == []
+
+    memory.rss_mb = 900  # 100MB over the warning limit; only "old" is idle long enough
+    assert registry.relieve_pressure(WARNING) == ["old"]
+    assert registry.relieve_pressure(WARNING) == []
+
+    memory.rss_mb, memory.critical = 500, True  # system-wide pressure
+    assert registry.relieve_pressure(CRITICAL) == ["new"]
@@ -0,0 +1,172 @@
+import random
+import tempfile
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from src.analytics.quantile_sketch import DDSketch
+from src.analytics.performance_tracker import PerformanceMetric, PerformanceTracker
+
+
+ALPHA = 0.01
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def exact_quantile(values, q):
+    """Reference percentile using the tracker's rank definition."""
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def assert_within_bound(estimate, exact, alpha=ALPHA):
+    assert abs(estimate - exact) <= alpha * exact + 1e-12
+
+
+@pytest.fixture
+def latencies():
+    """Heavy-tailed latencies in seconds (lognormal), similar to RAG chains."""
+    rng = random.Random(42)
+    return [rng.lognormvariate(0.5, 1.0) for _ in range(20000)]
+
+
+@pytest.fixture
+def performance_tracker():
+    temp_dir = tempfile.mkdtemp()
+    config = {"analytics_db_path": str(Path(temp_dir) / "test_performance.db")}
+    with patch('src.utils.logger.get_logger') as mock_logger:
+        mock_logger.return_value = MagicMock()
+        yield PerformanceTracker(config)
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class TestDDSketch:
+    """Accuracy, merge and serialization of the quantile sketch."""
+
+    @pytest.mark.unit
+    def test_relative_error_bound(self, latencies):
+        sketch = DDSketch(ALPHA)
+        for value in latencies:
+            sketch.add(value)
+
+        for q in PERCENTILES + (0.0, 0.25, 0.999, 1.0):
+            assert_within_bound(sketch.quantile(q), exact_quantile(latencies, q))
+
+    @pytest.mark.unit
+    def test_merge_equals_single_stream(self, latencies):
+        single = DDSketch(ALPHA)
+        parts = [DDSketch(ALPHA) for _ in range(24)]
+        for i, value in enumerate(latencies):
+            single.add(value)
+            parts[i % 24].add(value)
+
+        merged = DDSketch(ALPHA)
+        for part in parts:
+            merged.merge(part)
+
+        assert merged.count == single.count
+        assert merged.quantiles(PERCENTILES) == single.quantiles(PERCENTILES)
+
+    @pytest.mark.unit
+    def test_serialization_roundtrip(self, latencies):
+        sketch = DDSketch(ALPHA)
+        for value in latencies + [0.0, 0.0]:
+            sketch.add(value)
+
+        payload = sketch.to_bytes()
+        restored = DDSketch.from_bytes(payload)
+
+        assert len(payload) < 4096
+        assert restored.count == sketch.count
+        assert restored.zero_count == 2
+        assert restored.quantiles(PERCENTILES) == sketch.quantiles(PERCENTILES)
+        assert restored.quantile(0.0) == 0.0
+
+    @pytest.mark.unit
+    def test_empty_sketch(self):
+        sketch = DDSketch.from_bytes(DDSketch().to_bytes())
+        assert sketch.count == 0
+        assert sketch.quantile(0.95) is None
+
+    @pytest.mark.unit
+    def test_merge_rejects_different_accuracy(self):
+        other = DDSketch(0.05)
+        other.add(1.0)
+        with pytest.raises(ValueError):
+            DDSketch(0.01).merge(other)
+
+
+class TestTrackerPercentiles:
+    """Windowed percentiles answered from persisted bucket sketches."""
+
+    @pytest.mark.unit
+    def test_window_percentiles_match_exact(self, performance_tracker):
+        rng = random.Random(7)
+        now = datetime.now()
+        in_window = {"stuff": [], "refine": []}
+
+        for i in range(1500):
+            chain_type = "stuff" if i % 3 else "refine"
+            timestamp = now - timedelta(minutes=rng.uniform(0, 36 * 60))
+            execution_time = rng.lognormvariate(0.3, 0.9)
+            performance_tracker.record_performance(PerformanceMetric(
+                timestamp=timestamp.isoformat(),
+                query_id=f"sketch-{i}",
+                query_text="Test",
+                chain_type=chain_type,
+                query_type="test",
+                complexity_level="simple",
+                execution_time=execution_time,
+                tokens_used=100,
+                success=True
+            ))
+            if timestamp >= now - timedelta(hours=24):
+                in_window[chain_type].append(execution_time)
+
+        result = performance_tracker.get_percentile_times(time_range_hours=24)
+
+        for chain_type, values in in_window.items():
+            assert result[chain_type]["count"] == len(values)
+            for q in PERCENTILES:
+                assert_within_bound(result[chain_type][f"p{int(q * 100)}"], exact_quantile(values, q))
+
+        stats = {s.chain_type: s for s in performance_tracker.get_chain_performance_stats(time_range_hours=24)}
+        assert stats["stuff"].percentile_95_time == result["stuff"]["p95"]
+
+    @pytest.mark.unit
+    def test_failed_queries_excluded(self, performance_tracker):
+        for i, (execution_time, success) in enumerate([(1.0, True), (2.0, True), (50.0, False)]):
+            performance_tracker.record_performance(PerformanceMetric(
+                timestamp=datetime.now().isoformat(),
+                query_id=f"mixed-{i}",
+                query_text="Test",
+                chain_type="stuff",
+                query_type="test",
+                complexity_level="simple",
+                execution_time=execution_time,
+                tokens_used=100,
+                success=success
+            ))
+
+        assert performance_tracker._get_percentile_time("stuff", 99, 24) == pytest.approx(2.0, rel=ALPHA)
+
+    @pytest.mark.unit
+    def test_rebuild_matches_incremental(self, performance_tracker):
+        for i in range(200):
+            performance_tracker.record_performance(PerformanceMetric(
+                timestamp=(datetime.now() - timedelta(minutes=7 * i)).isoformat(),
+                query_id=f"rebuild-{i}",
+                query_text="Test",
+                chain_type="map_reduce",
+                query_type="test",
+                complexity_level="simple",
+                execution_time=0.1 * (i + 1),
+                tokens_used=100,
+                success=True
+            ))
+
+        incremental = performance_tracker.get_percentile_times(time_range_hours=48)
+        performance_tracker.rebuild_sketches()
+        assert performance_tracker.get_percentile_times(time_range_hours=48) == incremental
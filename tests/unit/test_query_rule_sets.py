@@ -0,0 +1,75 @@
+import random
+import re
+
+import pytest
+
+from src.query_processing.query_processor import EnhancedQueryProcessor
+from src.rag.query_router import QueryComplexity, QueryRouter, QueryType, RAGChainType
+from src.utils.rule_sets import SubstringSet, WordRuleSet
+from src.utils.turkish_text import normalize_text
+
+from tests.unit import legacy_query_rules as legacy
+
+
+@pytest.fixture(scope="module")
+def router():
+    return QueryRouter({})
+
+
+@pytest.fixture(scope="module")
+def processor():
+    return EnhancedQueryProcessor({"enable_semantic_analysis": False})
+
+
+@pytest.mark.parametrize("query", legacy.QUERY_CORPUS)
+def test_router_classification_matches_per_pattern_loops(router, query):
+    query_clean = normalize_text(query)
+    counts = router._rule_counts(query_clean)
+
+    assert router._detect_query_type(query_clean, counts) == legacy.router_detect_query_type(
+        router.patterns, query_clean, QueryType
+    )
+    for i, indicator in enumerate(legacy.HIGH_COMPLEXITY_INDICATORS):
+        assert bool(counts[f"complexity:{i}"]) == bool(re.search(indicator, query_clean, re.IGNORECASE))
+
+    features = router._extract_features(query_clean, counts)
+    for name, value in legacy.router_pattern_features(query_clean).items():
+        assert features[name] == value
+
+
+@pytest.mark.parametrize("query", legacy.QUERY_CORPUS)
+def test_processor_analysis_matches_per_keyword_loops(processor, query):
+    analysis = processor.semantic_analysis(query)
+    fields = {**analysis, **analysis["semantic_features"]}
+
+    expected = legacy.processor_analysis(processor.educational_patterns, query)
+    assert {name: fields[name] for name in expected} == expected
+
+
+def test_rule_sets_match_re_on_random_text():
+    rng = random.Random(48)
+    words = ["ne", "nedir", "ne demek", "nasıl", "nasıl yapılır", "fark", "farklı", "r", "kod", "İ", "ı",
+             "analiz", "analiz et", "birden", "fazla", "özetle", "karşılaştır", "-", " ", "?", "x"]
+    rules = [
+        ("a", r'\b(ne|nedir|ne demek|nasıl)\b'),
+        ("b", r'\b(fark|farklı|analiz|analiz et)\b'),
+        ("c", r'\b(r|kod|ı)\b'),
+        ("d", r'\b(birden.+fazla|karşılaştır.+özetle)\b'),
+    ]
+    folding = WordRuleSet(rules, re.IGNORECASE)
+    exact = WordRuleSet(rules)
+    keywords = SubstringSet(words[:16])
+
+    for _ in range(2000):
+        text = "".join(rng.choice(words) + rng.choice(["", " "]) for _ in range(rng.randint(0, 12)))
+        for rule_set, flags in ((folding, re.IGNORECASE), (exact, 0)):
+            assert rule_set.counts(text) == {name: len(re.findall(p, text, flags)) for name, p in rules}
+        assert keywords.find(text) == {k for k in words[:16] if k in text}
+
+
+def test_procedural_query_selects_chain_without_enum_comparison_error(router):
+    classification = router.classify_query("Python ile liste nasıl oluşturulur? Adım adım kod örneği göster")
+
+    assert classification["query_type"] == QueryType.APPLIED_PROCEDURAL
+    assert classification["complexity"] in (QueryComplexity.MEDIUM, QueryComplexity.HIGH)
+    assert classification["recommended_chain"] == RAGChainType.REFINE
@@ -0,0 +1,138 @@
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.rag.query_router import QueryComplexity, QueryType, RAGChainType
+from src.rag.rag_chains import MapReduceChain, StuffChain
+
+STEP_DELAY = 0.2
+
+
+@pytest.fixture
+def config(tmp_path):
+    return {
+        "ollama_base_url": "http://localhost:11434",
+        "enable_cache": False,
+        "chain_max_workers": 4,
+        "analytics_db_path": str(tmp_path / "performance.db"),
+    }
+
+
+@pytest.fixture
+def slow_store():
+    """Vector store whose searches take STEP_DELAY; hits depend on the query embedding"""
+    def search(query_embedding, k):
+        time.sleep(STEP_DELAY)
+        i = query_embedding[0]
+        return [
+            ("shared chunk", 0.5 + i / 10, {"filename": "a.pdf"}),
+            (f"chunk {i}", 0.4, {"filename": "b.pdf"}),
+        ]
+
+    store = MagicMock()
+    store.search.side_effect = search
+    return store
+
+
+@pytest.fixture(autouse=True)
+def fake_embeddings():
+    with patch("src.rag.rag_chains.generate_embeddings",
+               side_effect=lambda texts, **kwargs: [[i] for i in range(len(texts))]):
+        yield
+
+
+def slow_generation(system_prompt, user_prompt, temperature=None):
+    time.sleep(STEP_DELAY)
+    return f"Belgeye göre ilgili özet: {user_prompt[-40:]}"
+
+
+def test_multi_query_searches_run_concurrently(config, slow_store):
+    chain = StuffChain(config, slow_store)
+
+    start = time.time()
+    documents = chain._retrieve_documents(["q0", "q1", "q2", "q3"], top_k=10)
+    elapsed = time.time() - start
+
+    assert slow_store.search.call_count == 4
+    assert elapsed < STEP_DELAY * 2.5  # sequential: 4 * STEP_DELAY
+    # Merged by text, best score kept, best first
+    assert documents[0] == {"text": "shared chunk", "score": pytest.approx(0.8), "metadata": {"filename": "a.pdf"}}
+    assert len(documents) == 5
+
+
+def test_map_step_runs_concurrently_and_keeps_order(config, slow_store):
+    slow_store.search.side_effect = lambda embedding, k: [
+        (f"doc {i}", 1.0 - i / 10, {"filename": f"{i}.pdf"}) for i in range(4)
+    ]
+    chain = MapReduceChain(config, slow_store)
+
+    with patch.object(chain, "_generate_with_ollama", side_effect=slow_generation):
+        result = chain.execute("Hücre nedir?", top_k=4)
+
+    timings = result["step_timings"]
+    assert set(timings) == {"retrieval", "map", "reduce"}
+    assert timings["map"] < STEP_DELAY * 2.5  # sequential: 4 * STEP_DELAY
+    assert [s["document_index"] for s in result["map_summaries"]] == [0, 1, 2, 3]
+
+
+def test_speculative_mode_returns_first_result_meeting_threshold(config, slow_store):
+    from src.rag.edu_modrag_pipeline import EduModRAGPipeline
+
+    pipeline = EduModRAGPipeline(config, slow_store)
+    analysis = {
+        "query_type": QueryType.MULTI_DOCUMENT,
+        "complexity": QueryComplexity.HIGH,
+        "recommended_chain": RAGChainType.MAP_REDUCE,
+        "features": {},
+        "confidence": 0.8,
+    }
+    sources = [{"text": "t", "score": 0.9, "metadata": {}} for _ in range(5)]
+
+    def fake_chain(chain_type, query, top_k, query_analysis):
+        time.sleep(1.0 if chain_type == "map_reduce" else 0.05)
+        return {
+            "answer": "x" * 600,
+            "sources": sources,
+            "chain_type": chain_type,
+            "execution_time": 0.05,
+            "step_timings": {"retrieval": 0.01, "generation": 0.04},
+        }
+
+    with patch.object(pipeline.query_router, "classify_query", return_value=analysis), \
+            patch.object(pipeline, "_execute_chain", side_effect=fake_chain):
+        start = time.time()
+        response = pipeline.execute("Belgeleri karşılaştır", speculative=True)
+        elapsed = time.time() - start
+
+    assert response.success
+    assert response.chain_used == "stuff"
+    assert elapsed < 0.8
+    speculation = response.transparency_info["speculation"]
+    assert speculation["winner"] == "stuff" and speculation["routed_chain"] == "map_reduce"
+    assert speculation["still_running"] == ["map_reduce"]
+    assert response.transparency_info["step_timings"] == {"retrieval": 0.01, "generation": 0.04}
+
+
+def test_speculative_mode_prefers_routed_chain_below_threshold(config, slow_store):
+    from src.rag.edu_modrag_pipeline import EduModRAGPipeline
+
+    pipeline = EduModRAGPipeline(config, slow_store)
+    analysis = {
+        "query_type": QueryType.CONCEPTUAL,
+        "complexity": QueryComplexity.HIGH,
+        "recommended_chain": RAGChainType.REFINE,
+        "features": {},
+        "confidence": 0.8,
+    }
+
+    def fake_chain(chain_type, query, top_k, query_analysis):
+        time.sleep(0.2 if chain_type == "refine" else 0.01)
+        return {"answer": "kısa", "sources": [], "chain_type": chain_type, "execution_time": 0.01}
+
+    with patch.object(pipeline.query_router, "classify_query", return_value=analysis), \
+            patch.object(pipeline, "_execute_chain", side_effect=fake_chain):
+        response = pipeline.execute("Neden?", speculative=True)
+
+    assert response.chain_used == "refine"
+    assert response.transparency_info["speculation"]["still_running"] == []
@@ -0,0 +1,93 @@
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    path = Path(tempfile.mkdtemp())
+    # ProfessionalSessionManager creates backup/export folders relative to cwd
+    monkeypatch.chdir(path)
+    from src.services.session_manager import ProfessionalSessionManager
+    yield ProfessionalSessionManager(str(path / "sessions.db"))
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def create(manager, name, owner, status=None, **kwargs):
+    from src.services.session_manager import SessionCategory
+    session = manager.create_session(name, kwargs.pop("description", ""), SessionCategory.GENERAL, owner, **kwargs)
+    if status:
+        manager.update_session_status(session.session_id, status)
+    return session.session_id
+
+
+def test_fold_search_text_turkish_case(manager):
+    from src.services.session_manager import fold_search_text
+
+    assert fold_search_text("IŞIK") == fold_search_text("ışık") == "isik"
+    assert fold_search_text("İstanbul") == "istanbul"
+    assert fold_search_text("Çoğul Ünlü") == "cogul unlu"
+
+
+def test_owner_filter_runs_in_sql(manager):
+    from src.services.session_manager import SessionStatus
+
+    for i in range(30):
+        create(manager, f"Başka {i}", "other_teacher")
+    own = {create(manager, f"Ders {i}", "Teacher@School.org") for i in range(3)}
+
+    # Teacher rows are a small minority: old fetch-then-filter returned an empty first page
+    sessions = manager.list_sessions(limit=5, owner_keys=["42", "teacher", "teacher@school.org"])
+    assert {s.session_id for s in sessions} == own
+    assert manager.list_sessions(owner_keys=[]) == []
+
+    active = create(manager, "Aktif", "other_teacher", status=SessionStatus.ACTIVE)
+    assert [s.session_id for s in manager.list_sessions(status=SessionStatus.ACTIVE, limit=5)] == [active]
+
+
+def test_keyset_pagination_walks_every_session_once(manager):
+    ids = {create(manager, f"Ders {i}", "teacher") for i in range(23)}
+
+    seen, before = [], None
+    while True:
+        page = manager.list_sessions(limit=5, owner_keys=["teacher"], before=before)
+        seen.extend(s.session_id for s in page)
+        if len(page) < 5:
+            break
+        before = (page[-1].updated_at, page[-1].session_id)
+
+    assert len(seen) == len(ids) and set(seen) == ids
+
+
+def test_legacy_rows_are_backfilled(manager):
+    from src.services.session_manager import ProfessionalSessionManager, SessionStatus
+
+    session_id = create(manager, "Eski", "MixedCase")
+    with sqlite3.connect(str(manager.db_path)) as conn:
+        conn.execute("UPDATE sessions SET owner_key = NULL, status = 'Active ' WHERE session_id = ?", (session_id,))
+        conn.execute("DELETE FROM sessions_fts")
+
+    reopened = ProfessionalSessionManager(str(manager.db_path))
+    assert [s.session_id for s in reopened.list_sessions(owner_keys=["mixedcase"])] == [session_id]
+    assert [s.session_id for s in reopened.list_sessions(status=SessionStatus.ACTIVE)] == [session_id]
+    assert [s.session_id for s in reopened.search_sessions("eski")] == [session_id]
+
+
+def test_search_uses_turkish_folding_and_prefixes(manager):
+    isik = create(manager, "IŞIK ve Optik", "teacher", description="Kırılma")
+    create(manager, "Tarih", "teacher", tags=["osmanlı"])
+    other = create(manager, "Işığın Hızı", "someone_else")
+
+    assert {s.session_id for s in manager.search_sessions("ışık")} == {isik}
+    assert {s.session_id for s in manager.search_sessions("isi")} == {isik, other}
+    assert {s.session_id for s in manager.search_sessions("KIRILMA")} == {isik}
+    assert [s.name for s in manager.search_sessions("Osmanli")] == ["Tarih"]
+    assert [s.session_id for s in manager.search_sessions("ısı", owner_keys=["SOMEONE_ELSE"])] == [other]
+
+    manager.update_session_metadata(isik, name="Dalgalar")
+    assert {s.session_id for s in manager.search_sessions("ışık")} == set()
+    manager.delete_session(other, create_backup=False)
+    assert manager.search_sessions("ısı") == []
@@ -0,0 +1,153 @@
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+WORKERS = 5
+THREADS_PER_WORKER = 4
+QUERIES_PER_THREAD = 150
+STUDENTS = [f"student_{i}" for i in range(30)]
+
+
+@pytest.fixture
+def temp_dir(monkeypatch):
+    path = Path(tempfile.mkdtemp())
+    # ProfessionalSessionManager creates backup/export folders relative to cwd
+    monkeypatch.chdir(path)
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def make_manager(db_path):
+    from src.services.session_manager import ProfessionalSessionManager
+    return ProfessionalSessionManager(db_path)
+
+
+def create_sessions(manager):
+    from src.services.session_manager import SessionCategory
+    return [
+        manager.create_session(f"Ders {i}", "", SessionCategory.GENERAL, "teacher").session_id
+        for i in range(2)
+    ]
+
+
+def run_worker(db_path, session_ids, seed, flush_interval):
+    """One gateway worker: several request threads recording queries"""
+    os.chdir(os.path.dirname(db_path))
+    manager = make_manager(db_path)
+    manager.usage_counter.flush_interval = flush_interval
+
+    def requests_thread(thread_seed):
+        rng = random.Random(thread_seed)
+        for _ in range(QUERIES_PER_THREAD):
+            manager.record_query(rng.choice(session_ids), rng.choice(STUDENTS))
+
+    threads = [threading.Thread(target=requests_thread, args=(seed * 100 + t,)) for t in range(THREADS_PER_WORKER)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    manager.usage_counter.stop()
+
+
+def expected_counts(session_ids):
+    """Replay the workers' random choices"""
+    queries = {session_id: 0 for session_id in session_ids}
+    entries = {}
+    for seed in range(WORKERS):
+        for t in range(THREADS_PER_WORKER):
+            rng = random.Random(seed * 100 + t)
+            for _ in range(QUERIES_PER_THREAD):
+                session_id, student = rng.choice(session_ids), rng.choice(STUDENTS)
+                queries[session_id] += 1
+                entries[(session_id, student)] = entries.get((session_id, student), 0) + 1
+    return queries, entries
+
+
+def read_counts(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        sessions = {
+            row[0]: (row[1], row[2])
+            for row in conn.execute("SELECT session_id, query_count, student_entry_count FROM sessions")
+        }
+        entries = {
+            (row[0], row[1]): row[2]
+            for row in conn.execute("SELECT session_id, student_identifier, entry_count FROM student_entries")
+        }
+    finally:
+        conn.close()
+    return sessions, entries
+
+
+def test_record_query_is_memory_only_until_flush(temp_dir):
+    db_path = str(temp_dir / "sessions.db")
+    manager = make_manager(db_path)
+    session_id = create_sessions(manager)[0]
+    counter = manager.usage_counter
+    counter.flush_interval = 3600  # flush manually
+
+    for student in ["a", "b", "a"]:
+        manager.record_query(session_id, student)
+    assert counter.pending() == {session_id: 3}
+    assert read_counts(db_path)[0][session_id] == (0, 0)
+
+    assert counter.flush() == 3
+    assert read_counts(db_path)[0][session_id] == (3, 2)
+    assert read_counts(db_path)[1] == {(session_id, "a"): 2, (session_id, "b"): 1}
+
+    manager.record_query(session_id, "b")
+    manager.record_query(session_id, "c")
+    counter.stop()
+    assert read_counts(db_path)[0][session_id] == (5, 3)
+    assert manager.get_student_entry_stats(session_id)["total_entries"] == 5
+
+
+def test_failed_flush_keeps_deltas(temp_dir):
+    db_path = str(temp_dir / "sessions.db")
+    manager = make_manager(db_path)
+    session_id = create_sessions(manager)[0]
+    counter = manager.usage_counter
+    counter.flush_interval = 3600
+
+    manager.record_query(session_id, "a")
+    original_write = counter._write
+    counter._write = lambda *args: (_ for _ in ()).throw(sqlite3.OperationalError("database is locked"))
+    assert counter.flush() == 0
+    manager.record_query(session_id, "a")
+    assert counter.pending() == {session_id: 2}
+
+    counter._write = original_write
+    counter.stop()
+    assert read_counts(db_path)[0][session_id] == (2, 1)
+    assert read_counts(db_path)[1] == {(session_id, "a"): 2}
+
+
+def test_concurrent_workers_are_exact(temp_dir):
+    db_path = str(temp_dir / "sessions.db")
+    session_ids = create_sessions(make_manager(db_path))
+
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=run_worker, args=(db_path, session_ids, seed, 0.01))
+        for seed in range(WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=120)
+        assert worker.exitcode == 0
+
+    queries, entries = expected_counts(session_ids)
+    sessions, stored_entries = read_counts(db_path)
+    for session_id in session_ids:
+        unique_students = len({student for (sid, student) in entries if sid == session_id})
+        assert sessions[session_id] == (queries[session_id], unique_students)
+    assert stored_entries == entries
+    assert sum(queries.values()) == WORKERS * THREADS_PER_WORKER * QUERIES_PER_THREAD
@@ -0,0 +1,333 @@
+import shutil
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+from src.analytics import telemetry_outbox
+from src.analytics.database import ExperimentDatabase
+from src.analytics.telemetry_outbox import (
+    MAX_ATTEMPTS,
+    PermanentDeliveryError,
+    TelemetryOutbox,
+    backoff_seconds,
+)
+
+
+@pytest.fixture
+def temp_dir():
+    path = tempfile.mkdtemp()
+    yield Path(path)
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def make_outbox(temp_dir, handlers):
+    return TelemetryOutbox(str(temp_dir / "outbox.db"), handlers=handlers, batch_size=50)
+
+
+def rows(outbox):
+    conn = sqlite3.connect(outbox.db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(r) for r in conn.execute("SELECT * FROM telemetry_outbox ORDER BY event_id")]
+    finally:
+        conn.close()
+
+
+def make_due(outbox):
+    conn = sqlite3.connect(outbox.db_path)
+    conn.execute("UPDATE telemetry_outbox SET next_attempt_at = 0")
+    conn.commit()
+    conn.close()
+
+
+def test_enqueue_only_appends_and_flush_batches(temp_dir):
+    delivered = []
+    outbox = make_outbox(temp_dir, {"a": delivered.append, "b": delivered.append})
+    outbox.start = lambda: None  # flush manually
+
+    ids = [outbox.enqueue("a", {"n": i}) for i in range(3)] + [outbox.enqueue("b", {"n": 9})]
+    assert len(set(ids)) == 4
+    assert outbox.stats()["pending"] == 4
+    assert delivered == []
+
+    assert outbox.flush() == 4
+    assert delivered == [[{"n": 0}, {"n": 1}, {"n": 2}], [{"n": 9}]]
+    assert rows(outbox) == []
+    assert outbox.stats()["pending"] == 0
+
+
+def test_failed_batch_backs_off_and_retries(temp_dir):
+    calls = []
+
+    def flaky(payloads):
+        calls.append(payloads)
+        if len(calls) == 1:
+            raise RuntimeError("service unavailable")
+
+    outbox = make_outbox(temp_dir, {"a": flaky})
+    outbox.start = lambda: None
+    outbox.enqueue("a", {"n": 1})
+
+    outbox.flush()
+    [row] = rows(outbox)
+    assert row["attempts"] == 1
+    assert row["status"] == "pending"
+    assert "service unavailable" in row["last_error"]
+
+    # Not due yet: nothing is sent
+    assert outbox.flush() == 0
+    assert len(calls) == 1
+
+    make_due(outbox)
+    assert outbox.flush() == 1
+    assert len(calls) == 2
+    assert rows(outbox) == []
+
+
+def test_permanent_errors_and_max_attempts_go_dead(temp_dir):
+    def rejected(payloads):
+        raise PermanentDeliveryError("422 invalid payload")
+
+    def down(payloads):
+        raise RuntimeError("down")
+
+    outbox = make_outbox(temp_dir, {"rejected": rejected, "down": down})
+    outbox.start = lambda: None
+    outbox.enqueue("rejected", {})
+    outbox.enqueue("down", {})
+    outbox.enqueue("unknown", {})
+
+    for _ in range(MAX_ATTEMPTS):
+        make_due(outbox)
+        outbox.flush()
+
+    statuses = {r["kind"]: (r["status"], r["attempts"]) for r in rows(outbox)}
+    assert statuses == {
+        "rejected": ("dead", 1),
+        "down": ("dead", MAX_ATTEMPTS),
+        "unknown": ("dead", 1),
+    }
+    stats = outbox.stats()
+    assert stats["pending"] == 0
+    assert stats["dead"] == 3
+
+
+def test_backoff_is_exponential_and_capped():
+    assert [backoff_seconds(n) for n in (1, 2, 3, 4)] == [1.0, 2.0, 4.0, 8.0]
+    assert backoff_seconds(50) == telemetry_outbox.BACKOFF_MAX_SECONDS
+
+
+def test_workers_sharing_the_file_deliver_each_row_once(temp_dir):
+    delivered = []
+    lock = threading.Lock()
+
+    def handler(payloads):
+        with lock:
+            delivered.extend(p["n"] for p in payloads)
+
+    workers = [make_outbox(temp_dir, {"a": handler}) for _ in range(3)]
+    for worker in workers:
+        worker.start = lambda: None
+        worker.batch_size = 7
+    for i in range(100):
+        workers[i % 3].enqueue("a", {"n": i})
+
+    threads = [threading.Thread(target=worker.flush) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(delivered) == list(range(100))
+
+
+def test_background_flusher_writes_experiment_batch(temp_dir):
+    db = ExperimentDatabase(str(temp_dir / "experiments.db"))
+
+    outbox = TelemetryOutbox(
+        str(temp_dir / "outbox.db"),
+        handlers={"experiment_interaction": db.add_interactions_batch},
+        flush_interval=0.05,
+    )
+    try:
+        for i in range(5):
+            outbox.enqueue("experiment_interaction", {
+                "rag_params": {"model": "m", "top_k": 5},
+                "user_id": "u1",
+                "query": f"soru {i}",
+                "response": "cevap",
+                "retrieved_context": [{"doc_id": "d1"}],
+                "session_id": "s1",
+                "processing_time_ms": 12,
+                "chain_type": "rag",
+            })
+        for _ in range(100):
+            if outbox.stats()["pending"] == 0:
+                break
+            threading.Event().wait(0.05)
+    finally:
+        outbox.stop()
+
+    with db.get_connection() as conn:
+        interactions = conn.execute("SELECT query, rag_config_hash, success FROM interactions ORDER BY interaction_id").fetchall()
+        configs = conn.execute("SELECT COUNT(*) FROM rag_configurations").fetchone()[0]
+    assert [r["query"] for r in interactions] == [f"soru {i}" for i in range(5)]
+    assert len({r["rag_config_hash"] for r in interactions}) == 1
+    assert all(r["success"] for r in interactions)
+    assert configs == 1
+
+
+def test_per_row_results_only_retry_failed_rows(temp_dir):
+    calls = []
+
+    def partial(payloads):
+        calls.append([p["n"] for p in payloads])
+        return [
+            PermanentDeliveryError("invalid") if p["n"] == 1 else
+            RuntimeError("locked") if p["n"] == 2 and len(calls) == 1 else
+            100 + p["n"]
+            for p in payloads
+        ]
+
+    outbox = make_outbox(temp_dir, {"a": partial})
+    outbox.start = lambda: None
+    for i in range(4):
+        outbox.enqueue("a", {"n": i})
+
+    outbox.flush()
+    left = {r["payload"]: (r["status"], r["attempts"]) for r in rows(outbox)}
+    assert left == {'{"n": 1}': ("dead", 1), '{"n": 2}': ("pending", 1)}
+
+    make_due(outbox)
+    outbox.flush()
+    assert calls == [[0, 1, 2, 3], [2]]
+    assert [r["status"] for r in rows(outbox)] == ["dead"]
+
+
+def test_rejected_batch_is_bisected_to_the_bad_row(temp_dir):
+    delivered = []
+
+    def strict(payloads):
+        if any(p["n"] == 13 for p in payloads):
+            raise PermanentDeliveryError("422 invalid payload")
+        delivered.extend(p["n"] for p in payloads)
+
+    outbox = make_outbox(temp_dir, {"a": strict})
+    outbox.start = lambda: None
+    for i in range(40):
+        outbox.enqueue("a", {"n": i})
+
+    outbox.flush()
+    assert sorted(delivered) == [i for i in range(40) if i != 13]
+    [dead] = rows(outbox)
+    assert dead["payload"] == '{"n": 13}' and dead["status"] == "dead" and dead["attempts"] == 1
+
+
+def test_row_that_keeps_failing_is_isolated_before_max_attempts(temp_dir):
+    delivered = []
+    calls = []
+
+    def poisoned(payloads):
+        calls.append(len(payloads))
+        if any(p["n"] == 7 for p in payloads):
+            raise RuntimeError("500 internal error")
+        delivered.extend(p["n"] for p in payloads)
+
+    outbox = make_outbox(temp_dir, {"a": poisoned})
+    outbox.start = lambda: None
+    for i in range(50):
+        outbox.enqueue("a", {"n": i})
+
+    for _ in range(MAX_ATTEMPTS):
+        make_due(outbox)
+        outbox.flush()
+
+    assert sorted(delivered) == [i for i in range(50) if i != 7]
+    [dead] = rows(outbox)
+    assert dead["payload"] == '{"n": 7}' and dead["status"] == "dead" and dead["attempts"] == MAX_ATTEMPTS
+    # Groups shrink per attempt instead of splitting every failure at once
+    assert max(calls[1:]) == 25
+
+
+def test_lease_is_renewed_while_delivering(temp_dir, monkeypatch):
+    monkeypatch.setattr(telemetry_outbox, "CLAIM_LEASE_SECONDS", 0.2)
+    monkeypatch.setattr(telemetry_outbox, "CLAIM_RENEW_SECONDS", 0.05)
+    delivered = []
+    started = threading.Event()
+
+    def slow(payloads):
+        started.set()
+        threading.Event().wait(0.6)
+        delivered.extend(p["n"] for p in payloads)
+
+    first, second = make_outbox(temp_dir, {"a": slow}), make_outbox(temp_dir, {"a": slow})
+    first.start = second.start = lambda: None
+    first.enqueue("a", {"n": 1})
+
+    worker = threading.Thread(target=first.flush_once)
+    worker.start()
+    started.wait(5)
+    threading.Event().wait(0.3)  # longer than the lease
+    assert second.flush_once() == 0
+    worker.join()
+    assert delivered == [1]
+    assert rows(first) == []
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body or {}
+        self.text = str(self.body)
+
+    def json(self):
+        return self.body
+
+
+def test_per_interaction_fallback_acknowledges_each_row(monkeypatch):
+    from src.utils import aprag_middleware
+
+    posted = []
+
+    class FakeSession:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def post(self, url, json, **kwargs):
+            posted.append(json["n"])
+            if json["n"] == 1:
+                return FakeResponse(422, {"detail": "invalid"})
+            if json["n"] == 3:
+                return FakeResponse(503)
+            return FakeResponse(201, {"interaction_id": 100 + json["n"]})
+
+    monkeypatch.setattr(aprag_middleware, "is_aprag_enabled", lambda *a: True)
+    monkeypatch.setattr(aprag_middleware.requests, "post", lambda *a, **k: FakeResponse(404))
+    monkeypatch.setattr(aprag_middleware.requests, "Session", FakeSession)
+
+    results = aprag_middleware.post_interactions_batch([{"n": i} for i in range(6)])
+
+    # Stops at the transient error: rows 4 and 5 are not sent, only reported failed
+    assert posted == [0, 1, 2, 3]
+    assert results[0] == 100 and results[2] == 102
+    assert isinstance(results[1], PermanentDeliveryError)
+    assert all(isinstance(r, RuntimeError) and not isinstance(r, PermanentDeliveryError) for r in results[3:])
+
+
+def test_batch_endpoint_errors_become_row_results(monkeypatch):
+    from src.utils import aprag_middleware
+
+    monkeypatch.setattr(aprag_middleware, "is_aprag_enabled", lambda *a: True)
+    monkeypatch.setattr(aprag_middleware.requests, "post", lambda *a, **k: FakeResponse(201, {
+        "interaction_ids": [10, None, 12],
+        "errors": [{"index": 1, "error": "database is locked"}],
+    }))
+    results = aprag_middleware.post_interactions_batch([{}, {}, {}])
+    assert results[0] == 10 and results[2] == 12
+    assert "database is locked" in str(results[1])
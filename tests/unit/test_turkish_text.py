@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import pytest
+
+from src.utils import turkish_text
+from src.utils.turkish_text import analyze, ascii_fold, light_stem, normalize_text, tokenize, turkish_lower
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("ISI", "ısı"),
+    ("İNSAN", "insan"),
+    ("IŞIK İçin", "ışık için"),
+    ("s\u0327ekil", "şekil"),  # decomposed ş (PDF text)
+])
+def test_turkish_lower(text, expected):
+    assert turkish_lower(text) == expected
+
+
+def test_apostrophe_suffix_is_dropped():
+    assert normalize_text("Ankara'nın  nüfusu") == "ankara nüfusu"
+    assert analyze("DNA’ya bağlanan proteinler").tokens == ("dna", "bağlanan", "proteinler")
+
+
+@pytest.mark.parametrize("token, stem", [
+    ("hücrenin", "hücre"),
+    ("hücrelerin", "hücre"),
+    ("hücrelerde", "hücre"),
+    ("atomun", "atom"),
+    ("kitaplardan", "kitap"),
+    ("hücre", "hücre"),
+    ("dede", "dede"),  # stem would be shorter than MIN_STEM_LENGTH
+])
+def test_light_stem(token, stem):
+    assert light_stem(token) == stem
+
+
+def test_terms_share_forms_across_spellings():
+    # single-vowel possessives ("zarı") are kept: stripping them over-stems ("bilgi")
+    expected = ("hucre", "zari")
+    assert analyze("Hücrenin zarı nedir?").terms == expected
+    assert analyze("HÜCRENİN ZARI NEDİR").terms == expected
+    assert analyze("hucrenin zari nedir").terms == expected
+
+
+def test_tokenize_stopwords():
+    assert tokenize("Bu ve şu için 2024 yılı", remove_stopwords=False) == ("bu", "ve", "şu", "için", "2024", "yılı")
+    assert tokenize("Bu ve şu için 2024 yılı") == ("2024", "yili")
+    assert ascii_fold("çğıöşü") == "cgiosu"
+
+
+def test_analysis_is_cached_and_deterministic():
+    turkish_text.analyze.cache_clear()
+    first = analyze("Fotosentez nasıl gerçekleşir?")
+    second = analyze("Fotosentez nasıl gerçekleşir?")
+    assert first is second
+    assert turkish_text.analyze.cache_info().hits == 1
+    assert first.terms == ("fotosentez", "gerceklesir")
+
+
+def test_aprag_copy_matches():
+    # aprag image is built from services/aprag_service only; the module is copied there
+    source = (REPO_ROOT / "src" / "utils" / "turkish_text.py").read_text(encoding="utf-8")
+    copy = (REPO_ROOT / "services" / "aprag_service" / "utils" / "turkish_text.py").read_text(encoding="utf-8")
+    assert copy == source